@@ -3,10 +3,34 @@ OmniMonitor - Monitor de Sistema Multiplataforma
 Soporta modo Escritorio y Web con datos REALES
 Incluye CRUD: Alertas, Procesos, Historial, Configuración
 """
-import flet as ft
-import asyncio
 import os
 import sys
+import time
+
+STARTED_AT = time.perf_counter()  # Referencia para medir el tiempo hasta el primer frame
+
+# Modo agente (--agent URL_COLECTOR): sin interfaz, no necesita cargar Flet
+if __name__ == "__main__" and "--agent" in sys.argv:
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from src.agent.agent import main as agent_main
+    sys.exit(agent_main(sys.argv[sys.argv.index("--agent") + 1:]))
+
+# Modo colector (--collector): publica snapshots en memoria compartida para los consumidores locales
+if __name__ == "__main__" and "--collector" in sys.argv:
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from src.server.shm import main as collector_main
+    sys.exit(collector_main(sys.argv[sys.argv.index("--collector") + 1:]))
+
+# Modo terminal (--top): estilo `top` para sesiones SSH, sin Flet
+if __name__ == "__main__" and "--top" in sys.argv:
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from src.cli.top import main as top_main
+    sys.exit(top_main(sys.argv[sys.argv.index("--top") + 1:]))
+
+import flet as ft
+import asyncio
+import atexit
+import threading
 import urllib.request
 import json
 from datetime import datetime
@@ -16,6 +40,11 @@ ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, ROOT_DIR)
 
 from src.core.monitor import SystemMonitor
+from src.core.series import SeriesCollector
+from src.core.anomaly import AnomalyDetector
+from src.core.instrumentation import get_instrumentation
+from src.core.scheduler import SamplingScheduler, MetricSource
+from src.core.burst import BurstController
 from src.ui.chart_manager import ChartManager
 from src.ui.components import (
     DARK_BG, CARD_BG, SIDEBAR_BG, GREEN_PRIMARY, BLUE_PRIMARY, 
@@ -28,40 +57,77 @@ from src.ui.components import (
 from src.ui.theme_manager import ThemeManager, apply_theme_to_page, DARK_THEME, LIGHT_THEME
 
 # Importar CRUD
-from src.database.db import get_db
-from src.crud.alerts import AlertManager
+from src.database.db import get_db, get_read_pool
+from src.crud.alerts import AlertManager, AlertEngine, AlertEventLog, OPERATOR_CONDITIONS
 from src.crud.processes import ProcessManager
-from src.crud.history import HistoryManager
-from src.ui.crud_views import (
-    build_alerts_view, build_processes_view,
-    build_history_view, build_config_view
-)
+from src.crud.history import HistoryManager, get_history_writer
+from src.crud.sinks import AlertDispatcher
 from src.ui.toast_manager import ToastManager, ToastType
+from src.ui.view_cache import ViewCache, BackgroundLoader, skeleton_rows
+from src.server.wire import MIME_TYPE as SNAPSHOT_MIME_TYPE, decode_snapshot
+from src.server.fleet import FleetClient, merged_snapshot
+from src.server.shm import SnapshotCollector, get_shared_reader
 
-# Importar SoundManager
+# Importar SoundManager (la detección del backend se hace en segundo plano)
 try:
     from src.ui.sound_manager import SoundManager
 except ImportError:
     SoundManager = None
 
+
+# Vistas CRUD: se importan en la primera navegación, no retrasan el primer frame
+def _lazy_view(name: str):
+    def build(*args, **kwargs):
+        from src.ui import crud_views
+        return getattr(crud_views, name)(*args, **kwargs)
+    build.__name__ = name
+    return build
+
+
+build_alerts_view = _lazy_view("build_alerts_view")
+build_processes_view = _lazy_view("build_processes_view")
+build_containers_view = _lazy_view("build_containers_view")
+build_history_view = _lazy_view("build_history_view")
+build_config_view = _lazy_view("build_config_view")
+
 # Detectar modo de ejecución
 IS_WEB = "--web" in sys.argv or "-w" in sys.argv
 API_PORT = 8765
 API_URL = f"http://localhost:{API_PORT}"
 
+# Modo flota: --fleet host1:8765,host2:8765,...
+FLEET_HOSTS = []
+if "--fleet" in sys.argv:
+    _idx = sys.argv.index("--fleet")
+    if _idx + 1 < len(sys.argv):
+        FLEET_HOSTS = [h for h in sys.argv[_idx + 1].split(",") if h.strip()]
+IS_FLEET = bool(FLEET_HOSTS)
+
+HISTORY_SAVE_SECONDS = 10  # Una fila de historial local cada 10 s (independiente del intervalo)
+# Series etiquetadas que se guardan junto al historial (por núcleo, partición, interfaz)
+HISTORY_SERIES = ("cpu_usage", "disk_usage", "net_download", "net_upload")
+
 
 class WebMonitor:
     """Monitor que obtiene datos REALES desde el servidor API"""
     
-    def __init__(self, api_url: str = API_URL):
+    def __init__(self, api_url: str = API_URL, binary: bool = True):
         self.api_url = api_url
+        self.binary = binary  # Pedir formato binario compacto (con fallback a JSON)
         self._cache = {}
     
-    def _fetch(self, endpoint: str) -> dict:
+    def _fetch(self, endpoint: str, binary: bool = False) -> dict:
         """Hace petición HTTP al servidor API"""
         try:
-            with urllib.request.urlopen(f"{self.api_url}{endpoint}", timeout=2) as response:
-                return json.loads(response.read().decode())
+            request = urllib.request.Request(f"{self.api_url}{endpoint}")
+            if binary:
+                request.add_header("Accept", f"{SNAPSHOT_MIME_TYPE}, application/json;q=0.5")
+            with urllib.request.urlopen(request, timeout=2) as response:
+                body = response.read()
+                # El servidor puede no soportar el formato binario y responder JSON
+                if response.headers.get_content_type() == SNAPSHOT_MIME_TYPE:
+                    return decode_snapshot(body)
+                return json.loads(body.decode())
         except Exception as e:
             print(f"Error fetching {endpoint}: {e}")
             return {}
@@ -69,7 +135,7 @@ class WebMonitor:
     def refresh(self):
         """Actualiza todos los datos desde el API"""
         try:
-            self._cache = self._fetch("/api/all")
+            self._cache = self._fetch("/api/all", binary=self.binary)
         except:
             pass
     
@@ -92,6 +158,9 @@ class WebMonitor:
     def get_memory_usage(self) -> dict:
         return self._cache.get("memory", {"percent": 0, "used": 0, "total": 1, "free": 1})
     
+    def get_swap_memory(self) -> dict:
+        return self._cache.get("swap") or {"total": 0, "used": 0, "free": 0, "percent": 0}
+    
     def get_disk_usage(self, path: str = '/') -> dict:
         return self._cache.get("disk", {}).get("usage", {"percent": 0, "used": 0, "total": 1, "free": 1})
     
@@ -101,9 +170,21 @@ class WebMonitor:
     def get_disk_io(self) -> dict:
         return self._cache.get("disk", {}).get("io", {"read_speed": 0, "write_speed": 0})
     
+    def get_disk_io_per_device(self) -> dict:
+        return self._cache.get("disk", {}).get("devices") or {}
+    
     def get_network_speed(self) -> dict:
         return self._cache.get("network", {}).get("speed", {"upload": 0, "download": 0})
     
+    def get_network_speed_per_interface(self) -> dict:
+        return self._cache.get("network", {}).get("devices") or {}
+    
+    def get_containers(self) -> list:
+        # No va en /api/all: se pide solo con la vista de contenedores abierta
+        if not self.api_url:
+            return []
+        return self._fetch("/api/containers").get("cgroups") or []
+    
     def get_network_info(self) -> dict:
         return self._cache.get("network", {}).get("info", {"interfaces": []})
     
@@ -120,6 +201,51 @@ class WebMonitor:
         return self._cache.get("system", {}).get("battery")
 
 
+class FleetMonitor(WebMonitor):
+    """
+    Monitor de flota: consulta N servidores API en segundo plano
+    Las tarjetas muestran el peor host (CPU/RAM/disco) y la suma de la flota
+    (red, I/O); la vista por host está en `fleet_view`.
+    """
+    
+    def __init__(self, hosts: list, interval: float = 1.0):
+        super().__init__(api_url="")
+        self.client = FleetClient(hosts, interval=interval)
+        self.fleet_view = {"hosts": [], "aggregate": {}}
+    
+    def refresh(self):
+        """Combinar el último estado conocido de cada host (no bloquea)"""
+        self.fleet_view = self.client.fleet_view()
+        self._cache = merged_snapshot(self.fleet_view)
+
+
+class SharedMonitor(WebMonitor):
+    """
+    Monitor que lee el snapshot publicado por un colector local (--collector)
+    Si el colector se detiene, recolecta por su cuenta hasta que vuelva.
+    """
+    
+    def __init__(self, reader):
+        super().__init__(api_url="")
+        self.reader = reader
+        self.connected = True
+        self._fallback = None
+    
+    def refresh(self):
+        data = self.reader.read()
+        self.connected = data is not None
+        if data is None:
+            if self._fallback is None:
+                self._fallback = SnapshotCollector()
+            data = self._fallback.collect()
+        self._cache = data
+    
+    def get_containers(self) -> list:
+        # Mismo host que el colector: los cgroups se leen aquí
+        from src.core.cgroups import get_cgroup_collector
+        return get_cgroup_collector().sample()
+
+
 def main(page: ft.Page):
     page.title = "OmniMonitor"
     page.theme_mode = ft.ThemeMode.DARK
@@ -132,16 +258,46 @@ def main(page: ft.Page):
         page.window.height = 800
 
     # Seleccionar monitor según el modo
-    if IS_WEB:
+    if IS_FLEET:
+        monitor = FleetMonitor(FLEET_HOSTS)
+        page.run_task(monitor.client.run)
+    elif IS_WEB:
         monitor = WebMonitor(API_URL)
+    elif "--no-shared" not in sys.argv and get_shared_reader().available():
+        monitor = SharedMonitor(get_shared_reader())
     else:
         monitor = SystemMonitor()
     
     # Inicializar CRUD managers
     db = get_db()
     alert_manager = AlertManager()
+    alert_engine = AlertEngine(db)  # Reglas compiladas; se recompilan al editarlas
+    series_collector = SeriesCollector(monitor)  # Series por núcleo/partición/interfaz/proceso
+    # Anomalías resaltadas en los gráficos; línea base estacional solo con historial local
+    # (la línea base se carga tras el primer frame, ver más abajo)
+    anomaly_detector = AnomalyDetector(("ram_usage", "net_download"))
     process_manager = ProcessManager()
     history_manager = HistoryManager()
+    # Autodiagnóstico: latencia por etapa del loop (coste casi nulo si está desactivado)
+    instrumentation = get_instrumentation()
+    instrumentation.set_enabled(instrumentation.enabled or db.get_config('enable_diagnostics') == 'true')
+    instrumentation.instrument_monitor(monitor)
+    # Historial, eventos y contadores de alertas se escriben en lotes en segundo plano
+    history_writer = get_history_writer()
+    alert_log = AlertEventLog(history_writer.add_alert_event)
+    # Destinos externos (webhook, archivo, syslog, comando) de la clave alert_sinks
+    alert_sinks = AlertDispatcher.from_config(db)
+    # Ráfagas de muestreo a 10-100 Hz (manuales desde Historial o al disparar una alerta)
+    burst_controller = BurstController()
+    
+    def shutdown_writers():
+        alert_log.close_all()
+        history_writer.stop()
+        alert_sinks.close()
+        burst_controller.stop()
+        if SoundManager:
+            SoundManager.shutdown()  # Cerrar el reproductor de audio persistente
+    atexit.register(shutdown_writers)
     
     # ============ CARGAR TEMA GUARDADO ============
     saved_theme = db.get_config('theme')
@@ -177,9 +333,50 @@ def main(page: ft.Page):
         SoundManager.set_enabled(sounds_enabled)
     
     chart_mgr = ChartManager(max_points=60)
-    update_interval = 1.0
     current_view = "resumen"
-    history_save_counter = 0  # Para guardar historial cada N actualizaciones
+    last_history_save = time.monotonic()  # El historial se guarda cada HISTORY_SAVE_SECONDS
+
+    def configured_interval() -> float:
+        """Intervalo base en segundos (clave update_interval, en ms; se relee en cada ronda)"""
+        try:
+            return max(int(db.get_config('update_interval') or 1000), 100) / 1000
+        except ValueError:
+            return 1.0
+
+    def gpu_signature(info):
+        return info and (round(info['usage']), round(info['temp']))
+
+    # ============ PLANIFICADOR DE MUESTREO ============
+    # Cadencia en múltiplos del intervalo base; las fuentes caras se espacian
+    # (hasta 8x) con CPU > 85% o si su valor no cambia. Las lambdas resuelven el
+    # getter en cada llamada para respetar los envoltorios del autodiagnóstico.
+    sources = [
+        MetricSource("cpu", lambda: monitor.get_cpu_usage()),
+        MetricSource("cpu_per_core", lambda: monitor.get_cpu_per_core()),
+        MetricSource("memory", lambda: monitor.get_memory_usage()),
+        MetricSource("network", lambda: monitor.get_network_speed()),
+        MetricSource("disk_io", lambda: monitor.get_disk_io()),
+        MetricSource("disk_devices", lambda: monitor.get_disk_io_per_device(), every=2),
+        MetricSource("net_devices", lambda: monitor.get_network_speed_per_interface(), every=2),
+        MetricSource("cpu_freq", lambda: monitor.get_cpu_freq(), every=2),
+        MetricSource("cpu_temp", lambda: monitor.get_cpu_temp(), every=2, expensive=True,
+                     signature=lambda t: t and round(t)),
+        MetricSource("gpu", lambda: monitor.get_gpu_info(), every=2, expensive=True,
+                     signature=gpu_signature),
+        MetricSource("top_processes", lambda: (process_manager.get_top_cpu(3), process_manager.get_top_memory(3)),
+                     every=3, expensive=True,
+                     signature=lambda top: tuple(p.name for group in top for p in group)),
+        MetricSource("disk", lambda: monitor.get_disk_usage(), every=5),
+        MetricSource("disk_info", lambda: monitor.get_disk_info(), every=10, expensive=True,
+                     signature=lambda parts: tuple((p['device'], round(p['usage']['percent'])) for p in parts)),
+        MetricSource("network_info", lambda: monitor.get_network_info(), every=10, expensive=True),
+        MetricSource("system_info", lambda: monitor.get_system_info(), every=60),
+    ]
+    if isinstance(monitor, WebMonitor):
+        # Modo web/flota: un solo snapshot por ronda, los getters leen de la caché
+        sources.insert(0, MetricSource("refresh", lambda: monitor.refresh()))
+    scheduler = SamplingScheduler(sources, interval=configured_interval(), load_source="cpu")
+    instrumentation.add_provider("scheduler", scheduler.stats)
 
     # ============ VALORES DE CPU ============
     cpu_percent_text = ft.Text("0%", size=42, weight=ft.FontWeight.BOLD, color=TEXT_WHITE)
@@ -214,9 +411,10 @@ def main(page: ft.Page):
     network_chart_container = ft.Container(height=180)
     net_details_container = ft.Column(spacing=10)  # Contenedor para detalles de red
     net_stats_row = ft.Row(spacing=15)  # Estadísticas en tiempo real de red
+    fleet_hosts_container = ft.Column(spacing=6)  # Tabla de hosts (modo flota)
 
     # ============ STATUS BAR ============
-    mode_indicator = "🌐 WEB (Datos Reales)" if IS_WEB else "🖥️ Escritorio"
+    mode_indicator = "🛰️ Flota" if IS_FLEET else ("🌐 WEB (Datos Reales)" if IS_WEB else "🖥️ Escritorio")
     status_text = ft.Text(f"Status: Conectado | {mode_indicator}", size=12, color=BLUE_PRIMARY)
     version_text = ft.Text("Versión 2.3.0", size=12, color=TEXT_GRAY)
 
@@ -225,13 +423,14 @@ def main(page: ft.Page):
     ram_details_container = ft.Column(spacing=10)
     disk_details_container = ft.Column(spacing=10)
 
-    def update_details_content():
-        """Actualizar el contenido de los desplegables (Top procesos, etc.)"""
+    def update_details_content(values: dict):
+        """Actualizar el contenido de los desplegables (Top procesos, etc.) con los valores de la ronda"""
         theme = ThemeManager.get_theme()
+        top_cpu, top_mem = values.get("top_processes") or ([], [])
         
         # --- CPU DETALLES ---
         # Uso por núcleo
-        cores = monitor.get_cpu_per_core()
+        cores = values.get("cpu_per_core") or []
         core_bars = []
         for i, usage in enumerate(cores):
             color = theme["accent_red"] if usage > 80 else (theme["accent_yellow"] if usage > 50 else theme["accent_green"])
@@ -246,7 +445,6 @@ def main(page: ft.Page):
             )
         
         # Top Procesos CPU
-        top_cpu = process_manager.get_top_cpu(3)
         top_cpu_items = [ft.Text("Top Procesos:", size=12, weight=ft.FontWeight.BOLD, color=theme["text_secondary"])]
         for p in top_cpu:
             top_cpu_items.append(
@@ -265,7 +463,6 @@ def main(page: ft.Page):
 
         # --- RAM DETALLES ---
         # Top Procesos RAM
-        top_mem = process_manager.get_top_memory(3)
         top_mem_items = [ft.Text("Top Memoria:", size=12, weight=ft.FontWeight.BOLD, color=theme["text_secondary"])]
         for p in top_mem:
             top_mem_items.append(
@@ -282,7 +479,7 @@ def main(page: ft.Page):
 
         # --- DISK DETALLES ---
         # Particiones (simplificado)
-        partitions = monitor.get_disk_info()
+        partitions = values.get("disk_info") or []
         part_items = [ft.Text("Particiones:", size=12, weight=ft.FontWeight.BOLD, color=theme["text_secondary"])]
         for p in partitions:
             usage = p['usage']
@@ -296,13 +493,34 @@ def main(page: ft.Page):
                 ], spacing=2)
             )
 
+        # E/S por disco físico: rendimiento, IOPS, latencia y cola
+        disk_devices = values.get("disk_devices") or {}
+        if disk_devices:
+            part_items.append(ft.Text("Dispositivos:", size=12, weight=ft.FontWeight.BOLD, color=theme["text_secondary"]))
+        for name, dev in sorted(disk_devices.items()):
+            queue_depth = dev.get('queue_depth')
+            part_items.append(
+                ft.Column([
+                    ft.Row([
+                        ft.Text(name, size=11, weight=ft.FontWeight.BOLD, color=theme["text_primary"]),
+                        ft.Text(f"L {dev['read_speed']:.2f} · E {dev['write_speed']:.2f} MB/s",
+                                size=11, color=theme["text_primary"]),
+                    ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+                    ft.Text(
+                        f"{dev['read_iops']:.0f}/{dev['write_iops']:.0f} IOPS · {dev['await_ms']:.1f} ms"
+                        + (f" · cola {queue_depth:.2f}" if queue_depth is not None else "")
+                        + f" · {dev['util']:.0f}% ocupado",
+                        size=10, color=theme["accent_orange"] if dev['util'] > 80 else theme["text_secondary"]),
+                ], spacing=0)
+            )
+
         disk_details_container.controls = [
             ft.Divider(color=theme["border_primary"]),
             ft.Column(part_items, spacing=5)
         ]
         
         # --- GPU DETALLES ---
-        gpu_info = monitor.get_gpu_info()
+        gpu_info = values.get("gpu")
         gpu_items = []
         
         if gpu_info:
@@ -343,8 +561,10 @@ def main(page: ft.Page):
         ]
         
         # --- RED DETALLES ---
-        net_info = monitor.get_network_info()
-        net_speed = monitor.get_network_speed()
+        # Misma muestra que el loop: una segunda llamada a get_network_speed
+        # mediría el tráfico de unos pocos milisegundos
+        net_info = values.get("network_info") or {}
+        net_speed = values.get("network") or {}
         
         # Calcular velocidades actuales
         down_speed = net_speed.get('download', 0) / (1024 * 1024)  # MB/s
@@ -352,6 +572,7 @@ def main(page: ft.Page):
         
         # Interfaces de red
         interfaces = net_info.get('interfaces', [])
+        net_devices = values.get("net_devices") or {}
         
         net_items = [
             ft.Text("📊 Tráfico en Tiempo Real:", size=12, weight=ft.FontWeight.BOLD, color=theme["text_secondary"]),
@@ -392,6 +613,11 @@ def main(page: ft.Page):
             iface_name = iface.get('name', 'Unknown')
             iface_ip = iface.get('ip', 'N/A')
             iface_speed = iface.get('speed', 0)
+            rates = net_devices.get(iface_name)
+            rate_text = (f"↓ {rates['download'] / (1024 * 1024):.2f} · ↑ {rates['upload'] / (1024 * 1024):.2f} MB/s"
+                         if rates else "")
+            if rates and (rates['errors'] or rates['drops']):
+                rate_text += f" · {rates['errors']:.0f} err/s · {rates['drops']:.0f} desc/s"
             
             net_items.append(
                 ft.Container(
@@ -401,6 +627,7 @@ def main(page: ft.Page):
                         ft.Column([
                             ft.Text(iface_name, size=12, weight=ft.FontWeight.BOLD, color=theme["text_primary"]),
                             ft.Text(f"IP: {iface_ip}", size=10, color=theme["text_secondary"]),
+                            ft.Text(rate_text, size=10, color=theme["accent_green"], visible=bool(rate_text)),
                         ], spacing=0, expand=True),
                         ft.Text(f"{iface_speed} Mbps" if iface_speed else "N/A", 
                                size=11, color=theme["text_secondary"]),
@@ -455,6 +682,28 @@ def main(page: ft.Page):
             ),
         ]
         
+        # --- FLOTA ---
+        if IS_FLEET:
+            fleet_rows = []
+            for host in monitor.fleet_view["hosts"]:
+                snap = host["snapshot"] or {}
+                cpu_h = (snap.get("cpu") or {}).get("usage") or 0
+                ram_h = (snap.get("memory") or {}).get("percent") or 0
+                fleet_rows.append(
+                    ft.Row([
+                        ft.Icon(ft.Icons.CIRCLE, size=10,
+                                color=theme["accent_green"] if host["up"] else theme["accent_red"]),
+                        ft.Text(host["name"][:24], size=12, color=theme["text_primary"], expand=True),
+                        ft.Text(f"CPU {cpu_h:.0f}%" if host["up"] else (host["error"] or "sin datos")[:30],
+                                size=11, color=theme["text_secondary"]),
+                        ft.Text(f"RAM {ram_h:.0f}%" if host["up"] else "", size=11, color=theme["text_secondary"]),
+                        ft.Text(f"{host['latency_ms']:.0f} ms" if host["up"] else "", size=11,
+                                color=theme["text_secondary"]),
+                    ], spacing=12)
+                )
+            fleet_hosts_container.controls = fleet_rows
+            if fleet_hosts_container.page: fleet_hosts_container.update()
+        
         # Actualizar todos los contenedores
         if cpu_details_container.page: cpu_details_container.update()
         if ram_details_container.page: ram_details_container.update()
@@ -539,7 +788,7 @@ def main(page: ft.Page):
         nonlocal current_view
         current_view = "alertas"
         sidebar.selected_index = 5  # Índice de Alertas en el sidebar
-        main_content.content = build_alerts_view(alert_manager, page)
+        main_content.content = view_cache.get("alertas")
         page.snack_bar = ft.SnackBar(
             content=ft.Text(f"🔔 Tienes {alert_manager.count()} alertas configuradas"),
             bgcolor=YELLOW_PRIMARY,
@@ -580,44 +829,10 @@ def main(page: ft.Page):
         ram_bar.bgcolor = theme["border_secondary"]
         disk_bar.bgcolor = theme["border_secondary"]
         
-        if current_view == "resumen":
-            main_content.content = build_resumen_view()
-        elif current_view == "cpu":
-            main_content.content = build_cpu_detail_view()
-        elif current_view == "ram":
-            main_content.content = build_ram_detail_view()
-        elif current_view == "disco":
-            main_content.content = build_disk_detail_view()
-        elif current_view == "red":
-            main_content.content = build_network_detail_view()
-        elif current_view == "alertas":
-            main_content.content = build_alerts_view(
-                alert_manager, page,
-                on_theme_light=on_theme_light,
-                on_theme_dark=on_theme_dark,
-                on_notifications=on_show_notifications
-            )
-        elif current_view == "procesos":
-            main_content.content = build_processes_view(
-                process_manager, page,
-                on_theme_light=on_theme_light,
-                on_theme_dark=on_theme_dark,
-                on_notifications=on_show_notifications
-            )
-        elif current_view == "historial":
-            main_content.content = build_history_view(
-                history_manager, page,
-                on_theme_light=on_theme_light,
-                on_theme_dark=on_theme_dark,
-                on_notifications=on_show_notifications
-            )
-        elif current_view == "ajustes":
-            main_content.content = build_config_view(
-                db, page,
-                on_theme_light=on_theme_light,
-                on_theme_dark=on_theme_dark,
-                on_notifications=on_show_notifications
-            )
+        # Los colores quedan fijados al construir: descartar la caché y
+        # reconstruir solo la vista visible (las demás, al visitarlas)
+        view_cache.invalidate()
+        main_content.content = view_cache.get(current_view)
 
     # ============ VISTAS ============
     def build_resumen_view():
@@ -643,6 +858,18 @@ def main(page: ft.Page):
                 ], expand=False),
                 ft.Container(height=15),
                 build_network_card(),
+                ft.Container(height=15) if IS_FLEET else ft.Container(),
+                ft.Container(
+                    content=ft.Column([
+                        ft.Text("🛰️ Hosts de la Flota", size=16, weight=ft.FontWeight.W_500,
+                                color=ThemeManager.get_theme()["text_primary"]),
+                        fleet_hosts_container,
+                    ], spacing=10),
+                    bgcolor=ThemeManager.get_theme()["bg_card"],
+                    border_radius=15,
+                    padding=20,
+                    visible=IS_FLEET,
+                ),
             ], scroll=ft.ScrollMode.AUTO, spacing=0),
             padding=25,
             expand=True,
@@ -650,10 +877,18 @@ def main(page: ft.Page):
         )
 
 
+    def with_background_refresh(view, load, apply):
+        """Cargar los datos de la vista fuera del hilo de la UI; al volver a ella solo se recargan"""
+        loader = BackgroundLoader(page, load, apply)
+        view.data = {"refresh": loader.request}
+        loader.request()
+        return view
+
     def build_cpu_detail_view():
         theme = ThemeManager.get_theme()
         
         # Info básica
+        freq_text = ft.Text("Frecuencia actual: -- GHz", color=theme["text_secondary"])
         user_info = ft.Container(
             content=ft.Column([
                 ft.Row([
@@ -664,7 +899,7 @@ def main(page: ft.Page):
                 ft.Text(f"Núcleos físicos: {monitor.get_cpu_count()[0]}", color=theme["text_secondary"]),
                 ft.Text(f"Núcleos lógicos: {monitor.get_cpu_count()[1]}", color=theme["text_secondary"]),
                 ft.Text(f"Arquitectura: {monitor.get_system_info()['architecture']}", color=theme["text_secondary"]),
-                ft.Text(f"Frecuencia actual: {monitor.get_cpu_freq() or 'N/A'} GHz", color=theme["text_secondary"]),
+                freq_text,
             ]),
             bgcolor=theme["bg_card"],
             border_radius=15,
@@ -672,20 +907,15 @@ def main(page: ft.Page):
             expand=True,
         )
 
-        # Uso por núcleo (construido dinámicamente)
-        cores_usage = monitor.get_cpu_per_core()
-        core_controls = []
-        for i, usage in enumerate(cores_usage):
-            color = theme["accent_red"] if usage > 80 else (theme["accent_yellow"] if usage > 50 else theme["accent_green"])
-            core_controls.append(
-                ft.Column([
-                    ft.Row([
-                        ft.Text(f"Núcleo {i}", size=12, color=theme["text_secondary"]),
-                        ft.Text(f"{usage}%", size=12, weight=ft.FontWeight.BOLD, color=theme["text_primary"]),
-                    ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
-                    ft.ProgressBar(value=usage/100, color=color, bgcolor=theme["bg_hover"], height=6),
-                ], spacing=3)
-            )
+        # Uso por núcleo (se llena al cargar)
+        cores_grid = ft.GridView(
+            runs_count=2,
+            max_extent=250,
+            child_aspect_ratio=3,
+            spacing=15,
+            run_spacing=15,
+            controls=skeleton_rows(4, theme["text_secondary"]),
+        )
             
         cores_expansion = ft.Container(
             content=ft.ExpansionTile(
@@ -695,14 +925,7 @@ def main(page: ft.Page):
                 ]),
                 controls=[
                     ft.Container(height=15),
-                    ft.GridView(
-                        runs_count=2,
-                        max_extent=250,
-                        child_aspect_ratio=3,
-                        spacing=15,
-                        run_spacing=15,
-                        controls=core_controls,
-                    ),
+                    cores_grid,
                     ft.Container(height=10),
                 ],
 
@@ -716,17 +939,18 @@ def main(page: ft.Page):
             padding=5,
         )
 
-        # Top Procesos CPU
-        top_cpu = process_manager.get_top_cpu(5)
-        top_cpu_rows = []
-        for p in top_cpu:
-            top_cpu_rows.append(
-                ft.DataRow(cells=[
-                    ft.DataCell(ft.Text(str(p.pid), color=theme["text_secondary"], size=12)),
-                    ft.DataCell(ft.Text(p.name[:20], color=theme["text_primary"], size=12, weight=ft.FontWeight.BOLD)),
-                    ft.DataCell(ft.Text(f"{p.cpu_percent:.1f}%", color=theme["accent_red"] if p.cpu_percent > 10 else theme["text_primary"], size=12)),
-                ])
-            )
+        # Top Procesos CPU (el recorrido de procesos corre en segundo plano)
+        top_cpu_table = ft.DataTable(
+            columns=[
+                ft.DataColumn(ft.Text("PID", size=12, color=theme["text_secondary"])),
+                ft.DataColumn(ft.Text("Nombre", size=12, color=theme["text_secondary"])),
+                ft.DataColumn(ft.Text("Uso", size=12, color=theme["text_secondary"])),
+            ],
+            rows=[],
+            heading_row_height=30,
+            data_row_min_height=40,
+        )
+        top_cpu_slot = ft.Column(skeleton_rows(5, theme["text_secondary"]), spacing=12)
             
         top_processes_expansion = ft.Container(
             content=ft.ExpansionTile(
@@ -734,18 +958,7 @@ def main(page: ft.Page):
                     ft.Icon(ft.Icons.SPEED, color=theme["accent_red"], size=20),
                     ft.Text("Top 5 Procesos (CPU)", size=16, weight=ft.FontWeight.W_500, color=theme["text_primary"]),
                 ]),
-                controls=[
-                    ft.DataTable(
-                        columns=[
-                            ft.DataColumn(ft.Text("PID", size=12, color=theme["text_secondary"])),
-                            ft.DataColumn(ft.Text("Nombre", size=12, color=theme["text_secondary"])),
-                            ft.DataColumn(ft.Text("Uso", size=12, color=theme["text_secondary"])),
-                        ],
-                        rows=top_cpu_rows,
-                        heading_row_height=30,
-                        data_row_min_height=40,
-                    )
-                ],
+                controls=[top_cpu_slot],
 
                 collapsed_text_color=theme["text_primary"],
                 text_color=theme["text_primary"],
@@ -757,7 +970,36 @@ def main(page: ft.Page):
             padding=5,
         )
 
-        return ft.Container(
+        def load():
+            return monitor.get_cpu_freq(), monitor.get_cpu_per_core(), process_manager.get_top_cpu(5)
+
+        def apply(data):
+            freq, cores_usage, top_cpu = data
+            freq_text.value = f"Frecuencia actual: {freq or 'N/A'} GHz"
+            core_controls = []
+            for i, usage in enumerate(cores_usage):
+                color = theme["accent_red"] if usage > 80 else (theme["accent_yellow"] if usage > 50 else theme["accent_green"])
+                core_controls.append(
+                    ft.Column([
+                        ft.Row([
+                            ft.Text(f"Núcleo {i}", size=12, color=theme["text_secondary"]),
+                            ft.Text(f"{usage}%", size=12, weight=ft.FontWeight.BOLD, color=theme["text_primary"]),
+                        ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+                        ft.ProgressBar(value=usage/100, color=color, bgcolor=theme["bg_hover"], height=6),
+                    ], spacing=3)
+                )
+            cores_grid.controls = core_controls
+            top_cpu_table.rows = [
+                ft.DataRow(cells=[
+                    ft.DataCell(ft.Text(str(p.pid), color=theme["text_secondary"], size=12)),
+                    ft.DataCell(ft.Text(p.name[:20], color=theme["text_primary"], size=12, weight=ft.FontWeight.BOLD)),
+                    ft.DataCell(ft.Text(f"{p.cpu_percent:.1f}%", color=theme["accent_red"] if p.cpu_percent > 10 else theme["text_primary"], size=12)),
+                ])
+                for p in top_cpu
+            ]
+            top_cpu_slot.controls = [top_cpu_table]
+
+        view = ft.Container(
             content=ft.Column([
                 create_header("CPU - Detalles", on_theme_toggle=on_theme_light, on_dark_mode=on_theme_dark, on_notifications=on_show_notifications),
                 ft.Container(height=10),
@@ -773,15 +1015,15 @@ def main(page: ft.Page):
             expand=True,
             bgcolor=theme["bg_primary"],
         )
+        return with_background_refresh(view, load, apply)
 
     def build_ram_detail_view():
         theme = ThemeManager.get_theme()
         
-        # Info Swap
-        swap = monitor.get_swap_memory()
-        swap_used_gb = swap['used'] / (1024**3)
-        swap_total_gb = swap['total'] / (1024**3)
-        swap_percent = swap['percent']
+        # Info Swap (se llena al cargar)
+        swap_usage_text = ft.Text("-- GB / -- GB", color=theme["text_primary"], weight=ft.FontWeight.BOLD)
+        swap_bar = ft.ProgressBar(value=0, color=theme["accent_orange"], bgcolor=theme["bg_hover"], height=8)
+        swap_percent_text = ft.Text("--% Utilizado", size=12, color=theme["text_secondary"], text_align=ft.TextAlign.RIGHT)
         
         swap_expansion = ft.Container(
             content=ft.ExpansionTile(
@@ -793,10 +1035,10 @@ def main(page: ft.Page):
                     ft.Container(height=10),
                     ft.Row([
                         ft.Text("Usado / Total:", color=theme["text_secondary"]),
-                        ft.Text(f"{swap_used_gb:.1f} GB / {swap_total_gb:.1f} GB", color=theme["text_primary"], weight=ft.FontWeight.BOLD),
+                        swap_usage_text,
                     ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
-                    ft.ProgressBar(value=swap_percent/100, color=theme["accent_orange"], bgcolor=theme["bg_hover"], height=8),
-                    ft.Text(f"{swap_percent}% Utilizado", size=12, color=theme["text_secondary"], text_align=ft.TextAlign.RIGHT),
+                    swap_bar,
+                    swap_percent_text,
                     ft.Container(height=10),
                 ],
 
@@ -810,17 +1052,18 @@ def main(page: ft.Page):
             padding=5,
         )
 
-        # Top Procesos RAM
-        top_mem = process_manager.get_top_memory(5)
-        top_mem_rows = []
-        for p in top_mem:
-            top_mem_rows.append(
-                ft.DataRow(cells=[
-                    ft.DataCell(ft.Text(str(p.pid), color=theme["text_secondary"], size=12)),
-                    ft.DataCell(ft.Text(p.name[:20], color=theme["text_primary"], size=12, weight=ft.FontWeight.BOLD)),
-                    ft.DataCell(ft.Text(f"{p.memory_mb:.0f} MB", color=theme["accent_blue"], size=12)),
-                ])
-            )
+        # Top Procesos RAM (el recorrido de procesos corre en segundo plano)
+        top_mem_table = ft.DataTable(
+            columns=[
+                ft.DataColumn(ft.Text("PID", size=12, color=theme["text_secondary"])),
+                ft.DataColumn(ft.Text("Nombre", size=12, color=theme["text_secondary"])),
+                ft.DataColumn(ft.Text("Uso", size=12, color=theme["text_secondary"])),
+            ],
+            rows=[],
+            heading_row_height=30,
+            data_row_min_height=40,
+        )
+        top_mem_slot = ft.Column(skeleton_rows(5, theme["text_secondary"]), spacing=12)
 
         top_processes_expansion = ft.Container(
             content=ft.ExpansionTile(
@@ -828,18 +1071,7 @@ def main(page: ft.Page):
                     ft.Icon(ft.Icons.TABLE_CHART, color=theme["accent_blue"], size=20),
                     ft.Text("Top 5 Procesos (RAM)", size=16, weight=ft.FontWeight.W_500, color=theme["text_primary"]),
                 ]),
-                controls=[
-                    ft.DataTable(
-                        columns=[
-                            ft.DataColumn(ft.Text("PID", size=12, color=theme["text_secondary"])),
-                            ft.DataColumn(ft.Text("Nombre", size=12, color=theme["text_secondary"])),
-                            ft.DataColumn(ft.Text("Uso", size=12, color=theme["text_secondary"])),
-                        ],
-                        rows=top_mem_rows,
-                        heading_row_height=30,
-                        data_row_min_height=40,
-                    )
-                ],
+                controls=[top_mem_slot],
 
                 collapsed_text_color=theme["text_primary"],
                 text_color=theme["text_primary"],
@@ -851,7 +1083,25 @@ def main(page: ft.Page):
             padding=5,
         )
 
-        return ft.Container(
+        def load():
+            return monitor.get_swap_memory(), process_manager.get_top_memory(5)
+
+        def apply(data):
+            swap, top_mem = data
+            swap_usage_text.value = f"{swap['used'] / (1024**3):.1f} GB / {swap['total'] / (1024**3):.1f} GB"
+            swap_bar.value = swap['percent'] / 100
+            swap_percent_text.value = f"{swap['percent']}% Utilizado"
+            top_mem_table.rows = [
+                ft.DataRow(cells=[
+                    ft.DataCell(ft.Text(str(p.pid), color=theme["text_secondary"], size=12)),
+                    ft.DataCell(ft.Text(p.name[:20], color=theme["text_primary"], size=12, weight=ft.FontWeight.BOLD)),
+                    ft.DataCell(ft.Text(f"{p.memory_mb:.0f} MB", color=theme["accent_blue"], size=12)),
+                ])
+                for p in top_mem
+            ]
+            top_mem_slot.controls = [top_mem_table]
+
+        view = ft.Container(
             content=ft.Column([
                 create_header("RAM - Detalles", on_theme_toggle=on_theme_light, on_dark_mode=on_theme_dark, on_notifications=on_show_notifications),
                 ft.Container(height=10),
@@ -865,14 +1115,14 @@ def main(page: ft.Page):
             expand=True,
             bgcolor=theme["bg_primary"],
         )
+        return with_background_refresh(view, load, apply)
 
     def build_disk_detail_view():
         theme = ThemeManager.get_theme()
         
-        # IO Estadísticas
-        io_stats = monitor.get_disk_io()
-        read_speed = io_stats['read_speed'] if io_stats else 0
-        write_speed = io_stats['write_speed'] if io_stats else 0
+        # IO Estadísticas (se llenan al cargar)
+        read_speed_text = ft.Text("-- MB/s", color=theme["accent_green"], size=20, weight=ft.FontWeight.BOLD)
+        write_speed_text = ft.Text("-- MB/s", color=theme["accent_red"], size=20, weight=ft.FontWeight.BOLD)
         
         io_expansion = ft.Container(
             content=ft.ExpansionTile(
@@ -885,11 +1135,11 @@ def main(page: ft.Page):
                     ft.Row([
                         ft.Column([
                             ft.Text("Lectura", color=theme["text_secondary"], size=12),
-                            ft.Text(f"{read_speed:.1f} MB/s", color=theme["accent_green"], size=20, weight=ft.FontWeight.BOLD),
+                            read_speed_text,
                         ], horizontal_alignment=ft.CrossAxisAlignment.CENTER),
                         ft.Column([
                             ft.Text("Escritura", color=theme["text_secondary"], size=12),
-                            ft.Text(f"{write_speed:.1f} MB/s", color=theme["accent_red"], size=20, weight=ft.FontWeight.BOLD),
+                            write_speed_text,
                         ], horizontal_alignment=ft.CrossAxisAlignment.CENTER),
                     ], alignment=ft.MainAxisAlignment.SPACE_EVENLY, expand=True),
                     ft.Container(height=10),
@@ -905,46 +1155,8 @@ def main(page: ft.Page):
             padding=5,
         )
         
-        # Lista de Particiones
-        partitions = monitor.get_disk_info()
-        partition_controls = []
-        
-        for p in partitions:
-            usage = p['usage']
-            used_gb = usage['used'] / (1024**3)
-            total_gb = usage['total'] / (1024**3)
-            percent = usage['percent']
-            
-            p_color = theme["accent_red"] if percent > 90 else (theme["accent_yellow"] if percent > 70 else theme["accent_blue"])
-            
-            partition_controls.append(
-                ft.Container(
-                    content=ft.Column([
-                        ft.Row([
-                            ft.Row([
-                                ft.Icon(ft.Icons.STORAGE, color=theme["text_secondary"]),
-                                ft.Text(f"{p['device']} ({p['mountpoint']})", weight=ft.FontWeight.BOLD, color=theme["text_primary"]),
-                            ]),
-                            ft.Container(
-                                content=ft.Text(p['fstype'].upper(), size=10, color=theme["bg_card"]),
-                                bgcolor=theme["text_secondary"],
-                                padding=ft.Padding(left=8, right=8, top=2, bottom=2),
-                                border_radius=10,
-                            )
-                        ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
-                        ft.Container(height=10),
-                        ft.ProgressBar(value=percent/100, color=p_color, bgcolor=theme["bg_hover"], height=10, border_radius=5),
-                        ft.Row([
-                            ft.Text(f"{used_gb:.1f} GB usados", size=12, color=theme["text_secondary"]),
-                            ft.Text(f"{total_gb:.1f} GB total", size=12, color=theme["text_secondary"]),
-                        ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
-                    ]),
-                    bgcolor=theme["bg_hover"], # Ligeramente más claro
-                    border_radius=10,
-                    padding=15,
-                    margin=ft.Margin(left=0, top=0, right=0, bottom=10)
-                )
-            )
+        # Lista de Particiones (leer particiones puede tardar con montajes de red)
+        partitions_column = ft.Column(skeleton_rows(3, theme["text_secondary"], height=60), spacing=12)
 
         partitions_expansion = ft.Container(
             content=ft.ExpansionTile(
@@ -954,7 +1166,7 @@ def main(page: ft.Page):
                 ]),
                 controls=[
                     ft.Container(height=10),
-                    ft.Column(partition_controls),
+                    partitions_column,
                     ft.Container(height=10),
                 ],
 
@@ -968,7 +1180,53 @@ def main(page: ft.Page):
             padding=5,
         )
 
-        return ft.Container(
+        def load():
+            return monitor.get_disk_io(), monitor.get_disk_info()
+
+        def apply(data):
+            io_stats, partitions = data
+            read_speed_text.value = f"{io_stats['read_speed'] if io_stats else 0:.1f} MB/s"
+            write_speed_text.value = f"{io_stats['write_speed'] if io_stats else 0:.1f} MB/s"
+            partition_controls = []
+            for p in partitions:
+                usage = p['usage']
+                used_gb = usage['used'] / (1024**3)
+                total_gb = usage['total'] / (1024**3)
+                percent = usage['percent']
+                
+                p_color = theme["accent_red"] if percent > 90 else (theme["accent_yellow"] if percent > 70 else theme["accent_blue"])
+                
+                partition_controls.append(
+                    ft.Container(
+                        content=ft.Column([
+                            ft.Row([
+                                ft.Row([
+                                    ft.Icon(ft.Icons.STORAGE, color=theme["text_secondary"]),
+                                    ft.Text(f"{p['device']} ({p['mountpoint']})", weight=ft.FontWeight.BOLD, color=theme["text_primary"]),
+                                ]),
+                                ft.Container(
+                                    content=ft.Text(p['fstype'].upper(), size=10, color=theme["bg_card"]),
+                                    bgcolor=theme["text_secondary"],
+                                    padding=ft.Padding(left=8, right=8, top=2, bottom=2),
+                                    border_radius=10,
+                                )
+                            ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+                            ft.Container(height=10),
+                            ft.ProgressBar(value=percent/100, color=p_color, bgcolor=theme["bg_hover"], height=10, border_radius=5),
+                            ft.Row([
+                                ft.Text(f"{used_gb:.1f} GB usados", size=12, color=theme["text_secondary"]),
+                                ft.Text(f"{total_gb:.1f} GB total", size=12, color=theme["text_secondary"]),
+                            ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+                        ]),
+                        bgcolor=theme["bg_hover"], # Ligeramente más claro
+                        border_radius=10,
+                        padding=15,
+                        margin=ft.Margin(left=0, top=0, right=0, bottom=10)
+                    )
+                )
+            partitions_column.controls = partition_controls
+
+        view = ft.Container(
             content=ft.Column([
                 create_header("Disco - Detalles", on_theme_toggle=on_theme_light, on_dark_mode=on_theme_dark, on_notifications=on_show_notifications),
                 ft.Container(height=10),
@@ -982,6 +1240,7 @@ def main(page: ft.Page):
             expand=True,
             bgcolor=theme["bg_primary"],
         )
+        return with_background_refresh(view, load, apply)
 
     def build_network_detail_view():
         theme = ThemeManager.get_theme()
@@ -996,9 +1255,26 @@ def main(page: ft.Page):
             bgcolor=theme["bg_primary"],
         )
 
+    # ============ CACHÉ DE VISTAS ============
+    crud_callbacks = dict(on_theme_light=on_theme_light, on_theme_dark=on_theme_dark,
+                          on_notifications=on_show_notifications)
+    view_cache = ViewCache({
+        "resumen": build_resumen_view,
+        "cpu": build_cpu_detail_view,
+        "ram": build_ram_detail_view,
+        "disco": build_disk_detail_view,
+        "red": build_network_detail_view,
+        "alertas": lambda: build_alerts_view(alert_manager, page, alert_log=alert_log, **crud_callbacks),
+        "procesos": lambda: build_processes_view(process_manager, page, **crud_callbacks),
+        "contenedores": lambda: build_containers_view(monitor.get_containers, page, **crud_callbacks),
+        "historial": lambda: build_history_view(history_manager, page, burst_controller=burst_controller,
+                                                **crud_callbacks),
+        "ajustes": lambda: build_config_view(db, page, **crud_callbacks),
+    })
+
     # ============ CONTENEDOR PRINCIPAL ============
     main_content = ft.Container(
-        content=build_resumen_view(),
+        content=view_cache.get("resumen"),
         expand=True,
         bgcolor=DARK_BG,
     )
@@ -1007,48 +1283,12 @@ def main(page: ft.Page):
     def on_nav_change(e):
         nonlocal current_view
         index = e.control.selected_index
-        views = ["resumen", "cpu", "ram", "disco", "red", "alertas", "procesos", "historial", "ajustes"]
+        views = ["resumen", "cpu", "ram", "disco", "red", "alertas", "procesos", "contenedores",
+                 "historial", "ajustes"]
         current_view = views[index]
         
-        if current_view == "resumen":
-            main_content.content = build_resumen_view()
-        elif current_view == "cpu":
-            main_content.content = build_cpu_detail_view()
-        elif current_view == "ram":
-            main_content.content = build_ram_detail_view()
-        elif current_view == "disco":
-            main_content.content = build_disk_detail_view()
-        elif current_view == "red":
-            main_content.content = build_network_detail_view()
-        elif current_view == "alertas":
-            main_content.content = build_alerts_view(
-                alert_manager, page,
-                on_theme_light=on_theme_light,
-                on_theme_dark=on_theme_dark,
-                on_notifications=on_show_notifications
-            )
-        elif current_view == "procesos":
-            main_content.content = build_processes_view(
-                process_manager, page,
-                on_theme_light=on_theme_light,
-                on_theme_dark=on_theme_dark,
-                on_notifications=on_show_notifications
-            )
-        elif current_view == "historial":
-            main_content.content = build_history_view(
-                history_manager, page,
-                on_theme_light=on_theme_light,
-                on_theme_dark=on_theme_dark,
-                on_notifications=on_show_notifications
-            )
-        elif current_view == "ajustes":
-            main_content.content = build_config_view(
-                db, page,
-                on_theme_light=on_theme_light,
-                on_theme_dark=on_theme_dark,
-                on_notifications=on_show_notifications
-            )
-        
+        # Vista en caché: se construye la primera vez y luego solo se refrescan sus datos
+        main_content.content = view_cache.get(current_view)
         page.update()
 
     # Crear sidebar con nuevos items CRUD
@@ -1095,6 +1335,11 @@ def main(page: ft.Page):
                 selected_icon=ft.Icons.LIST_ALT,
                 label="Procesos",
             ),
+            ft.NavigationRailDestination(
+                icon=ft.Icons.VIEW_IN_AR_OUTLINED,
+                selected_icon=ft.Icons.VIEW_IN_AR,
+                label="Contenedores",
+            ),
             ft.NavigationRailDestination(
                 icon=ft.Icons.HISTORY_OUTLINED,
                 selected_icon=ft.Icons.HISTORY,
@@ -1132,24 +1377,39 @@ def main(page: ft.Page):
             status_bar,
         ], expand=True, spacing=0)
     )
+    # Visible en /api/diagnostics con los diagnósticos activados
+    instrumentation.record("startup.first_frame", time.perf_counter() - STARTED_AT)
+    
+    # ============ ARRANQUE EN SEGUNDO PLANO ============
+    # Lo que no hace falta para pintar el primer frame se carga después:
+    # backend de sonido y línea base estacional de anomalías (consulta de 7 días)
+    if SoundManager:
+        SoundManager.initialize_async()
+    if isinstance(monitor, SystemMonitor):
+        threading.Thread(target=anomaly_detector.load_baselines, args=(get_read_pool(),),
+                         daemon=True, name='omnimonitor-baselines').start()
 
     # ============ LOOP DE ACTUALIZACIÓN ============
     async def update_metrics():
-        nonlocal net_download_history, net_upload_history, net_time_labels, history_save_counter
+        nonlocal net_download_history, net_upload_history, net_time_labels, last_history_save
         
         while True:
+            # Intervalo de Ajustes aplicado en caliente
+            scheduler.set_interval(configured_interval())
+            instrumentation.tick(scheduler.interval)
+            tick_started = time.perf_counter()
             try:
-                # En modo web, primero refrescar datos desde API
-                if IS_WEB and isinstance(monitor, WebMonitor):
-                    monitor.refresh()
+                # Una ronda: todas las fuentes que vencen (en web/flota, primero el snapshot del API)
+                scheduler.collect()
+                values = scheduler.values
                 
                 # CPU
-                cpu = monitor.get_cpu_usage()
+                cpu = values["cpu"]
                 chart_mgr.cpu_history.append(cpu)
                 cpu_percent_text.value = f"{cpu:.0f}%"
                 cpu_progress.content.controls[0].value = cpu / 100
                 
-                temp = monitor.get_cpu_temp()
+                temp = values.get("cpu_temp")
                 if temp:
                     cpu_temp_text.value = f"Temp: {temp:.0f}°C"
                     if temp > 80:
@@ -1162,17 +1422,18 @@ def main(page: ft.Page):
                     cpu_temp_text.value = "Temp: N/A"
                     cpu_temp_text.color = TEXT_GRAY
 
-                cpu_freq = monitor.get_cpu_freq()
+                cpu_freq = values.get("cpu_freq")
                 if cpu_freq:
                     cpu_speed_text.value = f"Speed: {cpu_freq:.1f} GHz"
                 
-                sys_info = monitor.get_system_info()
+                sys_info = values["system_info"]
                 processor_name = sys_info['processor'] if sys_info['processor'] else 'Unknown'
                 cpu_name_text.value = f"CPU: {processor_name[:30]}"
 
                 # Memoria
-                mem = monitor.get_memory_usage()
+                mem = values["memory"]
                 chart_mgr.mem_history.append(mem['percent'])
+                chart_mgr.mem_anomalies.append(anomaly_detector.observe("ram_usage", mem['percent']))
                 used_gb = mem['used'] / (1024**3)
                 total_gb = mem['total'] / (1024**3)
                 available_gb = mem['free'] / (1024**3)
@@ -1183,12 +1444,13 @@ def main(page: ft.Page):
                 
                 # Actualizar mini chart de RAM
                 ram_history_chart.content = chart_mgr.create_mini_line_chart(
-                    list(chart_mgr.mem_history)[-30:], GREEN_PRIMARY, 50
+                    list(chart_mgr.mem_history)[-30:], GREEN_PRIMARY, 50,
+                    anomalies=list(chart_mgr.mem_anomalies)[-30:]
                 )
 
                 # Disco
-                disk = monitor.get_disk_usage()
-                disk_info_list = monitor.get_disk_info()
+                disk = values["disk"]
+                disk_info_list = values.get("disk_info") or []
                 main_disk = disk_info_list[0] if disk_info_list else {}
                 
                 used_disk_gb = disk['used'] / (1024**3)
@@ -1199,21 +1461,24 @@ def main(page: ft.Page):
                 disk_used_text.value = f"{used_disk_gb:.0f}GB Used ({disk['percent']:.0f}%)"
                 disk_bar.value = disk['percent'] / 100
                 
-                disk_io = monitor.get_disk_io()
+                disk_io = values.get("disk_io")
                 if disk_io:
                     disk_speed_text.value = f"Read/Write: {disk_io['read_speed']:.0f}MB/s"
 
                 # GPU
-                gpu_info = monitor.get_gpu_info()
+                gpu_info = values.get("gpu")
                 if gpu_info:
                     gpu_percent_text.value = f"{gpu_info['usage']:.0f}%"
                     gpu_progress.content.controls[0].value = gpu_info['usage'] / 100
-                    gpu_temp_text.value = f"Temp: {gpu_info['temp']:.0f}°C"
+                    gpu_temp = gpu_info.get('temp')
+                    gpu_temp_text.value = f"Temp: {gpu_temp:.0f}°C" if gpu_temp is not None else "Temp: N/A"
                     gpu_name_text.value = f"GPU/Temp: {gpu_info['name'][:20]}"
                     
-                    if gpu_info['temp'] > 80:
+                    if gpu_temp is None:
+                        gpu_temp_text.color = GREEN_PRIMARY
+                    elif gpu_temp > 80:
                         gpu_temp_text.color = RED_PRIMARY
-                    elif gpu_info['temp'] > 60:
+                    elif gpu_temp > 60:
                         gpu_temp_text.color = YELLOW_PRIMARY
                     else:
                         gpu_temp_text.color = GREEN_PRIMARY
@@ -1224,12 +1489,13 @@ def main(page: ft.Page):
                     gpu_name_text.value = "GPU/Temp: No detectada"
 
                 # Red
-                net = monitor.get_network_speed()
+                net = values["network"]
                 down_mb = net['download'] / (1024 * 1024)
                 up_mb = net['upload'] / (1024 * 1024)
                 
                 chart_mgr.net_down_history.append(down_mb * 10)
                 chart_mgr.net_up_history.append(up_mb * 10)
+                chart_mgr.net_anomalies.append(anomaly_detector.observe("net_download", down_mb))
                 
                 now = datetime.now()
                 time_label = now.strftime("%H:%M")
@@ -1243,16 +1509,17 @@ def main(page: ft.Page):
                     net_upload_history = net_upload_history[-60:]
                     net_time_labels = net_time_labels[-60:]
                 
-                network_chart_container.content = chart_mgr.create_network_area_chart(
-                    net_download_history, net_upload_history, net_time_labels
-                )
+                with instrumentation.stage("ui.charts"):
+                    network_chart_container.content = chart_mgr.create_network_area_chart(
+                        net_download_history, net_upload_history, net_time_labels,
+                        anomalies=chart_mgr.net_anomalies
+                    )
 
-                # ============ CRUD: Guardar historial cada 10 actualizaciones ============
-                history_save_counter += 1
-                if history_save_counter >= 10:
-                    history_save_counter = 0
+                # ============ CRUD: Guardar historial cada HISTORY_SAVE_SECONDS ============
+                if time.monotonic() - last_history_save >= HISTORY_SAVE_SECONDS:
+                    last_history_save = time.monotonic()
                     try:
-                        history_manager.save(
+                        history_writer.save_metrics(
                             cpu_usage=cpu,
                             cpu_temp=temp,
                             ram_usage=mem['percent'],
@@ -1265,6 +1532,9 @@ def main(page: ft.Page):
                             gpu_usage=gpu_info['usage'] if gpu_info else None,
                             gpu_temp=gpu_info['temp'] if gpu_info else None,
                         )
+                        if db.get_config('persist_series', 'true') == 'true':
+                            history_writer.save_series(series_collector.collect(
+                                HISTORY_SERIES, disk_info=disk_info_list))
                     except Exception as he:
                         print(f"Error guardando historial: {he}")
                 
@@ -1272,7 +1542,8 @@ def main(page: ft.Page):
                 try:
                     # Actualizar solo si hay contenedores visibles para mejorar performance
                     # O actualizar siempre si queremos que esté listo al abrir
-                    update_details_content()
+                    with instrumentation.stage("ui.details"):
+                        update_details_content(values)
                 except Exception as dex:
                      print(f"Error actualizando detalles: {dex}")
 
@@ -1288,57 +1559,60 @@ def main(page: ft.Page):
                         'net_upload': up_mb,
                         'net_download': down_mb,
                     }
+                    # Series etiquetadas solo de las métricas que usan reglas con selector
+                    current_metrics.update(series_collector.collect(
+                        alert_engine.series_metrics, disk_info=disk_info_list))
+                    
+                    # Configuración cacheada en memoria: una lectura por tick
+                    sounds_enabled = db.get_config('enable_sounds') == 'true'
                     
-                    # Verificar cada alerta habilitada
-                    for alert in alert_manager.get_all(only_enabled=True):
-                        metric_value = current_metrics.get(alert.metric)
-                        if metric_value is not None:
-                            # Determinar condición para ToastManager
-                            if alert.operator == ">":
-                                condition = "greater"
-                            elif alert.operator == ">=":
-                                condition = "greater_equal"
-                            elif alert.operator == "<":
-                                condition = "less"
-                            elif alert.operator == "<=":
-                                condition = "less_equal"
-                            else:
-                                condition = "equal"
-                            
-                            # Verificar si los sonidos están habilitados
-                            sounds_enabled = db.get_config('enable_sounds') == 'true'
-                            
-                            # Callback para guardar en BD cuando se dispara
-                            def on_alert_triggered(alert_id):
-                                db.trigger_alert(alert_id)
-                            
-                            # SIEMPRE llamar a show_alert para que pueda:
-                            # 1. Detectar cuando ENTRA en alerta (dispara notificación)
-                            # 2. Detectar cuando SALE de alerta (limpia rate limit para próxima vez)
-                            # ToastManager internamente maneja si debe mostrar o no
-                            triggered = ToastManager.show_alert(
-                                alert_name=alert.name,
-                                metric=alert.metric,
-                                value=metric_value,
-                                threshold=alert.threshold,
-                                condition=condition,
-                                play_sound=sounds_enabled and alert.notify_sound,
-                                on_triggered=on_alert_triggered,
-                                alert_id=alert.id
-                            )
+                    # El motor solo devuelve las reglas que ENTRAN o SALEN de alerta.
+                    # Ambas se pasan a show_alert para que ToastManager:
+                    # 1. Dispare la notificación al entrar
+                    # 2. Limpie el rate limit al salir (para la próxima vez)
+                    with instrumentation.stage("alerts.evaluate"):
+                        transitions = alert_engine.evaluate(current_metrics)
+                    for transition in transitions:
+                        alert = transition.alert
+                        alert_log.on_transition(transition)
+                        alert_sinks.publish(transition)
+                        if transition.firing and db.get_config('burst_on_alert') == 'true':
+                            burst_controller.trigger_for_alert(alert.name)
+                        if transition.value is None:
+                            continue
+                        ToastManager.show_alert(
+                            alert_name=alert.name,
+                            metric=alert.metric,
+                            value=transition.value,
+                            threshold=alert.threshold if transition.threshold is None else round(transition.threshold, 2),
+                            condition=OPERATOR_CONDITIONS[alert.operator],
+                            play_sound=sounds_enabled and alert.notify_sound,
+                            on_triggered=history_writer.record_trigger,
+                            alert_id=alert.id,
+                            firing=transition.firing
+                        )
+                    alert_log.observe(current_metrics)
                                 
                 except Exception as ae:
                     print(f"Error evaluando alertas: {ae}")
 
                 # Actualizar status
-                if IS_WEB:
+                if IS_FLEET:
+                    agg = monitor.fleet_view["aggregate"]
+                    status_text.value = (f"Status: 🛰️ Flota | {agg.get('hosts_up', 0)}/{agg.get('hosts_total', 0)} hosts"
+                                         f" | CPU máx {agg.get('cpu_max', 0):.0f}% ({agg.get('cpu_max_host') or '-'})")
+                elif IS_WEB:
                     status_text.value = f"Status: Conectado | 🌐 WEB (Datos Reales via API)"
                 else:
                     alert_count = alert_manager.count()
-                    status_text.value = f"Status: Conectado | 🖥️ Escritorio | 🔔 {alert_count} alertas"
+                    shared = ""
+                    if isinstance(monitor, SharedMonitor):
+                        shared = " (colector compartido)" if monitor.connected else " (colector detenido)"
+                    status_text.value = f"Status: Conectado | 🖥️ Escritorio{shared} | 🔔 {alert_count} alertas"
                 status_text.color = BLUE_PRIMARY
 
-                page.update()
+                with instrumentation.stage("ui.page_update"):
+                    page.update()
 
             except Exception as e:
                 print(f"Error en actualización: {e}")
@@ -1346,8 +1620,10 @@ def main(page: ft.Page):
                 traceback.print_exc()
                 status_text.value = f"Status: Error - {str(e)[:30]}"
                 status_text.color = RED_PRIMARY
+            finally:
+                instrumentation.record("loop.tick", time.perf_counter() - tick_started)
 
-            await asyncio.sleep(update_interval)
+            await asyncio.sleep(scheduler.next_delay())
 
     page.run_task(update_metrics)
 
@@ -1358,6 +1634,9 @@ if __name__ == "__main__":
     print("  Con CRUD: Alertas, Procesos, Historial, Config")
     print("=" * 50)
     
+    if IS_FLEET:
+        print(f"\n🛰️  Modo FLOTA: {len(FLEET_HOSTS)} hosts")
+    
     if IS_WEB:
         # Modo web - iniciar servidor API primero, luego UI
         print("\n🌐 Iniciando OmniMonitor en modo WEB...")
@@ -1367,7 +1646,6 @@ if __name__ == "__main__":
         from src.server.api import run_server_background
         run_server_background(API_PORT)
         
-        import time
         time.sleep(1)  # Esperar que arranque el servidor
         
         print(f"📍 API: http://localhost:{API_PORT}/api/all")
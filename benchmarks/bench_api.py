@@ -0,0 +1,75 @@
+"""
+Benchmarks de la API HTTP: peticiones por segundo por endpoint (un cliente)
+y /api/all con varios clientes concurrentes
+"""
+import http.client
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from harness import Result
+
+from src.core.monitor import SystemMonitor
+from src.database.db import use_database
+from src.server import api
+from src.server.wire import MIME_TYPE
+
+ENDPOINTS = (
+    ("/health", {}),
+    ("/api/all", {}),
+    ("/api/all", {"Accept": MIME_TYPE}),
+    ("/metrics", {}),
+)
+
+
+def _request(port: int, path: str, headers: dict) -> int:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+def _rps(port: int, path: str, headers: dict, duration: float) -> float:
+    _request(port, path, headers)  # Calentar (primer snapshot, renderer)
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        _request(port, path, headers)
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def run(quick: bool = False) -> List[Result]:
+    duration = 0.5 if quick else 2.0
+    workdir = tempfile.mkdtemp(prefix="omnimonitor-bench-")
+    use_database(os.path.join(workdir, "api.db"))  # /metrics lee alertas de la base
+    api.monitor = SystemMonitor()
+    server = api.create_server(port=0, host="127.0.0.1")
+    port = server.server_address[1]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    results = []
+    try:
+        for path, headers in ENDPOINTS:
+            name = f"api.rps[{path}{' binary' if headers else ''}]"
+            results.append(Result(name, round(_rps(port, path, headers, duration), 1), "req/s", True))
+
+        clients = 4
+        with ThreadPoolExecutor(clients) as pool:
+            start = time.perf_counter()
+            totals = list(pool.map(lambda _: _rps(port, "/api/all", {}, duration), range(clients)))
+        results.append(Result(f"api.rps[/api/all x{clients}]", round(sum(totals), 1), "req/s", True,
+                              extra={"clients": clients, "seconds": round(time.perf_counter() - start, 2)}))
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
@@ -0,0 +1,62 @@
+"""
+Benchmarks de recolección: latencia de cada getter de SystemMonitor,
+snapshot completo (el mismo que sirve /api/all) y listado de procesos
+a medida que crece el número de procesos del sistema
+"""
+import shutil
+import subprocess
+import sys
+import time
+from typing import List
+
+from harness import Result, latency
+
+from src.core.monitor import SystemMonitor
+from src.crud.processes import ProcessManager
+from src.server import api
+
+GETTERS = (
+    "get_cpu_usage", "get_cpu_per_core", "get_cpu_count", "get_cpu_freq", "get_cpu_temp",
+    "get_memory_usage", "get_swap_memory", "get_disk_usage", "get_disk_info", "get_disk_io",
+    "get_network_speed", "get_network_speed_per_interface", "get_network_info",
+    "get_all_temperatures", "get_gpu_info", "get_uptime", "get_system_info", "get_battery_info",
+)
+
+
+def _spawn_idle(count: int) -> List[subprocess.Popen]:
+    """Procesos dormidos para inflar la tabla de procesos"""
+    sleep = shutil.which("sleep")
+    command = [sleep, "600"] if sleep else [sys.executable, "-c", "import time; time.sleep(600)"]
+    return [subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            for _ in range(count)]
+
+
+def run(quick: bool = False) -> List[Result]:
+    min_time = 0.05 if quick else 0.2
+    results = []
+
+    monitor = SystemMonitor()
+    time.sleep(0.1)  # Base para las velocidades (red/disco) y cpu_percent
+    for getter in GETTERS:
+        fn = getattr(monitor, getter, None)
+        if fn is not None:
+            results.append(latency(f"monitor.{getter}", fn, min_time=min_time))
+
+    api.monitor = monitor
+    results.append(latency("snapshot.full", api.get_all_metrics, min_time=min_time * 2))
+
+    manager = ProcessManager()
+    for extra in ((0, 100) if quick else (0, 100, 400)):
+        children = _spawn_idle(extra)
+        try:
+            result = latency(f"processes.get_all_with_stats[+{extra}]",
+                             lambda: manager.get_all_with_stats(limit=50),
+                             min_time=min_time * 2, min_calls=3)
+            result.extra["processes"] = manager.get_all_with_stats(limit=1)[1]["total"]
+            results.append(result)
+        finally:
+            for child in children:
+                child.kill()
+            for child in children:
+                child.wait()
+    return results
@@ -0,0 +1,70 @@
+"""
+Benchmarks de persistencia: escrituras del historial (fila a fila y por
+lotes) y latencia de get_metrics_history según el tamaño de la tabla
+"""
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from harness import Result, latency
+
+from src.database.db import Database, HISTORY_METRICS
+
+
+def _sample() -> dict:
+    return {metric: random.uniform(0, 100) for metric in HISTORY_METRICS}
+
+
+def _fill(db: Database, rows: int):
+    """Filas repartidas en la última hora (UTC, como CURRENT_TIMESTAMP)"""
+    now = datetime.utcnow()
+    columns = ('timestamp',) + HISTORY_METRICS
+    placeholders = ', '.join('?' * len(columns))
+    data = [
+        ((now - timedelta(seconds=i * 3600 / rows)).strftime('%Y-%m-%d %H:%M:%S.%f')[:23],)
+        + tuple(random.uniform(0, 100) for _ in HISTORY_METRICS)
+        for i in range(rows)
+    ]
+    db.conn.executemany(f"INSERT INTO metrics_history ({', '.join(columns)}) VALUES ({placeholders})", data)
+    db.conn.commit()
+
+
+def run(quick: bool = False) -> List[Result]:
+    results = []
+    workdir = tempfile.mkdtemp(prefix="omnimonitor-bench-")
+    try:
+        db = Database(os.path.join(workdir, "bench.db"))
+
+        rows = 200 if quick else 1000
+        start = time.perf_counter()
+        for _ in range(rows):
+            db.save_metrics(**_sample())
+        elapsed = time.perf_counter() - start
+        results.append(Result("db.save_metrics", round(rows / elapsed, 1), "rows/s", True,
+                              extra={"rows": rows}))
+
+        batch = [dict(_sample(), timestamp=f"2020-01-01 00:00:{i // 1000:02d}.{i % 1000:03d}")
+                 for i in range(rows)]
+        start = time.perf_counter()
+        for i in range(0, rows, 100):
+            db.save_metrics_batch("bench-host", batch[i:i + 100])
+        elapsed = time.perf_counter() - start
+        results.append(Result("db.save_metrics_batch", round(rows / elapsed, 1), "rows/s", True,
+                              extra={"rows": rows, "batch": 100}))
+        db.close()
+
+        for size in ((1000, 10000) if quick else (1000, 10000, 100000)):
+            path = os.path.join(workdir, f"history-{size}.db")
+            db = Database(path)
+            _fill(db, size)
+            results.append(latency(f"db.get_metrics_history[{size}]",
+                                   lambda: db.get_metrics_history(hours=1, limit=1000),
+                                   min_time=0.1 if quick else 0.3))
+            db.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
@@ -0,0 +1,36 @@
+"""
+Benchmarks de renderizado: coste de construir los gráficos de ChartManager
+con historiales llenos (lo que hace el loop de la UI en cada tick)
+"""
+import random
+import sys
+from typing import List
+
+from harness import Result, latency
+
+from src.ui.chart_manager import ChartManager
+
+
+def run(quick: bool = False) -> List[Result]:
+    min_time = 0.1 if quick else 0.3
+    charts = ChartManager(max_points=60)
+    data = [random.uniform(0, 100) for _ in range(60)]
+    upload = [random.uniform(0, 10) for _ in range(60)]
+    flags = [random.random() < 0.05 for _ in range(60)]
+    labels = [f"12:{i:02d}" for i in range(60)]
+    cases = [
+        ("chart.mini_line[30]", lambda: charts.create_mini_line_chart(data[-30:], "#9ECE6A", 50)),
+        ("chart.mini_line[30]+anomalies",
+         lambda: charts.create_mini_line_chart(data[-30:], "#9ECE6A", 50, anomalies=flags[-30:])),
+        ("chart.network_area[60]",
+         lambda: charts.create_network_area_chart(data, upload, labels, anomalies=flags)),
+        ("chart.bar[4]", lambda: charts.create_bar_chart(data[:4], ["#9ECE6A"] * 4, ["a", "b", "c", "d"])),
+    ]
+    results = []
+    for name, fn in cases:
+        # Un gráfico que no se puede construir (p. ej. otra versión de flet) no tumba el resto
+        try:
+            results.append(latency(name, fn, min_time=min_time))
+        except Exception as e:
+            print(f"  {name}: omitido ({type(e).__name__}: {e})", file=sys.stderr)
+    return results
@@ -0,0 +1,102 @@
+"""
+Benchmarks del almacén comprimido (src/database/tsdb.py) frente a la tabla
+metrics_history: bytes por muestra, ritmo de escritura y consultas de rango
+(agregadas por bucket, como /api/history) sobre el mismo día de datos
+"""
+import os
+import random
+import shutil
+import tempfile
+import time
+from typing import List
+
+from harness import Result, latency
+
+from src.database.db import Database, ReadOnlyPool, HISTORY_METRICS
+from src.database.tsdb import TimeSeriesDB, ms_to_timestamp
+
+
+def _rows(count: int, interval: float = 10.0) -> List[dict]:
+    """Muestras realistas: paseo aleatorio en CPU, memoria casi fija, un decimal"""
+    now = time.time()
+    cpu, ram = 30.0, 55.0
+    rows = []
+    for i in range(count):
+        cpu = min(max(cpu + random.uniform(-5, 5), 0), 100)
+        ram = min(max(ram + random.uniform(-0.2, 0.2), 0), 100)
+        row = {metric: None for metric in HISTORY_METRICS}
+        row.update(cpu_usage=round(cpu, 1), ram_usage=round(ram, 1), ram_used_gb=round(ram * 0.16, 2),
+                   disk_usage=71.4, cpu_temp=round(45 + cpu / 5, 1),
+                   net_upload=round(random.expovariate(1 / 20), 2),
+                   net_download=round(random.expovariate(1 / 80), 2),
+                   timestamp=ms_to_timestamp(int((now - (count - i) * interval) * 1000)))
+        rows.append(row)
+    return rows
+
+
+def run(quick: bool = False) -> List[Result]:
+    results = []
+    workdir = tempfile.mkdtemp(prefix="omnimonitor-bench-")
+    try:
+        count = 2160 if quick else 8640   # 6 h / 24 h a 10 s
+        rows = _rows(count)
+        hours = count * 10 / 3600
+
+        db_path = os.path.join(workdir, "bench.db")
+        db = Database(db_path)
+        columns = ('timestamp',) + HISTORY_METRICS
+        start = time.perf_counter()
+        db.conn.executemany(
+            f"INSERT INTO metrics_history ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            [tuple(row[c] for c in columns) for row in rows])
+        db.conn.commit()
+        sqlite_write = count / (time.perf_counter() - start)
+        db.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        db.conn.execute("VACUUM")
+        page_size = db.conn.execute("PRAGMA page_size").fetchone()[0]
+        # Solo las páginas de la tabla y sus índices (la base tiene más tablas)
+        sqlite_bytes = db.conn.execute(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name = 'metrics_history' "
+            "OR name IN (SELECT name FROM sqlite_master WHERE tbl_name = 'metrics_history')"
+        ).fetchone()[0] if _has_dbstat(db) else os.path.getsize(db_path)
+        db.close()
+
+        tsdb = TimeSeriesDB(os.path.join(workdir, "tsdb"))
+        start = time.perf_counter()
+        for i in range(0, count, 100):
+            tsdb.append(rows[i:i + 100])
+        tsdb.flush()
+        tsdb_write = count / (time.perf_counter() - start)
+        tsdb_bytes = tsdb.size_bytes()
+
+        results.append(Result("sqlite.bytes_per_sample", round(sqlite_bytes / count, 2), "B",
+                              extra={"samples": count, "page_size": page_size}))
+        results.append(Result("tsdb.bytes_per_sample", round(tsdb_bytes / count, 2), "B",
+                              extra={"samples": count, "ratio": round(sqlite_bytes / tsdb_bytes, 1)}))
+        results.append(Result("sqlite.write", round(sqlite_write, 1), "rows/s", True))
+        results.append(Result("tsdb.write", round(tsdb_write, 1), "rows/s", True))
+
+        pool = ReadOnlyPool(db_path, size=1)
+        end = time.time()
+        options = {"min_time": 0.1 if quick else 0.3, "max_calls": 200}
+        for label, span in (("1h", 3600), ("all", hours * 3600)):
+            start_at = end - span
+            step = ReadOnlyPool.choose_step(start_at, end)
+            metrics = ['cpu_usage', 'ram_usage']
+            results.append(latency(f"sqlite.range[{label}]",
+                                   lambda: list(pool.iter_history(metrics, start_at, end, step)), **options))
+            results.append(latency(f"tsdb.range[{label}]",
+                                   lambda: list(tsdb.iter_history(metrics, start_at, end, step)), **options))
+        pool.close()
+        tsdb.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def _has_dbstat(db: Database) -> bool:
+    try:
+        db.conn.execute("SELECT 1 FROM dbstat LIMIT 1")
+        return True
+    except Exception:
+        return False
@@ -0,0 +1,100 @@
+"""
+Utilidades comunes de los benchmarks de OmniMonitor
+Medición de llamadas, resultados serializables y comparación contra una
+línea base guardada (benchmarks/baseline.json).
+"""
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Callable, Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+@dataclass
+class Result:
+    """Un número medido; `higher_is_better` decide el sentido de una regresión"""
+    name: str
+    value: float
+    unit: str                      # "us", "ms", "req/s", "rows/s"
+    higher_is_better: bool = False
+    extra: Dict = field(default_factory=dict)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def time_call(fn: Callable, min_time: float = 0.2, max_calls: int = 20000,
+              min_calls: int = 3, warmup: int = 1) -> Dict:
+    """
+    Llamar a `fn` hasta acumular `min_time` segundos (o `max_calls` llamadas)
+    y devolver mediana, p95 y mínimo en microsegundos
+    """
+    for _ in range(warmup):
+        fn()
+    samples: List[float] = []
+    deadline = time.perf_counter() + min_time
+    while len(samples) < max_calls and (len(samples) < min_calls or time.perf_counter() < deadline):
+        start = time.perf_counter_ns()
+        fn()
+        samples.append((time.perf_counter_ns() - start) / 1000)
+    samples.sort()
+    return {
+        "median": statistics.median(samples),
+        "p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "min": samples[0],
+        "calls": len(samples),
+    }
+
+
+def latency(name: str, fn: Callable, **options) -> Result:
+    """Resultado de latencia (mediana en µs; p95/mín/llamadas en `extra`)"""
+    stats = time_call(fn, **options)
+    return Result(name, round(stats.pop("median"), 3), "us",
+                  extra={k: round(v, 3) if isinstance(v, float) else v for k, v in stats.items()})
+
+
+def metadata() -> Dict:
+    """Contexto de la ejecución: las líneas base solo son comparables en la misma máquina"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.node(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[Dict]:
+    """
+    Comparar cada resultado con la línea base
+    Regresión: peor que la base en más de `tolerance` (fracción, 0.3 = 30%).
+    """
+    rows = []
+    for name, result in results.items():
+        base: Optional[Dict] = baseline.get(name)
+        if not base or "value" not in result or not base.get("value"):
+            continue
+        change = (result["value"] - base["value"]) / base["value"]
+        worse = -change if result.get("higher_is_better") else change
+        rows.append({
+            "name": name,
+            "baseline": base["value"],
+            "value": result["value"],
+            "unit": result["unit"],
+            "change": round(change, 4),
+            "regression": worse > tolerance,
+        })
+    return rows
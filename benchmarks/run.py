@@ -0,0 +1,113 @@
+"""
+Suite de benchmarks de OmniMonitor
+Mide los caminos calientes (recolección, persistencia, API y renderizado),
+emite resultados en JSON y los compara contra una línea base guardada.
+
+Uso:
+    python benchmarks/run.py                        # suite completa, compara con baseline.json
+    python benchmarks/run.py --quick --only api,render
+    python benchmarks/run.py --json out.json        # guardar resultados
+    python benchmarks/run.py --save-baseline        # fijar la línea base de esta máquina
+
+Sale con código 1 si algún resultado empeora más que `--tolerance`.
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import traceback
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import ROOT_DIR, compare, metadata  # noqa: E402
+
+SUITES = ("collection", "persistence", "tsdb", "api", "render", "startup")
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, "benchmarks", "baseline.json")
+
+
+def run_suite(name: str, quick: bool) -> Dict[str, Dict]:
+    """Ejecutar una suite y devolver {resultado: dict}"""
+    if name == "startup":
+        import startup
+        report = startup.run(2 if quick else 5)
+        return {"startup.import_app": {
+            "name": "startup.import_app", "value": report["import_app_ms"], "unit": "ms",
+            "higher_is_better": False,
+            "extra": {"eager_lazy_modules": report["eager_lazy_modules"]},
+        }}
+    module = importlib.import_module(f"bench_{name}")
+    return {result.name: result.to_dict() for result in module.run(quick=quick)}
+
+
+def format_value(result: Dict) -> str:
+    return f"{result['value']:>12,.2f} {result['unit']}"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de OmniMonitor")
+    parser.add_argument("--quick", action="store_true", help="Menos repeticiones y tamaños")
+    parser.add_argument("--only", default=",".join(SUITES),
+                        help=f"Suites separadas por comas ({', '.join(SUITES)})")
+    parser.add_argument("--json", metavar="OUT", help="Escribir resultados en un fichero JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Línea base a comparar")
+    parser.add_argument("--save-baseline", action="store_true", help="Guardar los resultados como línea base")
+    parser.add_argument("--tolerance", type=float, default=0.3,
+                        help="Empeoramiento permitido antes de marcar regresión (0.3 = 30%%)")
+    args = parser.parse_args(argv)
+
+    suites = [s.strip() for s in args.only.split(",") if s.strip()]
+    unknown = [s for s in suites if s not in SUITES]
+    if unknown:
+        parser.error(f"suites desconocidas: {', '.join(unknown)}")
+
+    report = {"meta": metadata(), "quick": args.quick, "results": {}, "errors": {}}
+    for suite in suites:
+        print(f"== {suite}", flush=True)
+        try:
+            results = run_suite(suite, args.quick)
+        except Exception as e:
+            report["errors"][suite] = f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+            continue
+        for name, result in results.items():
+            print(f"  {name:<45} {format_value(result)}")
+        report["results"].update(results)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        base_meta = baseline.get("meta", {})
+        if base_meta.get("machine") != report["meta"]["machine"]:
+            print(f"Aviso: la línea base es de otra máquina ({base_meta.get('machine')}); "
+                  f"las diferencias pueden no ser significativas")
+        if baseline.get("quick") != args.quick:
+            print("Aviso: la línea base se midió con otro modo (--quick)")
+        rows = compare(report["results"], baseline.get("results", {}), args.tolerance)
+        report["comparison"] = rows
+        print(f"== comparación con {os.path.relpath(args.baseline, ROOT_DIR)} "
+              f"(tolerancia {args.tolerance:.0%})")
+        for row in rows:
+            flag = "REGRESIÓN" if row["regression"] else ""
+            print(f"  {row['name']:<45} {row['change']:>+8.1%}  {flag}")
+        regressions = [row["name"] for row in rows if row["regression"]]
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Línea base guardada en {args.baseline}")
+
+    for suite, error in report["errors"].items():
+        print(f"ERROR en {suite}: {error}")
+    if regressions:
+        print(f"{len(regressions)} regresiones: {', '.join(regressions)}")
+    return 1 if regressions or report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Benchmark de arranque de OmniMonitor
+Mide `import app` con `python -X importtime` (proceso nuevo en cada ronda)
+y falla si:
+
+- algún módulo que debe cargarse de forma perezosa aparece al importar
+  (vistas CRUD, capas de Atomic Design, backends de sonido), o
+- el tiempo acumulado de `import app` supera el presupuesto.
+
+Uso:
+    python benchmarks/startup.py                 # 5 rondas, presupuesto 600 ms
+    python benchmarks/startup.py --budget-ms 400 --top 15
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos que no deben importarse antes del primer frame
+LAZY_MODULES = (
+    "src.ui.crud_views",
+    "src.ui.atoms",
+    "src.ui.molecules",
+    "src.ui.organisms",
+    "pygame",
+    "playsound",
+)
+
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """Salida de -X importtime -> {módulo: (propio µs, acumulado µs)}"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        modules[parts[2].strip()] = (int(parts[0]), int(parts[1]))
+    return modules
+
+
+def measure_once(python: str = sys.executable) -> Dict[str, Tuple[int, int]]:
+    """Importar app en un proceso nuevo y devolver los tiempos por módulo"""
+    result = subprocess.run([python, "-X", "importtime", "-c", "import app"],
+                            cwd=ROOT_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import app falló:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def run(rounds: int = 5) -> Dict:
+    """Mejor ronda (mínimo del acumulado de `app`) y módulos perezosos cargados"""
+    samples: List[Dict[str, Tuple[int, int]]] = [measure_once() for _ in range(rounds)]
+    best = min(samples, key=lambda modules: modules.get("app", (0, 0))[1])
+    eager = sorted(name for name in best for lazy in LAZY_MODULES
+                   if name == lazy or name.startswith(lazy + "."))
+    return {
+        "import_app_ms": best["app"][1] / 1000,
+        "import_app_ms_all": [modules["app"][1] / 1000 for modules in samples],
+        "modules": len(best),
+        "eager_lazy_modules": eager,
+        "top_self_ms": sorted(((name, t[0] / 1000) for name, t in best.items()),
+                              key=lambda item: item[1], reverse=True),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de arranque (import app)")
+    parser.add_argument("--rounds", type=int, default=5, help="Procesos a medir (se toma el mejor)")
+    parser.add_argument("--budget-ms", type=float, default=600.0,
+                        help="Máximo para el tiempo acumulado de `import app`")
+    parser.add_argument("--top", type=int, default=10, help="Módulos más lentos a listar")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args(argv)
+
+    report = run(args.rounds)
+    report["top_self_ms"] = report["top_self_ms"][:args.top]
+    report["budget_ms"] = args.budget_ms
+    failures = []
+    if report["eager_lazy_modules"]:
+        failures.append(f"módulos perezosos importados al arrancar: {', '.join(report['eager_lazy_modules'])}")
+    if report["import_app_ms"] > args.budget_ms:
+        failures.append(f"import app {report['import_app_ms']:.0f} ms > presupuesto {args.budget_ms:.0f} ms")
+    report["ok"] = not failures
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"import app: {report['import_app_ms']:.1f} ms (mejor de {args.rounds}, "
+              f"{report['modules']} módulos, presupuesto {args.budget_ms:.0f} ms)")
+        for name, ms in report["top_self_ms"]:
+            print(f"  {ms:8.2f} ms  {name}")
+        for failure in failures:
+            print(f"REGRESIÓN: {failure}")
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+"""Agente sin interfaz: muestreo local, spool en disco y envío al colector"""
+from .spool import Spool
+from .agent import Sampler, Shipper, run_agent, main
+
+__all__ = ['Spool', 'Sampler', 'Shipper', 'run_agent', 'main']
@@ -0,0 +1,6 @@
+"""python -m src.agent http://colector:8765"""
+import sys
+
+from src.agent.agent import main
+
+sys.exit(main())
@@ -0,0 +1,302 @@
+"""
+Agente sin interfaz de OmniMonitor
+Muestrea el sistema local con SystemMonitor, guarda las muestras en un
+spool en disco y las envía por lotes comprimidos a un colector central
+(POST /api/ingest del servidor API). Con `--sink` evalúa además las
+alertas locales y entrega sus transiciones a destinos externos.
+
+Uso:
+    python app.py --agent http://colector:8765 [--interval 1] [--host nombre]
+    python app.py --agent http://colector:8765 --sink webhook=http://hooks/x --sink syslog
+    python -m src.agent http://colector:8765
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.core.monitor import SystemMonitor
+from src.agent.spool import Spool, DEFAULT_SPOOL_DIR
+from src.crud.sinks import AlertDispatcher
+
+INGEST_PATH = '/api/ingest'
+HOST_HEADER = 'X-OmniMonitor-Host'
+TOKEN_HEADER = 'X-OmniMonitor-Token'
+TOKEN_ENV = 'OMNIMONITOR_INGEST_TOKEN'
+MAX_BACKOFF_DOUBLINGS = 16  # Limitar el exponente: 2 ** 1024 ya no cabe en un float
+
+
+class Sampler:
+    """
+    Convierte lecturas de SystemMonitor en filas de historial
+    Solo consulta las métricas que se guardan; la GPU (que lanza procesos
+    externos) se lee cada `gpu_interval` segundos.
+    """
+
+    def __init__(self, monitor: SystemMonitor = None, gpu_interval: float = 30.0):
+        self.monitor = monitor or SystemMonitor()
+        self.gpu_interval = gpu_interval
+        self._gpu = None
+        self._gpu_read_at = float('-inf')
+
+    def sample(self) -> Dict:
+        m = self.monitor
+        now = time.monotonic()
+        if now - self._gpu_read_at >= self.gpu_interval:
+            self._gpu = m.get_gpu_info()
+            self._gpu_read_at = now
+
+        mem = m.get_memory_usage()
+        disk = m.get_disk_usage()
+        disk_io = m.get_disk_io() or {}
+        net = m.get_network_speed()
+        gpu = self._gpu or {}
+        row = {
+            "timestamp": datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
+            "cpu_usage": m.get_cpu_usage(),
+            "cpu_temp": m.get_cpu_temp(),
+            "ram_usage": mem['percent'],
+            "ram_used_gb": mem['used'] / (1024**3),
+            "disk_usage": disk['percent'],
+            "disk_read_speed": disk_io.get('read_speed'),
+            "disk_write_speed": disk_io.get('write_speed'),
+            "net_upload": net['upload'] / (1024 * 1024),
+            "net_download": net['download'] / (1024 * 1024),
+            "gpu_usage": gpu.get('usage'),
+            "gpu_temp": gpu.get('temp'),
+        }
+        return {k: round(v, 3) if isinstance(v, float) else v for k, v in row.items()}
+
+
+class Shipper(threading.Thread):
+    """Hilo que vacía el spool hacia el colector con backoff exponencial"""
+
+    def __init__(self, spool: Spool, collector_url: str, host: str, poll_interval: float = 5.0,
+                 timeout: float = 10.0, max_backoff: float = 300.0, batch_bytes: int = 1024 * 1024,
+                 token: str = None):
+        super().__init__(daemon=True, name='omnimonitor-shipper')
+        self.spool = spool
+        self.url = collector_url.rstrip('/') + INGEST_PATH
+        self.host = host
+        self.token = token or ''
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.batch_bytes = batch_bytes
+        self.failures = 0
+        self.shipped_records = 0
+        self.last_error: Optional[str] = None
+        self._stop_event = threading.Event()
+
+    def ship_once(self) -> bool:
+        """Enviar el lote pendiente más antiguo. False si hay que esperar."""
+        batch = self.spool.peek(self.batch_bytes)
+        if not batch:
+            return False
+        body = self.spool.read(batch)
+        request = urllib.request.Request(self.url, data=body, method='POST', headers={
+            'Content-Type': 'application/x-ndjson',
+            'Content-Encoding': 'gzip',
+            HOST_HEADER: self.host,
+            TOKEN_HEADER: self.token,
+        })
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            if e.code in (400, 413):
+                # El colector nunca aceptará este lote: descartarlo para no bloquear la cola
+                print(f"Lote rechazado por el colector ({e.code}), descartado")
+                self.spool.ack(batch)
+                return True
+            raise
+        self.spool.ack(batch)
+        self.shipped_records += sum(s[2] for s in batch)
+        return True
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                shipped = self.ship_once()
+                self.failures = 0
+                self.last_error = None
+                if shipped:
+                    continue  # Vaciar el atraso sin esperar
+                delay = self.poll_interval
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e) or type(e).__name__
+                delay = self.backoff()
+            self._stop_event.wait(delay)
+    
+    def backoff(self) -> float:
+        """Espera tras `failures` fallos seguidos: 2, 4, 8... segundos hasta max_backoff"""
+        try:
+            return min(self.poll_interval * (2 ** min(self.failures, MAX_BACKOFF_DOUBLINGS)),
+                       self.max_backoff)
+        except Exception:
+            return self.max_backoff  # Nunca salir del bucle por calcular la espera
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def run_agent(collector_url: str, interval: float = 1.0, spool_dir: str = DEFAULT_SPOOL_DIR,
+              host: str = None, stop_event: threading.Event = None, verbose: bool = True,
+              sinks: list = None, **shipper_options) -> Dict:
+    """Bucle principal del agente; devuelve estadísticas al detenerse"""
+    host = host or socket.gethostname()
+    stop_event = stop_event or threading.Event()
+    sampler = Sampler()
+    spool = Spool(spool_dir)
+    shipper = Shipper(spool, collector_url, host, **shipper_options)
+    shipper.start()
+    engine = dispatcher = None
+    if sinks:
+        # Alertas locales: reglas de la base de datos del host, salida por los destinos
+        from src.crud.alerts import AlertEngine
+        engine = AlertEngine()
+        dispatcher = AlertDispatcher.from_specs(sinks, host)
+    if verbose:
+        print(f"🛰️  Agente {host} -> {collector_url} (cada {interval}s, spool: {spool_dir})")
+
+    next_tick = time.monotonic()
+    try:
+        while not stop_event.is_set():
+            try:
+                sample = sampler.sample()
+                spool.append(sample)
+                if engine is not None:
+                    for transition in engine.evaluate(sample):
+                        dispatcher.publish(transition)
+            except Exception as e:
+                print(f"Error muestreando: {e}")
+            next_tick += interval
+            stop_event.wait(max(0.0, next_tick - time.monotonic()))
+    finally:
+        spool.flush()  # No perder el lote en memoria al salir
+        shipper.stop()
+        if dispatcher is not None:
+            dispatcher.close()
+    stats = {**spool.stats(), "shipped_records": shipper.shipped_records,
+             "failures": shipper.failures, "last_error": shipper.last_error}
+    if dispatcher is not None:
+        stats["sinks"] = dispatcher.stats()
+    return stats
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='omnimonitor --agent', description='Agente OmniMonitor sin interfaz')
+    parser.add_argument('collector', help='URL del colector, p. ej. http://colector:8765')
+    parser.add_argument('--interval', type=float, default=1.0, help='Segundos entre muestras')
+    parser.add_argument('--spool', default=DEFAULT_SPOOL_DIR, help='Directorio del spool en disco')
+    parser.add_argument('--host', default=None, help='Nombre del host (por defecto hostname)')
+    parser.add_argument('--token', default=os.environ.get(TOKEN_ENV),
+                        help=f'Token del colector (por defecto ${TOKEN_ENV})')
+    parser.add_argument('--sink', action='append', default=[], metavar='TIPO=DESTINO',
+                        help='Destino de alertas: webhook=URL, file=RUTA, syslog[=host:puerto], exec=COMANDO')
+    args = parser.parse_args(argv)
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    try:
+        stats = run_agent(args.collector, args.interval, args.spool, args.host, stop_event,
+                          sinks=args.sink, token=args.token)
+    except KeyboardInterrupt:
+        stop_event.set()
+        return 0
+    print(json.dumps(stats))
+    return 0
+
+
+if __name__ == "__main__":
+    # Test: agente contra un colector local que arranca tarde (simula caída)
+    import tempfile
+    from src.server.api import create_server, ingest_batch
+    from src.database.db import get_read_pool, use_database
+    
+    # Base de datos temporal: el colector de prueba no escribe en la del repositorio
+    db_dir = tempfile.TemporaryDirectory()
+    use_database(os.path.join(db_dir.name, 'collector.db'))
+
+    # Colector caído durante días: la espera se queda en el tope, sin OverflowError
+    with tempfile.TemporaryDirectory() as tmp:
+        shipper = Shipper(Spool(tmp), "http://localhost:1", "agente-test", poll_interval=5.0)
+        shipper.failures = 5000
+        assert shipper.backoff() == shipper.max_backoff
+    
+    port = 8891
+    with tempfile.TemporaryDirectory() as tmp:
+        stop = threading.Event()
+        result = {}
+        agent_thread = threading.Thread(
+            target=lambda: result.update(run_agent(f"http://localhost:{port}", 0.02, tmp, "agente-test",
+                                                   stop, verbose=False, poll_interval=0.2,
+                                                   token="secreto")))
+        agent_thread.start()
+        time.sleep(3.0)  # Colector caído: las muestras se acumulan en el spool
+        print(f"Sin colector, spool: {len(os.listdir(tmp))} segmentos")
+
+        server = create_server(port, ingest_token="secreto")
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        time.sleep(4.0)  # Reintento tras el backoff y vaciado del atraso
+        stop.set()
+        agent_thread.join()
+        server.shutdown()
+        server.server_close()
+
+        print(f"Agente: {result}")
+        hosts = {h['host']: h for h in get_read_pool().get_hosts()}
+        print(f"Colector: {hosts.get('agente-test')}")
+        assert result["shipped_records"] > 0 and 'agente-test' in hosts
+    
+    # Ingesta: sin --ingest no existe, sin token se rechaza, timestamps validados
+    def post(server_port, token=None):
+        request = urllib.request.Request(f"http://localhost:{server_port}{INGEST_PATH}", method='POST',
+                                         data=b'{"timestamp": "2026-01-01 00:00:00"}\n',
+                                         headers={HOST_HEADER: "intruso", TOKEN_HEADER: token or ''})
+        try:
+            with urllib.request.urlopen(request, timeout=2) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+    
+    def post_length(server_port, length=None):
+        import http.client
+        conn = http.client.HTTPConnection("localhost", server_port, timeout=2)
+        conn.putrequest('POST', INGEST_PATH)
+        conn.putheader(HOST_HEADER, "agente-test")
+        conn.putheader(TOKEN_HEADER, "secreto")
+        if length is not None:
+            conn.putheader('Content-Length', length)
+        conn.endheaders()
+        status = conn.getresponse().status
+        conn.close()
+        return status
+    
+    plain, collector = create_server(port + 1), create_server(port + 2, ingest_token="secreto")
+    for s in (plain, collector):
+        threading.Thread(target=s.serve_forever, daemon=True).start()
+    assert post(port + 1, "secreto") == 404 and post(port + 2) == 401 and post(port + 2, "otro") == 401
+    assert post_length(port + 2) == 411
+    assert post_length(port + 2, "abc") == 400 and post_length(port + 2, "-1") == 400
+    for s in (plain, collector):
+        s.shutdown()
+        s.server_close()
+    for bad in ("basura", "9999-01-01 00:00:00", "1970-01-01 00:00:00"):
+        try:
+            ingest_batch("agente-test", json.dumps({"timestamp": bad}).encode())
+            raise AssertionError(f"timestamp aceptado: {bad}")
+        except ValueError:
+            pass
+    db_dir.cleanup()
+    print("Agente OK")
@@ -0,0 +1,177 @@
+"""
+Spool en disco para el agente de OmniMonitor
+Guarda las muestras en segmentos JSONL comprimidos con gzip hasta que el
+colector confirma su recepción.
+
+- Las muestras se acumulan en memoria y se sellan en un segmento cada
+  `batch_size` muestras o `max_age` segundos (escritura atómica tmp + rename).
+- El spool está acotado a `max_bytes`: si el colector no responde durante
+  mucho tiempo se descartan los segmentos más antiguos.
+- Los segmentos sobreviven a reinicios del agente: al arrancar se retoma
+  la numeración y se reenvía lo pendiente.
+"""
+import gzip
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Tuple
+
+SUFFIX = '.jsonl.gz'
+DEFAULT_SPOOL_DIR = os.path.join(os.path.expanduser('~'), '.omnimonitor', 'spool')
+
+
+class Spool:
+    """Cola FIFO de segmentos gzip en un directorio"""
+
+    def __init__(self, directory: str = DEFAULT_SPOOL_DIR, max_bytes: int = 64 * 1024 * 1024,
+                 batch_size: int = 60, max_age: float = 30.0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+        self.max_age = max_age
+        self.dropped_records = 0
+
+        self._lock = threading.Lock()
+        self._buffer: List[bytes] = []
+        self._buffer_started = 0.0
+        # (ruta, bytes, registros) de cada segmento sellado, del más antiguo al más nuevo
+        self._segments: "deque[Tuple[str, int, int]]" = deque()
+        self._total_bytes = 0
+        self._next_seq = 0
+        self._load()
+
+    def _load(self):
+        """Retomar los segmentos que quedaron de una ejecución anterior"""
+        os.makedirs(self.directory, exist_ok=True)
+        found = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith('.tmp'):
+                os.remove(path)  # Escritura interrumpida
+            elif name.endswith(SUFFIX):
+                seq, _, count = name[:-len(SUFFIX)].partition('-')
+                found.append((int(seq), path, int(count or 0)))
+        for seq, path, count in sorted(found):
+            size = os.path.getsize(path)
+            self._segments.append((path, size, count))
+            self._total_bytes += size
+            self._next_seq = seq + 1
+
+    def append(self, record: Dict):
+        """Agregar una muestra; sella un segmento si el lote está completo"""
+        line = json.dumps(record, separators=(',', ':')).encode() + b'\n'
+        with self._lock:
+            if not self._buffer:
+                self._buffer_started = time.monotonic()
+            self._buffer.append(line)
+            full = len(self._buffer) >= self.batch_size or \
+                time.monotonic() - self._buffer_started >= self.max_age
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Sellar las muestras en memoria como un segmento en disco"""
+        with self._lock:
+            if not self._buffer:
+                return
+            lines, self._buffer = self._buffer, []
+            seq = self._next_seq
+            self._next_seq += 1
+
+        payload = gzip.compress(b''.join(lines), compresslevel=6)
+        path = os.path.join(self.directory, f'{seq:012d}-{len(lines)}{SUFFIX}')
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+        with self._lock:
+            self._segments.append((path, len(payload), len(lines)))
+            self._total_bytes += len(payload)
+            # Acotar el spool descartando lo más antiguo
+            while self._total_bytes > self.max_bytes and len(self._segments) > 1:
+                old_path, old_size, old_count = self._segments.popleft()
+                self._total_bytes -= old_size
+                self.dropped_records += old_count
+                self._remove(old_path)
+
+    def peek(self, max_bytes: int = 1024 * 1024) -> List[Tuple[str, int, int]]:
+        """Segmentos más antiguos (al menos uno) hasta sumar `max_bytes`"""
+        with self._lock:
+            batch, size = [], 0
+            for segment in self._segments:
+                if batch and size + segment[1] > max_bytes:
+                    break
+                batch.append(segment)
+                size += segment[1]
+            return batch
+
+    def read(self, segments: List[Tuple[str, int, int]]) -> bytes:
+        """
+        Contenido de varios segmentos concatenado
+        Varios miembros gzip seguidos siguen siendo un gzip válido.
+        """
+        chunks = []
+        for path, _, _ in segments:
+            try:
+                with open(path, 'rb') as f:
+                    chunks.append(f.read())
+            except FileNotFoundError:
+                pass  # Descartado por el límite mientras se enviaba
+        return b''.join(chunks)
+
+    def ack(self, segments: List[Tuple[str, int, int]]):
+        """Eliminar segmentos confirmados por el colector"""
+        with self._lock:
+            for segment in segments:
+                try:
+                    self._segments.remove(segment)
+                except ValueError:
+                    continue
+                self._total_bytes -= segment[1]
+                self._remove(segment[0])
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def stats(self) -> Dict:
+        """Estado del spool"""
+        with self._lock:
+            return {
+                "segments": len(self._segments),
+                "bytes": self._total_bytes,
+                "pending_records": sum(s[2] for s in self._segments) + len(self._buffer),
+                "dropped_records": self.dropped_records,
+            }
+
+
+if __name__ == "__main__":
+    # Test: sellado, límite con descarte y recuperación tras reinicio
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        spool = Spool(tmp, max_bytes=2000, batch_size=10)
+        for i in range(200):
+            spool.append({"timestamp": f"2024-01-01 00:00:{i % 60:02d}", "cpu_usage": i * 0.5})
+        spool.flush()
+        stats = spool.stats()
+        print(f"Spool: {stats}")
+        assert stats["bytes"] <= 2000 and stats["dropped_records"] > 0
+
+        reopened = Spool(tmp, max_bytes=2000, batch_size=10)
+        assert reopened.stats()["segments"] == stats["segments"]
+        batch = reopened.peek()
+        body = gzip.decompress(reopened.read(batch))
+        lines = body.decode().splitlines()
+        print(f"Reabierto: {len(batch)} segmentos, {len(lines)} registros pendientes")
+        assert json.loads(lines[-1])["cpu_usage"] == 199 * 0.5
+        reopened.ack(batch)
+        assert reopened.stats()["segments"] == 0 and not os.listdir(tmp)
+    print("Spool OK")
@@ -0,0 +1 @@
+"""Terminal package (sin Flet)"""
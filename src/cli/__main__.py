@@ -0,0 +1,8 @@
+"""python -m src.cli top [--once --json]"""
+import sys
+
+from src.cli.top import main
+
+if len(sys.argv) > 1 and sys.argv[1] == "top":
+    sys.argv.pop(1)
+sys.exit(main())
@@ -0,0 +1,369 @@
+"""
+Modo terminal de OmniMonitor (estilo `top`)
+Pensado para sesiones SSH en equipos cargados: no importa Flet, lee el
+snapshot del colector compartido si hay uno (src/server/shm.py) o recolecta
+con SnapshotCollector, y redibuja solo lo que cambió.
+
+Uso:
+    python app.py --top [--interval 1] [--sort cpu|mem|pid] [--limit 20]
+    python -m src.cli top --once --json     # un snapshot para scripts
+
+Teclas: q salir, c/m/p ordenar por CPU/memoria/PID.
+"""
+import argparse
+import json
+import os
+import select
+import shutil
+import signal
+import sys
+import time
+from dataclasses import asdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import termios
+    import tty
+except ImportError:  # Windows: sin teclas (Ctrl+C para salir)
+    termios = tty = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.core.scheduler import MetricSource, SamplingScheduler
+from src.crud.processes import ProcessManager
+from src.server.shm import SnapshotCollector, read_shared_snapshot
+
+SORT_FIELDS = {"cpu": "cpu_percent", "mem": "memory_mb", "pid": "pid"}
+SORT_KEYS = {"c": "cpu", "m": "mem", "p": "pid"}
+
+# Estilos (SGR) por línea
+RESET = "\x1b[0m"
+STYLES = {
+    "": "",
+    "title": "\x1b[1;7m",
+    "header": "\x1b[1m",
+    "ok": "\x1b[32m",
+    "warn": "\x1b[33m",
+    "crit": "\x1b[31m",
+    "dim": "\x1b[2m",
+}
+
+
+# ==================== DATOS ====================
+
+class TopSource:
+    """
+    Snapshot + procesos por ronda
+    El snapshot sale del colector compartido si está publicando (lectura de
+    memoria, sin recolectar); si no, de un SnapshotCollector propio. Los
+    procesos (lo más caro) van con cadencia propia en el planificador.
+    """
+
+    def __init__(self, interval: float = 1.0, limit: int = 20, sort: str = "cpu",
+                 shared: bool = True):
+        self.limit = limit
+        self.shared = shared
+        self.origin = "local"
+        self._collector: Optional[SnapshotCollector] = None
+        self.processes = ProcessManager()
+        self.set_sort(sort)
+        self.scheduler = SamplingScheduler([
+            MetricSource("snapshot", self._snapshot),
+            MetricSource("processes", lambda: self.processes.get_top_with_stats(self.limit),
+                         every=2, expensive=True, max_backoff=4),
+        ], interval=interval)
+
+    def _snapshot(self) -> Dict:
+        data = read_shared_snapshot() if self.shared else None
+        if data is not None:
+            self.origin = "colector compartido"
+            return data
+        self.origin = "local"
+        if self._collector is None:
+            self._collector = SnapshotCollector(interval=self.scheduler.interval)
+        return self._collector.collect()
+
+    def set_sort(self, sort: str):
+        self.sort = sort
+        self.processes.set_sort(SORT_FIELDS[sort], reverse=sort != "pid")
+
+    def refresh_processes(self):
+        """Reordenar ya: la próxima ronda vuelve a leer procesos"""
+        for source in self.scheduler.sources:
+            if source.name == "processes":
+                source.next_due = 0.0
+
+    def collect(self) -> Tuple[Dict, List, Dict]:
+        self.scheduler.collect()
+        values = self.scheduler.values
+        processes, stats = values.get("processes") or ([], {})
+        return values.get("snapshot") or {}, processes, stats
+
+    def next_delay(self) -> float:
+        return self.scheduler.next_delay()
+
+
+# ==================== FORMATO ====================
+
+def fmt_bytes(value: float) -> str:
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if abs(value) < 1024 or unit == "TB":
+            return f"{value:.1f} {unit}" if unit != "B" else f"{value:.0f} B"
+        value /= 1024
+    return f"{value:.1f} TB"
+
+
+def level(percent: float) -> str:
+    if percent >= 90:
+        return "crit"
+    if percent >= 70:
+        return "warn"
+    return "ok"
+
+
+def bar(percent: float, width: int) -> str:
+    percent = max(0.0, min(float(percent or 0), 100.0))
+    filled = int(round(percent / 100 * width))
+    return "[" + "|" * filled + " " * (width - filled) + "]"
+
+
+def render(snapshot: Dict, processes: List, stats: Dict, width: int, height: int,
+           origin: str = "local", sort: str = "cpu") -> List[Tuple[str, str]]:
+    """Pantalla como lista de (texto, estilo), una entrada por fila"""
+    lines: List[Tuple[str, str]] = []
+    cpu = snapshot.get("cpu") or {}
+    mem = snapshot.get("memory") or {}
+    swap = snapshot.get("swap") or {}
+    disk = snapshot.get("disk") or {}
+    usage = disk.get("usage") or {}
+    disk_io = disk.get("io") or {}
+    net = (snapshot.get("network") or {}).get("speed") or {}
+    system = snapshot.get("system") or {}
+    info = system.get("info") or {}
+    bar_width = max(10, min(50, width - 40))
+
+    lines.append((f" OmniMonitor top  {info.get('hostname', '')}  {datetime.now():%H:%M:%S}  "
+                  f"activo {str(system.get('uptime', '')).split('.')[0]}  fuente: {origin}", "title"))
+
+    cpu_usage = cpu.get("usage") or 0
+    extra = ""
+    if cpu.get("freq"):
+        extra += f"  {cpu['freq']:.2f} GHz"
+    if cpu.get("temp") is not None:
+        extra += f"  {cpu['temp']:.0f}°C"
+    lines.append((f" CPU   {bar(cpu_usage, bar_width)} {cpu_usage:5.1f}%{extra}", level(cpu_usage)))
+
+    per_core = cpu.get("per_core") or []
+    core_width = 22
+    per_row = max(1, width // core_width)
+    for start in range(0, len(per_core), per_row):
+        cells = [f"{start + i:>3} {bar(v, 10)} {v:5.1f}%" for i, v in enumerate(per_core[start:start + per_row])]
+        lines.append(("".join(c.ljust(core_width) for c in cells), level(max(per_core[start:start + per_row]))))
+
+    mem_pct = mem.get("percent") or 0
+    lines.append((f" Mem   {bar(mem_pct, bar_width)} {mem_pct:5.1f}%  "
+                  f"{fmt_bytes(mem.get('used') or 0)} / {fmt_bytes(mem.get('total') or 0)}", level(mem_pct)))
+    if swap.get("total"):
+        swap_pct = swap.get("percent") or 0
+        lines.append((f" Swap  {bar(swap_pct, bar_width)} {swap_pct:5.1f}%  "
+                      f"{fmt_bytes(swap.get('used') or 0)} / {fmt_bytes(swap.get('total') or 0)}", level(swap_pct)))
+    disk_pct = usage.get("percent") or 0
+    lines.append((f" Disco {bar(disk_pct, bar_width)} {disk_pct:5.1f}%  "
+                  f"L {disk_io.get('read_speed') or 0:.1f} MB/s  E {disk_io.get('write_speed') or 0:.1f} MB/s",
+                  level(disk_pct)))
+    lines.append((f" Red   ↑ {fmt_bytes(net.get('upload') or 0)}/s  ↓ {fmt_bytes(net.get('download') or 0)}/s", ""))
+    gpu = snapshot.get("gpu")
+    if gpu:
+        gpu_usage = gpu.get("usage") or 0
+        lines.append((f" GPU   {bar(gpu_usage, bar_width)} {gpu_usage:5.1f}%  {gpu.get('name', '')}"
+                      f"  {gpu.get('temp') or 0:.0f}°C", level(gpu_usage)))
+
+    lines.append(("", ""))
+    lines.append((f" Procesos: {stats.get('total', 0)} total, {stats.get('running', 0)} en ejecución, "
+                  f"{stats.get('threads', 0)} hilos   orden: {sort}", ""))
+    lines.append((f" {'PID':>7} {'USUARIO':<10} {'%CPU':>6} {'%MEM':>5} {'RES':>9} {'HILOS':>5}  NOMBRE", "header"))
+    room = max(0, height - len(lines) - 1)
+    for p in processes[:room]:
+        lines.append((f" {p.pid:>7} {p.username[:10]:<10} {p.cpu_percent:>6.1f} {p.memory_percent:>5.1f} "
+                      f"{fmt_bytes(p.memory_mb * 1024 * 1024):>9} {p.num_threads:>5}  {p.name}",
+                      "crit" if p.cpu_percent >= 90 else ""))
+    while len(lines) < height - 1:
+        lines.append(("", ""))
+    lines.append((" q salir  c CPU  m memoria  p PID", "dim"))
+    return [(text[:width], style) for text, style in lines[:height]]
+
+
+# ==================== PANTALLA ====================
+
+class Screen:
+    """
+    Redibujado mínimo con ANSI: por cada fila solo se reescribe el tramo
+    entre el primer y el último carácter distintos del frame anterior
+    """
+
+    def __init__(self, out=None):
+        self.out = out or sys.stdout
+        self._previous: List[Tuple[str, str]] = []
+        self._size: Optional[Tuple[int, int]] = None
+        self.bytes_written = 0
+
+    def draw(self, lines: List[Tuple[str, str]], size: Tuple[int, int]) -> int:
+        """Escribir el frame; devuelve los bytes enviados a la terminal"""
+        parts = []
+        if size != self._size:
+            parts.append("\x1b[2J")  # Redimensionado: repintado completo
+            self._previous = []
+            self._size = size
+        width = size[0]
+        for row, (text, style) in enumerate(lines):
+            text = text.ljust(width)
+            old_text, old_style = self._previous[row] if row < len(self._previous) else (None, None)
+            if old_text == text and old_style == style:
+                continue
+            start, end = 0, len(text)
+            if old_text is not None and old_style == style:
+                while start < end and text[start] == old_text[start]:
+                    start += 1
+                while end > start and text[end - 1] == old_text[end - 1]:
+                    end -= 1
+            sgr = STYLES.get(style, "")
+            parts.append(f"\x1b[{row + 1};{start + 1}H{sgr}{text[start:end]}{RESET if sgr else ''}")
+        self._previous = [(text.ljust(width), style) for text, style in lines]
+        if not parts:
+            return 0
+        data = "".join(parts)
+        self.out.write(data)
+        self.out.flush()
+        self.bytes_written += len(data)
+        return len(data)
+
+    def enter(self):
+        self.out.write("\x1b[?1049h\x1b[?25l\x1b[2J")  # Pantalla alternativa, sin cursor
+        self.out.flush()
+
+    def leave(self):
+        self.out.write(f"{RESET}\x1b[?25h\x1b[?1049l")
+        self.out.flush()
+
+
+class RawInput:
+    """Teclas sin esperar Enter (POSIX); sin efecto si stdin no es una terminal"""
+
+    def __init__(self):
+        self.enabled = termios is not None and sys.stdin.isatty()
+        self._saved = None
+
+    def __enter__(self):
+        if self.enabled:
+            self._saved = termios.tcgetattr(sys.stdin)
+            tty.setcbreak(sys.stdin.fileno())
+        return self
+
+    def __exit__(self, *exc):
+        if self._saved is not None:
+            termios.tcsetattr(sys.stdin, termios.TCSADRAIN, self._saved)
+
+    def wait(self, timeout: float) -> str:
+        """Esperar hasta `timeout` segundos; devuelve la tecla pulsada o ''"""
+        if not self.enabled:
+            time.sleep(timeout)
+            return ""
+        ready, _, _ = select.select([sys.stdin], [], [], timeout)
+        return os.read(sys.stdin.fileno(), 1).decode(errors="ignore") if ready else ""
+
+
+# ==================== MODOS ====================
+
+def snapshot_json(source: TopSource, settle: float = 0.5) -> Dict:
+    """Un snapshot con procesos (dos lecturas: la primera fija la referencia de CPU)"""
+    snapshot, processes, stats = source.collect()
+    if source.origin == "local" or not processes:
+        time.sleep(settle)
+        for s in source.scheduler.sources:
+            s.next_due = 0.0
+        snapshot, processes, stats = source.collect()
+    return dict(snapshot, processes={"stats": stats, "top": [asdict(p) for p in processes]},
+                source=source.origin)
+
+
+def run_top(source: TopSource) -> int:
+    screen = Screen()
+    resized = [False]
+    if hasattr(signal, "SIGWINCH"):
+        signal.signal(signal.SIGWINCH, lambda *_: resized.__setitem__(0, True))
+    screen.enter()
+    try:
+        with RawInput() as keys:
+            while True:
+                snapshot, processes, stats = source.collect()
+                size = tuple(shutil.get_terminal_size())
+                screen.draw(render(snapshot, processes, stats, size[0], size[1],
+                                   source.origin, source.sort), size)
+                key = keys.wait(source.next_delay()).lower()
+                if key == "q":
+                    break
+                if key in SORT_KEYS:
+                    source.set_sort(SORT_KEYS[key])
+                    source.refresh_processes()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        screen.leave()
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="omnimonitor top", description="Monitor en modo terminal")
+    parser.add_argument("--interval", type=float, default=1.0, help="Segundos entre refrescos")
+    parser.add_argument("--sort", choices=tuple(SORT_FIELDS), default="cpu", help="Orden de procesos")
+    parser.add_argument("--limit", type=int, default=40, help="Procesos leídos por ronda")
+    parser.add_argument("--once", action="store_true", help="Una sola lectura y salir")
+    parser.add_argument("--json", action="store_true", help="Con --once: imprimir JSON")
+    parser.add_argument("--no-shared", action="store_true", help="No usar el colector compartido")
+    args = parser.parse_args(argv)
+
+    source = TopSource(args.interval, args.limit, args.sort, shared=not args.no_shared)
+    if args.once:
+        data = snapshot_json(source)
+        if args.json:
+            print(json.dumps(data, default=str))
+        else:
+            size = shutil.get_terminal_size()
+            processes = source.scheduler.values.get("processes") or ([], {})
+            for text, _ in render(data, processes[0], processes[1], size[0],
+                                  len(processes[0]) + 14, source.origin, source.sort):
+                print(text.rstrip())
+        return 0
+    if not sys.stdout.isatty():
+        print("La salida no es una terminal: usar --once [--json]", file=sys.stderr)
+        return 1
+    return run_top(source)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main())
+    # Test: sin Flet, diff mínimo entre frames y coste por ronda
+    import io
+
+    assert "flet" not in sys.modules
+    source = TopSource(limit=20)
+    snapshot, processes, stats = source.collect()
+    out = io.StringIO()
+    screen = Screen(out)
+    first = screen.draw(render(snapshot, processes, stats, 120, 40), (120, 40))
+    same = screen.draw(render(snapshot, processes, stats, 120, 40), (120, 40))
+    changed = dict(snapshot, cpu=dict(snapshot.get("cpu") or {}, usage=99.0))
+    diff = screen.draw(render(changed, processes, stats, 120, 40), (120, 40))
+    print(f"Frame completo {first} bytes, sin cambios {same}, CPU cambiada {diff}")
+    assert same <= 60 and diff < first / 4  # Solo el reloj y la fila de CPU
+
+    rounds = 5
+    cpu_start = time.process_time()
+    for _ in range(rounds):
+        screen.draw(render(*source.collect(), 120, 40), (120, 40))
+        time.sleep(source.next_delay())
+    per_round = (time.process_time() - cpu_start) / rounds
+    print(f"CPU por ronda: {per_round * 1000:.1f} ms ({per_round * 100:.2f}% a 1 Hz, fuente {source.origin})")
+    print(json.dumps(snapshot_json(source), default=str)[:120] + "...")
+    print("Modo terminal OK")
@@ -0,0 +1,189 @@
+"""
+Detección de anomalías en línea para OmniMonitor
+Modelos con memoria O(1) por serie, baratos para ejecutarse en cada muestra:
+
+- Línea base estacional: media y desviación por hora del día (UTC)
+  aprendidas de metrics_history (24 buckets por métrica).
+- EWMA + z-score sobre el residuo respecto a esa línea base.
+- CUSUM sobre el z-score para detectar cambios de nivel y derivas lentas
+  (p. ej. una fuga de memoria) que nunca superan un umbral fijo.
+
+La puntuación se expresa en desviaciones típicas: 3 = anomalía clara.
+"""
+import math
+import os
+import sys
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+
+class SeasonalBaseline:
+    """Media y desviación esperadas por hora del día (UTC)"""
+
+    MIN_SAMPLES = 30  # Muestras mínimas para confiar en una hora
+
+    def __init__(self, profile: Dict[int, Tuple[float, float, int]] = None):
+        # hora -> (media, desviación, muestras)
+        self.profile = {h: p for h, p in (profile or {}).items() if p[2] >= self.MIN_SAMPLES}
+
+    def __bool__(self) -> bool:
+        return bool(self.profile)
+
+    def expected(self, hour: int) -> Optional[Tuple[float, float]]:
+        entry = self.profile.get(hour)
+        return (entry[0], entry[1]) if entry else None
+
+    @classmethod
+    def from_history(cls, db, metric: str, days: int = 7, host: str = None) -> 'SeasonalBaseline':
+        """Aprender la línea base de los agregados horarios de metrics_history"""
+        try:
+            return cls(db.get_hourly_profile(metric, days, host))
+        except Exception as e:
+            print(f"Sin línea base para {metric}: {e}")
+            return cls()
+
+
+class AnomalyModel:
+    """
+    Modelo en línea de una serie: z-score EWMA del residuo estacional + CUSUM
+    Estado: media y varianza EWMA, dos acumuladores CUSUM y contadores.
+    """
+
+    WARMUP_SAMPLES = 30
+
+    def __init__(self, halflife: float = 1800.0, z_threshold: float = 3.0,
+                 cusum_k: float = 0.5, cusum_h: float = 8.0, min_std: float = 1e-3,
+                 baseline: SeasonalBaseline = None, clock=time.time):
+        self.halflife = halflife or 1800.0
+        self.z_threshold = z_threshold
+        self.cusum_k = cusum_k
+        self.cusum_h = cusum_h
+        self.min_std = min_std
+        self.baseline = baseline
+        self.clock = clock  # Reloj de pared para la hora del día
+        self.mean = 0.0
+        self.var = 0.0
+        self.n = 0
+        self.cusum_hi = 0.0
+        self.cusum_lo = 0.0
+        self.score = 0.0
+        self._last = None
+
+    def _residual(self, value: float) -> float:
+        if self.baseline:
+            expected = self.baseline.expected(time.gmtime(self.clock()).tm_hour)
+            if expected is not None:
+                return value - expected[0]
+        return value
+
+    def update(self, value: float, now: float) -> Optional[float]:
+        """Incorporar una muestra; devuelve la puntuación (None durante el calentamiento)"""
+        r = self._residual(value)
+        self.n += 1
+        if self.n == 1:
+            self.mean, self._last = r, now
+            return None
+
+        dt = max(now - self._last, 0.0)
+        self._last = now
+        # Olvido exponencial por tiempo; al inicio, media acumulada (1/n)
+        alpha = max(1.0 - math.exp(-dt * math.log(2) / self.halflife), 1.0 / self.n)
+        std = max(math.sqrt(self.var), self.min_std, abs(self.mean) * 0.01)
+        z = (r - self.mean) / std
+
+        # CUSUM de dos lados sobre el z-score (acotado para que pueda bajar)
+        k, h = self.cusum_k, self.cusum_h
+        self.cusum_hi = min(max(0.0, self.cusum_hi + z - k), 2 * h)
+        self.cusum_lo = min(max(0.0, self.cusum_lo - z - k), 2 * h)
+
+        # Actualizar con el residuo recortado: una anomalía no arrastra al modelo
+        clipped = self.mean + max(-self.z_threshold, min(self.z_threshold, z)) * std
+        delta = clipped - self.mean
+        self.mean += alpha * delta
+        self.var = (1 - alpha) * (self.var + alpha * delta * delta)
+
+        if self.n < self.WARMUP_SAMPLES:
+            self.cusum_hi = self.cusum_lo = 0.0
+            return None
+        change = max(self.cusum_hi, self.cusum_lo) / h * self.z_threshold
+        self.score = max(abs(z), change)
+        return self.score
+
+
+class AnomalyDetector:
+    """
+    Un modelo por métrica del monitor; marca qué muestras son anómalas
+    (para resaltarlas en los gráficos)
+    """
+
+    def __init__(self, metrics: Iterable[str] = (), z_threshold: float = 3.0, db=None, **model_options):
+        self.z_threshold = z_threshold
+        self.models: Dict[str, AnomalyModel] = {}
+        for metric in metrics:
+            baseline = SeasonalBaseline.from_history(db, metric) if db is not None else None
+            self.models[metric] = AnomalyModel(z_threshold=z_threshold, baseline=baseline, **model_options)
+
+    def load_baselines(self, db):
+        """
+        Cargar las líneas base estacionales después de crear el detector
+        Pensado para un hilo en segundo plano (`db` puede ser el ReadOnlyPool).
+        """
+        for metric, model in self.models.items():
+            model.baseline = SeasonalBaseline.from_history(db, metric)
+
+    def observe(self, metric: str, value: Optional[float], now: float = None) -> bool:
+        """Actualizar la serie y devolver True si la muestra es anómala"""
+        model = self.models.get(metric)
+        if model is None or value is None:
+            return False
+        score = model.update(value, time.monotonic() if now is None else now)
+        return score is not None and score >= self.z_threshold
+
+    def scores(self) -> Dict[str, float]:
+        return {metric: round(model.score, 2) for metric, model in self.models.items()}
+
+
+if __name__ == "__main__":
+    # Test: ruido estable, pico, fuga lenta y coste por muestra
+    import random
+
+    random.seed(7)
+    detector = AnomalyDetector(["ram_usage"], halflife=600)
+    flags = [detector.observe("ram_usage", random.gauss(50, 1), now=t) for t in range(2000)]
+    false_positives = sum(flags[100:])
+    print(f"Ruido normal: {false_positives} falsos positivos en 1900 muestras")
+    assert false_positives < 20
+
+    assert detector.observe("ram_usage", 60, now=2000)  # Pico de 10σ
+    print(f"Pico: puntuación {detector.models['ram_usage'].score:.1f}")
+
+    # Fuga: +0.01 por segundo (siempre bajo un umbral fijo de 80%)
+    leaking = AnomalyDetector(["ram_usage"], halflife=600)
+    for t in range(2000):
+        leaking.observe("ram_usage", random.gauss(50, 1), now=t)
+    leak_at = None
+    for t in range(2000, 4000):
+        value = 50 + (t - 2000) * 0.01 + random.gauss(0, 1)
+        if leaking.observe("ram_usage", value, now=t):
+            leak_at = t - 2000
+            break
+    print(f"Fuga detectada tras {leak_at}s (+{leak_at * 0.01:.1f} puntos)")
+    assert leak_at is not None and leak_at * 0.01 < 10
+
+    # Línea base estacional: el mismo valor es normal a una hora y anómalo a otra
+    baseline = SeasonalBaseline({h: (80.0 if h == 12 else 20.0, 2.0, 100) for h in range(24)})
+    noon = AnomalyModel(baseline=baseline, clock=lambda: 12 * 3600)
+    night = AnomalyModel(baseline=baseline, clock=lambda: 3 * 3600)
+    for t in range(100):
+        noon.update(80 + random.gauss(0, 2), t)
+        night.update(20 + random.gauss(0, 2), t)
+    assert noon.update(82, 100) < 3 and night.update(35, 100) > 3
+
+    model = AnomalyModel()
+    start = time.perf_counter()
+    for t in range(100000):
+        model.update(50.0 + (t % 7), t)
+    print(f"Coste: {(time.perf_counter() - start) * 10:.2f} µs/muestra")
+    print("Anomalías OK")
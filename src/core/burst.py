@@ -0,0 +1,351 @@
+"""
+Muestreo en ráfaga de OmniMonitor
+A 1 Hz (y con historial cada 10 s) se pierden los picos de CPU e I/O de
+menos de un segundo. Una ráfaga muestrea CPU por núcleo, I/O de disco y
+red a 10-100 Hz durante una ventana acotada en un buffer circular
+preasignado (`array('f')`, sin asignaciones por muestra), en su propio
+hilo; al terminar se comprime y se guarda en la tabla `burst_captures`.
+
+Los contadores se leen directamente (psutil.cpu_times, disk_io_counters,
+net_io_counters) y las tasas se calculan aquí: así la ráfaga no altera el
+estado interno de psutil.cpu_percent que usa el monitor.
+
+Nota: el kernel cuenta el tiempo de CPU en ticks de 10 ms, así que a
+50-100 Hz el uso por núcleo de una sola muestra está cuantizado; los picos
+sostenidos de decenas de milisegundos sí se ven.
+"""
+import json
+import threading
+import time
+import zlib
+from array import array
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import psutil
+
+BURST_RATES = (10, 25, 50, 100)
+MAX_DURATION = 60.0
+DEFAULT_RATE = 50
+DEFAULT_DURATION = 10.0
+
+# Entre dos ráfagas disparadas por alertas (las manuales no esperan)
+ALERT_COOLDOWN = 300.0
+
+MB = 1024 * 1024
+
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f')[:23]
+
+
+class BurstCapture:
+    """
+    Muestras de una ráfaga: filas de float32 [t, cpu.0..cpu.N, disco, red]
+    `t` son segundos desde el inicio; tasas en MB/s; CPU en %.
+    """
+
+    def __init__(self, columns: List[str], rate_hz: float, data: array = None,
+                 started_at: str = None, reason: str = "manual", stats: Dict = None):
+        self.columns = columns
+        self.rate_hz = rate_hz
+        self.data = data if data is not None else array('f')
+        self.started_at = started_at or _utc_now()
+        self.reason = reason
+        self.stats = stats or {}
+
+    @property
+    def width(self) -> int:
+        return len(self.columns)
+
+    @property
+    def samples(self) -> int:
+        return len(self.data) // self.width
+
+    @property
+    def duration(self) -> float:
+        return self.data[(self.samples - 1) * self.width] if self.samples else 0.0
+
+    def column(self, name: str) -> array:
+        """Una columna completa"""
+        index = self.columns.index(name)
+        return self.data[index::self.width]
+
+    def downsample(self, name: str, start: float = 0.0, end: float = None,
+                   buckets: int = 120) -> List[tuple]:
+        """
+        Vista de [start, end] segundos en `buckets` tramos (t, mín, máx)
+        Mínimo y máximo conservan los picos al alejar el zoom.
+        """
+        end = self.duration if end is None else end
+        if end <= start or not self.samples:
+            return []
+        times = self.column("t")
+        values = self.column(name)
+        span = (end - start) / buckets
+        out = []
+        lo, hi = float("inf"), float("-inf")
+        current = None
+        for t, v in zip(times, values):
+            if t < start or t > end:
+                continue
+            bucket = min(int((t - start) / span), buckets - 1)
+            if bucket != current:
+                if current is not None:
+                    out.append((start + current * span, lo, hi))
+                current, lo, hi = bucket, v, v
+            else:
+                lo, hi = min(lo, v), max(hi, v)
+        if current is not None:
+            out.append((start + current * span, lo, hi))
+        return out
+
+    def to_row(self) -> Dict:
+        """Fila para Database.save_burst_capture (datos con zlib)"""
+        return {
+            "started_at": self.started_at,
+            "reason": self.reason,
+            "rate_hz": self.rate_hz,
+            "duration_s": round(self.duration, 3),
+            "samples": self.samples,
+            "columns": json.dumps(self.columns),
+            "stats": json.dumps(self.stats),
+            "data": zlib.compress(self.data.tobytes(), 6),
+        }
+
+    @classmethod
+    def from_row(cls, row: Dict) -> 'BurstCapture':
+        data = array('f')
+        data.frombytes(zlib.decompress(row["data"]))
+        return cls(json.loads(row["columns"]), row["rate_hz"], data, row["started_at"],
+                   row.get("reason") or "", json.loads(row.get("stats") or "{}"))
+
+
+class BurstSampler(threading.Thread):
+    """
+    Hilo de muestreo de una ráfaga
+    Las muestras se escriben en un array preasignado usado como anillo; con
+    `duration` acotada no da la vuelta, pero `stop()` anticipado o un reloj
+    atrasado nunca hacen crecer la memoria.
+    """
+
+    def __init__(self, rate_hz: float = DEFAULT_RATE, duration: float = DEFAULT_DURATION,
+                 reason: str = "manual", on_done: Callable[['BurstCapture'], None] = None):
+        super().__init__(daemon=True, name='omnimonitor-burst')
+        self.rate_hz = max(1.0, min(float(rate_hz), max(BURST_RATES)))
+        self.duration = max(0.1, min(float(duration), MAX_DURATION))
+        self.reason = reason
+        self.on_done = on_done
+        self.cores = psutil.cpu_count() or 1
+        self.columns = ["t"] + [f"cpu.{i}" for i in range(self.cores)] + [
+            "disk_read", "disk_write", "net_down", "net_up"]
+        self.capacity = int(self.rate_hz * self.duration) + 1
+        self._ring = array('f', bytes(4 * len(self.columns) * self.capacity))
+        self._index = 0      # Próxima fila del anillo
+        self._count = 0      # Filas escritas (acotado por capacity)
+        self._stop_event = threading.Event()
+        self.capture: Optional[BurstCapture] = None
+
+    @property
+    def progress(self) -> float:
+        return min(self._count / self.capacity, 1.0)
+
+    def stop(self):
+        """Terminar antes de tiempo (se guarda lo capturado)"""
+        self._stop_event.set()
+
+    @staticmethod
+    def _cpu_counters():
+        return [(t.user + t.nice + t.system + t.irq + t.softirq + getattr(t, 'steal', 0.0),
+                 sum(t)) for t in psutil.cpu_times(percpu=True)]
+
+    @staticmethod
+    def _io_counters():
+        disk = psutil.disk_io_counters()
+        net = psutil.net_io_counters()
+        return (disk.read_bytes if disk else 0, disk.write_bytes if disk else 0,
+                net.bytes_recv if net else 0, net.bytes_sent if net else 0)
+
+    def run(self):
+        width = len(self.columns)
+        period = 1.0 / self.rate_hz
+        ring = self._ring
+        jitter = array('f')      # Desfase de cada muestra respecto a su cita (µs)
+        costs = array('f')       # Coste de leer y escribir cada muestra (µs)
+        missed = 0
+        started_at = _utc_now()
+        last_cpu = [0.0] * self.cores
+
+        prev_cpu = self._cpu_counters()
+        prev_io = self._io_counters()
+        start = prev_time = time.perf_counter()
+        cpu_start = time.thread_time()
+        tick = 1
+        while not self._stop_event.is_set():
+            deadline = start + tick * period
+            if deadline - start > self.duration + period / 2:
+                break
+            delay = deadline - time.perf_counter()
+            if delay > 0 and self._stop_event.wait(delay):
+                break
+            now = time.perf_counter()
+            jitter.append((now - deadline) * 1e6)
+
+            cpu = self._cpu_counters()
+            io = self._io_counters()
+            elapsed = max(now - prev_time, 1e-6)
+            base = self._index * width
+            ring[base] = now - start
+            for i, ((busy, total), (prev_busy, prev_total)) in enumerate(zip(cpu, prev_cpu)):
+                if i >= self.cores:
+                    break
+                dt = total - prev_total
+                if dt > 0:  # Sin ticks nuevos del kernel se repite el último valor
+                    last_cpu[i] = 100.0 * (busy - prev_busy) / dt
+                ring[base + 1 + i] = last_cpu[i]
+            for j in range(4):
+                ring[base + 1 + self.cores + j] = max(io[j] - prev_io[j], 0) / elapsed / MB
+            prev_cpu, prev_io, prev_time = cpu, io, now
+            self._index = (self._index + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+            costs.append((time.perf_counter() - now) * 1e6)
+
+            # Si una muestra llega tarde más de un periodo, se saltan citas (sin ráfagas de recuperación)
+            tick += 1
+            behind = int((time.perf_counter() - start) / period) - tick
+            if behind > 0:
+                missed += behind
+                tick += behind
+
+        wall = time.perf_counter() - start
+        cpu_used = time.thread_time() - cpu_start
+        # Filas en orden cronológico desde el anillo
+        first = (self._index - self._count) % self.capacity
+        rows = array('f')
+        for k in range(self._count):
+            base = ((first + k) % self.capacity) * width
+            rows.extend(ring[base:base + width])
+
+        ordered_jitter = sorted(jitter)
+        self.capture = BurstCapture(self.columns, self.rate_hz, rows, started_at, self.reason, {
+            "samples": self._count,
+            "missed": missed,
+            "wall_s": round(wall, 3),
+            "effective_hz": round(self._count / wall, 2) if wall > 0 else 0.0,
+            "jitter_mean_us": round(sum(jitter) / len(jitter), 1) if jitter else 0.0,
+            "jitter_p99_us": round(ordered_jitter[int(len(ordered_jitter) * 0.99)], 1) if jitter else 0.0,
+            "jitter_max_us": round(ordered_jitter[-1], 1) if jitter else 0.0,
+            "sample_cost_mean_us": round(sum(costs) / len(costs), 1) if costs else 0.0,
+            "sample_cost_max_us": round(max(costs), 1) if costs else 0.0,
+            "cpu_overhead_percent": round(100.0 * cpu_used / wall, 2) if wall > 0 else 0.0,
+        })
+        if self.on_done:
+            try:
+                self.on_done(self.capture)
+            except Exception as e:
+                print(f"Error guardando ráfaga: {e}")
+
+
+class BurstController:
+    """
+    Una ráfaga a la vez, disparada a mano o por una alerta
+    Al terminar, la captura se guarda con una conexión propia (desde el hilo
+    de la ráfaga, nunca desde el de la UI) y se avisa a `listeners`.
+    """
+
+    def __init__(self, db_path: str = None, cooldown: float = ALERT_COOLDOWN):
+        self.db_path = db_path
+        self.cooldown = cooldown
+        self.listeners: List[Callable[[Optional[int], BurstCapture], None]] = []
+        self._lock = threading.Lock()
+        self._sampler: Optional[BurstSampler] = None
+        self._last_alert_burst = float("-inf")
+        self.last_capture_id: Optional[int] = None
+
+    @property
+    def active(self) -> Optional[BurstSampler]:
+        sampler = self._sampler
+        return sampler if sampler is not None and sampler.is_alive() else None
+
+    def trigger(self, rate_hz: float = DEFAULT_RATE, duration: float = DEFAULT_DURATION,
+                reason: str = "manual") -> bool:
+        """Iniciar una ráfaga; False si ya hay una en curso"""
+        with self._lock:
+            if self.active is not None:
+                return False
+            self._sampler = BurstSampler(rate_hz, duration, reason, on_done=self._save)
+            self._sampler.start()
+            return True
+
+    def trigger_for_alert(self, alert_name: str, **options) -> bool:
+        """Ráfaga por una alerta que entra en disparo (con enfriamiento)"""
+        now = time.monotonic()
+        if now - self._last_alert_burst < self.cooldown:
+            return False
+        if self.trigger(reason=f"alerta: {alert_name}", **options):
+            self._last_alert_burst = now
+            return True
+        return False
+
+    def stop(self):
+        sampler = self.active
+        if sampler is not None:
+            sampler.stop()
+
+    def _save(self, capture: BurstCapture):
+        from src.database.db import Database, DB_PATH
+        db = Database(self.db_path or DB_PATH)
+        try:
+            self.last_capture_id = db.save_burst_capture(capture.to_row())
+        finally:
+            db.close()
+        for listener in list(self.listeners):
+            try:
+                listener(self.last_capture_id, capture)
+            except Exception as e:
+                print(f"Error notificando ráfaga: {e}")
+
+
+if __name__ == "__main__":
+    # Test: ráfaga de 1 s a 100 Hz, guardado y lectura con zoom
+    import os
+    import sys
+    import tempfile
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from src.database.db import Database
+
+    path = os.path.join(tempfile.mkdtemp(), "burst.db")
+    controller = BurstController(db_path=path)
+    done = threading.Event()
+    controller.listeners.append(lambda capture_id, capture: done.set())
+
+    assert controller.trigger(rate_hz=100, duration=1.0)
+    assert not controller.trigger()  # Solo una a la vez
+    # El hilo de la UI sigue libre mientras tanto
+    start = time.perf_counter()
+    spins = 0
+    while not done.is_set():
+        spins += 1
+        time.sleep(0.001)
+    capture = controller._sampler.capture
+    stats = capture.stats
+    print(f"{stats['samples']} muestras a {stats['effective_hz']} Hz, desfase p99 {stats['jitter_p99_us']} µs, "
+          f"coste {stats['sample_cost_mean_us']} µs/muestra, CPU {stats['cpu_overhead_percent']}%")
+    assert 90 <= stats["samples"] <= 101, stats
+
+    db = Database(path)
+    listed = db.get_burst_captures()
+    assert listed[0]["samples"] == capture.samples
+    raw = capture.samples * capture.width * 4
+    print(f"Blob {listed[0]['size_bytes']} bytes (sin comprimir {raw})")
+    loaded = BurstCapture.from_row(db.get_burst_capture(listed[0]["id"]))
+    assert loaded.columns == capture.columns and list(loaded.data) == list(capture.data)
+    zoom = loaded.downsample("cpu.0", 0.2, 0.4, buckets=10)
+    assert 1 <= len(zoom) <= 10 and all(lo <= hi for _, lo, hi in zoom)
+    assert db.delete_burst_capture(listed[0]["id"])
+    db.close()
+
+    assert controller.trigger_for_alert("CPU alta", duration=0.2)
+    controller.active.join()
+    assert not controller.trigger_for_alert("CPU alta", duration=0.2)  # Enfriamiento
+    print("Ráfagas OK")
@@ -0,0 +1,445 @@
+"""
+Contabilidad por cgroup v2 de OmniMonitor (contenedores, servicios, slices)
+En un host con contenedores las cifras globales de CPU y memoria no dicen
+qué inquilino consume. `CgroupCollector` recorre la jerarquía cgroup v2 y
+lee de cada cgroup:
+
+    cpu.stat        uso, usuario/sistema y throttling (contadores)
+    memory.current  memoria cargada al cgroup (instantáneo)
+    memory.max      límite ("max" = sin límite)
+    memory.stat     anon, file, shmem y fallos mayores
+    io.stat         bytes y operaciones por dispositivo (se suman)
+    *.pressure      PSI: % de tiempo con tareas esperando (avg10)
+
+Los contadores se convierten en tasas con `CounterTable` (devices.py), que
+ya resuelve reinicios y altas/bajas. Los archivos se mantienen abiertos y
+se releen con pread desde el offset 0 (sin open/close por muestra), hasta
+`max_open_files` descriptores.
+
+El árbol solo se vuelve a recorrer cuando inotify avisa de que se creó o
+borró un directorio. Sin inotify (otros sistemas, o si libc no lo
+expone), se recorre cada `rescan_interval` segundos.
+
+Todas las rutas parten de `root`, así que se puede probar contra un
+árbol de archivos de ejemplo (ver el test al final).
+"""
+import ctypes
+import ctypes.util
+import os
+import re
+import struct
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.core.devices import CounterTable
+
+DEFAULT_CGROUP_ROOT = "/sys/fs/cgroup"
+
+# Contadores con tasa, en el orden de la tabla
+COUNTERS = (
+    "usage_usec", "user_usec", "system_usec", "nr_throttled", "throttled_usec",
+    "rbytes", "wbytes", "rios", "wios", "pgmajfault",
+)
+_INDEX = {name: i for i, name in enumerate(COUNTERS)}
+_CPU_KEYS = ("usage_usec", "user_usec", "system_usec", "nr_throttled", "throttled_usec")
+_IO_KEYS = ("rbytes", "wbytes", "rios", "wios")
+_MEMORY_STAT_KEYS = ("anon", "file", "shmem", "pgmajfault")
+PRESSURE_FILES = ("cpu.pressure", "memory.pressure", "io.pressure")
+
+# Nombres legibles de cgroups de contenedores (systemd y cgroupfs)
+_CONTAINER_RE = re.compile(
+    r'^(?:(?P<runtime>docker|libpod|crio|cri-containerd|containerd)-)?(?P<id>[0-9a-f]{64})(?:\.scope)?$')
+
+# inotify (linux/inotify.h)
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+
+def find_cgroup2_root(default: str = DEFAULT_CGROUP_ROOT) -> Optional[str]:
+    """Punto de montaje de cgroup v2 (unificado o híbrido), o None"""
+    for candidate in (default, os.path.join(default, "unified")):
+        if os.path.exists(os.path.join(candidate, "cgroup.controllers")):
+            return candidate
+    try:
+        with open("/proc/mounts") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) > 2 and parts[2] == "cgroup2":
+                    return parts[1]
+    except OSError:
+        pass
+    return None
+
+
+def display_name(path: str) -> str:
+    """'/system.slice/docker-<id>.scope' -> 'docker 1a2b3c4d5e6f'"""
+    base = path.rstrip("/").rsplit("/", 1)[-1]
+    match = _CONTAINER_RE.match(base)
+    if match:
+        return f"{match.group('runtime') or 'container'} {match.group('id')[:12]}"
+    return path
+
+
+class Inotify:
+    """Avisos de creación y borrado de directorios (inotify vía ctypes, sin dependencias)"""
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        self._mask = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_ONLYDIR
+
+    def watch(self, path: str):
+        # Añadir dos veces el mismo directorio devuelve el mismo descriptor
+        if self._libc.inotify_add_watch(self.fd, os.fsencode(path), self._mask) < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch {path}")
+
+    def changed(self) -> bool:
+        """True si desde la última llamada se creó, borró o movió algún subdirectorio"""
+        changed = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            pos = 0
+            while pos < len(data):
+                _, mask, _, length = _EVENT.unpack_from(data, pos)
+                pos += _EVENT.size + length
+                changed |= bool(mask & IN_ISDIR)  # Los archivos de un cgroup no cuentan
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class _Files:
+    """Descriptores abiertos para releer con pread; sin hueco, open/read/close"""
+
+    def __init__(self, max_open: int):
+        self.max_open = max_open
+        self._fds: Dict[str, int] = {}
+
+    def read(self, path: str) -> Optional[str]:
+        fd = self._fds.get(path)
+        try:
+            if fd is not None:
+                return os.pread(fd, 64 * 1024, 0).decode()
+            fd = os.open(path, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+        except OSError:
+            return None  # Archivo inexistente (controlador inactivo) o cgroup borrado
+        try:
+            data = os.pread(fd, 64 * 1024, 0).decode()
+        except OSError:
+            os.close(fd)
+            return None
+        if len(self._fds) < self.max_open:
+            self._fds[path] = fd
+        else:
+            os.close(fd)
+        return data
+
+    def forget(self, prefix: str):
+        """Cerrar los archivos de un cgroup que ya no existe"""
+        for path in [p for p in self._fds if p.startswith(prefix)]:
+            os.close(self._fds.pop(path))
+
+    def close(self):
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds.clear()
+
+
+def parse_flat_keyed(text: Optional[str], keys, into: Dict[str, float]):
+    """'clave valor' por línea (cpu.stat, memory.stat)"""
+    for line in (text or "").splitlines():
+        key, _, value = line.partition(" ")
+        if key in keys:
+            into[key] = float(value)
+
+
+def parse_io_stat(text: Optional[str], into: Dict[str, float]):
+    """'8:0 rbytes=.. wbytes=.. rios=.. wios=..' por dispositivo, sumados"""
+    for line in (text or "").splitlines():
+        for field in line.split()[1:]:
+            key, _, value = field.partition("=")
+            if key in _IO_KEYS:
+                into[key] = into.get(key, 0.0) + float(value)
+
+
+def parse_pressure(text: Optional[str]) -> Dict[str, float]:
+    """'some avg10=1.50 ...' -> {'some': 1.5, 'full': ...}"""
+    result = {}
+    for line in (text or "").splitlines():
+        kind, _, rest = line.partition(" ")
+        for field in rest.split():
+            if field.startswith("avg10="):
+                result[kind] = float(field[6:])
+    return result
+
+
+class CgroupCollector:
+    """
+    Uso de CPU, memoria, E/S y presión de cada cgroup v2
+    `sample()` devuelve una lista de dicts ordenada por CPU. Las tasas son
+    None en la primera lectura de un cgroup (no hay referencia todavía).
+    """
+
+    def __init__(self, root: str = None, rescan_interval: float = 10.0, use_inotify: bool = True,
+                 max_open_files: int = 512, min_interval: float = 0.5):
+        self.root = root if root is not None else find_cgroup2_root()
+        self.rescan_interval = rescan_interval
+        self.min_interval = min_interval
+        self.table = CounterTable(len(COUNTERS), capacity=64)
+        self.paths: List[str] = []
+        self.scans = 0
+        self._files = _Files(max_open_files)
+        self._scanned_at = float("-inf")
+        self._result: List[Dict] = []
+        self._lock = threading.Lock()
+        self.inotify: Optional[Inotify] = None
+        if use_inotify and self.available():
+            try:
+                self.inotify = Inotify()
+            except (OSError, AttributeError):
+                self.inotify = None  # Sin inotify: recorrido periódico
+
+    def available(self) -> bool:
+        return bool(self.root) and os.path.isdir(self.root)
+
+    def _scan(self):
+        """Recorrer el árbol (sin la raíz: sus cifras son las del host)"""
+        paths = []
+        stack = [self.root]
+        while stack:
+            directory = stack.pop()
+            if self.inotify is not None:
+                try:
+                    self.inotify.watch(directory)
+                except OSError:
+                    pass
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                            paths.append(entry.path)
+            except OSError:
+                continue  # Borrado mientras se recorría
+        for gone in set(self.paths) - set(paths):
+            self._files.forget(gone + os.sep)
+        self.paths = sorted(paths)
+        self._scanned_at = time.monotonic()
+        self.scans += 1
+
+    def _needs_scan(self) -> bool:
+        if self.scans == 0:
+            return True
+        if self.inotify is not None:
+            return self.inotify.changed()
+        return time.monotonic() - self._scanned_at >= self.rescan_interval
+
+    def sample(self, now: float = None) -> List[Dict]:
+        if not self.available():
+            return []
+        with self._lock:
+            now = time.monotonic() if now is None else now
+            last = self.table.last_time
+            if last is not None and now - last < self.min_interval:
+                return self._result
+            if self._needs_scan():
+                self._scan()
+            self._result = self._read_all(now)
+            return self._result
+
+    def _read_all(self, now: float) -> List[Dict]:
+        read = self._files.read
+        counters: Dict[str, List[float]] = {}
+        gauges: Dict[str, Dict] = {}
+        for path in self.paths:
+            values: Dict[str, float] = {}
+            cpu_stat = read(os.path.join(path, "cpu.stat"))
+            if cpu_stat is None:
+                continue  # No es un cgroup (o ya no existe)
+            parse_flat_keyed(cpu_stat, _CPU_KEYS, values)
+            parse_flat_keyed(read(os.path.join(path, "memory.stat")), _MEMORY_STAT_KEYS, values)
+            parse_io_stat(read(os.path.join(path, "io.stat")), values)
+            counters[path] = [values.get(name, 0.0) for name in COUNTERS]
+
+            current = read(os.path.join(path, "memory.current"))
+            limit = (read(os.path.join(path, "memory.max")) or "max").strip()
+            pressure = {}
+            for filename in PRESSURE_FILES:
+                for kind, avg10 in parse_pressure(read(os.path.join(path, filename))).items():
+                    pressure[f"{filename.split('.')[0]}_{kind}"] = avg10
+            gauges[path] = {
+                "memory_current": int(current) if current and current.strip().isdigit() else None,
+                "memory_max": int(limit) if limit.isdigit() else None,
+                "memory_anon": values.get("anon"),
+                "memory_file": values.get("file"),
+                "memory_shmem": values.get("shmem"),
+                "pressure": pressure,
+            }
+
+        ready = self.table.update(counters, now)
+        rate = self.table.rate
+        prefix = len(self.root.rstrip(os.sep))
+        result = []
+        for path, gauge in gauges.items():
+            slot = ready.get(path)
+            relative = path[prefix:] or "/"
+            row = {
+                "path": relative,
+                "name": display_name(relative),
+                "depth": relative.count("/"),
+                "cpu_percent": None, "cpu_user_percent": None, "cpu_system_percent": None,
+                "throttled_ms": None, "nr_throttled": None,
+                "io_read": None, "io_write": None, "io_read_iops": None, "io_write_iops": None,
+                "pgmajfault": None,
+            }
+            row.update(gauge)
+            current, limit = gauge["memory_current"], gauge["memory_max"]
+            row["memory_percent"] = current / limit * 100 if current is not None and limit else None
+            if slot is not None:
+                row.update({
+                    # 100% = un núcleo completo
+                    "cpu_percent": rate(slot, _INDEX["usage_usec"]) / 1e4,
+                    "cpu_user_percent": rate(slot, _INDEX["user_usec"]) / 1e4,
+                    "cpu_system_percent": rate(slot, _INDEX["system_usec"]) / 1e4,
+                    "throttled_ms": rate(slot, _INDEX["throttled_usec"]) / 1e3,
+                    "nr_throttled": rate(slot, _INDEX["nr_throttled"]),
+                    "io_read": rate(slot, _INDEX["rbytes"]),
+                    "io_write": rate(slot, _INDEX["wbytes"]),
+                    "io_read_iops": rate(slot, _INDEX["rios"]),
+                    "io_write_iops": rate(slot, _INDEX["wios"]),
+                    "pgmajfault": rate(slot, _INDEX["pgmajfault"]),
+                })
+            result.append(row)
+        result.sort(key=lambda r: (r["cpu_percent"] or 0.0, r["memory_current"] or 0), reverse=True)
+        return result
+
+    def close(self):
+        self._files.close()
+        if self.inotify is not None:
+            self.inotify.close()
+
+
+SORT_KEYS = {
+    "cpu": lambda r: r["cpu_percent"] or 0.0,
+    "memory": lambda r: r["memory_current"] or 0,
+    "io": lambda r: (r["io_read"] or 0.0) + (r["io_write"] or 0.0),
+    "pressure": lambda r: max(r["pressure"].values(), default=0.0),
+}
+
+
+def sort_cgroups(rows: List[Dict], key: str = "cpu", limit: int = None) -> List[Dict]:
+    """Ordenar (cpu, memory, io, pressure) y recortar la lista de sample()"""
+    if key not in SORT_KEYS:
+        raise ValueError(f"Orden no válido: {key}. Disponibles: {', '.join(SORT_KEYS)}")
+    rows = sorted(rows, key=SORT_KEYS[key], reverse=True)
+    return rows[:limit] if limit else rows
+
+
+_collector: Optional[CgroupCollector] = None
+_collector_lock = threading.Lock()
+
+
+def get_cgroup_collector() -> CgroupCollector:
+    """Colector de la jerarquía del sistema (singleton; la primera lectura fija la referencia)"""
+    global _collector
+    with _collector_lock:
+        if _collector is None:
+            _collector = CgroupCollector()
+            _collector.sample()
+    return _collector
+
+
+if __name__ == "__main__":
+    # Test contra un cgroupfs de ejemplo: tasas, alta y baja de cgroups
+    import shutil
+    import tempfile
+
+    container_id = "0123456789abcdef" * 4
+
+    def write_cgroup(path, usage_usec, rbytes, current, throttled_usec=0, limit="max"):
+        os.makedirs(path, exist_ok=True)
+        files = {
+            "cpu.stat": f"usage_usec {usage_usec}\nuser_usec {usage_usec * 3 // 4}\n"
+                        f"system_usec {usage_usec // 4}\nnr_periods 10\nnr_throttled 2\n"
+                        f"throttled_usec {throttled_usec}\n",
+            "memory.current": f"{current}\n",
+            "memory.max": f"{limit}\n",
+            "memory.stat": f"anon {current // 2}\nfile {current // 2}\nshmem 0\npgmajfault 3\n",
+            "io.stat": f"8:0 rbytes={rbytes} wbytes=0 rios=10 wios=0 dbytes=0 dios=0\n"
+                       f"8:16 rbytes={rbytes} wbytes=4096 rios=10 wios=1 dbytes=0 dios=0\n",
+            "cpu.pressure": "some avg10=12.50 avg60=3.00 avg300=1.00 total=100\n",
+            "memory.pressure": "some avg10=0.00 avg60=0.00 avg300=0.00 total=0\n"
+                               "full avg10=0.00 avg60=0.00 avg300=0.00 total=0\n",
+        }
+        for name, content in files.items():
+            # Escritura en el mismo inodo, como el kernel: los descriptores abiertos ven el cambio
+            with open(os.path.join(path, name), "w") as f:
+                f.write(content)
+
+    for inotify in (True, False):
+        with tempfile.TemporaryDirectory() as root:
+            open(os.path.join(root, "cgroup.controllers"), "w").write("cpu io memory\n")
+            slice_dir = os.path.join(root, "system.slice")
+            scope = os.path.join(slice_dir, f"docker-{container_id}.scope")
+            write_cgroup(slice_dir, 1_000_000, 0, 4 << 20)
+            write_cgroup(scope, 1_000_000, 1 << 20, 2 << 20, limit=str(8 << 20))
+
+            collector = CgroupCollector(root, use_inotify=inotify, rescan_interval=0, min_interval=0)
+            assert collector.inotify is not None or not inotify
+            first = collector.sample(0.0)
+            assert {r["path"] for r in first} == {"/system.slice", f"/system.slice/docker-{container_id}.scope"}
+            assert all(r["cpu_percent"] is None for r in first)
+
+            # 1 s después: 0,5 s de CPU (50% de un núcleo), 2 MB leídos en dos discos
+            write_cgroup(scope, 1_500_000, 2 << 20, 3 << 20, throttled_usec=20_000, limit=str(8 << 20))
+            row = next(r for r in collector.sample(1.0) if r["name"].startswith("docker"))
+            assert row["name"] == f"docker {container_id[:12]}"
+            assert row["cpu_percent"] == 50.0 and row["io_read"] == 2 << 20 and row["throttled_ms"] == 20.0
+            assert row["memory_current"] == 3 << 20 and row["memory_percent"] == 37.5
+            assert row["pressure"] == {"cpu_some": 12.5, "memory_some": 0.0, "memory_full": 0.0}
+
+            # Alta: el nuevo cgroup aparece sin tasa; baja: desaparece y libera su hueco
+            scans = collector.scans
+            write_cgroup(os.path.join(root, "user.slice"), 10, 0, 1 << 20)
+            rows = collector.sample(2.0)
+            assert collector.scans == scans + 1 and any(r["path"] == "/user.slice" for r in rows)
+            assert collector.sample(3.0) and collector.scans == scans + (1 if inotify else 2)
+            shutil.rmtree(scope)
+            rows = collector.sample(4.0)
+            assert all(not r["name"].startswith("docker") for r in rows)
+            print(f"Fixture OK ({'inotify' if inotify else 'recorrido periódico'}): "
+                  f"{collector.scans} recorridos, {len(rows)} cgroups")
+            collector.close()
+
+    # Sistema real
+    collector = CgroupCollector(min_interval=0)
+    if not collector.available():
+        print("Sin cgroup v2 en este sistema")
+    else:
+        collector.sample()
+        time.sleep(0.5)
+        start = time.perf_counter()
+        rows = collector.sample()
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{collector.root}: {len(rows)} cgroups en {elapsed:.2f} ms "
+              f"(inotify: {'sí' if collector.inotify else 'no'})")
+        for row in sort_cgroups(rows, "cpu", 5):
+            print(f"  {row['name']:<40} CPU {row['cpu_percent'] or 0:6.1f}%  "
+                  f"mem {(row['memory_current'] or 0) / 2**20:8.1f} MB")
@@ -0,0 +1,317 @@
+"""
+Tasas por dispositivo de OmniMonitor (interfaces de red y discos)
+Los contadores del kernel son acumulativos: la tasa es la diferencia entre
+dos lecturas dividida por el tiempo transcurrido. `CounterTable` guarda la
+lectura anterior de cada dispositivo en un array contiguo preasignado (un
+hueco por dispositivo) y resuelve los dos casos raros:
+
+- Desbordamiento: un contador de 32 bits que pasa de 2^32 - 1 a 0 da una
+  diferencia negativa; si la lectura anterior estaba en la mitad alta del
+  rango se suma 2^32. Cualquier otra caída es un reinicio del contador
+  (dispositivo recreado) y esa ronda cuenta como 0.
+- Conexión en caliente: un dispositivo nuevo ocupa un hueco libre y no tiene
+  tasa hasta la segunda lectura; uno que desaparece libera su hueco.
+
+En Linux los discos se leen de /proc/diskstats (IOPS, latencia media, cola
+media, % de ocupación y peticiones en curso); en otros sistemas se usa
+psutil.disk_io_counters(perdisk=True) con los campos que ofrezca.
+"""
+import os
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import psutil
+
+WRAP_32 = 2 ** 32
+SECTOR_SIZE = 512  # /proc/diskstats cuenta sectores de 512 bytes siempre
+MB = 1024 * 1024
+
+# Dispositivos de bloque virtuales sin interés para el usuario
+SKIP_DISK_PREFIXES = ("loop", "ram", "fd")
+
+# Campos de /proc/diskstats usados (tras major, minor y nombre)
+DISKSTATS_FIELDS = (
+    "reads", "reads_merged", "sectors_read", "ms_reading",
+    "writes", "writes_merged", "sectors_written", "ms_writing",
+    "in_flight", "ms_io", "ms_weighted",
+)
+# Índices de los campos acumulativos (in_flight es instantáneo)
+_DISK_COUNTERS = tuple(i for i, name in enumerate(DISKSTATS_FIELDS) if name != "in_flight")
+_IN_FLIGHT = DISKSTATS_FIELDS.index("in_flight")
+
+NIC_FIELDS = ("bytes_sent", "bytes_recv", "packets_sent", "packets_recv",
+              "errin", "errout", "dropin", "dropout")
+
+
+class CounterTable:
+    """
+    Contadores acumulativos de N dispositivos en arrays contiguos
+    `update` recibe {nombre: contadores} y devuelve {nombre: hueco} de los
+    dispositivos con tasa; las tasas (unidades/s) quedan en `rates` a partir
+    de `hueco * width`.
+    """
+
+    def __init__(self, width: int, capacity: int = 16):
+        self.width = width
+        self.capacity = capacity
+        self.last = array('d', bytes(8 * width * capacity))
+        self.rates = array('d', bytes(8 * width * capacity))
+        self.slots: Dict[str, int] = {}
+        self._free: List[int] = list(range(capacity - 1, -1, -1))
+        self.last_time: Optional[float] = None
+        self.wraps = 0
+        self.resets = 0
+
+    def _grow(self):
+        """Duplicar la capacidad (solo con más dispositivos de los previstos)"""
+        extra = self.capacity
+        self.last.extend(array('d', bytes(8 * self.width * extra)))
+        self.rates.extend(array('d', bytes(8 * self.width * extra)))
+        self._free.extend(range(self.capacity + extra - 1, self.capacity - 1, -1))
+        self.capacity += extra
+
+    def update(self, counters: Dict[str, Sequence[float]], now: float) -> Dict[str, int]:
+        dt = now - self.last_time if self.last_time is not None else 0.0
+        self.last_time = now
+        width, last, rates = self.width, self.last, self.rates
+
+        # Dispositivos retirados: liberar el hueco
+        for name in [n for n in self.slots if n not in counters]:
+            self._free.append(self.slots.pop(name))
+
+        ready: Dict[str, int] = {}
+        for name, values in counters.items():
+            slot = self.slots.get(name)
+            if slot is None:
+                # Dispositivo nuevo: la primera lectura solo sirve de referencia
+                if not self._free:
+                    self._grow()
+                    last, rates = self.last, self.rates
+                slot = self._free.pop()
+                self.slots[name] = slot
+                last[slot * width:(slot + 1) * width] = array('d', values[:width])
+                continue
+            base = slot * width
+            for i in range(width):
+                value = values[i]
+                delta = value - last[base + i]
+                if delta < 0:
+                    if last[base + i] >= WRAP_32 // 2 and value < WRAP_32:
+                        delta += WRAP_32  # Contador de 32 bits desbordado
+                        self.wraps += 1
+                    else:
+                        delta = 0.0  # Contador reiniciado
+                        self.resets += 1
+                last[base + i] = value
+                rates[base + i] = delta / dt if dt > 0 else 0.0
+            if dt > 0:
+                ready[name] = slot
+        return ready
+
+    def rate(self, slot: int, field: int) -> float:
+        return self.rates[slot * self.width + field]
+
+
+def read_diskstats(path: str = "/proc/diskstats") -> Dict[str, Tuple[float, ...]]:
+    """{dispositivo: (campos de DISKSTATS_FIELDS)} de todas las líneas"""
+    stats = {}
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < 14:
+                continue
+            stats[parts[2]] = tuple(float(v) for v in parts[3:14])
+    return stats
+
+
+class DiskIOTracker:
+    """
+    E/S por disco físico
+    Solo cuenta los discos completos (los que aparecen en /sys/block), no las
+    particiones, para no sumar dos veces el mismo tráfico.
+    """
+
+    def __init__(self, diskstats_path: str = "/proc/diskstats", sys_block: str = "/sys/block",
+                 min_interval: float = 0.5):
+        self.diskstats_path = diskstats_path
+        self.sys_block = sys_block
+        self.min_interval = min_interval
+        self.use_diskstats = os.path.exists(diskstats_path)
+        self.table = CounterTable(len(_DISK_COUNTERS) if self.use_diskstats else 7)
+        self._whole: Dict[str, bool] = {}
+        self._result: Dict[str, Dict] = {}
+
+    def _is_whole_disk(self, name: str) -> bool:
+        whole = self._whole.get(name)
+        if whole is None:
+            whole = not name.startswith(SKIP_DISK_PREFIXES) and (
+                not os.path.isdir(self.sys_block) or
+                os.path.exists(os.path.join(self.sys_block, name)))
+            self._whole[name] = whole
+        return whole
+
+    def sample(self, now: float = None) -> Dict[str, Dict]:
+        """{disco: {read_speed, write_speed (MB/s), read_iops, write_iops, await_ms, ...}}"""
+        now = time.monotonic() if now is None else now
+        last = self.table.last_time
+        if last is not None and now - last < self.min_interval:
+            return self._result  # Otra llamada en la misma ronda
+        if self.use_diskstats:
+            self._result = self._sample_diskstats(now)
+        else:
+            self._result = self._sample_psutil(now)
+        return self._result
+
+    def _sample_diskstats(self, now: float) -> Dict[str, Dict]:
+        stats = {name: values for name, values in read_diskstats(self.diskstats_path).items()
+                 if self._is_whole_disk(name)}
+        counters = {name: [values[i] for i in _DISK_COUNTERS] for name, values in stats.items()}
+        ready = self.table.update(counters, now)
+        rate = self.table.rate
+        result = {}
+        for name, slot in ready.items():
+            (reads, _, sectors_read, ms_reading, writes, _, sectors_written, ms_writing,
+             ms_io, ms_weighted) = (rate(slot, i) for i in range(len(_DISK_COUNTERS)))
+            ios = reads + writes
+            result[name] = {
+                "read_speed": sectors_read * SECTOR_SIZE / MB,
+                "write_speed": sectors_written * SECTOR_SIZE / MB,
+                "read_iops": reads,
+                "write_iops": writes,
+                # Tiempo medio por petición completada (incluye la espera en cola)
+                "await_ms": (ms_reading + ms_writing) / ios if ios else 0.0,
+                "read_await_ms": ms_reading / reads if reads else 0.0,
+                "write_await_ms": ms_writing / writes if writes else 0.0,
+                # Tamaño medio de la cola: ms ponderados por petición / ms transcurridos
+                "queue_depth": ms_weighted / 1000,
+                "util": min(ms_io / 10, 100.0),
+                "in_flight": int(stats[name][_IN_FLIGHT]),
+            }
+        return result
+
+    def _sample_psutil(self, now: float) -> Dict[str, Dict]:
+        try:
+            perdisk = psutil.disk_io_counters(perdisk=True) or {}
+        except Exception:
+            return {}
+        counters = {
+            name: (io.read_count, io.write_count, io.read_bytes, io.write_bytes,
+                   getattr(io, "read_time", 0), getattr(io, "write_time", 0),
+                   getattr(io, "busy_time", 0))
+            for name, io in perdisk.items() if not name.startswith(SKIP_DISK_PREFIXES)
+        }
+        ready = self.table.update(counters, now)
+        rate = self.table.rate
+        result = {}
+        for name, slot in ready.items():
+            reads, writes, read_bytes, write_bytes, ms_reading, ms_writing, ms_busy = (
+                rate(slot, i) for i in range(7))
+            ios = reads + writes
+            result[name] = {
+                "read_speed": read_bytes / MB,
+                "write_speed": write_bytes / MB,
+                "read_iops": reads,
+                "write_iops": writes,
+                "await_ms": (ms_reading + ms_writing) / ios if ios else 0.0,
+                "read_await_ms": ms_reading / reads if reads else 0.0,
+                "write_await_ms": ms_writing / writes if writes else 0.0,
+                "queue_depth": None,
+                "util": min(ms_busy / 10, 100.0),
+                "in_flight": None,
+            }
+        return result
+
+
+class NicTracker:
+    """Tráfico, paquetes, errores y descartes por interfaz de red"""
+
+    def __init__(self, min_interval: float = 0.5):
+        self.min_interval = min_interval
+        self.table = CounterTable(len(NIC_FIELDS))
+        self._result: Dict[str, Dict] = {}
+
+    @property
+    def names(self) -> Iterable[str]:
+        """Interfaces vistas en la última lectura (detecta altas y bajas)"""
+        return self.table.slots.keys()
+
+    def sample(self, now: float = None) -> Dict[str, Dict]:
+        """{interfaz: {upload, download (bytes/s), packets_sent, packets_recv, errors, drops (/s)}}"""
+        now = time.monotonic() if now is None else now
+        last = self.table.last_time
+        if last is not None and now - last < self.min_interval:
+            return self._result
+        try:
+            pernic = psutil.net_io_counters(pernic=True) or {}
+        except Exception:
+            return {}
+        ready = self.table.update(pernic, now)  # snetio es una tupla en el orden de NIC_FIELDS
+        rate = self.table.rate
+        self._result = {
+            name: {
+                "upload": rate(slot, 0),
+                "download": rate(slot, 1),
+                "packets_sent": rate(slot, 2),
+                "packets_recv": rate(slot, 3),
+                "errors": rate(slot, 4) + rate(slot, 5),
+                "drops": rate(slot, 6) + rate(slot, 7),
+            }
+            for name, slot in ready.items()
+        }
+        return self._result
+
+
+if __name__ == "__main__":
+    # Test: desbordamiento, reinicio y conexión en caliente con contadores sintéticos
+    import tempfile
+
+    table = CounterTable(2, capacity=2)
+    assert table.update({"a": (100, 5)}, 0.0) == {}
+    slot = table.update({"a": (300, 5)}, 2.0)["a"]
+    assert table.rate(slot, 0) == 100.0
+    # 32 bits: 2^32 - 100 -> 100 son 200 unidades, no una caída
+    table.update({"a": (WRAP_32 - 100, 5)}, 3.0)
+    table.update({"a": (100, 5)}, 4.0)
+    assert table.rate(slot, 0) == 200.0 and table.wraps == 1
+    # Reinicio (valor bajo que cae): tasa 0 en esa ronda
+    table.update({"a": (50, 5)}, 5.0)
+    assert table.rate(slot, 0) == 0.0 and table.resets == 1
+    # Conexión en caliente: b y c entran (crece el array), a sale y libera su hueco
+    ready = table.update({"b": (1, 1), "c": (1, 1)}, 6.0)
+    assert ready == {} and table.capacity == 2 and "a" not in table.slots
+    ready = table.update({"b": (11, 1), "c": (21, 1), "d": (0, 0)}, 7.0)
+    assert set(ready) == {"b", "c"} and table.capacity == 4
+    print(f"CounterTable OK (capacidad {table.capacity}, {table.wraps} desbordes, {table.resets} reinicios)")
+
+    # /proc/diskstats de ejemplo: sda (disco) y sda1 (partición, se ignora)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, "block", "sda"))
+        path = os.path.join(tmp, "diskstats")
+
+        def write(reads, sectors, ms_reading, in_flight, ms_io, ms_weighted):
+            with open(path, "w") as f:
+                for name in ("sda", "sda1"):
+                    f.write(f"   8  0 {name} {reads} 0 {sectors} {ms_reading} 0 0 0 0 "
+                            f"{in_flight} {ms_io} {ms_weighted} 0 0 0 0\n")
+
+        write(1000, 8000, 500, 0, 100, 600)
+        tracker = DiskIOTracker(path, os.path.join(tmp, "block"), min_interval=0)
+        assert tracker.sample(0.0) == {}
+        write(1200, 10048, 900, 3, 600, 2600)  # 1 s: 200 lecturas de 5 KB, 2 ms cada una
+        disk = tracker.sample(1.0)
+        assert set(disk) == {"sda"}
+        sda = disk["sda"]
+        assert sda["read_iops"] == 200 and sda["await_ms"] == 2.0 and sda["in_flight"] == 3
+        assert sda["util"] == 50.0 and sda["queue_depth"] == 2.0
+        print(f"diskstats OK: {sda['read_iops']:.0f} IOPS, {sda['read_speed']:.2f} MB/s, "
+              f"await {sda['await_ms']:.1f} ms, cola {sda['queue_depth']:.1f}, {sda['util']:.0f}% ocupado")
+
+    # Sistema real
+    nics, disks = NicTracker(min_interval=0), DiskIOTracker(min_interval=0)
+    nics.sample(), disks.sample()
+    time.sleep(0.5)
+    start = time.perf_counter()
+    nic_rates, disk_rates = nics.sample(), disks.sample()
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"Interfaces: {sorted(nic_rates)} | discos: {sorted(disk_rates)} | {elapsed:.2f} ms por lectura")
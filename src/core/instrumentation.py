@@ -0,0 +1,320 @@
+"""
+Autodiagnóstico de OmniMonitor
+Mide cuánto cuesta el propio monitor: latencia por etapa del ciclo de
+actualización (getters del colector, sonda de GPU, escritura en base de
+datos, evaluación de alertas, reconstrucción de detalles y page.update),
+CPU y memoria del proceso, y el desfase de cada tick respecto a
+`update_interval`.
+
+Desactivado (por defecto) el coste es prácticamente nulo: `stage()`
+devuelve un contexto vacío compartido y los getters del monitor no se
+envuelven. Se activa con la clave de configuración `enable_diagnostics`
+o con la variable de entorno OMNIMONITOR_DIAGNOSTICS=1.
+
+    instr = get_instrumentation()
+    with instr.stage("alerts.evaluate"):
+        engine.evaluate(metrics)
+    instr.snapshot()   # -> lo que sirve /api/diagnostics
+"""
+import bisect
+import contextlib
+import functools
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+import psutil
+
+# Límites superiores de los cubos en µs (escala 1-2-5 hasta 10 s)
+BUCKETS_US = tuple(m * 10 ** e for e in range(0, 7) for m in (1, 2, 5)) + (10_000_000,)
+
+# Ventana de desfase a partir de la cual un tick cuenta como "tarde"
+LATE_TICK_US = 100_000
+
+# Getters del monitor que se miden como etapas "collect.<getter>"
+COLLECTOR_GETTERS = (
+    "refresh", "get_cpu_usage", "get_cpu_per_core", "get_cpu_freq", "get_cpu_temp",
+    "get_memory_usage", "get_swap_memory", "get_disk_usage", "get_disk_info", "get_disk_io",
+    "get_network_speed", "get_network_info", "get_gpu_info", "get_system_info",
+    "get_network_speed_per_interface", "get_disk_io_per_device",
+    "get_top_processes", "get_battery_info",
+)
+# La sonda de GPU (nvidia-smi/WMI/sysfs) se reporta aparte
+COLLECTOR_STAGE_NAMES = {"get_gpu_info": "gpu.probe"}
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+class Histogram:
+    """Histograma de latencias con cubos fijos (memoria constante)"""
+
+    __slots__ = ("counts", "count", "total", "max", "last")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_US) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def record(self, us: float):
+        self.counts[bisect.bisect_left(BUCKETS_US, us)] += 1
+        self.count += 1
+        self.total += us
+        self.last = us
+        if us > self.max:
+            self.max = us
+
+    def percentile(self, q: float) -> float:
+        """Límite superior del cubo que contiene el percentil `q` (0-1)"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target and n:
+                return float(BUCKETS_US[i]) if i < len(BUCKETS_US) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "mean_us": round(self.total / self.count, 1) if self.count else 0.0,
+            "p50_us": self.percentile(0.5),
+            "p95_us": self.percentile(0.95),
+            "p99_us": self.percentile(0.99),
+            "max_us": round(self.max, 1),
+            "last_us": round(self.last, 1),
+        }
+
+
+class _Stage:
+    """Cronómetro de una etapa (solo se crea con la instrumentación activa)"""
+
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.record((time.perf_counter_ns() - self.start) / 1000)
+        return False
+
+
+class Instrumentation:
+    """Registro de latencias por etapa, desfase de ticks y consumo propio"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Histogram] = {}
+        self._jitter = Histogram()
+        self._ticks = 0
+        self._late_ticks = 0
+        self._last_tick: Optional[float] = None
+        self._interval = 0.0
+        self._targets: List[tuple] = []   # (objeto, {método: etapa}) para envolver getters
+        self._process: Optional[psutil.Process] = None
+        self._providers: Dict[str, Callable[[], Dict]] = {}
+
+    # ---------- Etapas ----------
+
+    def histogram(self, name: str) -> Histogram:
+        histogram = self._stages.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._stages.setdefault(name, Histogram())
+        return histogram
+
+    def stage(self, name: str):
+        """Contexto que mide la etapa `name` (vacío si está desactivado)"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self.histogram(name))
+
+    def record(self, name: str, seconds: float):
+        """Registrar una duración medida por fuera"""
+        if self.enabled:
+            self.histogram(name).record(seconds * 1_000_000)
+
+    def instrument(self, obj, methods: Iterable[str], prefix: str = "collect.",
+                   names: Dict[str, str] = None):
+        """
+        Medir los métodos `methods` de `obj` (p. ej. los getters del monitor)
+        Los envoltorios solo existen mientras la instrumentación está activa;
+        desactivada, las llamadas van directas al método original.
+        """
+        names = names or {}
+        mapping = {m: names.get(m, prefix + m) for m in methods if callable(getattr(obj, m, None))}
+        self._targets.append((obj, mapping))
+        if self.enabled:
+            self._wrap(obj, mapping)
+
+    def instrument_monitor(self, monitor):
+        """Medir los getters de un SystemMonitor (o WebMonitor/FleetMonitor)"""
+        self.instrument(monitor, COLLECTOR_GETTERS, names=COLLECTOR_STAGE_NAMES)
+
+    def _wrap(self, obj, mapping: Dict[str, str]):
+        for method, stage in mapping.items():
+            original = getattr(type(obj), method, None)
+            if original is None:
+                continue
+            histogram = self.histogram(stage)
+
+            @functools.wraps(original)
+            def timed(*args, _original=original.__get__(obj), _histogram=histogram, **kwargs):
+                start = time.perf_counter_ns()
+                try:
+                    return _original(*args, **kwargs)
+                finally:
+                    _histogram.record((time.perf_counter_ns() - start) / 1000)
+            setattr(obj, method, timed)
+
+    @staticmethod
+    def _unwrap(obj, mapping: Dict[str, str]):
+        for method in mapping:
+            obj.__dict__.pop(method, None)
+
+    def set_enabled(self, enabled: bool):
+        """Activar/desactivar en caliente (envuelve o restaura los getters)"""
+        enabled = bool(enabled)
+        if enabled == self.enabled:
+            return
+        self.enabled = enabled
+        for obj, mapping in self._targets:
+            if enabled:
+                self._wrap(obj, mapping)
+            else:
+                self._unwrap(obj, mapping)
+        self._last_tick = None
+
+    def add_provider(self, name: str, provider: Callable[[], Dict]):
+        """Sección extra del snapshot (p. ej. el estado del planificador)"""
+        self._providers[name] = provider
+
+    # ---------- Ticks ----------
+
+    def tick(self, interval: float):
+        """
+        Marcar el inicio de un ciclo de actualización
+        El desfase es |periodo real - interval|: trabajo del ciclo más el
+        retraso del event loop en despertar.
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self._last_tick is not None:
+            jitter_us = abs(now - self._last_tick - interval) * 1_000_000
+            self._jitter.record(jitter_us)
+            if jitter_us > LATE_TICK_US:
+                self._late_ticks += 1
+        self._last_tick = now
+        self._interval = interval
+        self._ticks += 1
+
+    # ---------- Lectura ----------
+
+    def process_stats(self) -> Dict:
+        """CPU (% de un núcleo desde la lectura anterior), RSS e hilos del proceso"""
+        try:
+            if self._process is None:
+                self._process = psutil.Process(os.getpid())
+                self._process.cpu_percent(None)  # Primera lectura: referencia
+            with self._process.oneshot():
+                times = self._process.cpu_times()
+                return {
+                    "cpu_percent": self._process.cpu_percent(None),
+                    "cpu_seconds": round(times.user + times.system, 2),
+                    "rss_mb": round(self._process.memory_info().rss / (1024 * 1024), 1),
+                    "threads": self._process.num_threads(),
+                }
+        except (psutil.Error, OSError):
+            return {}
+
+    def snapshot(self) -> Dict:
+        """Estado completo (diccionario serializable a JSON)"""
+        with self._lock:
+            stages = dict(self._stages)
+        return {
+            "enabled": self.enabled,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "process": self.process_stats(),
+            "ticks": {
+                "count": self._ticks,
+                "late": self._late_ticks,
+                "interval_s": self._interval,
+                "jitter": self._jitter.to_dict(),
+            },
+            "stages": {name: h.to_dict() for name, h in sorted(stages.items())},
+            **{name: provider() for name, provider in self._providers.items()},
+        }
+
+    def reset(self):
+        """Vaciar histogramas y contadores (mantiene los getters envueltos)"""
+        with self._lock:
+            for histogram in self._stages.values():
+                histogram.__init__()
+        self._jitter = Histogram()
+        self._ticks = self._late_ticks = 0
+        self._last_tick = None
+
+
+_instance: Optional[Instrumentation] = None
+
+
+def get_instrumentation() -> Instrumentation:
+    """Obtener la instrumentación del proceso (singleton)"""
+    global _instance
+    if _instance is None:
+        _instance = Instrumentation(enabled=os.environ.get("OMNIMONITOR_DIAGNOSTICS") == "1")
+    return _instance
+
+
+if __name__ == "__main__":
+    # Test: coste desactivado/activado y getters envueltos solo si está activo
+    class Probe:
+        def get_value(self):
+            return sum(range(200))
+
+    instr = Instrumentation()
+    probe = Probe()
+    instr.instrument(probe, ["get_value"])
+    assert "get_value" not in probe.__dict__
+
+    def loop(n=100_000):
+        start = time.perf_counter()
+        for _ in range(n):
+            with instr.stage("loop"):
+                pass
+        return (time.perf_counter() - start) / n * 1e9
+
+    off_ns = loop()
+    instr.set_enabled(True)
+    on_ns = loop()
+    print(f"stage(): desactivado {off_ns:.0f} ns, activado {on_ns:.0f} ns")
+    assert "get_value" in probe.__dict__
+
+    for _ in range(50):
+        probe.get_value()
+    for i in range(5):
+        instr.tick(0.01)
+        time.sleep(0.01)
+    data = instr.snapshot()
+    assert data["stages"]["collect.get_value"]["count"] == 50
+    assert data["stages"]["loop"]["count"] == 100_000
+    assert data["ticks"]["count"] == 5 and data["process"]["rss_mb"] > 0
+    print(f"getter p50 {data['stages']['collect.get_value']['p50_us']} µs, "
+          f"desfase p95 {data['ticks']['jitter']['p95_us']} µs, "
+          f"RSS {data['process']['rss_mb']} MB")
+
+    instr.set_enabled(False)
+    assert "get_value" not in probe.__dict__ and probe.get_value() == sum(range(200))
+    assert instr.snapshot()["stages"]["collect.get_value"]["count"] == 50
+    print("Instrumentación OK")
@@ -3,6 +3,10 @@ import time
 import platform
 from datetime import datetime, timedelta
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.core.devices import DiskIOTracker, NicTracker
 
 
 class SystemMonitor:
@@ -13,6 +17,12 @@ class SystemMonitor:
         self.net_time_last = time.time()
         self.disk_io_last = psutil.disk_io_counters() if hasattr(psutil, 'disk_io_counters') else None
         self.disk_time_last = time.time()
+        # Tasas por interfaz y por disco (contadores en arrays preasignados)
+        self.nic_rates = NicTracker()
+        self.disk_devices = DiskIOTracker()
+        self._net_info = None
+        self._net_info_at = 0.0
+        self._net_info_names = frozenset()
         # Inicializar CPU percent para que no devuelva 0 la primera vez
         psutil.cpu_percent(interval=None)
     
@@ -168,8 +178,40 @@ class SystemMonitor:
         except Exception:
             return {"upload": 0, "download": 0}
 
+    def get_network_speed_per_interface(self) -> dict:
+        """Retorna tasas por interfaz {nombre: {upload, download, packets_*, errors, drops}} (por seg)."""
+        try:
+            return self.nic_rates.sample()
+        except Exception:
+            return {}
+
+    def get_disk_io_per_device(self) -> dict:
+        """Retorna E/S por disco {nombre: {read_speed, write_speed (MB/s), IOPS, await_ms, queue_depth, util}}."""
+        try:
+            return self.disk_devices.sample()
+        except Exception:
+            return {}
+
+    def get_containers(self) -> list:
+        """Retorna uso por cgroup v2 (contenedores, servicios); vacío sin cgroup v2."""
+        from src.core.cgroups import get_cgroup_collector
+        try:
+            return get_cgroup_collector().sample()
+        except Exception:
+            return []
+
     def get_network_info(self) -> dict:
-        """Retorna información de interfaces de red."""
+        """Retorna información de interfaces de red (se relee al cambiar las interfaces o cada 60 s)."""
+        names = frozenset(self.nic_rates.names)
+        if (self._net_info is not None and names == self._net_info_names
+                and time.monotonic() - self._net_info_at < 60):
+            return self._net_info
+        self._net_info = self._read_network_info()
+        self._net_info_at = time.monotonic()
+        self._net_info_names = names
+        return self._net_info
+
+    def _read_network_info(self) -> dict:
         try:
             addrs = psutil.net_if_addrs()
             stats = psutil.net_if_stats()
@@ -209,6 +251,22 @@ class SystemMonitor:
             pass
         return None
 
+    def get_all_temperatures(self) -> list:
+        """Retorna todas las lecturas de sensores de temperatura."""
+        readings = []
+        try:
+            temps = psutil.sensors_temperatures()
+            for sensor, entries in (temps or {}).items():
+                for i, entry in enumerate(entries):
+                    readings.append({
+                        "sensor": sensor,
+                        "label": entry.label or f"{sensor}{i}",
+                        "current": entry.current
+                    })
+        except Exception:
+            pass
+        return readings
+
     def get_gpu_info(self) -> dict:
         """Retorna información de GPU si está disponible."""
         import subprocess
@@ -0,0 +1,224 @@
+"""
+Planificador de muestreo de OmniMonitor
+Cada fuente de métricas declara su coste y su cadencia (en múltiplos del
+intervalo base). En cada ronda se recogen juntas todas las fuentes que
+vencen, y las sondas caras (GPU, temperaturas, particiones, procesos) se
+espacian cuando el sistema está cargado o cuando su valor no cambia.
+
+    scheduler = SamplingScheduler([
+        MetricSource("cpu", monitor.get_cpu_usage),
+        MetricSource("gpu", monitor.get_gpu_info, every=2, expensive=True),
+    ], interval=1.0, load_source="cpu")
+    updated = scheduler.collect()      # {"cpu", "gpu"} o solo {"cpu"}
+    scheduler.values["gpu"]           # último valor (aunque no tocara)
+    await asyncio.sleep(scheduler.next_delay())
+
+El intervalo base se cambia en caliente con `set_interval()`.
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+MIN_INTERVAL = 0.1
+
+# Carga del sistema (%) a partir de la cual se espacian las sondas caras
+BUSY_THRESHOLD = 85.0
+
+# Fracción del intervalo base que puede ocupar una ronda antes de espaciar
+# las sondas caras (el propio monitor se está comiendo el presupuesto)
+ROUND_BUDGET = 0.5
+
+
+@dataclass
+class MetricSource:
+    """
+    Fuente de métricas planificable
+    - every: cadencia en múltiplos del intervalo base
+    - expensive: puede espaciarse (hasta `max_backoff` veces) con carga
+      alta o valores estables
+    - signature: valor -> algo comparable para decidir si "cambió"
+      (por defecto el propio valor)
+    """
+    name: str
+    collect: Callable[[], Any]
+    every: int = 1
+    expensive: bool = False
+    max_backoff: int = 8
+    stable_rounds: int = 3
+    signature: Optional[Callable[[Any], Any]] = None
+
+    # Estado (lo gestiona el planificador)
+    backoff: int = field(default=1, init=False)
+    next_due: float = field(default=0.0, init=False)
+    last_duration: float = field(default=0.0, init=False)
+    samples: int = field(default=0, init=False)
+    errors: int = field(default=0, init=False)
+    _stable: int = field(default=0, init=False, repr=False)
+    _signature: Any = field(default=None, init=False, repr=False)
+
+    def period(self, interval: float) -> float:
+        """Periodo efectivo en segundos (cadencia × espaciado actual)"""
+        return interval * self.every * self.backoff
+
+    def observe(self, value: Any) -> bool:
+        """Registrar un valor; True si se considera estable"""
+        signature = self.signature(value) if self.signature else value
+        stable = self.samples > 0 and signature == self._signature
+        self._signature = signature
+        self._stable = self._stable + 1 if stable else 0
+        return self._stable >= self.stable_rounds
+
+
+class SamplingScheduler:
+    """Rondas de recolección con cadencia por fuente y espaciado adaptativo"""
+
+    def __init__(self, sources: Iterable[MetricSource], interval: float = 1.0,
+                 load_source: str = None, busy_threshold: float = BUSY_THRESHOLD,
+                 clock: Callable[[], float] = time.monotonic):
+        self.sources: List[MetricSource] = list(sources)
+        self.interval = max(float(interval), MIN_INTERVAL)
+        self.load_source = load_source
+        self.busy_threshold = busy_threshold
+        self.clock = clock
+        self.values: Dict[str, Any] = {}
+        self.rounds = 0
+        self.last_round_duration = 0.0
+        self._next_round: Optional[float] = None
+
+    def set_interval(self, interval: float):
+        """Cambiar el intervalo base; las próximas citas se reescalan"""
+        interval = max(float(interval), MIN_INTERVAL)
+        if interval == self.interval:
+            return
+        now = self.clock()
+        ratio = interval / self.interval
+        for source in self.sources:
+            source.next_due = now + max(source.next_due - now, 0.0) * ratio
+        if self._next_round is not None:
+            self._next_round = now + max(self._next_round - now, 0.0) * ratio
+        self.interval = interval
+
+    def due(self, now: float = None) -> List[MetricSource]:
+        """Fuentes que vencen en esta ronda (con holgura de medio intervalo)"""
+        now = self.clock() if now is None else now
+        slack = self.interval * 0.5
+        return [s for s in self.sources if s.next_due <= now + slack]
+
+    def busy(self) -> bool:
+        """Sistema cargado o rondas que consumen demasiado del intervalo"""
+        load = self.values.get(self.load_source) if self.load_source else None
+        if isinstance(load, (int, float)) and load >= self.busy_threshold:
+            return True
+        return self.last_round_duration > self.interval * ROUND_BUDGET
+
+    def collect(self, now: float = None) -> Set[str]:
+        """Recoger todas las fuentes vencidas; devuelve los nombres actualizados"""
+        now = self.clock() if now is None else now
+        # Citas ancladas a la ronda prevista: despertar tarde no desplaza las siguientes
+        anchor = now
+        if self._next_round is not None and abs(now - self._next_round) < self.interval:
+            anchor = self._next_round
+        started = time.perf_counter()
+        updated = set()
+        stable = set()
+        due = self.due(now)
+        for source in due:
+            start = time.perf_counter()
+            try:
+                value = source.collect()
+            except Exception as e:
+                source.errors += 1
+                print(f"Error recogiendo {source.name}: {e}")
+                continue
+            source.last_duration = time.perf_counter() - start
+            self.values[source.name] = value
+            if source.observe(value):
+                stable.add(source.name)
+            source.samples += 1
+            updated.add(source.name)
+        self.last_round_duration = time.perf_counter() - started
+
+        busy = self.busy()
+        for source in due:
+            if source.name in updated and source.expensive:
+                if busy or source.name in stable:
+                    source.backoff = min(source.backoff * 2, source.max_backoff)
+                else:
+                    source.backoff = 1
+            source.next_due = anchor + source.period(self.interval)
+
+        self.rounds += 1
+        self._next_round = anchor + self.interval
+        return updated
+
+    def next_delay(self, now: float = None) -> float:
+        """Segundos hasta la próxima ronda"""
+        now = self.clock() if now is None else now
+        if not self.sources:
+            return self.interval
+        return max(min(s.next_due for s in self.sources) - now, 0.0)
+
+    def stats(self) -> Dict[str, Dict]:
+        """Estado por fuente (para diagnóstico)"""
+        return {
+            s.name: {
+                "period_s": round(s.period(self.interval), 3),
+                "backoff": s.backoff,
+                "samples": s.samples,
+                "errors": s.errors,
+                "last_ms": round(s.last_duration * 1000, 3),
+            }
+            for s in self.sources
+        }
+
+
+if __name__ == "__main__":
+    # Test con reloj simulado: cadencias, espaciado por estabilidad/carga e intervalo en caliente
+    clock = [0.0]
+    load = [10.0]
+    gpu_value = [50]
+    calls = {"cpu": 0, "gpu": 0, "disk": 0}
+
+    def counted(name, fn):
+        def collect():
+            calls[name] += 1
+            return fn()
+        return collect
+
+    scheduler = SamplingScheduler([
+        MetricSource("cpu", counted("cpu", lambda: load[0])),
+        MetricSource("gpu", counted("gpu", lambda: gpu_value[0]), expensive=True),
+        MetricSource("disk", counted("disk", lambda: 1), every=5),
+    ], interval=1.0, load_source="cpu", clock=lambda: clock[0])
+
+    def run(seconds):
+        end = clock[0] + seconds
+        while clock[0] < end:
+            scheduler.collect()
+            clock[0] += scheduler.next_delay()
+
+    # 1) GPU estable: se espacia hasta 8x
+    run(60)
+    assert calls["cpu"] == 60 and calls["disk"] == 12, calls
+    assert scheduler.sources[1].backoff == 8 and calls["gpu"] < 20, calls
+    print(f"Estable 60 s: cpu={calls['cpu']} gpu={calls['gpu']} disk={calls['disk']}")
+
+    # 2) GPU cambiando cada vez: vuelve a la cadencia normal
+    scheduler.sources[1].signature = lambda v: clock[0]
+    run(10)
+    assert scheduler.sources[1].backoff == 1
+
+    # 3) Carga alta: las sondas caras se espacian aunque cambien
+    load[0] = 95.0
+    run(20)
+    assert scheduler.sources[1].backoff == 8
+    load[0] = 10.0
+
+    # 4) Intervalo en caliente: 0.5 s -> el doble de rondas
+    before = calls["cpu"]
+    scheduler.set_interval(0.5)
+    run(10)
+    assert calls["cpu"] - before in (20, 21), calls["cpu"] - before
+    print(f"Intervalo 0.5 s: {calls['cpu'] - before} rondas en 10 s")
+    print(scheduler.stats())
+    print("Planificador OK")
@@ -0,0 +1,172 @@
+"""
+Series etiquetadas de OmniMonitor
+Además de las métricas agregadas (cpu_usage, disk_usage...), un snapshot
+puede expandirse en series con etiqueta: una por núcleo, partición,
+interfaz de red o nombre de proceso. Cada serie se identifica con un
+selector concreto:
+
+    cpu_usage{core=3}
+    disk_usage{mountpoint=/var}
+    net_download{interface=eth0}
+    process_rss_gb{name=postgres}
+
+Las alertas usan selectores con comodines (`disk_usage{mountpoint=*}`) que
+se resuelven contra estas series.
+"""
+import fnmatch
+import os
+import re
+import sys
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+import psutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# Métrica con etiqueta -> nombre de la etiqueta
+SERIES_LABELS = {
+    "cpu_usage": "core",
+    "disk_usage": "mountpoint",
+    "net_download": "interface",
+    "net_upload": "interface",
+    "process_cpu": "name",
+    "process_rss_gb": "name",
+}
+
+# Métricas que solo existen como series (no tienen valor agregado)
+LABELED_ONLY = {"process_cpu", "process_rss_gb"}
+
+_SELECTOR_RE = re.compile(r'^\s*(\w+)\s*\{(.*)\}\s*$')
+# Caracteres reservados del selector que pueden aparecer en nombres de proceso
+_RESERVED = str.maketrans("{},=", "____")
+
+
+def parse_selector(text: str) -> Optional[Tuple[str, Dict[str, str]]]:
+    """
+    'disk_usage{mountpoint=/var*}' -> ('disk_usage', {'mountpoint': '/var*'})
+    Devuelve None si el texto es una métrica agregada sin llaves.
+    """
+    match = _SELECTOR_RE.match(text or "")
+    if not match:
+        return None
+    labels = {}
+    for part in match.group(2).split(","):
+        if not part.strip():
+            continue
+        name, sep, value = part.partition("=")
+        if not sep:
+            raise ValueError(f"Etiqueta sin valor en el selector: {part.strip()!r}")
+        labels[name.strip()] = value.strip().strip('"\'')
+    return match.group(1), labels
+
+
+def series_key(metric: str, label: str, value) -> str:
+    """Selector concreto de una serie"""
+    return f"{metric}{{{label}={str(value).translate(_RESERVED)}}}"
+
+
+def matches(labels: Dict[str, str], patterns: Dict[str, str]) -> bool:
+    """True si cada patrón (con comodines * ? [..]) coincide con su etiqueta"""
+    for name, pattern in patterns.items():
+        value = labels.get(name)
+        if value is None or not fnmatch.fnmatchcase(value, pattern):
+            return False
+    return True
+
+
+class SeriesCollector:
+    """
+    Genera las series etiquetadas de un snapshot
+    Solo recolecta las métricas pedidas (las que usan las reglas con
+    selector), así que sin esas reglas no tiene coste. La lista de procesos
+    es la lectura más cara: se refresca cada `process_interval` segundos.
+    Funciona con SystemMonitor y con WebMonitor (en modo web no hay datos
+    por interfaz ni por proceso).
+    """
+
+    def __init__(self, monitor, process_interval: float = 5.0):
+        self.monitor = monitor
+        self.process_interval = process_interval
+        self._processes: Dict[str, Dict[str, float]] = {}
+        self._processes_read_at = float('-inf')
+
+    def collect(self, metrics: Iterable[str], disk_info: list = None) -> Dict[str, float]:
+        """Series de las métricas pedidas; `disk_info` evita releer las particiones"""
+        metrics = set(metrics)
+        series: Dict[str, float] = {}
+        if not metrics:
+            return series
+
+        if "cpu_usage" in metrics:
+            for core, usage in enumerate(self.monitor.get_cpu_per_core() or []):
+                series[series_key("cpu_usage", "core", core)] = usage
+
+        if "disk_usage" in metrics:
+            if disk_info is None:
+                disk_info = self.monitor.get_disk_info()
+            for partition in disk_info if isinstance(disk_info, list) else []:
+                usage = partition.get("usage") or {}
+                if partition.get("mountpoint") and usage.get("percent") is not None:
+                    series[series_key("disk_usage", "mountpoint", partition["mountpoint"])] = usage["percent"]
+
+        if metrics & {"net_download", "net_upload"}:
+            per_interface = getattr(self.monitor, "get_network_speed_per_interface", None)
+            for iface, speed in (per_interface() if per_interface else {}).items():
+                for metric in ("net_download", "net_upload"):
+                    if metric in metrics:
+                        series[series_key(metric, "interface", iface)] = speed[metric[4:]] / (1024 * 1024)
+
+        if metrics & LABELED_ONLY and self._is_local():
+            for name, usage in self._read_processes().items():
+                for metric in LABELED_ONLY & metrics:
+                    series[series_key(metric, "name", name)] = usage[metric]
+        return series
+
+    def _is_local(self) -> bool:
+        # Los monitores remotos (web/flota) no exponen la lista de procesos
+        return not hasattr(self.monitor, "refresh")
+
+    def _read_processes(self) -> Dict[str, Dict[str, float]]:
+        """CPU y RSS sumados por nombre de proceso (todas sus instancias)"""
+        now = time.monotonic()
+        if now - self._processes_read_at < self.process_interval:
+            return self._processes
+        totals: Dict[str, Dict[str, float]] = {}
+        for proc in psutil.process_iter(['name', 'cpu_percent', 'memory_info']):
+            info = proc.info
+            name = info.get('name')
+            if not name:
+                continue
+            usage = totals.setdefault(name, {"process_cpu": 0.0, "process_rss_gb": 0.0})
+            usage["process_cpu"] += info.get('cpu_percent') or 0.0
+            if info.get('memory_info') is not None:
+                usage["process_rss_gb"] += info['memory_info'].rss / (1024**3)
+        self._processes = totals
+        self._processes_read_at = now
+        return totals
+
+
+if __name__ == "__main__":
+    # Test: selectores y series del sistema local
+    from src.core.monitor import SystemMonitor
+
+    assert parse_selector("cpu_usage") is None
+    assert parse_selector("disk_usage{mountpoint=/var*}") == ("disk_usage", {"mountpoint": "/var*"})
+    assert parse_selector('net_download{ interface="eth0" }') == ("net_download", {"interface": "eth0"})
+    assert matches({"core": "12"}, {"core": "1*"}) and not matches({"core": "2"}, {"core": "1*"})
+    assert not matches({"core": "1"}, {"mountpoint": "*"})
+
+    collector = SeriesCollector(SystemMonitor(), process_interval=0)
+    assert collector.collect([]) == {}
+    time.sleep(0.5)
+    series = collector.collect(SERIES_LABELS)
+    for metric in SERIES_LABELS:
+        count = sum(1 for key in series if key.startswith(metric + "{"))
+        print(f"  {metric:<16} {count} series")
+    assert series_key("cpu_usage", "core", 0) in series
+
+    start = time.perf_counter()
+    collector.collect(["cpu_usage", "disk_usage", "net_download"])
+    print(f"Series sin procesos: {(time.perf_counter() - start) * 1000:.2f} ms")
+    print("Series OK")
@@ -2,14 +2,21 @@
 CRUD de Alertas para OmniMonitor
 Gestiona alertas de métricas del sistema
 """
-from typing import List, Dict, Optional, Callable
-from dataclasses import dataclass
+from typing import List, Dict, Optional, Callable, Tuple
+from dataclasses import dataclass, replace
+from collections import deque
 from enum import Enum
+from bisect import bisect_left, bisect_right
+import operator as _op
+import time
 import sys
 import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-from src.database.db import get_db
+from src.database.db import get_db, HISTORY_METRICS
+from src.crud.history import utc_timestamp
+from src.core.series import SERIES_LABELS, LABELED_ONLY, parse_selector, matches
+from src.core.anomaly import AnomalyModel, SeasonalBaseline
 
 
 class MetricType(Enum):
@@ -22,6 +29,16 @@ class MetricType(Enum):
     GPU_TEMP = "gpu_temp"
     NET_UPLOAD = "net_upload"
     NET_DOWNLOAD = "net_download"
+    PROCESS_CPU = "process_cpu"        # Solo con selector: process_cpu{name=...}
+    PROCESS_RSS_GB = "process_rss_gb"  # Solo con selector: process_rss_gb{name=...}
+
+
+class ConditionType(Enum):
+    """Tipos de condición de una alerta"""
+    THRESHOLD = "threshold"    # valor <op> umbral
+    RATE = "rate"              # variación en window_s segundos <op> umbral
+    PERCENTILE = "percentile"  # valor <op> percentil `umbral` de los últimos window_s segundos
+    ANOMALY = "anomaly"        # puntuación de anomalía (en desviaciones) <op> umbral
 
 
 class Operator(Enum):
@@ -33,6 +50,25 @@ class Operator(Enum):
     EQUAL = "=="
 
 
+# Operadores de comparación compilados una sola vez
+OPERATOR_FUNCS = {
+    ">": _op.gt,
+    "<": _op.lt,
+    ">=": _op.ge,
+    "<=": _op.le,
+    "==": _op.eq,
+}
+
+# Nombre de la condición que espera ToastManager.show_alert
+OPERATOR_CONDITIONS = {
+    ">": "greater",
+    ">=": "greater_equal",
+    "<": "less",
+    "<=": "less_equal",
+    "==": "equal",
+}
+
+
 @dataclass
 class Alert:
     """Modelo de Alerta"""
@@ -45,6 +81,27 @@ class Alert:
     notify_sound: bool
     triggered_count: int
     last_triggered: Optional[str]
+    condition_type: str = "threshold"
+    duration_s: float = 0.0            # Segundos que debe mantenerse la condición
+    window_s: float = 0.0              # Ventana de tasa de cambio / percentil
+    clear_threshold: Optional[float] = None  # Histéresis: umbral para salir de alerta
+    series: Optional[str] = None       # Serie concreta si la regla usa un selector
+    
+    @property
+    def key(self) -> Tuple[int, Optional[str]]:
+        """Identidad de la regla en el motor (una por serie con selector)"""
+        return self.id, self.series
+    
+    @property
+    def is_selector(self) -> bool:
+        """True si la métrica es un selector con etiquetas (cpu_usage{core=*})"""
+        return self.series is None and "{" in self.metric
+    
+    @property
+    def is_stateful(self) -> bool:
+        """True si la regla necesita estado entre muestras"""
+        return (self.condition_type != ConditionType.THRESHOLD.value or self.duration_s > 0
+                or self.clear_threshold is not None)
     
     @classmethod
     def from_dict(cls, data: Dict) -> 'Alert':
@@ -57,7 +114,11 @@ class Alert:
             enabled=bool(data['enabled']),
             notify_sound=bool(data['notify_sound']),
             triggered_count=data.get('triggered_count', 0),
-            last_triggered=data.get('last_triggered')
+            last_triggered=data.get('last_triggered'),
+            condition_type=data.get('condition_type') or "threshold",
+            duration_s=data.get('duration_s') or 0.0,
+            window_s=data.get('window_s') or 0.0,
+            clear_threshold=data.get('clear_threshold')
         )
 
 
@@ -72,7 +133,9 @@ class AlertManager:
         "gpu_usage": "Uso de GPU (%)",
         "gpu_temp": "Temperatura GPU (°C)",
         "net_upload": "Subida de Red (MB/s)",
-        "net_download": "Bajada de Red (MB/s)"
+        "net_download": "Bajada de Red (MB/s)",
+        "process_cpu": "CPU de proceso (%)",
+        "process_rss_gb": "Memoria de proceso (GB)"
     }
     
     OPERATORS = {
@@ -83,15 +146,26 @@ class AlertManager:
         "==": "Igual a"
     }
     
+    CONDITION_TYPES = {
+        "threshold": "Umbral",
+        "rate": "Tasa de cambio",
+        "percentile": "Percentil",
+        "anomaly": "Anomalía",
+    }
+    
     def __init__(self):
         self.db = get_db()
         self._callbacks: List[Callable] = []
+        self._count: Optional[Tuple[int, int]] = None  # (generación, total)
     
     # ============ CREATE ============
     def create(self, name: str, metric: str, operator: str, threshold: float,
-               enabled: bool = True, notify_sound: bool = True) -> Alert:
+               enabled: bool = True, notify_sound: bool = True,
+               condition_type: str = "threshold", duration_s: float = 0,
+               window_s: float = 0, clear_threshold: float = None) -> Alert:
         """Crear nueva alerta"""
-        alert_id = self.db.create_alert(name, metric, operator, threshold, enabled, notify_sound)
+        alert_id = self.db.create_alert(name, metric, operator, threshold, enabled, notify_sound,
+                                        condition_type, duration_s, window_s, clear_threshold)
         return self.get(alert_id)
     
     # ============ READ ============
@@ -105,9 +179,71 @@ class AlertManager:
         alerts = self.db.get_alerts(only_enabled)
         return [Alert.from_dict(a) for a in alerts]
     
+    @staticmethod
+    def make_metric(metric: str, label_filter: str = "") -> str:
+        """
+        Combinar métrica y filtro de etiqueta en un selector
+        ('disk_usage', 'mountpoint=/var*') -> 'disk_usage{mountpoint=/var*}'
+        Un filtro solo con el patrón usa la etiqueta de la métrica ('*' -> core=*).
+        """
+        label_filter = (label_filter or "").strip()
+        if not label_filter:
+            if metric in LABELED_ONLY:
+                raise ValueError(f"La métrica {metric} necesita un filtro, ej: {SERIES_LABELS[metric]}=postgres")
+            return metric
+        label = SERIES_LABELS.get(metric)
+        if label is None:
+            raise ValueError(f"La métrica {metric} no tiene series con etiqueta")
+        if "=" not in label_filter:
+            label_filter = f"{label}={label_filter}"
+        selector = f"{metric}{{{label_filter}}}"
+        unknown = set(parse_selector(selector)[1]) - {label}
+        if unknown:
+            raise ValueError(f"Etiqueta desconocida para {metric}: {', '.join(sorted(unknown))} (usa {label})")
+        return selector
+    
+    @staticmethod
+    def split_metric(metric: str) -> Tuple[str, str]:
+        """Inverso de make_metric: 'cpu_usage{core=*}' -> ('cpu_usage', 'core=*')"""
+        parsed = parse_selector(metric)
+        if parsed is None:
+            return metric, ""
+        return parsed[0], ", ".join(f"{k}={v}" for k, v in parsed[1].items())
+    
+    def describe(self, alert: Alert) -> str:
+        """Texto legible de la condición de una alerta"""
+        base, label_filter = self.split_metric(alert.metric)
+        label = self.METRICS_LABELS.get(base, base)
+        if label_filter:
+            label += f" {{{label_filter}}}"
+        if alert.condition_type == ConditionType.RATE.value:
+            text = f"Δ {label} en {alert.window_s or RateCondition.DEFAULT_WINDOW:g}s {alert.operator} {alert.threshold:g}"
+        elif alert.condition_type == ConditionType.PERCENTILE.value:
+            window = alert.window_s or PercentileCondition.DEFAULT_WINDOW
+            text = f"{label} {alert.operator} p{alert.threshold:g} de {window / 60:g} min"
+        elif alert.condition_type == ConditionType.ANOMALY.value:
+            text = f"anomalía en {label} {alert.operator} {alert.threshold:g}σ"
+        else:
+            text = f"{label} {alert.operator} {alert.threshold:g}"
+        if alert.duration_s:
+            text += f" durante {alert.duration_s:g}s"
+        if alert.clear_threshold is not None:
+            text += f" (sale en {alert.clear_threshold:g})"
+        return text
+    
+    def get_events(self, limit: int = 20, alert_id: int = None) -> List[Dict]:
+        """Historial de disparos (eventos cerrados, más recientes primero)"""
+        return self.db.get_alert_events(limit, alert_id)
+    
+    def get_event_stats(self, hours: int = 24) -> Dict[int, Dict]:
+        """Eventos y tiempo medio de recuperación por alerta"""
+        return self.db.get_alert_event_stats(hours)
+    
     def count(self) -> int:
-        """Contar alertas"""
-        return len(self.db.get_alerts())
+        """Contar alertas (cacheado hasta que cambie la tabla)"""
+        if self._count is None or self._count[0] != self.db.alerts_generation:
+            self._count = (self.db.alerts_generation, len(self.db.get_alerts()))
+        return self._count[1]
     
     # ============ UPDATE ============
     def update(self, alert_id: int, **kwargs) -> bool:
@@ -138,14 +274,7 @@ class AlertManager:
     # ============ EVALUACIÓN ============
     def check_alert(self, alert: Alert, current_value: float) -> bool:
         """Verificar si una alerta debe dispararse"""
-        ops = {
-            ">": lambda a, b: a > b,
-            "<": lambda a, b: a < b,
-            ">=": lambda a, b: a >= b,
-            "<=": lambda a, b: a <= b,
-            "==": lambda a, b: a == b
-        }
-        op_func = ops.get(alert.operator)
+        op_func = OPERATOR_FUNCS.get(alert.operator)
         if op_func:
             return op_func(current_value, alert.threshold)
         return False
@@ -154,11 +283,16 @@ class AlertManager:
         """Evaluar todas las alertas activas contra métricas actuales"""
         triggered = []
         for alert in self.get_all(only_enabled=True):
-            if alert.metric in metrics:
-                value = metrics[alert.metric]
-                if value is not None and self.check_alert(alert, value):
-                    self.db.trigger_alert(alert.id)
-                    triggered.append(alert)
+            if alert.is_selector:
+                # Dispara si alguna serie que coincide con el selector cumple la condición
+                metric, patterns = parse_selector(alert.metric)
+                values = [v for k, v in metrics.items() if k.startswith(metric + "{")
+                          and matches(parse_selector(k)[1], patterns)]
+            else:
+                values = [metrics.get(alert.metric)]
+            if any(v is not None and self.check_alert(alert, v) for v in values):
+                self.db.trigger_alert(alert.id)
+                triggered.append(alert)
         return triggered
     
     def register_callback(self, callback: Callable[[Alert], None]):
@@ -174,6 +308,490 @@ class AlertManager:
                 pass
 
 
+@dataclass
+class AlertTransition:
+    """Cambio de estado de una regla: entra (firing=True) o sale de alerta"""
+    alert: Alert
+    value: float
+    firing: bool
+    threshold: Optional[float] = None  # Límite efectivo (p. ej. percentil estimado)
+
+
+class RateCondition:
+    """
+    Variación de la métrica en los últimos `window` segundos
+    Ventana deslizante acotada (muestras dentro de la ventana); O(1)
+    amortizado por muestra.
+    """
+    
+    DEFAULT_WINDOW = 10.0
+    
+    def __init__(self, threshold: float, window: float = 0):
+        self.threshold = threshold
+        self.window = window or self.DEFAULT_WINDOW
+        self._samples: "deque[Tuple[float, float]]" = deque()
+    
+    def observe(self, value: float, now: float) -> Optional[Tuple[float, float]]:
+        samples = self._samples
+        samples.append((now, value))
+        # Conservar como referencia la última muestra tomada hace >= window
+        while len(samples) > 2 and samples[1][0] <= now - self.window:
+            samples.popleft()
+        ref_time, ref_value = samples[0]
+        if now - ref_time < self.window:
+            return None  # Aún no hay historia suficiente
+        return value - ref_value, self.threshold
+
+
+class PercentileCondition:
+    """
+    Valor actual contra un percentil móvil de los últimos `window` segundos
+    Estimación estocástica del cuantil con olvido exponencial: estado O(1)
+    (cuantil, media y desviación absoluta media) en lugar de guardar la ventana.
+    """
+    
+    DEFAULT_WINDOW = 3600.0
+    WARMUP_SAMPLES = 30
+    STEP = 4.0  # Paso relativo a la desviación media
+    
+    def __init__(self, percentile: float, window: float = 0):
+        self.p = min(max(percentile, 0.0), 100.0) / 100
+        self.window = window or self.DEFAULT_WINDOW
+        self.q: Optional[float] = None
+        self._mean = 0.0
+        self._dev = 0.0
+        self._n = 0
+        self._last = 0.0
+    
+    def observe(self, value: float, now: float) -> Optional[Tuple[float, float]]:
+        if self.q is None:
+            self.q = self._mean = value
+            self._last = now
+            self._n = 1
+            return None
+        self._n += 1
+        # Al inicio media acumulada (1/n); luego olvido con horizonte `window`
+        alpha = max(min(1.0, (now - self._last) / self.window), 1.0 / self._n)
+        self._last = now
+        self._mean += alpha * (value - self._mean)
+        self._dev += alpha * (abs(value - self._mean) - self._dev)
+        limit = self.q
+        self.q += self.STEP * max(self._dev, 1e-9) * alpha * (self.p - (value <= self.q))
+        if self._n < self.WARMUP_SAMPLES:
+            return None
+        return value, limit
+
+
+class AnomalyCondition:
+    """
+    Puntuación de anomalía de la métrica (z-score EWMA + CUSUM, ver
+    src/core/anomaly.py); `window` es la vida media del modelo en segundos
+    """
+    
+    DEFAULT_WINDOW = 1800.0
+    
+    def __init__(self, threshold: float, window: float = 0, baseline: SeasonalBaseline = None):
+        self.threshold = threshold
+        self.model = AnomalyModel(halflife=window or self.DEFAULT_WINDOW,
+                                  z_threshold=threshold, baseline=baseline)
+    
+    def observe(self, value: float, now: float) -> Optional[Tuple[float, float]]:
+        score = self.model.update(value, now)
+        if score is None:
+            return None
+        return score, self.threshold
+
+
+class ThresholdCondition:
+    """Comparación directa del valor contra el umbral"""
+    
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+    
+    def observe(self, value: float, now: float) -> Optional[Tuple[float, float]]:
+        return value, self.threshold
+
+
+class StatefulRule:
+    """
+    Regla con estado: condición + duración mínima + histéresis
+    - Entra en alerta cuando la condición se cumple durante `duration_s`
+    - Sale cuando deja de cumplirse contra `clear_threshold` (o el umbral)
+    """
+    
+    def __init__(self, alert: Alert, baseline: SeasonalBaseline = None):
+        self.alert = alert
+        self.compare = OPERATOR_FUNCS[alert.operator]
+        if alert.condition_type == ConditionType.RATE.value:
+            self.condition = RateCondition(alert.threshold, alert.window_s)
+        elif alert.condition_type == ConditionType.PERCENTILE.value:
+            self.condition = PercentileCondition(alert.threshold, alert.window_s)
+        elif alert.condition_type == ConditionType.ANOMALY.value:
+            self.condition = AnomalyCondition(alert.threshold, alert.window_s, baseline)
+        else:
+            self.condition = ThresholdCondition(alert.threshold)
+        self.signature = self.make_signature(alert)
+        self.firing = False
+        self.since: Optional[float] = None
+    
+    @staticmethod
+    def make_signature(alert: Alert) -> tuple:
+        """Campos que definen la regla; si no cambian se conserva el estado"""
+        return (alert.metric, alert.operator, alert.threshold, alert.condition_type,
+                alert.duration_s, alert.window_s, alert.clear_threshold)
+    
+    def update(self, value: float, now: float) -> Optional[AlertTransition]:
+        observed = self.condition.observe(value, now)
+        if observed is None:
+            return None
+        x, limit = observed
+        if not self.firing:
+            if not self.compare(x, limit):
+                self.since = None
+                return None
+            if self.since is None:
+                self.since = now
+            if now - self.since >= self.alert.duration_s:
+                self.firing = True
+                return AlertTransition(self.alert, x, True, limit)
+            return None
+        
+        clear = self.alert.clear_threshold
+        if clear is None or self.alert.condition_type == ConditionType.PERCENTILE.value:
+            clear = limit
+        if not self.compare(x, clear):
+            self.firing = False
+            self.since = None
+            return AlertTransition(self.alert, x, False, limit)
+        return None
+
+
+class _RuleGroup:
+    """
+    Reglas de una métrica con el mismo operador, ordenadas por umbral
+    Las reglas en alerta forman siempre un prefijo o sufijo de la lista,
+    así que basta con un bisect por snapshot para saber cuáles cambiaron.
+    """
+    
+    # operador -> (función bisect, en alerta = prefijo [:k] o sufijo [k:])
+    LAYOUT = {
+        ">": (bisect_left, True),    # umbral < valor
+        ">=": (bisect_right, True),  # umbral <= valor
+        "<": (bisect_right, False),  # umbral > valor
+        "<=": (bisect_left, False),  # umbral >= valor
+    }
+    
+    def __init__(self, operator: str, alerts: List[Alert]):
+        self.alerts = sorted(alerts, key=lambda a: a.threshold)
+        self.thresholds = [a.threshold for a in self.alerts]
+        self.bisect, self.prefix = self.LAYOUT[operator]
+        self.cut: Optional[int] = None  # Posición del corte en el último snapshot
+    
+    def firing(self, cut: int) -> List[Alert]:
+        return self.alerts[:cut] if self.prefix else self.alerts[cut:]
+    
+    def update(self, value: float) -> Tuple[List[Alert], List[Alert]]:
+        """Devolver (reglas que entran, reglas que salen) de alerta"""
+        cut = self.bisect(self.thresholds, value)
+        old, self.cut = self.cut, cut
+        if old is None:
+            return self.firing(cut), []
+        if cut == old:
+            return [], []
+        changed = self.alerts[min(old, cut):max(old, cut)]
+        # Con prefijo, avanzar el corte agrega reglas; con sufijo, las quita
+        entering = (cut > old) == self.prefix
+        return (changed, []) if entering else ([], changed)
+
+
+class SeriesIndex:
+    """
+    Índice selector -> series del snapshot que coinciden
+    Resolver los comodines cuesta O(series x selectores); el índice se
+    reconstruye solo cuando cambia el conjunto de series (arranque,
+    discos o interfaces que aparecen, procesos que nacen o terminan) y
+    en los demás snapshots basta con comparar las claves.
+    """
+    
+    def __init__(self):
+        self.selectors: Dict[str, Tuple[str, Dict[str, str]]] = {}
+        self.matches: Dict[str, List[str]] = {}
+        self.rebuilds = 0
+        self._keys = frozenset()
+        self._parsed: Dict[str, Tuple[str, Dict[str, str]]] = {}  # serie -> (métrica, etiquetas)
+    
+    @property
+    def metrics(self) -> set:
+        """Métricas base usadas por los selectores (qué series recolectar)"""
+        return {metric for metric, _ in self.selectors.values()}
+    
+    def set_selectors(self, selectors: List[str]):
+        self.selectors = {}
+        for selector in selectors:
+            try:
+                self.selectors[selector] = parse_selector(selector)
+            except ValueError:
+                continue  # Selector mal formado: la regla no coincide con nada
+        self._rebuild()
+    
+    def update(self, metrics: Dict[str, float]) -> bool:
+        """Registrar las series del snapshot; True si cambió alguna coincidencia"""
+        if metrics.keys() == self._keys:
+            return False
+        self._keys = frozenset(metrics)
+        return self._rebuild()
+    
+    def _rebuild(self) -> bool:
+        by_metric: Dict[str, List[Tuple[str, Dict[str, str]]]] = {}
+        parsed = {}
+        for key in self._keys:
+            if "{" not in key:
+                continue
+            entry = self._parsed.get(key) or parse_selector(key)
+            parsed[key] = entry
+            by_metric.setdefault(entry[0], []).append((key, entry[1]))
+        self._parsed = parsed
+        
+        index = {}
+        for selector, (metric, patterns) in self.selectors.items():
+            index[selector] = sorted(key for key, labels in by_metric.get(metric, ())
+                                     if matches(labels, patterns))
+        changed = index != self.matches
+        self.matches = index
+        self.rebuilds += 1
+        return changed
+    
+    def labels(self, key: str) -> Dict[str, str]:
+        return self._parsed[key][1]
+
+
+class AlertEngine:
+    """
+    Motor de alertas compilado
+    Carga las reglas habilitadas una vez, las indexa por métrica y operador
+    y solo las recompila cuando cambia la tabla de alertas
+    (Database.alerts_generation). Cada snapshot se evalúa con un bisect por
+    grupo y solo devuelve las transiciones (entrada/salida de alerta).
+    Las reglas con estado (duración, histéresis, tasa, percentil) se evalúan
+    aparte con estado O(1) por regla, que se conserva al recompilar.
+    Las reglas con selector (disk_usage{mountpoint=*}) se expanden en una
+    regla por serie mediante SeriesIndex, y el motor se recompila también
+    cuando cambian las series que coinciden con algún selector.
+    """
+    
+    def __init__(self, db=None):
+        self.db = db or get_db()
+        self._generation = None
+        self._index: Dict[str, List[_RuleGroup]] = {}
+        self._equal: Dict[str, Dict[float, List[Alert]]] = {}
+        self._stateful: Dict[str, List[StatefulRule]] = {}
+        self._firing: Dict[Tuple[int, Optional[str]], Alert] = {}
+        self._last_values: Dict[str, float] = {}
+        self._series = SeriesIndex()
+    
+    @property
+    def series_metrics(self) -> set:
+        """Métricas cuyas series por etiqueta necesitan las reglas actuales"""
+        return self._series.metrics
+    
+    @property
+    def rule_count(self) -> int:
+        return sum(len(g.alerts) for groups in self._index.values() for g in groups) + \
+            sum(len(r) for rules in self._equal.values() for r in rules.values()) + \
+            sum(len(rules) for rules in self._stateful.values())
+    
+    def _expand(self, alerts: List[Alert]) -> List[Alert]:
+        """Sustituir cada regla con selector por una copia por serie coincidente"""
+        self._series.set_selectors([a.metric for a in alerts if a.is_selector])
+        expanded = []
+        for alert in alerts:
+            if not alert.is_selector:
+                expanded.append(alert)
+                continue
+            for key in self._series.matches.get(alert.metric, ()):
+                suffix = ", ".join(self._series.labels(key).values())
+                expanded.append(replace(alert, metric=key, name=f"{alert.name} [{suffix}]", series=key))
+        return expanded
+    
+    def _baseline(self, alert: Alert) -> Optional[SeasonalBaseline]:
+        """Línea base estacional para reglas de anomalía sobre métricas con historial"""
+        if alert.condition_type != ConditionType.ANOMALY.value or alert.metric not in HISTORY_METRICS:
+            return None
+        return SeasonalBaseline.from_history(self.db, alert.metric)
+    
+    def _compile(self):
+        """Reconstruir el índice métrica -> grupos de reglas"""
+        self._generation = self.db.alerts_generation
+        previous = {rule.alert.key: rule for rules in self._stateful.values() for rule in rules}
+        by_key: Dict[Tuple[str, str], List[Alert]] = {}
+        self._stateful = {}
+        alerts = [Alert.from_dict(data) for data in self.db.get_alerts(only_enabled=True)]
+        for alert in self._expand(alerts):
+            if alert.operator not in OPERATOR_FUNCS:
+                continue
+            if alert.is_stateful:
+                rule = previous.get(alert.key)
+                if rule is None or rule.signature != StatefulRule.make_signature(alert):
+                    rule = StatefulRule(alert, self._baseline(alert))
+                rule.alert = alert
+                self._stateful.setdefault(alert.metric, []).append(rule)
+            else:
+                by_key.setdefault((alert.metric, alert.operator), []).append(alert)
+        
+        self._index, self._equal = {}, {}
+        for (metric, operator), alerts in by_key.items():
+            if operator == "==":
+                rules = self._equal.setdefault(metric, {})
+                for alert in alerts:
+                    rules.setdefault(alert.threshold, []).append(alert)
+            else:
+                self._index.setdefault(metric, []).append(_RuleGroup(operator, alerts))
+    
+    def evaluate(self, metrics: Dict[str, float], now: float = None) -> List[AlertTransition]:
+        """Evaluar un snapshot y devolver solo los cambios de estado"""
+        now = time.monotonic() if now is None else now
+        if self._generation != self.db.alerts_generation:
+            return self._recompile(metrics, now)
+        if self._series.selectors and self._series.update(metrics):
+            return self._recompile(metrics, now)
+        return self._evaluate(metrics, now)
+    
+    def _evaluate(self, metrics: Dict[str, float], now: float) -> List[AlertTransition]:
+        transitions = []
+        for metric, groups in self._index.items():
+            value = metrics.get(metric)
+            if value is None:
+                continue
+            for group in groups:
+                entering, leaving = group.update(value)
+                for alert in entering:
+                    self._firing[alert.key] = alert
+                    transitions.append(AlertTransition(alert, value, True))
+                for alert in leaving:
+                    self._firing.pop(alert.key, None)
+                    transitions.append(AlertTransition(alert, value, False))
+        
+        for metric, rules in self._equal.items():
+            value = metrics.get(metric)
+            if value is None:
+                continue
+            previous = self._last_values.get(metric)
+            if previous == value:
+                continue
+            for alert in rules.get(previous, ()):
+                self._firing.pop(alert.key, None)
+                transitions.append(AlertTransition(alert, value, False))
+            for alert in rules.get(value, ()):
+                self._firing[alert.key] = alert
+                transitions.append(AlertTransition(alert, value, True))
+            self._last_values[metric] = value
+        
+        for metric, rules in self._stateful.items():
+            value = metrics.get(metric)
+            if value is None:
+                continue
+            for rule in rules:
+                transition = rule.update(value, now)
+                if transition is None:
+                    continue
+                if transition.firing:
+                    self._firing[rule.alert.key] = rule.alert
+                else:
+                    self._firing.pop(rule.alert.key, None)
+                transitions.append(transition)
+        return transitions
+    
+    def _recompile(self, metrics: Dict[str, float], now: float) -> List[AlertTransition]:
+        """Recompilar y comparar el nuevo estado con el anterior regla a regla"""
+        previous = self._firing
+        self._series.update(metrics)
+        self._compile()
+        # Las reglas con estado conservado siguen en alerta si lo estaban
+        self._firing = {rule.alert.key: rule.alert for rules in self._stateful.values()
+                        for rule in rules if rule.firing}
+        self._last_values = {}
+        emitted = {t.alert.key: t for t in self._evaluate(metrics, now)}
+        
+        transitions = []
+        for key, alert in previous.items():
+            if key not in self._firing:
+                # Ya no está en alerta (editada/eliminada, o su serie desapareció)
+                transitions.append(emitted.get(key) or
+                                   AlertTransition(alert, metrics.get(alert.metric), False))
+        for key, alert in self._firing.items():
+            if key not in previous:
+                transitions.append(emitted.get(key) or
+                                   AlertTransition(alert, metrics.get(alert.metric), True))
+        return transitions
+    
+    def firing(self) -> List[Alert]:
+        """Reglas actualmente en alerta"""
+        return list(self._firing.values())
+
+
+
+class AlertEventLog:
+    """
+    Eventos de alerta abiertos (en memoria) y cerrados (al escritor)
+    Un evento empieza cuando la regla entra en alerta y se cierra cuando sale;
+    mientras tanto se actualiza el valor pico. Al cerrarse se entrega a
+    `sink` (HistoryWriter.add_alert_event) para escribirse en lote.
+    """
+    
+    def __init__(self, sink: Callable[[Dict], None]):
+        self.sink = sink
+        self._open: Dict[Tuple[int, Optional[str]], Dict] = {}
+    
+    def on_transition(self, transition: AlertTransition, now: float = None):
+        """Abrir o cerrar el evento de la regla"""
+        alert = transition.alert
+        now = time.monotonic() if now is None else now
+        if transition.firing:
+            self._open[alert.key] = {
+                "alert_id": alert.id,
+                "alert_name": alert.name,
+                "metric": alert.metric,
+                "started_at": utc_timestamp(),
+                "ended_at": None,
+                "duration_s": None,
+                # En reglas de tasa el valor de la transición es la variación, no la métrica
+                "peak_value": None if alert.condition_type == ConditionType.RATE.value else transition.value,
+                "_start": now,
+                "_lower_is_worse": alert.operator in ("<", "<="),
+            }
+            return
+        event = self._open.pop(alert.key, None)
+        if event is not None:
+            event["ended_at"] = utc_timestamp()
+            event["duration_s"] = round(now - event["_start"], 3)
+            self.sink(self._public(event))
+    
+    def observe(self, metrics: Dict[str, float]):
+        """Actualizar el valor pico de los eventos abiertos"""
+        for event in self._open.values():
+            value = metrics.get(event["metric"])
+            if value is None:
+                continue
+            peak = event["peak_value"]
+            if peak is None or (value < peak if event["_lower_is_worse"] else value > peak):
+                event["peak_value"] = value
+    
+    def open_events(self, now: float = None) -> List[Dict]:
+        """Eventos en curso con su duración hasta ahora"""
+        now = time.monotonic() if now is None else now
+        return [dict(self._public(e), duration_s=round(now - e["_start"], 1)) for e in self._open.values()]
+    
+    def close_all(self):
+        """Entregar los eventos abiertos (sin fin) al cerrar la aplicación"""
+        for event in self._open.values():
+            self.sink(self._public(event))
+        self._open.clear()
+    
+    @staticmethod
+    def _public(event: Dict) -> Dict:
+        return {k: v for k, v in event.items() if not k.startswith("_")}
+
+
 if __name__ == "__main__":
     # Test
     manager = AlertManager()
@@ -197,3 +815,103 @@ if __name__ == "__main__":
     # DELETE
     manager.delete(alert.id)
     print(f"Eliminada. Total: {manager.count()}")
+    
+    # MOTOR COMPILADO: solo transiciones, recompila al cambiar las reglas
+    import random
+    from src.database.db import Database
+    
+    test_db = Database(":memory:")
+    rule_id = test_db.create_alert("CPU Alto", "cpu_usage", ">", 80)
+    engine = AlertEngine(test_db)
+    assert [t.firing for t in engine.evaluate({"cpu_usage": 95})] == [True]
+    assert engine.evaluate({"cpu_usage": 96}) == []
+    assert [t.firing for t in engine.evaluate({"cpu_usage": 50})] == [False]
+    test_db.update_alert(rule_id, threshold=40)
+    assert [t.firing for t in engine.evaluate({"cpu_usage": 50})] == [True]
+    test_db.delete_alert(rule_id)
+    assert [t.firing for t in engine.evaluate({"cpu_usage": 50})] == [False]
+    
+    # CONDICIONES CON ESTADO (tiempo simulado, una muestra por segundo)
+    def fired(transitions):
+        return [(t.alert.name, t.firing) for t in transitions]
+    
+    test_db.create_alert("CPU sostenida", "cpu_usage", ">", 90, duration_s=60, clear_threshold=80)
+    test_db.create_alert("Subida brusca", "cpu_usage", ">", 20, condition_type="rate", window_s=10)
+    engine.evaluate({}, now=0)
+    assert fired(engine.evaluate({"cpu_usage": 95}, now=1)) == []
+    events = [fired(engine.evaluate({"cpu_usage": 95}, now=t)) for t in range(2, 70)]
+    assert events[59] == [("CPU sostenida", True)] and sum(map(len, events)) == 1
+    assert fired(engine.evaluate({"cpu_usage": 85}, now=70)) == []  # Histéresis: sigue en alerta
+    assert fired(engine.evaluate({"cpu_usage": 79}, now=71)) == [("CPU sostenida", False)]
+    
+    for t in range(72, 90):
+        engine.evaluate({"cpu_usage": 10}, now=t)
+    assert fired(engine.evaluate({"cpu_usage": 40}, now=90)) == [("Subida brusca", True)]
+    print(f"Con estado: duración/histéresis/tasa OK ({engine.rule_count} reglas)")
+    
+    # Percentil móvil: p95 de una normal(50, 10) ≈ 66.4
+    estimate = PercentileCondition(95, window=3600)
+    for t in range(20000):
+        estimate.observe(random.gauss(50, 10), t)
+    print(f"p95 estimado: {estimate.q:.1f} (teórico 66.4)")
+    assert abs(estimate.q - 66.4) < 3
+    
+    # Anomalía: ruido estable sin alertas, un pico de 10σ entra en alerta
+    test_db.create_alert("RAM anómala", "ram_usage", ">=", 4, condition_type="anomaly", window_s=600)
+    noise = [fired(engine.evaluate({"ram_usage": random.gauss(50, 1)}, now=t)) for t in range(100, 1100)]
+    assert sum(map(len, noise)) <= 2
+    assert ("RAM anómala", True) in fired(engine.evaluate({"ram_usage": 60}, now=1100))
+    print("Anomalía: pico detectado sin falsos positivos")
+
+    # REGISTRO DE EVENTOS: inicio, fin, duración y pico
+    closed = []
+    log = AlertEventLog(closed.append)
+    rule = Alert(1, "CPU Alto", "cpu_usage", ">", 90, True, True, 0, None)
+    log.on_transition(AlertTransition(rule, 92, True), now=0)
+    log.observe({"cpu_usage": 99})
+    log.observe({"cpu_usage": 95})
+    assert log.open_events(now=5)[0]["duration_s"] == 5
+    log.on_transition(AlertTransition(rule, 80, False), now=12)
+    assert closed[0]["peak_value"] == 99 and closed[0]["duration_s"] == 12
+    print(f"Evento: {closed[0]}")
+    
+    # SELECTORES: una regla por serie, índice reconstruido solo si cambian las series
+    selector_db = Database(":memory:")
+    selector_db.create_alert("Núcleo saturado", "cpu_usage{core=*}", ">=", 100, duration_s=300)
+    selector_db.create_alert("Partición llena", "disk_usage{mountpoint=/var*}", ">", 95)
+    selector_engine = AlertEngine(selector_db)
+    snapshot = {"cpu_usage": 30, "cpu_usage{core=0}": 10, "cpu_usage{core=1}": 100,
+                "disk_usage{mountpoint=/}": 97, "disk_usage{mountpoint=/var}": 50,
+                "disk_usage{mountpoint=/var/lib}": 96}
+    assert fired(selector_engine.evaluate(snapshot, now=0)) == [("Partición llena [/var/lib]", True)]
+    assert selector_engine.series_metrics == {"cpu_usage", "disk_usage"}
+    rebuilds = selector_engine._series.rebuilds
+    for t in range(1, 300):
+        assert selector_engine.evaluate(dict(snapshot, **{"cpu_usage{core=0}": t % 50}), now=t) == []
+    assert selector_engine._series.rebuilds == rebuilds  # Mismas series: sin reconstruir
+    assert fired(selector_engine.evaluate(snapshot, now=300)) == [("Núcleo saturado [1]", True)]
+    # Disco desmontado: su regla sale de alerta; el núcleo conserva su estado
+    unmounted = {k: v for k, v in snapshot.items() if k != "disk_usage{mountpoint=/var/lib}"}
+    assert fired(selector_engine.evaluate(unmounted, now=301)) == [("Partición llena [/var/lib]", False)]
+    assert [a.name for a in selector_engine.firing()] == ["Núcleo saturado [1]"]
+    assert AlertManager.make_metric("process_rss_gb", "postgres") == "process_rss_gb{name=postgres}"
+    assert AlertManager.split_metric("cpu_usage{core=*}") == ("cpu_usage", "core=*")
+    print(f"Selectores OK ({selector_engine.rule_count} reglas expandidas)")
+    
+    # Rendimiento: cientos de reglas evaluadas contra snapshots
+    metrics = [m for m in AlertManager.METRICS_LABELS if m not in LABELED_ONLY]
+    for i in range(500):
+        test_db.create_alert(f"r{i}", random.choice(metrics), random.choice(list(OPERATOR_FUNCS)),
+                             random.randint(0, 100))
+    snapshots = [{m: random.gauss(50, 10) for m in metrics} for _ in range(2000)]
+    engine.evaluate(snapshots[0])
+    start = time.perf_counter()
+    changes = sum(len(engine.evaluate(snap)) for snap in snapshots)
+    per_tick = (time.perf_counter() - start) / len(snapshots) * 1e6
+    print(f"Motor: {engine.rule_count} reglas, {per_tick:.1f} µs/snapshot ({changes} transiciones)")
+    
+    # Mismo resultado que la evaluación regla a regla
+    rules = [Alert.from_dict(a) for a in test_db.get_alerts(only_enabled=True)]
+    expected = {a.id for a in rules if not a.is_stateful and manager.check_alert(a, snapshots[-1][a.metric])}
+    assert {a.id for a in engine.firing() if not a.is_stateful} == expected
+    print("Motor OK")
@@ -4,12 +4,21 @@ Gestiona el almacenamiento y consulta de métricas históricas
 """
 from typing import List, Dict, Optional
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timezone
+import threading
+import time
 import sys
 import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-from src.database.db import get_db
+from src.database.db import Database, DB_PATH, get_db, get_read_pool
+from src.core.instrumentation import get_instrumentation
+from src.core.series import parse_selector
+
+
+def utc_timestamp() -> str:
+    """Timestamp UTC con el mismo formato que CURRENT_TIMESTAMP de SQLite"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
 
 
 @dataclass
@@ -48,11 +57,90 @@ class MetricRecord:
         )
 
 
+class SQLiteHistoryBackend:
+    """Historial local en la tabla metrics_history (motor por defecto)"""
+    
+    name = 'sqlite'
+    
+    def __init__(self, db: Database = None):
+        self.db = db or get_db()
+    
+    def save(self, **metrics) -> int:
+        return self.db.save_metrics(**metrics)
+    
+    def get_history(self, hours: int, limit: int) -> List[Dict]:
+        return self.db.get_metrics_history(hours, limit)
+    
+    def get_summary(self, hours: int = 24) -> Dict:
+        return self.db.get_metrics_summary(hours)
+    
+    def get_count(self) -> int:
+        return self.db.get_metrics_count()
+    
+    def iter_history(self, metrics, start: float, end: float, step: int):
+        return get_read_pool().iter_history(metrics, start, end, step)
+    
+    def cleanup(self, days: int) -> int:
+        return self.db.cleanup_old_metrics(days)
+
+
+class TSDBHistoryBackend:
+    """
+    Historial local en el almacén comprimido (src/database/tsdb.py)
+    Los agentes remotos y las ráfagas siguen en SQLite. La retención borra
+    días completos.
+    """
+    
+    name = 'tsdb'
+    
+    def __init__(self, tsdb=None, db: Database = None):
+        from src.database.tsdb import get_tsdb
+        self.tsdb = tsdb or get_tsdb()
+        self.db = db or get_db()
+    
+    def save(self, **metrics) -> int:
+        timestamp = metrics.pop('timestamp', None) or utc_timestamp()
+        self.tsdb.append([dict(metrics, timestamp=timestamp)])
+        return self.tsdb.last_timestamp() or -1
+    
+    def get_history(self, hours: int, limit: int) -> List[Dict]:
+        return self.tsdb.get_history(hours, limit)
+    
+    def get_summary(self, hours: int = 24) -> Dict:
+        return self.tsdb.get_summary(hours)
+    
+    def get_count(self) -> int:
+        return self.tsdb.count()
+    
+    def iter_history(self, metrics, start: float, end: float, step: int):
+        return self.tsdb.iter_history(metrics, start, end, step)
+    
+    def cleanup(self, days: int) -> int:
+        deleted = self.tsdb.cleanup(days)
+        self.db.cleanup_old_metrics(days)  # Hosts remotos y ráfagas
+        return deleted
+
+
+HISTORY_BACKENDS = {'sqlite': SQLiteHistoryBackend, 'tsdb': TSDBHistoryBackend}
+
+_backend = None
+
+
+def get_history_backend():
+    """Motor de historial local según la configuración `history_backend` (singleton)"""
+    global _backend
+    if _backend is None:
+        name = get_db().get_config('history_backend', 'sqlite')
+        _backend = HISTORY_BACKENDS.get(name, SQLiteHistoryBackend)()
+    return _backend
+
+
 class HistoryManager:
     """Gestor de historial de métricas con CRUD completo"""
     
-    def __init__(self):
+    def __init__(self, backend=None):
         self.db = get_db()
+        self.backend = backend or get_history_backend()
     
     # ============ CREATE ============
     def save(self, cpu_usage: float = None, cpu_temp: float = None,
@@ -62,7 +150,7 @@ class HistoryManager:
              net_download: float = None, gpu_usage: float = None,
              gpu_temp: float = None) -> int:
         """Guardar métricas actuales"""
-        return self.db.save_metrics(
+        return self.backend.save(
             cpu_usage=cpu_usage, cpu_temp=cpu_temp,
             ram_usage=ram_usage, ram_used_gb=ram_used_gb,
             disk_usage=disk_usage, disk_read_speed=disk_read_speed,
@@ -102,20 +190,20 @@ class HistoryManager:
     # ============ READ ============
     def get_history(self, hours: int = 1, limit: int = 1000) -> List[MetricRecord]:
         """Obtener historial de las últimas N horas"""
-        data = self.db.get_metrics_history(hours, limit)
+        data = self.backend.get_history(hours, limit)
         return [MetricRecord.from_dict(d) for d in data]
     
     def get_summary(self, hours: int = 24) -> Dict:
         """Obtener resumen estadístico"""
-        return self.db.get_metrics_summary(hours)
+        return self.backend.get_summary(hours)
     
     def get_count(self) -> int:
         """Obtener cantidad total de registros"""
-        return self.db.get_metrics_count()
+        return self.backend.get_count()
     
     def get_latest(self) -> Optional[MetricRecord]:
         """Obtener último registro"""
-        data = self.db.get_metrics_history(hours=24, limit=1)
+        data = self.backend.get_history(hours=24, limit=1)
         return MetricRecord.from_dict(data[0]) if data else None
     
     def get_metric_series(self, metric: str, hours: int = 1) -> List[Dict]:
@@ -133,15 +221,148 @@ class HistoryManager:
     # ============ DELETE ============
     def cleanup(self, days: int = 7) -> int:
         """Eliminar registros antiguos"""
-        return self.db.cleanup_old_metrics(days)
+        return self.backend.cleanup(days)
     
     def clear_all(self) -> int:
         """Eliminar todo el historial"""
         count = self.get_count()
-        self.db.cleanup_old_metrics(days=0)
+        self.backend.cleanup(days=0)
         return count
 
 
+
+class HistoryWriter(threading.Thread):
+    """
+    Escritor de historial en segundo plano
+    Acumula filas de métricas, eventos de alerta y contadores de disparo en
+    memoria y los escribe cada `flush_interval` segundos en una sola
+    transacción, con su propia conexión (el hilo de la UI nunca hace commit).
+    Con `tsdb` las filas de métricas van al almacén comprimido; las series
+    etiquetadas (por núcleo, partición, interfaz) siempre van a SQLite.
+    """
+    
+    def __init__(self, db_path: str = DB_PATH, flush_interval: float = 5.0, max_pending: int = 10000,
+                 tsdb=None):
+        super().__init__(daemon=True, name='omnimonitor-history-writer')
+        self.db_path = db_path
+        self.tsdb = tsdb
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.dropped = 0
+        self.flushes = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._metrics: List[Dict] = []
+        self._events: List[Dict] = []
+        self._series: List[tuple] = []
+        self._triggers: Dict[int, tuple] = {}
+        self._stop_event = threading.Event()
+        self._db: Optional[Database] = None
+    
+    def save_metrics(self, **metrics):
+        """Encolar una fila de historial local (mismos campos que HistoryManager.save)"""
+        metrics.setdefault('timestamp', utc_timestamp())
+        self._append(self._metrics, metrics)
+    
+    def save_series(self, series: Dict[str, float], timestamp: float = None):
+        """Encolar series etiquetadas {'cpu_usage{core=3}': 41.0, ...} de un mismo instante"""
+        ts = int(timestamp if timestamp is not None else time.time())
+        rows = []
+        for key, value in series.items():
+            parsed = parse_selector(key)
+            if parsed is None or len(parsed[1]) != 1 or value is None:
+                continue
+            metric, labels = parsed
+            (label, label_value), = labels.items()
+            rows.append((metric, label, label_value, ts, float(value)))
+        with self._lock:
+            if self._pending_locked() + len(rows) > self.max_pending:
+                self.dropped += len(rows)
+                return
+            self._series.extend(rows)
+    
+    def add_alert_event(self, event: Dict):
+        """Encolar un evento de alerta cerrado"""
+        self._append(self._events, event)
+    
+    def record_trigger(self, alert_id: int):
+        """Contar un disparo (se agrupan por alerta hasta el siguiente flush)"""
+        with self._lock:
+            count, _ = self._triggers.get(alert_id, (0, None))
+            self._triggers[alert_id] = (count + 1, utc_timestamp())
+    
+    def _append(self, target: List[Dict], item: Dict):
+        with self._lock:
+            if self._pending_locked() >= self.max_pending:
+                self.dropped += 1  # Base de datos bloqueada demasiado tiempo
+                return
+            target.append(item)
+    
+    def _pending_locked(self) -> int:
+        return len(self._metrics) + len(self._events) + len(self._series)
+    
+    def pending(self) -> int:
+        with self._lock:
+            return self._pending_locked() + len(self._triggers)
+    
+    def flush(self):
+        """Escribir lo acumulado en una transacción"""
+        with self._lock:
+            metrics, self._metrics = self._metrics, []
+            events, self._events = self._events, []
+            series, self._series = self._series, []
+            triggers, self._triggers = self._triggers, {}
+        if not (metrics or events or series or triggers):
+            return
+        with self._write_lock:
+            if self._db is None:
+                self._db = Database(self.db_path)
+            try:
+                with get_instrumentation().stage('db.write'):
+                    if self.tsdb is not None and metrics:
+                        self.tsdb.append(metrics)
+                        metrics = []  # Ya escritas: no se reintentan
+                    self._db.write_batch(metrics, events, triggers, series)
+                self.flushes += 1
+            except Exception as e:
+                print(f"Error escribiendo historial: {e}")
+                with self._lock:
+                    # Reintentar en el próximo flush, sin superar el límite
+                    room = max(self.max_pending - self._pending_locked(), 0)
+                    self._metrics[:0] = metrics[:room]
+                    room = max(room - len(metrics), 0)
+                    self._events[:0] = events[:room]
+                    self._series[:0] = series[:max(room - len(events), 0)]
+                    for alert_id, (count, last) in triggers.items():
+                        prev_count, prev_last = self._triggers.get(alert_id, (0, None))
+                        self._triggers[alert_id] = (count + prev_count, prev_last or last)
+    
+    def run(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+    
+    def stop(self, timeout: float = 10.0):
+        """Detener el hilo escribiendo lo pendiente"""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+        else:
+            self.flush()
+
+
+_writer: Optional[HistoryWriter] = None
+
+
+def get_history_writer() -> HistoryWriter:
+    """Obtener el escritor de historial (singleton, se inicia al pedirlo)"""
+    global _writer
+    if _writer is None:
+        _writer = HistoryWriter(tsdb=getattr(get_history_backend(), 'tsdb', None))
+        _writer.start()
+    return _writer
+
+
 if __name__ == "__main__":
     # Test
     manager = HistoryManager()
@@ -163,3 +384,62 @@ if __name__ == "__main__":
     # DELETE
     deleted = manager.cleanup(days=7)
     print(f"Limpiados: {deleted} registros antiguos")
+    
+    # ESCRITOR EN LOTES: muchas escrituras, una transacción por flush
+    import tempfile
+    from src.database.db import ReadOnlyPool
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = HistoryWriter(os.path.join(tmp, 'test.db'), flush_interval=60)
+        writer.start()
+        start = time.perf_counter()
+        for i in range(1000):
+            writer.save_metrics(cpu_usage=float(i % 100), ram_usage=50.0)
+            writer.record_trigger(1)
+        enqueue_us = (time.perf_counter() - start) / 2000 * 1e6
+        writer.add_alert_event({
+            "alert_id": 1, "alert_name": "CPU Alto", "metric": "cpu_usage",
+            "started_at": utc_timestamp(), "ended_at": utc_timestamp(),
+            "duration_s": 3.0, "peak_value": 97.5,
+        })
+        writer.stop()
+        db = Database(os.path.join(tmp, 'test.db'))
+        print(f"Escritor: {enqueue_us:.1f} µs/encolado, {writer.flushes} flush, "
+              f"{db.get_metrics_count()} filas, eventos: {len(db.get_alert_events())}")
+        assert writer.flushes == 1 and db.get_metrics_count() == 1000
+        db.close()
+        
+        # Con el almacén comprimido las métricas no pasan por SQLite
+        from src.database.tsdb import TimeSeriesDB
+        tsdb = TimeSeriesDB(os.path.join(tmp, 'tsdb'))
+        writer = HistoryWriter(os.path.join(tmp, 'test.db'), flush_interval=60, tsdb=tsdb)
+        for i in range(100):
+            writer.save_metrics(cpu_usage=float(i), ram_usage=50.0)
+        writer.flush()
+        backend = TSDBHistoryBackend(tsdb, Database(os.path.join(tmp, 'test.db')))
+        assert backend.get_count() == 100 and backend.get_summary(1)['max_cpu'] == 99.0
+        print(f"TSDB: {backend.get_count()} filas, último {backend.get_history(1, 1)[0]['timestamp']}")
+        
+        # Series por núcleo: muestras estrechas + agregados por hora para rankings
+        now = int(time.time())
+        for i in range(120):
+            writer.save_series({f"cpu_usage{{core={core}}}": float(core * 10 + i % 5) for core in range(8)},
+                               timestamp=now - 120 + i)
+        writer.flush()
+        pool = ReadOnlyPool(os.path.join(tmp, 'test.db'))
+        top = pool.rank_series("cpu_usage", now - 3600, now + 1, limit=3)
+        points = list(pool.iter_series("cpu_usage", "7", now - 120, now, 60))
+        print(f"Series: top {[(row['value'], round(row['avg'], 1)) for row in top]}, "
+              f"{len(points)} puntos del núcleo 7")
+        assert [row['value'] for row in top] == ['7', '6', '5'] and top[0]['samples'] == 120
+        assert len(pool.get_series("cpu_usage")) == 8 and points
+        
+        # Reenviar las mismas muestras no las suma dos veces en los agregados por hora
+        for i in range(120):
+            writer.save_series({"cpu_usage{core=7}": 99.0}, timestamp=now - 120 + i)
+        writer.flush()
+        top = pool.rank_series("cpu_usage", now - 3600, now + 1, limit=1)
+        assert top[0]['value'] == '7' and top[0]['samples'] == 120 and top[0]['max'] == 74.0
+        pool.close()
+        tsdb.close()
+        backend.db.close()
@@ -134,6 +134,57 @@ class ProcessManager:
         
         return processes[:limit], stats
     
+    def get_top_with_stats(self, limit: int = 20) -> tuple:
+        """
+        Como get_all_with_stats pero para refrescos frecuentes (modo terminal):
+        lee solo los campos de la tabla y pide el usuario solo de los `limit`
+        primeros; sin línea de comandos ni fecha de inicio
+        """
+        rows = []
+        counts = {'running': 0, 'sleeping': 0, 'stopped': 0, 'zombie': 0}
+        total_threads = 0
+        attrs = ['pid', 'name', 'status', 'cpu_percent', 'memory_percent', 'memory_info', 'num_threads']
+        
+        for proc in psutil.process_iter(attrs):
+            info = proc.info
+            status = info['status']
+            if status in counts:
+                counts[status] += 1
+            total_threads += info['num_threads'] or 0
+            if self._filter_text and self._filter_text.lower() not in (info['name'] or '').lower():
+                continue
+            rows.append((proc, info))
+        
+        def key(row):
+            info = row[1]
+            if self._sort_by == 'memory_mb':
+                return info['memory_info'].rss if info['memory_info'] else 0
+            return info.get(self._sort_by) or 0
+        rows.sort(key=key, reverse=self._sort_reverse)
+        
+        processes = []
+        for proc, info in rows[:limit]:
+            try:
+                username = proc.username()
+            except (psutil.Error, KeyError):
+                username = 'unknown'
+            memory_mb = info['memory_info'].rss / (1024 * 1024) if info['memory_info'] else 0
+            processes.append(Process(
+                pid=info['pid'],
+                name=info['name'] or 'Unknown',
+                status=info['status'] or 'unknown',
+                cpu_percent=info['cpu_percent'] or 0,
+                memory_percent=info['memory_percent'] or 0,
+                memory_mb=round(memory_mb, 2),
+                username=username,
+                create_time='',
+                num_threads=info['num_threads'] or 0,
+                cmdline=''
+            ))
+        
+        stats = dict(counts, total=sum(counts.values()), threads=total_threads)
+        return processes, stats
+    
     def get_top_cpu(self, limit: int = 5) -> List[Process]:
         """Obtener top procesos por uso de CPU"""
         processes = []
@@ -0,0 +1,478 @@
+"""
+Destinos de alertas (sinks) para OmniMonitor
+Entregan las transiciones del motor de alertas fuera de la ventana de
+Flet: webhook HTTP, archivo JSONL, syslog o un comando externo. Así un
+host sin interfaz (agente) también puede avisar.
+
+Cada destino tiene su propio hilo y su cola acotada: publicar nunca
+bloquea el muestreo. El hilo agrupa eventos en lotes, reintenta con
+backoff exponencial y, si se agotan los reintentos (o la cola se llena),
+guarda los eventos en un archivo de "dead letter" para no perderlos.
+
+Configuración (clave `alert_sinks` de la tabla config, o `--sink` del agente):
+    webhook=http://hooks.local/omnimonitor
+    file=/var/log/omnimonitor/alerts.jsonl
+    syslog                      (o syslog=host:514)
+    exec=/usr/local/bin/notificar.sh
+"""
+import json
+import logging
+import logging.handlers
+import os
+import shlex
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from collections import deque
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.crud.history import utc_timestamp
+
+DEFAULT_DEAD_LETTER = os.path.join(os.path.expanduser('~'), '.omnimonitor', 'dead_letter.jsonl')
+
+
+def transition_event(transition, host: str = None) -> Dict:
+    """Evento serializable de una AlertTransition"""
+    alert = transition.alert
+    threshold = alert.threshold if transition.threshold is None else transition.threshold
+    return {
+        "timestamp": utc_timestamp(),
+        "host": host or socket.gethostname(),
+        "state": "firing" if transition.firing else "resolved",
+        "alert_id": alert.id,
+        "alert_name": alert.name,
+        "metric": alert.metric,
+        "operator": alert.operator,
+        "threshold": round(threshold, 3) if isinstance(threshold, float) else threshold,
+        "value": round(transition.value, 3) if isinstance(transition.value, float) else transition.value,
+    }
+
+
+class AlertSink(threading.Thread):
+    """
+    Destino base: cola acotada + hilo de entrega por lotes con reintentos
+    Las subclases implementan `deliver(batch)` y lanzan una excepción si falla.
+    """
+
+    kind = "sink"
+
+    def __init__(self, max_queue: int = 1000, batch_size: int = 50, batch_interval: float = 1.0,
+                 max_retries: int = 5, base_backoff: float = 1.0, max_backoff: float = 60.0,
+                 dead_letter: str = DEFAULT_DEAD_LETTER):
+        super().__init__(daemon=True, name=f'omnimonitor-sink-{self.kind}')
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.dead_letter = dead_letter
+        self.delivered = 0
+        self.dead_lettered = 0
+        self.retries = 0
+        self.last_error: Optional[str] = None
+        self._queue: "deque[Dict]" = deque()
+        self._max_queue = max_queue
+        self._overflow: List[Dict] = []  # Desbordados; los escribe el hilo del destino
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()  # Solo para el archivo de dead letter
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+
+    @property
+    def name_label(self) -> str:
+        return self.kind
+
+    def submit(self, event: Dict):
+        """
+        Encolar sin bloquear; con la cola llena el más antiguo va a dead letter
+        El archivo lo escribe el hilo del destino: aquí nunca hay E/S de disco.
+        """
+        with self._lock:
+            overflow = len(self._queue) >= self._max_queue
+            if overflow:
+                self._overflow.append(self._queue.popleft())
+            self._queue.append(event)
+            full_batch = len(self._queue) >= self.batch_size
+        if overflow or full_batch:
+            self._wakeup.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._queue)
+
+    def deliver(self, batch: List[Dict]):
+        raise NotImplementedError
+
+    def _take_batch(self) -> List[Dict]:
+        with self._lock:
+            count = min(self.batch_size, len(self._queue))
+            return [self._queue.popleft() for _ in range(count)]
+
+    def _flush_overflow(self):
+        """Pasar a dead letter los eventos desbordados por submit()"""
+        with self._lock:
+            overflow, self._overflow = self._overflow, []
+        if overflow:
+            self._write_dead_letter(overflow, "cola llena")
+
+    def _deliver_with_retries(self, batch: List[Dict]):
+        attempt = 0
+        while True:
+            try:
+                self.deliver(batch)
+                self.delivered += len(batch)
+                self.last_error = None
+                return
+            except Exception as e:
+                self.last_error = str(e) or type(e).__name__
+                if attempt >= self.max_retries:
+                    self._write_dead_letter(batch, self.last_error)
+                    return
+                attempt += 1
+                self.retries += 1
+                self._flush_overflow()  # Durante los reintentos la cola puede desbordarse
+                delay = min(self.base_backoff * (2 ** (attempt - 1)), self.max_backoff)
+                # Al detenerse no se espera más: lo pendiente va a dead letter
+                if self._stop_event.wait(delay):
+                    self._write_dead_letter(batch, f"detenido tras error: {self.last_error}")
+                    return
+
+    def _write_dead_letter(self, batch: List[Dict], error: str):
+        if not self.dead_letter:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.dead_letter)), exist_ok=True)
+            with self._file_lock, open(self.dead_letter, 'a', encoding='utf-8') as f:
+                for event in batch:
+                    f.write(json.dumps({"sink": self.name_label, "error": error,
+                                        "failed_at": utc_timestamp(), "event": event},
+                                       ensure_ascii=False) + "\n")
+                self.dead_lettered += len(batch)
+        except OSError as e:
+            print(f"Error escribiendo dead letter: {e}")
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self._wakeup.wait(self.batch_interval)
+            self._wakeup.clear()
+            while not self._stop_event.is_set():
+                self._flush_overflow()
+                batch = self._take_batch()
+                if not batch:
+                    break
+                self._deliver_with_retries(batch)
+        # Último intento sin reintentos para lo que quede en la cola
+        self._flush_overflow()
+        batch = self._take_batch()
+        while batch:
+            try:
+                self.deliver(batch)
+                self.delivered += len(batch)
+            except Exception as e:
+                self._write_dead_letter(batch, str(e) or type(e).__name__)
+            batch = self._take_batch()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop_event.set()
+        self._wakeup.set()
+        if self.is_alive():
+            self.join(timeout)
+        else:
+            self._flush_overflow()  # Destino nunca iniciado: no perder los desbordados
+
+    def stats(self) -> Dict:
+        return {"sink": self.name_label, "pending": self.pending(), "delivered": self.delivered,
+                "retries": self.retries, "dead_lettered": self.dead_lettered,
+                "last_error": self.last_error}
+
+
+class WebhookSink(AlertSink):
+    """POST JSON {"alerts": [...]} a una URL"""
+
+    kind = "webhook"
+
+    def __init__(self, url: str, timeout: float = 5.0, headers: Dict[str, str] = None, **options):
+        self.url = url
+        self.timeout = timeout
+        self.headers = headers or {}
+        super().__init__(**options)
+
+    @property
+    def name_label(self) -> str:
+        return f"webhook:{self.url}"
+
+    def deliver(self, batch: List[Dict]):
+        body = json.dumps({"alerts": batch}, ensure_ascii=False).encode()
+        request = urllib.request.Request(self.url, data=body, method='POST', headers={
+            'Content-Type': 'application/json', **self.headers})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class FileSink(AlertSink):
+    """Añadir cada evento como una línea JSON a un archivo"""
+
+    kind = "file"
+
+    def __init__(self, path: str, **options):
+        self.path = path
+        super().__init__(**options)
+
+    @property
+    def name_label(self) -> str:
+        return f"file:{self.path}"
+
+    def deliver(self, batch: List[Dict]):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in batch))
+
+
+class _RaisingSysLogHandler(logging.handlers.SysLogHandler):
+    """SysLogHandler que propaga los errores de envío en lugar de tragárselos"""
+
+    def handleError(self, record):
+        raise  # Llamado desde el except de emit(): relanza el error original
+
+
+class SyslogSink(AlertSink):
+    """Un mensaje syslog por evento (WARNING al entrar, INFO al salir)"""
+
+    kind = "syslog"
+
+    def __init__(self, address=None, facility: int = logging.handlers.SysLogHandler.LOG_USER, **options):
+        if address is None:
+            address = '/dev/log' if os.path.exists('/dev/log') else ('localhost', 514)
+        self.address = address
+        self._handler = _RaisingSysLogHandler(address=address, facility=facility)
+        self._handler.setFormatter(logging.Formatter('omnimonitor: %(message)s'))
+        super().__init__(**options)
+
+    def deliver(self, batch: List[Dict]):
+        for event in batch:
+            level = logging.WARNING if event.get("state") == "firing" else logging.INFO
+            message = (f"[{event.get('state')}] {event.get('alert_name')} "
+                       f"{event.get('metric')}={event.get('value')} "
+                       f"({event.get('operator')} {event.get('threshold')}) host={event.get('host')}")
+            record = logging.LogRecord('omnimonitor', level, __file__, 0, message, None, None)
+            self._handler.emit(record)
+            if self._handler.socket is None:
+                raise ConnectionError("syslog no disponible")
+
+    def stop(self, timeout: float = 5.0):
+        super().stop(timeout)
+        self._handler.close()
+
+
+class ExecSink(AlertSink):
+    """Ejecutar un comando por lote con los eventos en JSONL por stdin"""
+
+    kind = "exec"
+
+    def __init__(self, command, timeout: float = 30.0, **options):
+        self.command = shlex.split(command) if isinstance(command, str) else list(command)
+        self.timeout = timeout
+        super().__init__(**options)
+
+    @property
+    def name_label(self) -> str:
+        return f"exec:{self.command[0]}"
+
+    def deliver(self, batch: List[Dict]):
+        payload = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in batch)
+        env = dict(os.environ, OMNIMONITOR_ALERT_COUNT=str(len(batch)))
+        result = subprocess.run(self.command, input=payload.encode(), env=env, timeout=self.timeout,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if result.returncode != 0:
+            raise RuntimeError(f"código {result.returncode}: {result.stderr.decode(errors='replace')[:200]}")
+
+
+SINK_TYPES = {
+    "webhook": WebhookSink,
+    "file": FileSink,
+    "syslog": SyslogSink,
+    "exec": ExecSink,
+}
+
+
+def parse_sink_spec(spec: str) -> Dict:
+    """'webhook=http://x' -> {"type": "webhook", "url": "http://x"}"""
+    kind, _, target = spec.partition("=")
+    kind = kind.strip().lower()
+    target = target.strip()
+    if kind not in SINK_TYPES:
+        raise ValueError(f"Tipo de destino desconocido: {kind!r} (usa {', '.join(SINK_TYPES)})")
+    if kind == "syslog":
+        if not target:
+            return {"type": kind}
+        host, _, port = target.rpartition(":")
+        return {"type": kind, "address": [host, int(port)] if host else target}
+    if not target:
+        raise ValueError(f"El destino {kind} necesita un valor, ej: {kind}=...")
+    key = {"webhook": "url", "file": "path", "exec": "command"}[kind]
+    return {"type": kind, key: target}
+
+
+def build_sink(config: Dict, **defaults) -> AlertSink:
+    """Crear un destino a partir de su configuración"""
+    options = dict(config)
+    kind = options.pop("type")
+    if kind not in SINK_TYPES:
+        raise ValueError(f"Tipo de destino desconocido: {kind!r}")
+    if isinstance(options.get("address"), list):
+        options["address"] = tuple(options["address"])
+    return SINK_TYPES[kind](**{**defaults, **options})
+
+
+class AlertDispatcher:
+    """Reparte cada transición de alerta a todos los destinos configurados"""
+
+    def __init__(self, sinks: List[AlertSink] = None, host: str = None):
+        self.sinks = list(sinks or [])
+        self.host = host
+        for sink in self.sinks:
+            if not sink.is_alive():
+                sink.start()
+
+    @classmethod
+    def from_specs(cls, specs: List, host: str = None, **defaults) -> 'AlertDispatcher':
+        """Specs como texto ('file=/x.jsonl') o dict ({"type": "file", "path": ...})"""
+        sinks = []
+        for spec in specs:
+            try:
+                config = parse_sink_spec(spec) if isinstance(spec, str) else spec
+                sinks.append(build_sink(config, **defaults))
+            except Exception as e:
+                print(f"Destino de alertas inválido {spec!r}: {e}")
+        return cls(sinks, host)
+
+    @classmethod
+    def from_config(cls, db, host: str = None) -> 'AlertDispatcher':
+        """Leer la clave `alert_sinks` (lista JSON) de la configuración"""
+        raw = db.get_config('alert_sinks') or '[]'
+        try:
+            specs = json.loads(raw)
+        except ValueError:
+            print("Configuración alert_sinks inválida (se esperaba una lista JSON)")
+            specs = []
+        return cls.from_specs(specs, host)
+
+    def __bool__(self) -> bool:
+        return bool(self.sinks)
+
+    def publish(self, transition):
+        """Encolar la transición en cada destino (no bloquea)"""
+        if not self.sinks:
+            return
+        event = transition_event(transition, self.host)
+        for sink in self.sinks:
+            sink.submit(event)
+
+    def close(self, timeout: float = 5.0):
+        for sink in self.sinks:
+            sink.stop(timeout)
+
+    def stats(self) -> List[Dict]:
+        return [sink.stats() for sink in self.sinks]
+
+
+if __name__ == "__main__":
+    # Test: destinos contra un servidor HTTP local que falla, tarda o cae
+    import tempfile
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from src.crud.alerts import Alert, AlertTransition
+
+    received: List[Dict] = []
+    state = {"fail": 2, "delay": 0.0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            time.sleep(state["delay"])
+            if state["fail"] > 0:
+                state["fail"] -= 1
+                self.send_response(500)
+                self.end_headers()
+                return
+            received.append(json.loads(body))
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('localhost', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://localhost:{server.server_port}/hook"
+    rule = Alert(1, "CPU Alto", "cpu_usage", ">", 90, True, True, 0, None)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dead = os.path.join(tmp, 'dead.jsonl')
+        options = dict(batch_interval=0.05, base_backoff=0.05, dead_letter=dead)
+        syslog_rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        syslog_rx.bind(('localhost', 0))
+        syslog_rx.settimeout(2)
+        dispatcher = AlertDispatcher([
+            WebhookSink(url, **options),
+            FileSink(os.path.join(tmp, 'alerts.jsonl'), **options),
+            ExecSink(f"sh -c 'cat >> {os.path.join(tmp, 'exec.jsonl')}'", **options),
+            SyslogSink(('localhost', syslog_rx.getsockname()[1]), **options),
+            WebhookSink("http://localhost:1/caido", max_retries=2, **options),
+        ], host="test")
+
+        # Endpoint lento: publicar no debe bloquear
+        state["delay"] = 0.3
+        start = time.perf_counter()
+        for i in range(100):
+            dispatcher.publish(AlertTransition(rule, 90.0 + i % 10, i % 2 == 0))
+        publish_us = (time.perf_counter() - start) / 100 * 1e6
+        print(f"Publicar: {publish_us:.1f} µs/transición con endpoint lento")
+        assert publish_us < 1000
+
+        time.sleep(3.0)
+        dispatcher.close()
+        for stats in dispatcher.stats():
+            print(f"  {stats}")
+        webhook_events = sum(len(b["alerts"]) for b in received)
+        assert webhook_events == 100 and dispatcher.sinks[0].retries == 2
+        with open(os.path.join(tmp, 'alerts.jsonl')) as f:
+            assert len(f.readlines()) == 100
+        with open(os.path.join(tmp, 'exec.jsonl')) as f:
+            assert json.loads(f.readline())["host"] == "test"
+        assert b"CPU Alto" in syslog_rx.recv(1024)
+        with open(dead) as f:
+            dead_lines = [json.loads(line) for line in f]
+        assert len(dead_lines) == 100 and dead_lines[0]["sink"].endswith("/caido")
+        print(f"Webhook: {len(received)} lotes; dead letter: {len(dead_lines)} eventos")
+
+        # Cola llena: el desbordamiento no escribe en disco desde el hilo que publica
+        overflow_dead = os.path.join(tmp, 'overflow-dead.jsonl')
+        small = FileSink(os.path.join(tmp, 'small.jsonl'), max_queue=5, batch_interval=60,
+                         dead_letter=overflow_dead)
+        for i in range(20):
+            small.submit({"state": "firing", "n": i})
+        assert small.pending() == 5 and not os.path.exists(overflow_dead)
+        small.start()
+        small.stop()
+        with open(overflow_dead) as f:
+            assert [json.loads(line)["event"]["n"] for line in f] == list(range(15))
+        with open(os.path.join(tmp, 'small.jsonl')) as f:
+            assert len(f.readlines()) == 5
+
+        # Syslog caído: el envío fallido no cuenta como entregado y va a dead letter
+        broken = SyslogSink(os.path.join(tmp, 'no-existe.sock'), max_retries=0,
+                            dead_letter=os.path.join(tmp, 'syslog-dead.jsonl'))
+        broken._deliver_with_retries([{"state": "firing", "alert_name": "CPU Alto"}])
+        assert broken.delivered == 0 and broken.last_error
+        with open(os.path.join(tmp, 'syslog-dead.jsonl')) as f:
+            assert len(f.readlines()) == 1
+        broken._handler.close()
+
+        assert parse_sink_spec("syslog=logs.local:514") == {"type": "syslog", "address": ["logs.local", 514]}
+        assert parse_sink_spec("file=/tmp/a.jsonl") == {"type": "file", "path": "/tmp/a.jsonl"}
+    server.shutdown()
+    print("Destinos OK")
@@ -1,4 +1,4 @@
 """Database package"""
-from .db import Database, get_db
+from .db import Database, ReadOnlyPool, get_db, get_read_pool, use_database
 
-__all__ = ['Database', 'get_db']
+__all__ = ['Database', 'ReadOnlyPool', 'get_db', 'get_read_pool', 'use_database']
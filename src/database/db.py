@@ -5,12 +5,68 @@ Maneja alertas, historial de métricas y configuración
 import sqlite3
 import os
 import json
+import math
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator, Sequence
 
 # Ruta de la base de datos
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'omnimonitor.db')
 
+# Columnas numéricas de metrics_history consultables desde fuera
+HISTORY_METRICS = (
+    'cpu_usage', 'cpu_temp', 'ram_usage', 'ram_used_gb', 'disk_usage',
+    'disk_read_speed', 'disk_write_speed', 'net_upload', 'net_download',
+    'gpu_usage', 'gpu_temp'
+)
+
+# Columnas de alerts agregadas después de la versión inicial
+ALERT_CONDITION_COLUMNS = {
+    'condition_type': "TEXT DEFAULT 'threshold'",
+    'duration_s': 'REAL DEFAULT 0',
+    'window_s': 'REAL DEFAULT 0',
+    'clear_threshold': 'REAL',
+}
+
+SUMMARY_SQL = '''
+    SELECT 
+        AVG(cpu_usage) as avg_cpu,
+        MAX(cpu_usage) as max_cpu,
+        MIN(cpu_usage) as min_cpu,
+        AVG(ram_usage) as avg_ram,
+        MAX(ram_usage) as max_ram,
+        AVG(cpu_temp) as avg_cpu_temp,
+        MAX(cpu_temp) as max_cpu_temp,
+        COUNT(*) as total_records
+    FROM metrics_history 
+    WHERE timestamp >= datetime('now', '-' || ? || ' hours') AND host IS ?
+'''
+
+
+def hourly_profile_sql(metric: str) -> str:
+    """Consulta del perfil horario de una métrica (validada contra HISTORY_METRICS)"""
+    if metric not in HISTORY_METRICS:
+        raise ValueError(f"Métrica no válida: {metric}")
+    return f'''
+        SELECT CAST(strftime('%H', timestamp) AS INTEGER) AS hour,
+               AVG({metric}), AVG({metric} * {metric}), COUNT({metric})
+        FROM metrics_history
+        WHERE timestamp >= datetime('now', '-' || ? || ' days') AND host IS ?
+        GROUP BY hour
+    '''
+
+
+def hourly_profile(rows) -> Dict[int, tuple]:
+    """Filas (hora, media, media de cuadrados, muestras) -> {hora: (media, desviación, muestras)}"""
+    profile = {}
+    for hour, mean, mean_sq, count in rows:
+        if count:
+            profile[hour] = (mean, math.sqrt(max(mean_sq - mean * mean, 0.0)), count)
+    return profile
+
 
 class Database:
     """Clase principal para manejo de base de datos SQLite"""
@@ -18,6 +74,10 @@ class Database:
     def __init__(self, db_path: str = DB_PATH):
         self.db_path = db_path
         self.conn = None
+        # Se incrementa con cada cambio en la tabla de alertas (recompilar reglas)
+        self.alerts_generation = 0
+        self._config_cache: Optional[Dict[str, str]] = None
+        self._series_ids: Dict[tuple, int] = {}  # (metric, label, value, host) -> id
         self._connect()
         self._create_tables()
     
@@ -25,6 +85,8 @@ class Database:
         """Conectar a la base de datos"""
         self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
         self.conn.row_factory = sqlite3.Row
+        # WAL: los lectores (API, historial) no bloquean al escritor
+        self.conn.execute('PRAGMA journal_mode=WAL')
     
     def _create_tables(self):
         """Crear tablas si no existen"""
@@ -42,10 +104,20 @@ class Database:
                 notify_sound INTEGER DEFAULT 1,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 triggered_count INTEGER DEFAULT 0,
-                last_triggered TIMESTAMP
+                last_triggered TIMESTAMP,
+                condition_type TEXT DEFAULT 'threshold',
+                duration_s REAL DEFAULT 0,
+                window_s REAL DEFAULT 0,
+                clear_threshold REAL
             )
         ''')
         
+        # Migración: condiciones con estado (duración, ventana, histéresis)
+        columns = {row['name'] for row in cursor.execute('PRAGMA table_info(alerts)')}
+        for column, definition in ALERT_CONDITION_COLUMNS.items():
+            if column not in columns:
+                cursor.execute(f'ALTER TABLE alerts ADD COLUMN {column} {definition}')
+        
         # Tabla de Historial de Métricas
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS metrics_history (
@@ -61,10 +133,102 @@ class Database:
                 net_upload REAL,
                 net_download REAL,
                 gpu_usage REAL,
-                gpu_temp REAL
+                gpu_temp REAL,
+                host TEXT
+            )
+        ''')
+        
+        # Migración: columna host (NULL = equipo local, texto = agente remoto)
+        columns = {row['name'] for row in cursor.execute('PRAGMA table_info(metrics_history)')}
+        if 'host' not in columns:
+            cursor.execute('ALTER TABLE metrics_history ADD COLUMN host TEXT')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_metrics_history_timestamp
+            ON metrics_history (timestamp)
+        ''')
+        
+        # Un agente que reintenta un lote ya guardado no duplica filas
+        cursor.execute('''
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_metrics_history_host_timestamp
+            ON metrics_history (host, timestamp) WHERE host IS NOT NULL
+        ''')
+        
+        # Registro de eventos de alerta (solo inserciones)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS alert_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                alert_id INTEGER NOT NULL,
+                alert_name TEXT NOT NULL,
+                metric TEXT NOT NULL,
+                started_at TIMESTAMP NOT NULL,
+                ended_at TIMESTAMP,
+                duration_s REAL,
+                peak_value REAL
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_alert_events_started
+            ON alert_events (started_at)
+        ''')
+        
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_alert_events_alert_started
+            ON alert_events (alert_id, started_at)
+        ''')
+        
+        # Capturas de ráfaga (muestreo a 10-100 Hz, ver src/core/burst.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS burst_captures (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                started_at TIMESTAMP NOT NULL,
+                reason TEXT,
+                rate_hz REAL NOT NULL,
+                duration_s REAL NOT NULL,
+                samples INTEGER NOT NULL,
+                columns TEXT NOT NULL,
+                stats TEXT,
+                data BLOB NOT NULL
+            )
+        ''')
+        
+        # Series etiquetadas (por núcleo, partición, interfaz): catálogo + muestras estrechas
+        # host = '' para el equipo local (UNIQUE no agrupa NULLs)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS series (
+                id INTEGER PRIMARY KEY,
+                metric TEXT NOT NULL,
+                label TEXT NOT NULL,
+                value TEXT NOT NULL,
+                host TEXT NOT NULL DEFAULT '',
+                UNIQUE (metric, label, value, host)
             )
         ''')
         
+        # Una fila por muestra; la clave (serie, ts) hace que leer una serie sea un rango contiguo
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS series_samples (
+                series_id INTEGER NOT NULL,
+                ts INTEGER NOT NULL,
+                value REAL,
+                PRIMARY KEY (series_id, ts)
+            ) WITHOUT ROWID
+        ''')
+        
+        # Agregados por hora, mantenidos al escribir: rankings de días sin recorrer muestras
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS series_hourly (
+                series_id INTEGER NOT NULL,
+                hour INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                sum REAL NOT NULL,
+                min REAL,
+                max REAL,
+                PRIMARY KEY (series_id, hour)
+            ) WITHOUT ROWID
+        ''')
+        
         # Tabla de Configuración
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS config (
@@ -82,7 +246,13 @@ class Database:
             'enable_notifications': 'true',
             'enable_sounds': 'true',
             'start_minimized': 'false',
-            'language': 'es'
+            'language': 'es',
+            'enable_diagnostics': 'false',  # Autodiagnóstico (src/core/instrumentation.py)
+            'burst_on_alert': 'false',      # Ráfaga de muestreo al disparar una alerta (src/core/burst.py)
+            'history_backend': 'sqlite',    # 'sqlite' o 'tsdb' (src/database/tsdb.py, requiere reiniciar)
+            'persist_series': 'true',       # Historial por núcleo/partición/interfaz (tabla series)
+            'ingest_token': '',             # Token compartido para POST /api/ingest (colector --ingest)
+            'alert_sinks': '[]'  # Destinos externos de alertas (lista JSON, ver src/crud/sinks.py)
         }
         
         for key, value in default_config.items():
@@ -100,14 +270,19 @@ class Database:
     # ==================== CRUD ALERTAS ====================
     
     def create_alert(self, name: str, metric: str, operator: str, threshold: float,
-                     enabled: bool = True, notify_sound: bool = True) -> int:
+                     enabled: bool = True, notify_sound: bool = True,
+                     condition_type: str = 'threshold', duration_s: float = 0,
+                     window_s: float = 0, clear_threshold: float = None) -> int:
         """Crear nueva alerta"""
         cursor = self.conn.cursor()
         cursor.execute('''
-            INSERT INTO alerts (name, metric, operator, threshold, enabled, notify_sound)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (name, metric, operator, threshold, int(enabled), int(notify_sound)))
+            INSERT INTO alerts (name, metric, operator, threshold, enabled, notify_sound,
+                                condition_type, duration_s, window_s, clear_threshold)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (name, metric, operator, threshold, int(enabled), int(notify_sound),
+              condition_type, duration_s, window_s, clear_threshold))
         self.conn.commit()
+        self.alerts_generation += 1
         return cursor.lastrowid
     
     def get_alerts(self, only_enabled: bool = False) -> List[Dict]:
@@ -128,7 +303,8 @@ class Database:
     
     def update_alert(self, alert_id: int, **kwargs) -> bool:
         """Actualizar alerta"""
-        allowed_fields = ['name', 'metric', 'operator', 'threshold', 'enabled', 'notify_sound']
+        allowed_fields = ['name', 'metric', 'operator', 'threshold', 'enabled', 'notify_sound',
+                          'condition_type', 'duration_s', 'window_s', 'clear_threshold']
         updates = {k: v for k, v in kwargs.items() if k in allowed_fields}
         
         if not updates:
@@ -140,6 +316,7 @@ class Database:
         cursor = self.conn.cursor()
         cursor.execute(f'UPDATE alerts SET {set_clause} WHERE id = ?', values)
         self.conn.commit()
+        self.alerts_generation += 1
         return cursor.rowcount > 0
     
     def delete_alert(self, alert_id: int) -> bool:
@@ -147,6 +324,7 @@ class Database:
         cursor = self.conn.cursor()
         cursor.execute('DELETE FROM alerts WHERE id = ?', (alert_id,))
         self.conn.commit()
+        self.alerts_generation += 1
         return cursor.rowcount > 0
     
     def trigger_alert(self, alert_id: int):
@@ -159,6 +337,147 @@ class Database:
         ''', (alert_id,))
         self.conn.commit()
     
+    def get_alert_events(self, limit: int = 50, alert_id: int = None) -> List[Dict]:
+        """Eventos de alerta más recientes (opcionalmente de una sola alerta)"""
+        cursor = self.conn.cursor()
+        if alert_id is None:
+            cursor.execute('''
+                SELECT * FROM alert_events ORDER BY started_at DESC LIMIT ?
+            ''', (limit,))
+        else:
+            cursor.execute('''
+                SELECT * FROM alert_events WHERE alert_id = ?
+                ORDER BY started_at DESC LIMIT ?
+            ''', (alert_id, limit))
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def get_alert_event_stats(self, hours: int = 24) -> Dict[int, Dict]:
+        """Eventos, tiempo medio de recuperación (MTTR) y pico por alerta"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT alert_id,
+                   COUNT(*) as events,
+                   AVG(duration_s) as mttr_s,
+                   MAX(duration_s) as max_duration_s,
+                   MAX(started_at) as last_started
+            FROM alert_events
+            WHERE started_at >= datetime('now', '-' || ? || ' hours')
+            GROUP BY alert_id
+        ''', (hours,))
+        return {row['alert_id']: dict(row) for row in cursor.fetchall()}
+    
+    def write_batch(self, metrics: Sequence[Dict] = (), alert_events: Sequence[Dict] = (),
+                    triggers: Dict[int, tuple] = None, series: Sequence[tuple] = ()):
+        """
+        Escribir en una sola transacción lo acumulado por HistoryWriter
+        - metrics: filas de historial local
+        - alert_events: eventos de alerta cerrados
+        - triggers: {alert_id: (veces, último timestamp)}
+        - series: muestras etiquetadas (metric, label, value_label, ts epoch, valor)
+        """
+        with self.conn:
+            if series:
+                self._write_series(series)
+            if metrics:
+                columns = ('timestamp',) + HISTORY_METRICS
+                self.conn.executemany(f'''
+                    INSERT INTO metrics_history ({', '.join(columns)})
+                    VALUES ({', '.join('?' * len(columns))})
+                ''', [tuple(row.get(c) for c in columns) for row in metrics])
+            if alert_events:
+                self.conn.executemany('''
+                    INSERT INTO alert_events
+                    (alert_id, alert_name, metric, started_at, ended_at, duration_s, peak_value)
+                    VALUES (:alert_id, :alert_name, :metric, :started_at, :ended_at, :duration_s, :peak_value)
+                ''', alert_events)
+            if triggers:
+                self.conn.executemany('''
+                    UPDATE alerts
+                    SET triggered_count = triggered_count + ?, last_triggered = ?
+                    WHERE id = ?
+                ''', [(count, last, alert_id) for alert_id, (count, last) in triggers.items()])
+    
+    def _series_id(self, metric: str, label: str, value: str, host: str = '') -> int:
+        """Id de una serie (la crea si no existe); cacheado en memoria"""
+        key = (metric, label, value, host)
+        series_id = self._series_ids.get(key)
+        if series_id is None:
+            self.conn.execute(
+                'INSERT OR IGNORE INTO series (metric, label, value, host) VALUES (?, ?, ?, ?)', key)
+            series_id = self.conn.execute(
+                'SELECT id FROM series WHERE metric = ? AND label = ? AND value = ? AND host = ?', key
+            ).fetchone()[0]
+            self._series_ids[key] = series_id
+        return series_id
+    
+    def _write_series(self, series: Sequence[tuple], host: str = ''):
+        """
+        Muestras + agregados por hora (dentro de la transacción de write_batch)
+        Una muestra repetida (misma serie y segundo) se ignora y no vuelve a
+        sumarse en series_hourly.
+        """
+        hourly: Dict[tuple, list] = {}
+        for metric, label, label_value, ts, value in series:
+            if value is None:
+                continue
+            series_id = self._series_id(metric, label, str(label_value), host)
+            ts = int(ts)
+            inserted = self.conn.execute(
+                'INSERT OR IGNORE INTO series_samples (series_id, ts, value) VALUES (?, ?, ?)',
+                (series_id, ts, value)).rowcount
+            if not inserted:
+                continue
+            agg = hourly.get((series_id, ts - ts % 3600))
+            if agg is None:
+                hourly[(series_id, ts - ts % 3600)] = [1, value, value, value]
+            else:
+                agg[0] += 1
+                agg[1] += value
+                agg[2] = min(agg[2], value)
+                agg[3] = max(agg[3], value)
+        self.conn.executemany('''
+            INSERT INTO series_hourly (series_id, hour, count, sum, min, max) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (series_id, hour) DO UPDATE SET
+                count = count + excluded.count,
+                sum = sum + excluded.sum,
+                min = MIN(min, excluded.min),
+                max = MAX(max, excluded.max)
+        ''', [key + tuple(agg) for key, agg in hourly.items()])
+    
+    # ==================== CAPTURAS DE RÁFAGA ====================
+    
+    def save_burst_capture(self, row: Dict) -> int:
+        """Guardar una captura (columns y stats como JSON, data comprimida)"""
+        with self.conn:
+            cursor = self.conn.execute('''
+                INSERT INTO burst_captures
+                (started_at, reason, rate_hz, duration_s, samples, columns, stats, data)
+                VALUES (:started_at, :reason, :rate_hz, :duration_s, :samples, :columns, :stats, :data)
+            ''', row)
+        return cursor.lastrowid
+    
+    def get_burst_captures(self, limit: int = 20) -> List[Dict]:
+        """Capturas más recientes, sin los datos"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT id, started_at, reason, rate_hz, duration_s, samples, stats, length(data) as size_bytes
+            FROM burst_captures ORDER BY started_at DESC, id DESC LIMIT ?
+        ''', (limit,))
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def get_burst_capture(self, capture_id: int) -> Optional[Dict]:
+        """Una captura completa (con el blob de datos)"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT * FROM burst_captures WHERE id = ?', (capture_id,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    
+    def delete_burst_capture(self, capture_id: int) -> bool:
+        """Eliminar una captura"""
+        with self.conn:
+            cursor = self.conn.execute('DELETE FROM burst_captures WHERE id = ?', (capture_id,))
+        return cursor.rowcount > 0
+    
     # ==================== CRUD HISTORIAL ====================
     
     def save_metrics(self, cpu_usage: float = None, cpu_temp: float = None,
@@ -181,36 +500,51 @@ class Database:
         self.conn.commit()
         return cursor.lastrowid
     
-    def get_metrics_history(self, hours: int = 1, limit: int = 1000) -> List[Dict]:
-        """Obtener historial de métricas de las últimas N horas"""
+    def save_metrics_batch(self, host: str, rows: Sequence[Dict]) -> int:
+        """
+        Guardar un lote de métricas de un host remoto en una sola transacción
+        Cada fila: {'timestamp': 'YYYY-MM-DD HH:MM:SS[.fff]', <HISTORY_METRICS>...}
+        Las filas ya guardadas (mismo host y timestamp) se ignoran.
+        """
+        columns = ('timestamp',) + HISTORY_METRICS + ('host',)
+        values = [
+            tuple(row.get(c) for c in columns[:-1]) + (host,)
+            for row in rows
+        ]
+        with self.conn:
+            cursor = self.conn.executemany(f'''
+                INSERT OR IGNORE INTO metrics_history ({', '.join(columns)})
+                VALUES ({', '.join('?' * len(columns))})
+            ''', values)
+        return cursor.rowcount
+    
+    def get_metrics_history(self, hours: int = 1, limit: int = 1000, host: str = None) -> List[Dict]:
+        """Obtener historial de métricas de las últimas N horas (host=None: equipo local)"""
         cursor = self.conn.cursor()
         cursor.execute('''
             SELECT * FROM metrics_history 
-            WHERE timestamp >= datetime('now', '-' || ? || ' hours')
+            WHERE timestamp >= datetime('now', '-' || ? || ' hours') AND host IS ?
             ORDER BY timestamp DESC
             LIMIT ?
-        ''', (hours, limit))
+        ''', (hours, host, limit))
         return [dict(row) for row in cursor.fetchall()]
     
-    def get_metrics_summary(self, hours: int = 24) -> Dict:
+    def get_metrics_summary(self, hours: int = 24, host: str = None) -> Dict:
         """Obtener resumen estadístico de métricas"""
         cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT 
-                AVG(cpu_usage) as avg_cpu,
-                MAX(cpu_usage) as max_cpu,
-                MIN(cpu_usage) as min_cpu,
-                AVG(ram_usage) as avg_ram,
-                MAX(ram_usage) as max_ram,
-                AVG(cpu_temp) as avg_cpu_temp,
-                MAX(cpu_temp) as max_cpu_temp,
-                COUNT(*) as total_records
-            FROM metrics_history 
-            WHERE timestamp >= datetime('now', '-' || ? || ' hours')
-        ''', (hours,))
+        cursor.execute(SUMMARY_SQL, (hours, host))
         row = cursor.fetchone()
         return dict(row) if row else {}
     
+    def get_hourly_profile(self, metric: str, days: int = 7, host: str = None) -> Dict[int, tuple]:
+        """
+        Perfil por hora del día (UTC) de una métrica: {hora: (media, desviación, muestras)}
+        Base de la línea estacional del detector de anomalías.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute(hourly_profile_sql(metric), (days, host))
+        return hourly_profile(cursor.fetchall())
+    
     def cleanup_old_metrics(self, days: int = 7) -> int:
         """Eliminar métricas más antiguas que N días"""
         cursor = self.conn.cursor()
@@ -218,8 +552,16 @@ class Database:
             DELETE FROM metrics_history 
             WHERE timestamp < datetime('now', '-' || ? || ' days')
         ''', (days,))
+        deleted = cursor.rowcount
+        cursor.execute('''
+            DELETE FROM burst_captures
+            WHERE started_at < datetime('now', '-' || ? || ' days')
+        ''', (days,))
+        cutoff = int(time.time()) - int(days) * 86400
+        cursor.execute('DELETE FROM series_samples WHERE ts < ?', (cutoff,))
+        cursor.execute('DELETE FROM series_hourly WHERE hour < ?', (cutoff - cutoff % 3600,))
         self.conn.commit()
-        return cursor.rowcount
+        return deleted
     
     def get_metrics_count(self) -> int:
         """Obtener cantidad total de registros"""
@@ -230,17 +572,20 @@ class Database:
     # ==================== CRUD CONFIGURACIÓN ====================
     
     def get_config(self, key: str, default: str = None) -> Optional[str]:
-        """Obtener valor de configuración"""
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT value FROM config WHERE key = ?', (key,))
-        row = cursor.fetchone()
-        return row['value'] if row else default
+        """Obtener valor de configuración (desde caché en memoria)"""
+        return self._load_config().get(key, default)
     
     def get_all_config(self) -> Dict[str, str]:
         """Obtener toda la configuración"""
-        cursor = self.conn.cursor()
-        cursor.execute('SELECT key, value FROM config')
-        return {row['key']: row['value'] for row in cursor.fetchall()}
+        return dict(self._load_config())
+    
+    def _load_config(self) -> Dict[str, str]:
+        """Leer la tabla config una vez; se invalida al modificarla"""
+        if self._config_cache is None:
+            cursor = self.conn.cursor()
+            cursor.execute('SELECT key, value FROM config')
+            self._config_cache = {row['key']: row['value'] for row in cursor.fetchall()}
+        return self._config_cache
     
     def set_config(self, key: str, value: str) -> bool:
         """Establecer/actualizar configuración"""
@@ -250,6 +595,7 @@ class Database:
             VALUES (?, ?, CURRENT_TIMESTAMP)
         ''', (key, value))
         self.conn.commit()
+        self._config_cache = None
         return True
     
     def delete_config(self, key: str) -> bool:
@@ -257,6 +603,7 @@ class Database:
         cursor = self.conn.cursor()
         cursor.execute('DELETE FROM config WHERE key = ?', (key,))
         self.conn.commit()
+        self._config_cache = None
         return cursor.rowcount > 0
     
     def reset_config(self):
@@ -264,11 +611,189 @@ class Database:
         cursor = self.conn.cursor()
         cursor.execute('DELETE FROM config')
         self.conn.commit()
+        self._config_cache = None
         self._create_tables()  # Re-crear con valores por defecto
 
 
+class ReadOnlyPool:
+    """
+    Pool de conexiones SQLite de solo lectura, separado del escritor
+    Usado por la API para consultar historial sin competir con la conexión
+    del loop de métricas.
+    """
+    
+    MAX_POINTS = 1000  # Máximo de puntos devueltos por consulta
+    FETCH_SIZE = 256   # Filas por lote al hacer streaming
+    
+    def __init__(self, db_path: str = DB_PATH, size: int = 4):
+        self.db_path = db_path
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=size)
+        self._created = 0
+        self._size = size
+        self._lock = threading.Lock()
+    
+    def _open(self) -> sqlite3.Connection:
+        """Abrir una conexión de solo lectura"""
+        if not os.path.exists(self.db_path):
+            Database(self.db_path).close()  # Crear esquema la primera vez
+        conn = sqlite3.connect(f'file:{self.db_path}?mode=ro', uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Tomar una conexión del pool (la crea si aún no se alcanzó el tamaño)"""
+        conn = None
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                if self._created < self._size:
+                    self._created += 1
+                    conn = self._open()
+            if conn is None:
+                conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+    
+    @classmethod
+    def choose_step(cls, start: float, end: float, step: int = 0) -> int:
+        """
+        Elegir el paso de downsampling (segundos) para no superar MAX_POINTS
+        Los buckets se alinean a epoch, así que una ventana de W segundos toca
+        hasta ceil(W / step) + 1 buckets: se divide entre MAX_POINTS - 1.
+        """
+        window = max(math.ceil(end) - math.floor(start), 1)  # Rango que consulta el SQL
+        step = min(step or 0, window)  # Un paso mayor que la ventana no cabe en SQLite
+        return max(int(step), math.ceil(window / (cls.MAX_POINTS - 1)), 1)
+    
+    def iter_history(self, metrics: Sequence[str], start: float, end: float,
+                     step: int, host: str = None) -> Iterator[tuple]:
+        """
+        Iterar puntos agregados por bucket de `step` segundos
+        Cada punto: (epoch, avg_m1, max_m1, avg_m2, max_m2, ...)
+        """
+        invalid = [m for m in metrics if m not in HISTORY_METRICS]
+        if invalid or not metrics:
+            raise ValueError(f"Métrica no válida: {', '.join(invalid) or '(vacía)'}")
+        
+        aggregates = ', '.join(f'AVG({m}), MAX({m})' for m in metrics)
+        sql = f'''
+            SELECT (CAST(strftime('%s', timestamp) AS INTEGER) / ?) * ? AS bucket, {aggregates}
+            FROM metrics_history
+            WHERE timestamp >= datetime(?, 'unixepoch') AND timestamp < datetime(?, 'unixepoch')
+              AND host IS ?
+            GROUP BY bucket
+            ORDER BY bucket
+            LIMIT ?
+        '''
+        with self.connection() as conn:
+            cursor = conn.execute(sql, (step, step, int(start), int(math.ceil(end)), host,
+                                        self.MAX_POINTS))
+            while True:
+                rows = cursor.fetchmany(self.FETCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    yield tuple(row)
+    
+    def get_summary(self, hours: int = 24, host: str = None) -> Dict:
+        """Resumen estadístico (mismo formato que Database.get_metrics_summary)"""
+        with self.connection() as conn:
+            row = conn.execute(SUMMARY_SQL, (hours, host)).fetchone()
+            return dict(row) if row else {}
+    
+    def get_hourly_profile(self, metric: str, days: int = 7, host: str = None) -> Dict[int, tuple]:
+        """Perfil horario (mismo formato que Database.get_hourly_profile)"""
+        with self.connection() as conn:
+            return hourly_profile(conn.execute(hourly_profile_sql(metric), (days, host)).fetchall())
+    
+    def get_series(self, metric: str = None, host: str = None) -> List[Dict]:
+        """Catálogo de series etiquetadas (sin leer muestras)"""
+        sql = 'SELECT id, metric, label, value FROM series WHERE host = ?'
+        params: list = [host or '']
+        if metric:
+            sql += ' AND metric = ?'
+            params.append(metric)
+        with self.connection() as conn:
+            return [dict(row) for row in conn.execute(sql + ' ORDER BY metric, label, value', params)]
+    
+    def rank_series(self, metric: str, start: float, end: float, order: str = 'avg',
+                    limit: int = 10, host: str = None) -> List[Dict]:
+        """
+        Qué núcleo/partición/interfaz destacó en [start, end): media, máximo y
+        mínimo por etiqueta desde los agregados por hora (resolución de 1 h)
+        """
+        if order not in ('avg', 'max', 'min'):
+            raise ValueError(f"Orden no válido: {order}")
+        start_hour = int(start) - int(start) % 3600
+        with self.connection() as conn:
+            rows = conn.execute(f'''
+                SELECT s.label, s.value,
+                       SUM(h.sum) / SUM(h.count) AS avg, MAX(h.max) AS max, MIN(h.min) AS min,
+                       SUM(h.count) AS samples
+                FROM series s JOIN series_hourly h ON h.series_id = s.id
+                WHERE s.metric = ? AND s.host = ? AND h.hour >= ? AND h.hour < ?
+                GROUP BY s.id
+                ORDER BY {order} {'ASC' if order == 'min' else 'DESC'}
+                LIMIT ?
+            ''', (metric, host or '', start_hour, int(math.ceil(end)), limit)).fetchall()
+            return [dict(row) for row in rows]
+    
+    def iter_series(self, metric: str, label_value: str, start: float, end: float,
+                    step: int, host: str = None) -> Iterator[tuple]:
+        """Puntos (epoch, avg, max) de una sola serie: un rango de su clave primaria"""
+        with self.connection() as conn:
+            row = conn.execute('SELECT id FROM series WHERE metric = ? AND value = ? AND host = ?',
+                               (metric, str(label_value), host or '')).fetchone()
+            if row is None:
+                return
+            cursor = conn.execute('''
+                SELECT (ts / ?) * ? AS bucket, AVG(value), MAX(value)
+                FROM series_samples
+                WHERE series_id = ? AND ts >= ? AND ts < ?
+                GROUP BY bucket ORDER BY bucket LIMIT ?
+            ''', (step, step, row[0], int(start), int(math.ceil(end)), self.MAX_POINTS))
+            while True:
+                rows = cursor.fetchmany(self.FETCH_SIZE)
+                if not rows:
+                    break
+                for point in rows:
+                    yield tuple(point)
+    
+    def get_hosts(self) -> List[Dict]:
+        """Hosts remotos (agentes) con historial y su última muestra"""
+        with self.connection() as conn:
+            rows = conn.execute('''
+                SELECT host, COUNT(*) as records, MAX(timestamp) as last_seen
+                FROM metrics_history WHERE host IS NOT NULL
+                GROUP BY host ORDER BY host
+            ''').fetchall()
+            return [dict(row) for row in rows]
+    
+    def get_alert_counts(self) -> List[Dict]:
+        """Contadores de disparo por alerta"""
+        with self.connection() as conn:
+            rows = conn.execute(
+                'SELECT id, name, metric, triggered_count FROM alerts ORDER BY id'
+            ).fetchall()
+            return [dict(row) for row in rows]
+    
+    def close(self):
+        """Cerrar todas las conexiones inactivas"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+        self._created = 0
+
+
 # Instancia global
 _db_instance: Optional[Database] = None
+_read_pool: Optional[ReadOnlyPool] = None
 
 
 def get_db() -> Database:
@@ -279,6 +804,25 @@ def get_db() -> Database:
     return _db_instance
 
 
+def get_read_pool() -> ReadOnlyPool:
+    """Obtener pool de lectura (singleton)"""
+    global _read_pool
+    if _read_pool is None:
+        _read_pool = ReadOnlyPool()
+    return _read_pool
+
+
+def use_database(db_path: str):
+    """Apuntar get_db() y get_read_pool() a otra base de datos (tests, benchmarks)"""
+    global _db_instance, _read_pool
+    if _db_instance is not None:
+        _db_instance.close()
+    if _read_pool is not None:
+        _read_pool.close()
+    _db_instance = Database(db_path)
+    _read_pool = ReadOnlyPool(db_path)
+
+
 if __name__ == "__main__":
     # Test
     db = get_db()
@@ -295,4 +839,10 @@ if __name__ == "__main__":
     # Test config
     print(f"Config: {db.get_all_config()}")
     
+    # Test downsampling: los buckets alineados a epoch nunca superan MAX_POINTS
+    for start, end in ((7, 1_000_007), (1000.5, 2000.5), (123456.7, 123456.7 + 86400)):
+        step = ReadOnlyPool.choose_step(start, end)
+        buckets = (math.ceil(end) - 1) // step - math.floor(start) // step + 1
+        assert buckets <= ReadOnlyPool.MAX_POINTS, (start, end, step, buckets)
+    
     db.close()
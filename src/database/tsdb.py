@@ -0,0 +1,841 @@
+"""
+Almacén de series temporales comprimido para OmniMonitor
+Alternativa a la tabla `metrics_history` (una fila ancha por muestra,
+~100+ bytes antes de índices): almacenamiento por columnas, solo de
+anexado, en chunks comprimidos al estilo Gorilla.
+
+- Timestamps (ms): delta de deltas con prefijos de longitud variable; con
+  un intervalo regular cada muestra ocupa 1 bit.
+- Valores (float64): XOR con el valor anterior; un valor repetido ocupa
+  1 bit y uno parecido solo sus bits significativos. Los huecos (None)
+  se guardan como NaN.
+
+Disposición en disco (un directorio por host, "_local" para el equipo):
+
+    <raíz>/<host>/head.log          muestras aún sin sellar (float64 crudos)
+    <raíz>/<host>/YYYY-MM-DD.tsc    chunks sellados de ese día (UTC)
+
+Cada `.tsc` empieza con la lista de columnas y sigue con chunks:
+cabecera (muestras, t_min, t_max, longitud de cada columna) + flujo de
+timestamps + un flujo por columna. Una consulta solo decodifica los chunks
+que solapan el rango y solo las columnas pedidas, leyendo con mmap. La
+retención borra archivos de días completos.
+
+Uso:
+    python -m src.database.tsdb migrate [--db omnimonitor.db] [--out DIR]
+    python -m src.database.tsdb stats [--out DIR]
+"""
+import argparse
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.database.db import DB_PATH, HISTORY_METRICS
+
+DEFAULT_TSDB_DIR = os.path.join(os.path.dirname(DB_PATH), 'omnimonitor.tsdb')
+LOCAL_HOST = '_local'
+
+FILE_MAGIC = b'OMTS'
+CHUNK_MAGIC = b'CH'
+FORMAT_VERSION = 1
+SEGMENT_SUFFIX = '.tsc'
+
+_FILE_HEADER = struct.Struct('<4sBH')      # magic, versión, nº de columnas
+_CHUNK_HEADER = struct.Struct('<2sIqqI')   # magic, muestras, t_min, t_max, bytes de timestamps
+_U32 = struct.Struct('<I')
+
+_NAN_BITS = 0x7FF8000000000000
+_MASK64 = (1 << 64) - 1
+_HOST_RE = re.compile(r'[^A-Za-z0-9._-]')
+
+
+# ==================== BITS ====================
+
+class BitWriter:
+    """Escritura de bits MSB primero sobre un bytearray"""
+
+    __slots__ = ('out', '_acc', '_bits')
+
+    def __init__(self):
+        self.out = bytearray()
+        self._acc = 0
+        self._bits = 0
+
+    def write(self, value: int, bits: int):
+        self._acc = (self._acc << bits) | (value & ((1 << bits) - 1))
+        self._bits += bits
+        while self._bits >= 8:
+            self._bits -= 8
+            self.out.append((self._acc >> self._bits) & 0xFF)
+        self._acc &= (1 << self._bits) - 1
+
+    def getvalue(self) -> bytes:
+        if self._bits:
+            return bytes(self.out) + bytes([(self._acc << (8 - self._bits)) & 0xFF])
+        return bytes(self.out)
+
+
+class BitReader:
+    """Lectura de bits MSB primero (ventana de 9 bytes: hasta 64 bits por lectura)"""
+
+    __slots__ = ('data', 'pos')
+
+    def __init__(self, data: bytes):
+        self.data = bytes(data) + b'\0' * 9
+        self.pos = 0
+
+    def read_bit(self) -> int:
+        pos = self.pos
+        self.pos = pos + 1
+        return (self.data[pos >> 3] >> (7 - (pos & 7))) & 1
+
+    def read(self, bits: int) -> int:
+        pos = self.pos
+        start = pos >> 3
+        window = int.from_bytes(self.data[start:start + 9], 'big')
+        self.pos = pos + bits
+        return (window >> (72 - (pos & 7) - bits)) & ((1 << bits) - 1)
+
+
+# ==================== GORILLA ====================
+
+# (prefijo, bits del prefijo, bits del valor) para el delta de deltas
+_DOD_BUCKETS = ((0b10, 2, 7), (0b110, 3, 9), (0b1110, 4, 12))
+
+
+def encode_timestamps(values: Sequence[int]) -> bytes:
+    """Timestamps enteros (ms) -> delta de deltas"""
+    writer = BitWriter()
+    prev = prev_delta = 0
+    for i, value in enumerate(values):
+        if i == 0:
+            writer.write(value & _MASK64, 64)
+        else:
+            delta = value - prev
+            dod = delta - prev_delta
+            if dod == 0:
+                writer.write(0, 1)
+            else:
+                for prefix, prefix_bits, bits in _DOD_BUCKETS:
+                    if -(1 << (bits - 1)) <= dod < (1 << (bits - 1)):
+                        writer.write(prefix, prefix_bits)
+                        writer.write(dod, bits)
+                        break
+                else:
+                    writer.write(0b1111, 4)
+                    writer.write(dod & _MASK64, 64)
+            prev_delta = delta
+        prev = value
+    return writer.getvalue()
+
+
+def _signed(value: int, bits: int) -> int:
+    return value - (1 << bits) if value >= 1 << (bits - 1) else value
+
+
+def decode_timestamps(data: bytes, count: int) -> List[int]:
+    """Inversa de encode_timestamps"""
+    if not count:
+        return []
+    reader = BitReader(data)
+    value = _signed(reader.read(64), 64)
+    out = [value]
+    delta = 0
+    for _ in range(count - 1):
+        if reader.read_bit():
+            if not reader.read_bit():
+                dod = _signed(reader.read(7), 7)
+            elif not reader.read_bit():
+                dod = _signed(reader.read(9), 9)
+            elif not reader.read_bit():
+                dod = _signed(reader.read(12), 12)
+            else:
+                dod = _signed(reader.read(64), 64)
+            delta += dod
+        value += delta
+        out.append(value)
+    return out
+
+
+def _float_bits(value: Optional[float]) -> int:
+    if value is None or value != value:
+        return _NAN_BITS
+    return struct.unpack('<Q', struct.pack('<d', value))[0]
+
+
+def encode_floats(values: Sequence[Optional[float]]) -> bytes:
+    """Valores float64 (None = hueco) -> XOR con el anterior"""
+    writer = BitWriter()
+    prev = 0
+    prev_lead, prev_trail = 65, 0   # Sin ventana previa
+    for i, value in enumerate(values):
+        bits = _float_bits(value)
+        if i == 0:
+            writer.write(bits, 64)
+            prev = bits
+            continue
+        xor = bits ^ prev
+        prev = bits
+        if xor == 0:
+            writer.write(0, 1)
+            continue
+        lead = min(64 - xor.bit_length(), 31)
+        trail = (xor & -xor).bit_length() - 1
+        if lead >= prev_lead and trail >= prev_trail:
+            # Cabe en la ventana anterior: solo los bits significativos
+            writer.write(0b10, 2)
+            writer.write(xor >> prev_trail, 64 - prev_lead - prev_trail)
+        else:
+            meaningful = 64 - lead - trail
+            writer.write(0b11, 2)
+            writer.write(lead, 5)
+            writer.write(meaningful & 63, 6)  # 64 se guarda como 0
+            writer.write(xor >> trail, meaningful)
+            prev_lead, prev_trail = lead, trail
+    return writer.getvalue()
+
+
+def decode_floats(data: bytes, count: int) -> List[Optional[float]]:
+    """Inversa de encode_floats (NaN -> None)"""
+    if not count:
+        return []
+    # Lectura en línea (sin BitReader): es el bucle caliente de las consultas
+    data = bytes(data) + b'\0' * 9
+    from_bytes = int.from_bytes
+    unpack = struct.Struct('<d').unpack
+    pack = struct.Struct('<Q').pack
+    bits = from_bytes(data[:8], 'big')
+    out = [None if bits == _NAN_BITS else unpack(pack(bits))[0]]
+    pos = 64
+    lead = trail = 0
+    for _ in range(count - 1):
+        # Control (hasta 13 bits: '0' | '10' | '11' + lead(5) + significativos(6))
+        byte = pos >> 3
+        head = (from_bytes(data[byte:byte + 3], 'big') >> (11 - (pos & 7))) & 0x1FFF
+        if not head & 0x1000:
+            out.append(out[-1])
+            pos += 1
+            continue
+        if head & 0x800:
+            lead = (head >> 6) & 0x1F
+            trail = 64 - lead - ((head & 0x3F) or 64)
+            pos += 13
+        else:
+            pos += 2
+        width = 64 - lead - trail
+        byte = pos >> 3
+        window = from_bytes(data[byte:byte + 9], 'big')
+        bits ^= ((window >> (72 - (pos & 7) - width)) & ((1 << width) - 1)) << trail
+        pos += width
+        out.append(None if bits == _NAN_BITS else unpack(pack(bits))[0])
+    return out
+
+
+# ==================== TIEMPO ====================
+
+def timestamp_to_ms(value) -> int:
+    """'YYYY-MM-DD HH:MM:SS[.fff]' (UTC, como CURRENT_TIMESTAMP) o epoch -> ms"""
+    if isinstance(value, (int, float)):
+        return int(round(value * 1000))
+    text = str(value).replace('T', ' ').rstrip('Z')
+    fmt = '%Y-%m-%d %H:%M:%S.%f' if '.' in text else '%Y-%m-%d %H:%M:%S'
+    return int(round(datetime.strptime(text, fmt).replace(tzinfo=timezone.utc).timestamp() * 1000))
+
+
+def ms_to_timestamp(ms: int) -> str:
+    """ms -> 'YYYY-MM-DD HH:MM:SS' (mismo formato que la tabla)"""
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _day_of(ms: int) -> str:
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).strftime('%Y-%m-%d')
+
+
+# ==================== CHUNKS Y SEGMENTOS ====================
+
+def encode_chunk(timestamps: Sequence[int], columns: Sequence[Sequence[Optional[float]]]) -> bytes:
+    """Chunk sellado: cabecera + timestamps + una columna comprimida por métrica"""
+    ts_data = encode_timestamps(timestamps)
+    col_data = [encode_floats(values) for values in columns]
+    parts = [_CHUNK_HEADER.pack(CHUNK_MAGIC, len(timestamps), timestamps[0], timestamps[-1], len(ts_data))]
+    parts.extend(_U32.pack(len(data)) for data in col_data)
+    parts.append(ts_data)
+    parts.extend(col_data)
+    return b''.join(parts)
+
+
+class ChunkRef:
+    """Posición de un chunk dentro de un segmento (índice en memoria)"""
+
+    __slots__ = ('segment', 'offset', 'count', 't_min', 't_max', 'ts_len', 'col_lens', 'size')
+
+    def __init__(self, segment: 'Segment', offset: int, count: int, t_min: int, t_max: int,
+                 ts_len: int, col_lens: Tuple[int, ...]):
+        self.segment = segment
+        self.offset = offset
+        self.count = count
+        self.t_min = t_min
+        self.t_max = t_max
+        self.ts_len = ts_len
+        self.col_lens = col_lens
+        self.size = _CHUNK_HEADER.size + _U32.size * len(col_lens) + ts_len + sum(col_lens)
+
+    def read(self, column_indexes: Sequence[int]) -> Tuple[List[int], List[List[Optional[float]]]]:
+        """Decodificar timestamps y solo las columnas pedidas"""
+        view = self.segment.view()
+        base = self.offset + _CHUNK_HEADER.size + _U32.size * len(self.col_lens)
+        timestamps = decode_timestamps(view[base:base + self.ts_len], self.count)
+        starts = [base + self.ts_len]
+        for length in self.col_lens[:-1]:
+            starts.append(starts[-1] + length)
+        columns = [decode_floats(view[starts[i]:starts[i] + self.col_lens[i]], self.count)
+                   for i in column_indexes]
+        return timestamps, columns
+
+
+class Segment:
+    """Archivo de chunks de un día; lecturas vía mmap (se rehace si el archivo creció)"""
+
+    def __init__(self, path: str, columns: Sequence[str]):
+        self.path = path
+        self.columns = tuple(columns)
+        self.chunks: List[ChunkRef] = []
+        self._map: Optional[mmap.mmap] = None
+        self._mapped_size = 0
+        self._lock = threading.Lock()
+        header = self._file_header()
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, 'wb') as f:
+                f.write(header)
+        self._scan()
+
+    def _file_header(self) -> bytes:
+        names = '\0'.join(self.columns).encode()
+        return _FILE_HEADER.pack(FILE_MAGIC, FORMAT_VERSION, len(self.columns)) + _U32.pack(len(names)) + names
+
+    def _scan(self):
+        """Construir el índice de chunks; recorta un chunk final a medio escribir"""
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        magic, version, ncols = _FILE_HEADER.unpack_from(data, 0)
+        if magic != FILE_MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{self.path}: no es un segmento de OmniMonitor")
+        (names_len,) = _U32.unpack_from(data, _FILE_HEADER.size)
+        offset = _FILE_HEADER.size + _U32.size
+        names = tuple(data[offset:offset + names_len].decode().split('\0'))
+        if names != self.columns:
+            raise ValueError(f"{self.path}: columnas distintas ({', '.join(names)})")
+        offset += names_len
+        while offset + _CHUNK_HEADER.size <= len(data):
+            magic, count, t_min, t_max, ts_len = _CHUNK_HEADER.unpack_from(data, offset)
+            lens_at = offset + _CHUNK_HEADER.size
+            if magic != CHUNK_MAGIC or lens_at + _U32.size * ncols > len(data):
+                break
+            col_lens = struct.unpack_from(f'<{ncols}I', data, lens_at)
+            ref = ChunkRef(self, offset, count, t_min, t_max, ts_len, col_lens)
+            if offset + ref.size > len(data):
+                break
+            self.chunks.append(ref)
+            offset += ref.size
+        if offset < len(data):
+            with open(self.path, 'r+b') as f:
+                f.truncate(offset)
+
+    def append(self, chunk: bytes, count: int, t_min: int, t_max: int, sync: bool = False):
+        with self._lock:
+            with open(self.path, 'ab') as f:
+                offset = f.tell()
+                f.write(chunk)
+                f.flush()
+                if sync:
+                    os.fsync(f.fileno())
+            ncols = len(self.columns)
+            ts_len = _CHUNK_HEADER.unpack_from(chunk, 0)[4]
+            col_lens = struct.unpack_from(f'<{ncols}I', chunk, _CHUNK_HEADER.size)
+            self.chunks.append(ChunkRef(self, offset, count, t_min, t_max, ts_len, col_lens))
+
+    def view(self) -> mmap.mmap:
+        size = os.path.getsize(self.path)
+        with self._lock:
+            if self._map is None or size != self._mapped_size:
+                # Sin close(): otro hilo puede seguir leyendo el mapa anterior;
+                # se libera al soltar la última referencia
+                with open(self.path, 'rb') as f:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._mapped_size = size
+            return self._map
+
+    @property
+    def samples(self) -> int:
+        return sum(c.count for c in self.chunks)
+
+    def close(self):
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+
+
+class HostStore:
+    """Series de un host: segmentos diarios + cabeza sin sellar (head.log)"""
+
+    def __init__(self, directory: str, columns: Sequence[str], chunk_size: int, sync: bool):
+        self.directory = directory
+        self.columns = tuple(columns)
+        self.chunk_size = chunk_size
+        self.sync = sync
+        self._row = struct.Struct(f'<q{len(self.columns)}d')
+        self._lock = threading.RLock()
+        self.segments: Dict[str, Segment] = {}
+        self._head: List[tuple] = []
+        os.makedirs(directory, exist_ok=True)
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(SEGMENT_SUFFIX):
+                day = name[:-len(SEGMENT_SUFFIX)]
+                self.segments[day] = Segment(os.path.join(directory, name), self.columns)
+        self._load_head()
+
+    @property
+    def head_path(self) -> str:
+        return os.path.join(self.directory, 'head.log')
+
+    def _load_head(self):
+        """Recuperar muestras sin sellar (las ya selladas antes de un corte se descartan)"""
+        if not os.path.exists(self.head_path):
+            return
+        last_sealed = max((c.t_max for s in self.segments.values() for c in s.chunks), default=None)
+        with open(self.head_path, 'rb') as f:
+            data = f.read()
+        size = self._row.size
+        for offset in range(0, len(data) - size + 1, size):
+            row = self._row.unpack_from(data, offset)
+            if last_sealed is None or row[0] > last_sealed:
+                self._head.append(row)
+        self._rewrite_head()
+
+    def _rewrite_head(self):
+        with open(self.head_path, 'wb') as f:
+            for row in self._head:
+                f.write(self._row.pack(*row))
+
+    def append(self, rows: Sequence[tuple]):
+        """Anexar filas (ms, v1..vN) ordenadas por tiempo"""
+        with self._lock:
+            last = self.last_timestamp()
+            rows = [r for r in rows if last is None or r[0] >= last]  # Solo de anexado
+            if not rows:
+                return 0
+            with open(self.head_path, 'ab') as f:
+                f.write(b''.join(self._row.pack(*r) for r in rows))
+                if self.sync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._head.extend(rows)
+            while len(self._head) >= self.chunk_size:
+                self._seal(self.chunk_size)
+            return len(rows)
+
+    def last_timestamp(self) -> Optional[int]:
+        return self._head[-1][0] if self._head else self.last_sealed()
+
+    def last_sealed(self) -> Optional[int]:
+        for day in sorted(self.segments, reverse=True):
+            if self.segments[day].chunks:
+                return self.segments[day].chunks[-1].t_max
+        return None
+
+    def _seal(self, count: int):
+        """Comprimir las primeras `count` filas de la cabeza (sin cruzar de día)"""
+        rows = self._head[:count]
+        day = _day_of(rows[0][0])
+        rows = [r for r in rows if _day_of(r[0]) == day]
+        timestamps = [r[0] for r in rows]
+        columns = [[None if r[i + 1] != r[i + 1] else r[i + 1] for r in rows]
+                   for i in range(len(self.columns))]
+        segment = self.segments.get(day)
+        if segment is None:
+            path = os.path.join(self.directory, day + SEGMENT_SUFFIX)
+            segment = self.segments[day] = Segment(path, self.columns)
+        segment.append(encode_chunk(timestamps, columns), len(rows), timestamps[0], timestamps[-1], self.sync)
+        self._head = self._head[len(rows):]
+        self._rewrite_head()
+
+    def flush(self):
+        """Sellar todo lo pendiente"""
+        with self._lock:
+            while self._head:
+                self._seal(len(self._head))
+
+    def blocks(self, start: int, end: int, column_indexes: Sequence[int]) -> Iterator[tuple]:
+        """Bloques (timestamps, [columna, ...]) con start <= ms < end, en orden"""
+        for day in sorted(self.segments):
+            segment = self.segments[day]
+            for chunk in list(segment.chunks):
+                if chunk.t_max < start or chunk.t_min >= end:
+                    continue
+                timestamps, columns = chunk.read(column_indexes)
+                lo = bisect_left(timestamps, start)
+                hi = bisect_left(timestamps, end)
+                if lo < hi:
+                    if lo or hi < len(timestamps):
+                        timestamps = timestamps[lo:hi]
+                        columns = [column[lo:hi] for column in columns]
+                    yield timestamps, columns
+        with self._lock:
+            head = list(self._head)
+        keys = [r[0] for r in head]
+        head = head[bisect_left(keys, start):bisect_left(keys, end)]
+        if head:
+            yield ([r[0] for r in head],
+                   [[None if r[i + 1] != r[i + 1] else r[i + 1] for r in head] for i in column_indexes])
+
+    def count(self) -> int:
+        return sum(s.samples for s in self.segments.values()) + len(self._head)
+
+    def size_bytes(self) -> int:
+        total = sum(os.path.getsize(s.path) for s in self.segments.values())
+        return total + (os.path.getsize(self.head_path) if os.path.exists(self.head_path) else 0)
+
+    def drop_before(self, day: str) -> int:
+        """Borrar los segmentos de días anteriores a `day`"""
+        removed = 0
+        with self._lock:
+            for name in [d for d in self.segments if d < day]:
+                segment = self.segments.pop(name)
+                removed += segment.samples
+                segment.close()
+                os.remove(segment.path)
+        return removed
+
+    def close(self):
+        for segment in self.segments.values():
+            segment.close()
+
+
+# ==================== BASE DE DATOS ====================
+
+class TimeSeriesDB:
+    """
+    Almacén comprimido con la misma forma de consulta que metrics_history
+    (rangos, agregados por bucket, resumen, retención por días)
+    """
+
+    MAX_POINTS = 1000  # Igual que ReadOnlyPool
+
+    def __init__(self, root: str = DEFAULT_TSDB_DIR, columns: Sequence[str] = HISTORY_METRICS,
+                 chunk_size: int = 360, sync: bool = False):
+        self.root = root
+        self.columns = tuple(columns)
+        self.chunk_size = chunk_size
+        self.sync = sync
+        self._stores: Dict[str, HostStore] = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _store(self, host: Optional[str], create: bool = True) -> Optional[HostStore]:
+        key = LOCAL_HOST if host is None else _HOST_RE.sub('_', host)
+        with self._lock:
+            store = self._stores.get(key)
+            if store is None:
+                path = os.path.join(self.root, key)
+                if not create and not os.path.isdir(path):
+                    return None
+                store = self._stores[key] = HostStore(path, self.columns, self.chunk_size, self.sync)
+            return store
+
+    def _indexes(self, metrics: Sequence[str]) -> List[int]:
+        invalid = [m for m in metrics if m not in self.columns]
+        if invalid or not metrics:
+            raise ValueError(f"Métrica no válida: {', '.join(invalid) or '(vacía)'}")
+        return [self.columns.index(m) for m in metrics]
+
+    # ---------- Escritura ----------
+
+    def append(self, rows: Sequence[Dict], host: str = None) -> int:
+        """Anexar filas {'timestamp': ..., <métricas>...}; devuelve las aceptadas"""
+        packed = sorted(
+            (timestamp_to_ms(row['timestamp']),) + tuple(
+                math.nan if row.get(c) is None else float(row[c]) for c in self.columns)
+            for row in rows
+        )
+        return self._store(host).append(packed) if packed else 0
+
+    def flush(self):
+        for store in list(self._stores.values()):
+            store.flush()
+
+    # ---------- Lectura ----------
+
+    def query(self, start: float, end: float, metrics: Sequence[str] = None,
+              host: str = None) -> Iterator[tuple]:
+        """Muestras (epoch s, valores...) en [start, end)"""
+        metrics = metrics or self.columns
+        store = self._store(host, create=False)
+        if store is None:
+            return
+        for timestamps, columns in store.blocks(int(start * 1000), int(math.ceil(end * 1000)),
+                                                self._indexes(metrics)):
+            for ms, *values in zip(timestamps, *columns):
+                yield (ms / 1000, *values)
+
+    def iter_history(self, metrics: Sequence[str], start: float, end: float,
+                     step: int, host: str = None) -> Iterator[tuple]:
+        """Puntos (bucket, avg_m1, max_m1, ...) igual que ReadOnlyPool.iter_history"""
+        store = self._store(host, create=False)
+        if store is None:
+            return
+        step_ms = step * 1000
+        current = None
+        partial: List[List[float]] = []   # Valores del bucket en curso, por métrica
+        emitted = 0
+        for timestamps, columns in store.blocks(int(start * 1000), int(math.ceil(end * 1000)),
+                                                self._indexes(metrics)):
+            # Cortes de bucket dentro del bloque por bisección (sin recorrer fila a fila)
+            lo = 0
+            while lo < len(timestamps):
+                bucket = timestamps[lo] // step_ms
+                hi = bisect_left(timestamps, (bucket + 1) * step_ms, lo)
+                if bucket != current:
+                    if current is not None:
+                        yield _bucket_point(current * step, partial)
+                        emitted += 1
+                        if emitted >= self.MAX_POINTS:
+                            return
+                    current = bucket
+                    partial = [[] for _ in metrics]
+                for values, column in zip(partial, columns):
+                    values.extend(v for v in column[lo:hi] if v is not None)
+                lo = hi
+        if current is not None:
+            yield _bucket_point(current * step, partial)
+
+    def get_history(self, hours: int = 1, limit: int = 1000, host: str = None) -> List[Dict]:
+        """Últimas muestras (más recientes primero), con la forma de get_metrics_history"""
+        end = time.time() + 1
+        rows = list(self.query(end - hours * 3600 - 1, end, self.columns, host))[-limit:] if limit else []
+        rows.reverse()
+        return [dict(zip(('timestamp',) + self.columns, (ms_to_timestamp(int(r[0] * 1000)),) + r[1:]),
+                     id=int(r[0] * 1000), host=host) for r in rows]
+
+    def get_summary(self, hours: int = 24, host: str = None) -> Dict:
+        """Resumen con las mismas claves que SUMMARY_SQL"""
+        end = time.time() + 1
+        metrics = ('cpu_usage', 'ram_usage', 'cpu_temp')
+        stats = {m: [0.0, 0, None, None] for m in metrics}   # suma, n, mín, máx
+        total = 0
+        for row in self.query(end - hours * 3600, end, metrics, host):
+            total += 1
+            for metric, value in zip(metrics, row[1:]):
+                if value is None:
+                    continue
+                s = stats[metric]
+                s[0] += value
+                s[1] += 1
+                s[2] = value if s[2] is None else min(s[2], value)
+                s[3] = value if s[3] is None else max(s[3], value)
+
+        def avg(metric):
+            return stats[metric][0] / stats[metric][1] if stats[metric][1] else None
+        return {
+            'avg_cpu': avg('cpu_usage'), 'max_cpu': stats['cpu_usage'][3], 'min_cpu': stats['cpu_usage'][2],
+            'avg_ram': avg('ram_usage'), 'max_ram': stats['ram_usage'][3],
+            'avg_cpu_temp': avg('cpu_temp'), 'max_cpu_temp': stats['cpu_temp'][3],
+            'total_records': total,
+        }
+
+    def count(self, host: str = None) -> int:
+        store = self._store(host, create=False)
+        return store.count() if store else 0
+
+    def last_timestamp(self, host: str = None) -> Optional[int]:
+        """Última muestra del host (ms), o None"""
+        store = self._store(host, create=False)
+        return store.last_timestamp() if store else None
+
+    def hosts(self) -> List[str]:
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def size_bytes(self) -> int:
+        return sum(self._store(None if h == LOCAL_HOST else h).size_bytes() for h in self.hosts())
+
+    # ---------- Retención ----------
+
+    def cleanup(self, days: int = 7) -> int:
+        """Borrar días completos anteriores a la retención; devuelve las muestras borradas"""
+        cutoff = _day_of(int((time.time() - days * 86400) * 1000))
+        removed = 0
+        for host in self.hosts():
+            store = self._store(None if host == LOCAL_HOST else host)
+            if days <= 0:
+                store.flush()
+                removed += store.drop_before('9999-99-99')
+            else:
+                removed += store.drop_before(cutoff)
+        return removed
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            for store in self._stores.values():
+                store.close()
+            self._stores.clear()
+
+
+def _bucket_point(bucket: int, partial: List[List[float]]) -> tuple:
+    point = [bucket]
+    for values in partial:
+        point.extend((sum(values) / len(values), max(values)) if values else (None, None))
+    return tuple(point)
+
+
+_tsdb: Optional[TimeSeriesDB] = None
+
+
+def get_tsdb() -> TimeSeriesDB:
+    """Obtener el almacén comprimido por defecto (singleton)"""
+    global _tsdb
+    if _tsdb is None:
+        _tsdb = TimeSeriesDB()
+    return _tsdb
+
+
+# ==================== MIGRACIÓN ====================
+
+def migrate_from_sqlite(db_path: str = DB_PATH, root: str = DEFAULT_TSDB_DIR,
+                        batch: int = 5000, progress=None) -> int:
+    """
+    Copiar el historial local de metrics_history al almacén comprimido
+    (los agentes remotos siguen en SQLite). Es idempotente: solo se copian
+    las filas posteriores a la última muestra ya migrada.
+    """
+    import sqlite3
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    conn.row_factory = sqlite3.Row
+    tsdb = TimeSeriesDB(root)
+    copied = 0
+    try:
+        last = tsdb.last_timestamp()
+        cursor = conn.execute(f'''
+            SELECT timestamp, {', '.join(HISTORY_METRICS)} FROM metrics_history
+            WHERE host IS NULL ORDER BY timestamp
+        ''')
+        while True:
+            rows = cursor.fetchmany(batch)
+            if not rows:
+                break
+            rows = [dict(row) for row in rows]
+            if last is not None:
+                rows = [row for row in rows if timestamp_to_ms(row['timestamp']) > last]
+            copied += tsdb.append(rows)
+            if progress:
+                progress(copied)
+    finally:
+        tsdb.close()
+        conn.close()
+    return copied
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Almacén comprimido de historial de OmniMonitor")
+    sub = parser.add_subparsers(dest='command', required=True)
+    migrate = sub.add_parser('migrate', help="Copiar el historial local de SQLite al almacén")
+    migrate.add_argument('--db', default=DB_PATH, help="Base de datos SQLite de origen")
+    migrate.add_argument('--out', default=DEFAULT_TSDB_DIR, help="Directorio del almacén")
+    stats = sub.add_parser('stats', help="Muestras y bytes por host")
+    stats.add_argument('--out', default=DEFAULT_TSDB_DIR, help="Directorio del almacén")
+    args = parser.parse_args(argv)
+
+    if args.command == 'migrate':
+        start = time.perf_counter()
+        copied = migrate_from_sqlite(args.db, args.out,
+                                     progress=lambda n: print(f"\r{n} muestras", end='', flush=True))
+        print(f"\n{copied} muestras nuevas en {time.perf_counter() - start:.1f} s -> {args.out}")
+        print("Activar con la configuración history_backend = tsdb")
+    else:
+        tsdb = TimeSeriesDB(args.out)
+        for host in tsdb.hosts():
+            store = tsdb._store(None if host == LOCAL_HOST else host)
+            n, size = store.count(), store.size_bytes()
+            print(f"{host}: {n} muestras, {size / 1024:.1f} KB ({size / n if n else 0:.1f} bytes/muestra)")
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main())
+    # Test: ida y vuelta de los codificadores, sellado, recuperación de la cabeza y consultas
+    import random
+    import shutil
+    import tempfile
+
+    ts = [1_700_000_000_000 + i * 10_000 + random.choice((0, 0, 0, 3, -2)) for i in range(1000)]
+    ts[500] += 10_000_000  # Hueco largo
+    assert decode_timestamps(encode_timestamps(ts), len(ts)) == ts
+    vals = [round(random.uniform(0, 100), 1) if i % 7 else None for i in range(1000)]
+    vals[10:40] = [55.5] * 30
+    assert decode_floats(encode_floats(vals), len(vals)) == vals
+
+    root = tempfile.mkdtemp()
+    try:
+        db = TimeSeriesDB(root, chunk_size=100)
+        now = time.time()
+        rows = [{'timestamp': ms_to_timestamp(int((now - 7200 + i * 10) * 1000)),
+                 'cpu_usage': 20 + (i % 50), 'ram_usage': 60.0, 'cpu_temp': None,
+                 'disk_usage': 71.2} for i in range(720)]
+        assert db.append(rows) == 720
+        assert db.append(rows[:10]) == 0   # Solo de anexado
+        db.close()
+
+        db = TimeSeriesDB(root, chunk_size=100)  # Reabrir: 7 chunks + 20 en head.log
+        assert db.count() == 720
+        last_hour = list(db.query(now - 3600, now, ('cpu_usage', 'ram_usage')))
+        assert 355 <= len(last_hour) <= 361 and all(r[2] == 60.0 for r in last_hour)
+        points = list(db.iter_history(['cpu_usage'], now - 7200, now, 600))
+        assert 12 <= len(points) <= 13 and all(p[2] <= 69 for p in points)
+        summary = db.get_summary(hours=3)
+        assert summary['total_records'] == 720 and summary['max_cpu'] == 69 and summary['avg_cpu_temp'] is None
+        latest = db.get_history(hours=1, limit=5)
+        assert len(latest) == 5 and latest[0]['timestamp'] > latest[-1]['timestamp']
+        db.flush()
+        size = db.size_bytes()
+        print(f"720 muestras: {size} bytes ({size / 720:.1f} bytes/muestra)")
+        db.close()
+
+        # Escritor y lectores concurrentes: remapear el segmento no rompe lecturas en curso
+        db = TimeSeriesDB(os.path.join(root, 'concurrente'), chunk_size=2)
+        errors = []
+        stop = threading.Event()
+
+        def reader():
+            while not stop.is_set():
+                try:
+                    list(db.query(now - 3600, now + 3600, ('cpu_usage',)))
+                except Exception as e:
+                    errors.append(e)
+
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-5)  # Cambios de hilo frecuentes para provocar la carrera
+        readers = [threading.Thread(target=reader) for _ in range(6)]
+        for t in readers:
+            t.start()
+        for i in range(2000):
+            db.append([{'timestamp': ms_to_timestamp(int((now + i) * 1000)), 'cpu_usage': 50.0}])
+        stop.set()
+        for t in readers:
+            t.join()
+        sys.setswitchinterval(switch_interval)
+        assert not errors, f"{len(errors)} lecturas fallidas: {errors[0]!r}"
+        assert db.count() == 2000
+        db.close()
+    finally:
+        shutil.rmtree(root)
+    print("TSDB OK")
@@ -2,37 +2,95 @@
 Servidor API para OmniMonitor - Datos REALES del sistema
 Proporciona métricas vía HTTP para la versión web
 """
+import hmac
 import json
+import math
+import zlib
 import http.server
 import socketserver
 import threading
+import time
 import sys
 import os
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit, parse_qs
 
 # Agregar el directorio padre al path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from src.core.monitor import SystemMonitor
+from src.server.wire import MIME_TYPE, encode_snapshot, accepts_binary
+from src.server.exposition import (
+    CachedRenderer, render_openmetrics, CONTENT_TYPE_OPENMETRICS, CONTENT_TYPE_TEXT
+)
+from src.database.db import Database, get_read_pool, HISTORY_METRICS
+from src.crud.processes import ProcessManager
+from src.crud.history import get_history_backend
+from src.core.instrumentation import get_instrumentation
+from src.server.shm import read_shared_snapshot
+from src.core.series import SERIES_LABELS, parse_selector
+from src.core.cgroups import get_cgroup_collector, sort_cgroups
 
 PORT = 8765
 monitor = None
 
+# Snapshot compartido: todas las peticiones dentro de SNAPSHOT_MAX_AGE
+# reutilizan la misma recolección
+SNAPSHOT_MAX_AGE = 1.0
+_snapshot_lock = threading.Lock()
+_snapshot = {"seq": 0, "collected_at": 0.0, "data": None}
+
+# Colector: lotes de agentes (POST /api/ingest), solo con --ingest y token
+INGEST_HOST_HEADER = 'X-OmniMonitor-Host'
+INGEST_TOKEN_HEADER = 'X-OmniMonitor-Token'
+INGEST_TOKEN_ENV = 'OMNIMONITOR_INGEST_TOKEN'  # Tiene prioridad sobre la clave ingest_token
+INGEST_MIN_TIMESTAMP = datetime(2000, 1, 1)
+INGEST_MAX_FUTURE = timedelta(days=1)  # Margen para relojes de agentes adelantados
+MAX_INGEST_BYTES = 8 * 1024 * 1024       # Cuerpo comprimido
+MAX_INGEST_RAW_BYTES = 64 * 1024 * 1024  # Cuerpo descomprimido
+_ingest_lock = threading.Lock()
+_ingest_db = None
+
 class MonitorAPIHandler(http.server.BaseHTTPRequestHandler):
     def do_GET(self):
         global monitor
         if monitor is None:
             monitor = SystemMonitor()
+            get_instrumentation().instrument_monitor(monitor)
             
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
+        url = urlsplit(self.path)
+        path = url.path
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
         
+        status = 200
         try:
-            if self.path == '/api/all':
-                data = get_all_metrics()
-            elif self.path == '/api/cpu':
+            if path == '/api/history':
+                self._send_stream(stream_history(query), 'application/json')
+                return
+            elif path == '/api/summary':
+                hours = int(query.get('hours', 24))
+                host = query.get('host')
+                data = (get_read_pool().get_summary(hours, host) if host
+                        else get_history_backend().get_summary(hours))
+                data['hours'] = hours
+            elif path == '/api/series':
+                data = query_series(query)
+            elif path == '/api/containers':
+                data = query_containers(query)
+            elif path == '/api/hosts':
+                data = get_read_pool().get_hosts()
+            elif path == '/metrics':
+                accept = self.headers.get('Accept') or ''
+                openmetrics = 'application/openmetrics-text' in accept
+                content_type = CONTENT_TYPE_OPENMETRICS if openmetrics else CONTENT_TYPE_TEXT
+                self._send_body(get_metrics_exposition(openmetrics).encode(), content_type)
+                return
+            elif path == '/api/all':
+                _, data = get_snapshot()
+                # Negociación de contenido: formato binario compacto
+                if accepts_binary(self.headers.get('Accept')):
+                    self._send_body(encode_snapshot(data), MIME_TYPE)
+                    return
+            elif path == '/api/cpu':
                 data = {
                     "usage": monitor.get_cpu_usage(),
                     "per_core": monitor.get_cpu_per_core(),
@@ -40,44 +98,131 @@ class MonitorAPIHandler(http.server.BaseHTTPRequestHandler):
                     "freq": monitor.get_cpu_freq(),
                     "temp": monitor.get_cpu_temp()
                 }
-            elif self.path == '/api/memory':
+            elif path == '/api/memory':
                 data = monitor.get_memory_usage()
-            elif self.path == '/api/disk':
+            elif path == '/api/disk':
                 data = {
                     "usage": monitor.get_disk_usage(),
                     "info": monitor.get_disk_info(),
                     "io": monitor.get_disk_io()
                 }
-            elif self.path == '/api/network':
+            elif path == '/api/network':
                 data = {
                     "speed": monitor.get_network_speed(),
                     "info": monitor.get_network_info()
                 }
-            elif self.path == '/api/gpu':
+            elif path == '/api/gpu':
                 data = monitor.get_gpu_info() or {"name": "No detectada", "usage": 0, "temp": 0}
-            elif self.path == '/api/system':
+            elif path == '/api/system':
                 data = {
                     "info": monitor.get_system_info(),
                     "uptime": str(monitor.get_uptime()),
                     "battery": monitor.get_battery_info()
                 }
-            elif self.path == '/health':
+            elif path == '/api/diagnostics':
+                data = get_instrumentation().snapshot()
+            elif path == '/health':
                 data = {"status": "ok", "message": "Server running"}
             else:
                 data = {
                     "error": "Endpoint no encontrado",
-                    "available": ["/api/all", "/api/cpu", "/api/memory", "/api/disk", "/api/network", "/api/gpu", "/api/system", "/health"]
+                    "available": ["/api/all", "/api/cpu", "/api/memory", "/api/disk", "/api/network", "/api/gpu", "/api/system",
+                                  "/api/history", "/api/summary", "/api/series", "/api/containers", "/api/hosts", "/api/diagnostics", "/metrics", "/health"]
                 }
+        except ValueError as e:
+            # Parámetros no válidos: 400 como /api/history (un resultado vacío sigue siendo 200)
+            status, data = 400, {"error": str(e)}
         except Exception as e:
             data = {"error": str(e)}
         
-        self.wfile.write(json.dumps(data).encode())
+        self._send_body(json.dumps(data).encode(), 'application/json', status)
+    
+    def do_POST(self):
+        url = urlsplit(self.path)
+        token = getattr(self.server, 'ingest_token', None)
+        if url.path != '/api/ingest' or not token:
+            # Sin modo colector la ingesta no existe
+            self._send_body(json.dumps({"error": "Endpoint no encontrado"}).encode(), 'application/json', 404)
+            return
+        if not hmac.compare_digest((self.headers.get(INGEST_TOKEN_HEADER) or '').encode(), token.encode()):
+            self._send_body(json.dumps({"error": "Token de ingesta no válido"}).encode(), 'application/json', 401)
+            return
+        
+        length = self.headers.get('Content-Length')
+        if length is None:
+            self._send_body(json.dumps({"error": "Falta Content-Length"}).encode(), 'application/json', 411)
+            return
+        try:
+            length = int(length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send_body(json.dumps({"error": "Content-Length no válido"}).encode(), 'application/json', 400)
+            return
+        if length > MAX_INGEST_BYTES:
+            self._send_body(json.dumps({"error": "Lote demasiado grande"}).encode(), 'application/json', 413)
+            return
+        body = self.rfile.read(length)
+        try:
+            accepted = ingest_batch(self.headers.get(INGEST_HOST_HEADER), body,
+                                    self.headers.get('Content-Encoding'))
+            status, data = 200, {"accepted": accepted}
+        except ValueError as e:
+            status, data = 400, {"error": str(e)}
+        except Exception as e:
+            status, data = 500, {"error": str(e)}
+        self._send_body(json.dumps(data).encode(), 'application/json', status)
+    
+    def _send_stream(self, chunks, content_type: str):
+        """
+        Enviar respuesta por partes a medida que se generan
+        Sin Content-Length: HTTP/1.0 delimita el cuerpo cerrando la conexión.
+        El primer fragmento se genera antes de las cabeceras para poder
+        responder 400 si los parámetros no son válidos.
+        """
+        try:
+            first = next(chunks)
+        except ValueError as e:
+            self._send_body(json.dumps({"error": str(e)}).encode(), 'application/json', 400)
+            return
+        except Exception as e:
+            self._send_body(json.dumps({"error": str(e)}).encode(), 'application/json', 500)
+            return
+        
+        # Con las cabeceras enviadas ningún error sale de aquí: do_GET no debe
+        # añadir una segunda respuesta, el error solo puede cortar el cuerpo
+        try:
+            self.send_response(200)
+            self.send_header('Content-type', content_type)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+            self.send_header('Access-Control-Allow-Headers', 'Content-Type, Accept')
+            self.end_headers()
+            self.wfile.write(first)
+            for chunk in chunks:
+                self.wfile.write(chunk)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # El cliente cerró la conexión
+        except Exception as e:
+            print(f"Error en streaming de respuesta: {e}")
+    
+    def _send_body(self, body: bytes, content_type: str, status: int = 200):
+        """Enviar respuesta completa con cabeceras CORS"""
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Vary', 'Accept')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Accept')
+        self.end_headers()
+        self.wfile.write(body)
     
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, Accept')
         self.end_headers()
     
     def log_message(self, format, *args):
@@ -99,14 +244,18 @@ def get_all_metrics():
             "temp": monitor.get_cpu_temp()
         },
         "memory": monitor.get_memory_usage(),
+        "swap": monitor.get_swap_memory(),
+        "temperatures": monitor.get_all_temperatures(),
         "disk": {
             "usage": monitor.get_disk_usage(),
             "info": monitor.get_disk_info(),
-            "io": monitor.get_disk_io()
+            "io": monitor.get_disk_io(),
+            "devices": monitor.get_disk_io_per_device()
         },
         "network": {
             "speed": monitor.get_network_speed(),
-            "info": monitor.get_network_info()
+            "info": monitor.get_network_info(),
+            "devices": monitor.get_network_speed_per_interface()
         },
         "gpu": monitor.get_gpu_info(),
         "system": {
@@ -117,19 +266,299 @@ def get_all_metrics():
     }
 
 
+def get_snapshot() -> tuple:
+    """
+    Obtener (secuencia, snapshot) reutilizando la última recolección
+    si tiene menos de SNAPSHOT_MAX_AGE segundos
+    """
+    with _snapshot_lock:
+        now = time.monotonic()
+        if _snapshot["data"] is None or now - _snapshot["collected_at"] >= SNAPSHOT_MAX_AGE:
+            # Con un colector local (python app.py --collector) no se recolecta aquí
+            shared = read_shared_snapshot()
+            if shared is None:
+                with get_instrumentation().stage('api.snapshot'):
+                    shared = get_all_metrics()
+            if shared is not _snapshot["data"]:
+                _snapshot["data"] = shared
+                _snapshot["seq"] += 1
+            _snapshot["collected_at"] = now
+        return _snapshot["seq"], _snapshot["data"]
+
+
+_process_manager = None
+
+
+def _render_current_snapshot(openmetrics: bool = True) -> str:
+    """Renderizar el snapshot vigente con procesos y contadores de alertas"""
+    global _process_manager
+    if _process_manager is None:
+        _process_manager = ProcessManager()
+    _, data = get_snapshot()
+    try:
+        alerts = get_read_pool().get_alert_counts()
+    except Exception:
+        alerts = None
+    return render_openmetrics(data, _process_manager.get_stats(), alerts, openmetrics)
+
+
+# Un render cacheado por formato: OpenMetrics 1.0 y texto Prometheus 0.0.4
+_metrics_renderers = {
+    True: CachedRenderer(lambda: _render_current_snapshot(True)),
+    False: CachedRenderer(lambda: _render_current_snapshot(False)),
+}
+
+
+def get_metrics_exposition(openmetrics: bool = True) -> str:
+    """Texto de /metrics del snapshot actual (cacheado por secuencia)"""
+    seq, _ = get_snapshot()
+    return _metrics_renderers[openmetrics].get(seq)
+
+
+def _parse_time(value, default: float) -> float:
+    """Aceptar epoch en segundos, ISO-8601 o relativo ('-6h', '-30m', '-2d')"""
+    if value in (None, ''):
+        return default
+    value = str(value).strip()
+    try:
+        if value.startswith('-') and value[-1] in 'smhd':
+            units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+            parsed = time.time() - float(value[1:-1]) * units[value[-1]]
+        else:
+            parsed = float(value)
+    except ValueError:
+        parsed = None
+    if parsed is not None:
+        if not math.isfinite(parsed):
+            raise ValueError(f"Fecha no válida: {value}")
+        return parsed
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Fecha no válida: {value}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)  # El historial se guarda en UTC
+    return parsed.timestamp()
+
+
+def _parse_step(query: dict) -> float:
+    """Paso pedido en segundos (0 = automático); finito y no negativo"""
+    try:
+        step = float(query.get('step', 0) or 0)
+    except ValueError:
+        step = None
+    if step is None or not math.isfinite(step) or step < 0:
+        raise ValueError(f"'step' debe ser un número de segundos >= 0: {query.get('step')}")
+    return step
+
+
+def stream_history(query: dict):
+    """
+    Generar la respuesta de /api/history en fragmentos JSON
+    Parámetros: metric (uno o varios separados por coma), from, to, step (s)
+    """
+    metrics = [m.strip() for m in query.get('metric', 'cpu_usage').split(',') if m.strip()]
+    invalid = [m for m in metrics if m not in HISTORY_METRICS]
+    if invalid or not metrics:
+        raise ValueError(f"Métrica no válida: {', '.join(invalid) or '(vacía)'}. "
+                         f"Disponibles: {', '.join(HISTORY_METRICS)}")
+    
+    end = _parse_time(query.get('to'), time.time())
+    start = _parse_time(query.get('from'), end - 3600)
+    if start >= end:
+        raise ValueError("'from' debe ser anterior a 'to'")
+    
+    host = query.get('host')  # Sin host: historial del equipo local
+    pool = get_read_pool()
+    step = pool.choose_step(start, end, _parse_step(query))
+    columns = ["timestamp"] + [f"{m}_{agg}" for m in metrics for agg in ("avg", "max")]
+    
+    yield json.dumps({
+        "host": host, "metrics": metrics, "from": start, "to": end, "step": step,
+        "max_points": pool.MAX_POINTS, "columns": columns,
+    })[:-1].encode() + b', "points": ['
+    
+    first = True
+    # El historial local lo sirve el motor configurado; los agentes, siempre SQLite
+    rows = (pool.iter_history(metrics, start, end, step, host) if host
+            else get_history_backend().iter_history(metrics, start, end, step))
+    for row in rows:
+        yield (b'' if first else b',') + json.dumps(row).encode()
+        first = False
+    yield b']}'
+
+
+def query_series(query: dict) -> dict:
+    """
+    Respuesta de /api/series (historial por núcleo, partición o interfaz)
+    - metric=cpu_usage: ranking de etiquetas en el rango (order=avg|max|min, limit)
+    - selector=cpu_usage{core=3}: puntos de una sola serie (step en segundos)
+    Parámetros comunes: from, to, host
+    """
+    end = _parse_time(query.get('to'), time.time())
+    start = _parse_time(query.get('from'), end - 86400)
+    if start >= end:
+        raise ValueError("'from' debe ser anterior a 'to'")
+    host = query.get('host')
+    pool = get_read_pool()
+    
+    selector = query.get('selector')
+    if selector:
+        parsed = parse_selector(selector)
+        if parsed is None or len(parsed[1]) != 1:
+            raise ValueError(f"Selector no válido: {selector} (ej. cpu_usage{{core=3}})")
+        metric, labels = parsed
+        (label, value), = labels.items()
+        if SERIES_LABELS.get(metric) != label:
+            raise ValueError(f"Serie no válida: {selector}")
+        step = pool.choose_step(start, end, _parse_step(query))
+        return {
+            "host": host, "metric": metric, "label": label, "value": value,
+            "from": start, "to": end, "step": step,
+            "columns": ["timestamp", "avg", "max"],
+            "points": list(pool.iter_series(metric, value, start, end, step, host)),
+        }
+    
+    metric = query.get('metric', 'cpu_usage')
+    if metric not in SERIES_LABELS:
+        raise ValueError(f"Métrica sin series: {metric}. Disponibles: {', '.join(SERIES_LABELS)}")
+    return {
+        "host": host, "metric": metric, "label": SERIES_LABELS[metric], "from": start, "to": end,
+        "series": pool.rank_series(metric, start, end, query.get('order', 'avg'),
+                                   int(query.get('limit', 10)), host),
+    }
+
+
+def query_containers(query: dict) -> dict:
+    """
+    Respuesta de /api/containers: uso por cgroup v2
+    Parámetros: sort (cpu, memory, io, pressure), limit
+    """
+    collector = get_cgroup_collector()
+    limit = int(query.get('limit', 0) or 0)
+    return {
+        "available": collector.available(),
+        "root": collector.root,
+        "inotify": collector.inotify is not None,
+        "cgroups": sort_cgroups(collector.sample(), query.get('sort', 'cpu'), limit or None),
+    }
+
+
+def _gunzip(body: bytes, limit: int) -> bytes:
+    """Descomprimir uno o varios miembros gzip concatenados sin superar `limit`"""
+    out = []
+    size = 0
+    while body:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        chunk = decompressor.decompress(body, limit - size + 1)
+        size += len(chunk)
+        if size > limit or decompressor.unconsumed_tail:
+            raise ValueError("Lote descomprimido demasiado grande")
+        if not decompressor.eof:
+            raise ValueError("gzip truncado")
+        out.append(chunk)
+        body = decompressor.unused_data
+    return b''.join(out)
+
+
+def _parse_ingest_timestamp(value) -> str:
+    """
+    Validar el timestamp (UTC) de una fila de agente y normalizarlo al
+    formato del historial: 'YYYY-MM-DD HH:MM:SS[.fff]'
+    """
+    if not isinstance(value, str):
+        raise ValueError("Cada línea debe ser un objeto con 'timestamp'")
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        raise ValueError(f"Timestamp no válido: {value[:40]!r}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    if not INGEST_MIN_TIMESTAMP <= parsed <= datetime.now(timezone.utc).replace(tzinfo=None) + INGEST_MAX_FUTURE:
+        raise ValueError(f"Timestamp fuera de rango: {value[:40]!r}")
+    if parsed.microsecond:
+        return parsed.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+    return parsed.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def configured_ingest_token() -> str:
+    """Token de ingesta: variable de entorno o clave `ingest_token` de la configuración"""
+    from src.database.db import get_db
+    return os.environ.get(INGEST_TOKEN_ENV) or get_db().get_config('ingest_token', '') or ''
+
+
+def ingest_batch(host: str, body: bytes, encoding: str = None) -> int:
+    """
+    Guardar un lote JSONL enviado por un agente en el historial etiquetado
+    con su host. Devuelve las filas nuevas (los reenvíos se ignoran).
+    """
+    global _ingest_db
+    host = (host or '').strip()
+    if not host or len(host) > 255:
+        raise ValueError(f"Falta la cabecera {INGEST_HOST_HEADER}")
+    if (encoding or '').lower() == 'gzip':
+        try:
+            body = _gunzip(body, MAX_INGEST_RAW_BYTES)
+        except zlib.error as e:
+            raise ValueError(f"gzip no válido: {e}")
+    
+    rows = []
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON no válido: {e}")
+        if not isinstance(row, dict):
+            raise ValueError("Cada línea debe ser un objeto con 'timestamp'")
+        row['timestamp'] = _parse_ingest_timestamp(row.get('timestamp'))
+        for metric in HISTORY_METRICS:
+            value = row.get(metric)
+            if value is not None and not isinstance(value, (int, float)):
+                raise ValueError(f"Valor no numérico en {metric}")
+        rows.append(row)
+    
+    # Conexión de escritura propia: no compartir transacciones con la UI
+    with _ingest_lock:
+        if _ingest_db is None:
+            _ingest_db = Database(get_read_pool().db_path)  # La misma base que sirve la API
+        return _ingest_db.save_metrics_batch(host, rows)
+
+
 class ThreadedTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
     allow_reuse_address = True
+    ingest_token = None  # None: POST /api/ingest deshabilitado
 
 
 _server = None
 _server_thread = None
 
-def start_server(port=PORT):
-    """Inicia el servidor API"""
+def create_server(port=PORT, host="0.0.0.0", ingest_token: str = None) -> ThreadedTCPServer:
+    """
+    Crear (sin iniciar) un servidor API en el puerto indicado
+    Con `ingest_token` acepta lotes de agentes que envíen ese token.
+    """
+    global monitor
+    if monitor is None:
+        monitor = SystemMonitor()
+    server = ThreadedTCPServer((host, port), MonitorAPIHandler)
+    server.ingest_token = ingest_token or None
+    return server
+
+
+def start_server(port=PORT, ingest: bool = False):
+    """Inicia el servidor API (con ingest=True, también como colector de agentes)"""
     global _server, monitor
     monitor = SystemMonitor()
     
-    _server = ThreadedTCPServer(("0.0.0.0", port), MonitorAPIHandler)
+    token = None
+    if ingest:
+        token = configured_ingest_token()
+        if not token:
+            raise SystemExit(f"--ingest requiere un token: variable {INGEST_TOKEN_ENV} "
+                             "o clave 'ingest_token' de la configuración")
+    _server = create_server(port, ingest_token=token)
     print(f"🌐 API Server: http://localhost:{port}")
     _server.serve_forever()
 
@@ -163,12 +592,21 @@ if __name__ == "__main__":
     print(f"   GET http://localhost:{PORT}/api/network - Red")
     print(f"   GET http://localhost:{PORT}/api/gpu     - GPU")
     print(f"   GET http://localhost:{PORT}/api/system  - Sistema")
+    print(f"   GET http://localhost:{PORT}/api/history?metric=cpu_usage&from=-24h&step=300 - Historial")
+    print(f"   GET http://localhost:{PORT}/api/summary?hours=24 - Resumen")
+    print(f"   GET http://localhost:{PORT}/api/series?metric=cpu_usage&from=-7d - Ranking por núcleo/partición")
+    print(f"   GET http://localhost:{PORT}/api/containers?sort=cpu - Uso por cgroup v2")
+    print(f"   GET http://localhost:{PORT}/api/hosts   - Agentes remotos")
+    ingest = "--ingest" in sys.argv
+    if ingest:
+        print(f"   POST http://localhost:{PORT}/api/ingest - Lotes de agentes (cabecera {INGEST_TOKEN_HEADER})")
+    print(f"   GET http://localhost:{PORT}/metrics     - Prometheus/OpenMetrics")
     print(f"   GET http://localhost:{PORT}/health      - Estado")
     print()
     print("Presiona Ctrl+C para detener")
     print()
     
     try:
-        start_server()
+        start_server(ingest=ingest)
     except KeyboardInterrupt:
         print("\n🛑 Servidor detenido")
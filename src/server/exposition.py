@@ -0,0 +1,328 @@
+"""
+Exposición OpenMetrics/Prometheus para OmniMonitor
+Renderiza un snapshot de /api/all (más estadísticas de procesos y contadores
+de alertas) en formato de texto OpenMetrics 1.0 o en el formato de texto
+clásico de Prometheus (0.0.4), que no admite `info`, `# UNIT` ni `# EOF`.
+"""
+import math
+import os
+import re
+import sys
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.server.wire import parse_uptime
+
+CONTENT_TYPE_OPENMETRICS = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+CONTENT_TYPE_TEXT = "text/plain; version=0.0.4; charset=utf-8"
+
+PREFIX = "omnimonitor"
+
+_NAME_RE = re.compile(r"^[a-zA-Z_:][a-zA-Z0-9_:]*$")
+_LABEL_RE = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\\n]|\\.)*)"')
+_SAMPLE_RE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{.*\})? (\S+)$")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "NaN"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class _Family:
+    """Familia de métricas: metadatos + muestras"""
+
+    __slots__ = ("name", "kind", "help", "unit", "samples")
+
+    def __init__(self, name: str, kind: str, help_text: str, unit: str = ""):
+        self.name = f"{PREFIX}_{name}"
+        self.kind = kind
+        self.help = help_text
+        self.unit = unit
+        self.samples: List[Tuple[Dict, float]] = []
+
+    def add(self, value, **labels):
+        if value is not None:
+            self.samples.append((labels, value))
+        return self
+
+    def render(self, out: List[str], openmetrics: bool = True):
+        if not self.samples:
+            return
+        suffix = {"counter": "_total", "info": "_info"}.get(self.kind, "")
+        if openmetrics:
+            out.append(f"# TYPE {self.name} {self.kind}")
+            if self.unit:
+                out.append(f"# UNIT {self.name} {self.unit}")
+            out.append(f"# HELP {self.name} {_escape(self.help)}")
+        else:
+            # 0.0.4: la familia se llama como sus muestras y 'info' pasa a gauge
+            kind = "gauge" if self.kind == "info" else self.kind
+            out.append(f"# TYPE {self.name}{suffix} {kind}")
+            out.append(f"# HELP {self.name}{suffix} {_escape(self.help)}")
+        for labels, value in self.samples:
+            if labels:
+                label_str = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                out.append(f"{self.name}{suffix}{{{label_str}}} {_format_value(value)}")
+            else:
+                out.append(f"{self.name}{suffix} {_format_value(value)}")
+
+
+def render_openmetrics(snapshot: Dict, process_stats: Optional[Dict] = None,
+                       alerts: Optional[List[Dict]] = None, openmetrics: bool = True) -> str:
+    """
+    Renderizar un snapshot a texto OpenMetrics
+
+    Args:
+        snapshot: Diccionario con el formato de get_all_metrics()
+        process_stats: Resultado de ProcessManager.get_stats()
+        alerts: Filas de alertas (id, name, metric, triggered_count)
+        openmetrics: False para el formato de texto Prometheus 0.0.4
+    """
+    families: List[_Family] = []
+
+    def family(name, kind, help_text, unit=""):
+        f = _Family(name, kind, help_text, unit)
+        families.append(f)
+        return f
+
+    # ---- CPU ----
+    cpu = snapshot.get("cpu") or {}
+    family("cpu_usage_percent", "gauge", "Uso total de CPU", "percent").add(cpu.get("usage"))
+    cores = family("cpu_core_usage_percent", "gauge", "Uso de CPU por núcleo", "percent")
+    for i, usage in enumerate(cpu.get("per_core") or []):
+        cores.add(usage, core=i)
+    count = cpu.get("count") or (None, None)
+    family("cpu_cores", "gauge", "Núcleos de CPU").add(count[0], type="physical").add(count[1], type="logical")
+    freq = cpu.get("freq")
+    family("cpu_frequency_hertz", "gauge", "Frecuencia actual de CPU", "hertz").add(
+        freq * 1e9 if freq is not None else None)
+
+    # ---- Memoria y swap ----
+    mem = snapshot.get("memory") or {}
+    family("memory_usage_percent", "gauge", "Uso de memoria RAM", "percent").add(mem.get("percent"))
+    family("memory_used_bytes", "gauge", "Memoria RAM usada", "bytes").add(mem.get("used"))
+    family("memory_total_bytes", "gauge", "Memoria RAM total", "bytes").add(mem.get("total"))
+    family("memory_available_bytes", "gauge", "Memoria RAM disponible", "bytes").add(mem.get("free"))
+    swap = snapshot.get("swap") or {}
+    family("swap_usage_percent", "gauge", "Uso de swap", "percent").add(swap.get("percent"))
+    family("swap_used_bytes", "gauge", "Swap usada", "bytes").add(swap.get("used"))
+    family("swap_total_bytes", "gauge", "Swap total", "bytes").add(swap.get("total"))
+
+    # ---- Disco ----
+    disk = snapshot.get("disk") or {}
+    fs_used = family("filesystem_used_bytes", "gauge", "Espacio usado por partición", "bytes")
+    fs_size = family("filesystem_size_bytes", "gauge", "Tamaño de la partición", "bytes")
+    fs_pct = family("filesystem_usage_percent", "gauge", "Uso de la partición", "percent")
+    partitions = disk.get("info") if isinstance(disk.get("info"), list) else []
+    for p in partitions:
+        usage = p.get("usage") or {}
+        labels = {"device": p.get("device", ""), "mountpoint": p.get("mountpoint", ""),
+                  "fstype": p.get("fstype", "")}
+        fs_used.add(usage.get("used"), **labels)
+        fs_size.add(usage.get("total"), **labels)
+        fs_pct.add(usage.get("percent"), **labels)
+    io = disk.get("io") or {}
+    family("disk_read_bytes_per_second", "gauge", "Velocidad de lectura de disco").add(
+        io["read_speed"] * 1024 * 1024 if io.get("read_speed") is not None else None)
+    family("disk_write_bytes_per_second", "gauge", "Velocidad de escritura de disco").add(
+        io["write_speed"] * 1024 * 1024 if io.get("write_speed") is not None else None)
+
+    # ---- Red ----
+    network = snapshot.get("network") or {}
+    speed = network.get("speed") or {}
+    family("network_receive_bytes_per_second", "gauge", "Tráfico de red entrante").add(speed.get("download"))
+    family("network_transmit_bytes_per_second", "gauge", "Tráfico de red saliente").add(speed.get("upload"))
+    link = family("network_interface_speed_megabits", "gauge", "Velocidad de enlace por interfaz", "megabits")
+    up = family("network_interface_up", "gauge", "Interfaz activa con IPv4")
+    for iface in (network.get("info") or {}).get("interfaces") or []:
+        link.add(iface.get("speed"), interface=iface.get("name", ""))
+        up.add(1, interface=iface.get("name", ""), address=iface.get("ip", ""))
+
+    # ---- GPU y temperaturas ----
+    gpu = snapshot.get("gpu")
+    if gpu:
+        family("gpu_usage_percent", "gauge", "Uso de GPU", "percent").add(gpu.get("usage"), name=gpu.get("name", ""))
+        family("gpu_temperature_celsius", "gauge", "Temperatura de GPU", "celsius").add(
+            gpu.get("temp"), name=gpu.get("name", ""))
+    family("cpu_temperature_celsius", "gauge", "Temperatura de CPU", "celsius").add(cpu.get("temp"))
+    sensors = family("sensor_temperature_celsius", "gauge", "Lecturas de sensores de temperatura", "celsius")
+    seen = set()
+    for reading in snapshot.get("temperatures") or []:
+        key = (reading.get("sensor"), reading.get("label"))
+        if key not in seen:  # Etiquetas repetidas en algunos drivers
+            seen.add(key)
+            sensors.add(reading.get("current"), sensor=key[0], label=key[1])
+
+    # ---- Sistema ----
+    system = snapshot.get("system") or {}
+    family("uptime_seconds", "gauge", "Tiempo de actividad del sistema", "seconds").add(
+        parse_uptime(system.get("uptime", 0)))
+    battery = system.get("battery")
+    if battery:
+        family("battery_percent", "gauge", "Carga de batería", "percent").add(battery.get("percent"))
+        family("battery_plugged", "gauge", "Cargador conectado").add(bool(battery.get("plugged")))
+    info = system.get("info") or {}
+    family("system", "info", "Información del sistema").add(
+        1, **{k: info.get(k, "") for k in ("os", "os_version", "architecture", "hostname")})
+
+    # ---- Procesos ----
+    if process_stats:
+        procs = family("processes", "gauge", "Procesos por estado")
+        for state in ("running", "sleeping", "stopped", "zombie"):
+            procs.add(process_stats.get(state), state=state)
+        family("threads", "gauge", "Hilos totales").add(process_stats.get("threads"))
+
+    # ---- Alertas ----
+    if alerts is not None:
+        triggers = family("alert_triggers", "counter", "Veces que se disparó cada alerta")
+        for alert in alerts:
+            triggers.add(alert.get("triggered_count") or 0, alert_id=alert["id"],
+                         name=alert.get("name", ""), metric=alert.get("metric", ""))
+
+    out: List[str] = []
+    for f in families:
+        f.render(out, openmetrics)
+    if openmetrics:
+        out.append("# EOF")
+    return "\n".join(out) + "\n"
+
+
+class CachedRenderer:
+    """
+    Cache de renderizado por secuencia de snapshot
+    Varios scrapes concurrentes del mismo snapshot cuestan un solo render.
+    """
+
+    def __init__(self, render: Callable[[], str]):
+        self._render = render
+        self._lock = threading.Lock()
+        self._seq: Optional[int] = None
+        self._text: str = ""
+        self.renders = 0
+
+    def get(self, seq: int) -> str:
+        """Obtener el texto para `seq`, renderizando solo si cambió"""
+        if seq == self._seq:
+            return self._text
+        with self._lock:
+            if seq != self._seq:  # Otro hilo pudo renderizar mientras esperábamos
+                self._text = self._render()
+                self._seq = seq
+                self.renders += 1
+            return self._text
+
+
+def validate_openmetrics(text: str, openmetrics: bool = True) -> List[str]:
+    """
+    Validar texto OpenMetrics (subconjunto usado por OmniMonitor)
+    Con openmetrics=False valida el formato de texto Prometheus 0.0.4.
+    Retorna lista de errores (vacía si es válido).
+    """
+    errors = []
+    if openmetrics and not text.endswith("# EOF\n"):
+        errors.append("Falta '# EOF' final")
+    if not openmetrics and "# EOF" in text:
+        errors.append("'# EOF' no existe en el formato 0.0.4")
+    lines = text.rstrip("\n").split("\n")
+    if openmetrics:
+        lines = lines[:-1]
+
+    types: Dict[str, str] = {}
+    finished = set()
+    current = None
+    series = set()
+    kinds = ("gauge", "counter", "info", "stateset", "unknown", "histogram", "summary") if openmetrics \
+        else ("gauge", "counter", "untyped", "histogram", "summary")
+    for n, line in enumerate(lines, 1):
+        if line.startswith("#"):
+            parts = line.split(" ", 3)
+            if len(parts) < 4 or parts[1] not in (("TYPE", "UNIT", "HELP") if openmetrics else ("TYPE", "HELP")):
+                errors.append(f"Línea {n}: metadato inválido")
+                continue
+            name = parts[2]
+            if not _NAME_RE.match(name):
+                errors.append(f"Línea {n}: nombre inválido '{name}'")
+            if parts[1] == "TYPE":
+                if name in types:
+                    errors.append(f"Línea {n}: familia '{name}' duplicada")
+                if parts[3] not in kinds:
+                    errors.append(f"Línea {n}: tipo inválido '{parts[3]}'")
+                if current:
+                    finished.add(current)
+                types[name] = parts[3]
+                current = name
+            elif parts[1] == "UNIT" and not name.endswith("_" + parts[3]):
+                errors.append(f"Línea {n}: la unidad debe ser sufijo del nombre")
+            elif name != current:
+                errors.append(f"Línea {n}: metadato fuera de su familia")
+            continue
+
+        match = _SAMPLE_RE.match(line)
+        if not match:
+            errors.append(f"Línea {n}: muestra mal formada")
+            continue
+        name, labels, value = match.groups()
+        kind = types.get(current)
+        expected = (current or "") + ({"counter": "_total", "info": "_info"}.get(kind, "") if openmetrics else "")
+        if current is None or name != expected:
+            errors.append(f"Línea {n}: muestra '{name}' fuera de su familia")
+        if labels:
+            body = labels[1:-1]
+            consumed = ",".join(m.group(0) for m in _LABEL_RE.finditer(body))
+            if consumed != body:
+                errors.append(f"Línea {n}: etiquetas mal formadas")
+        try:
+            float(value)
+        except ValueError:
+            errors.append(f"Línea {n}: valor no numérico '{value}'")
+        key = (name, labels)
+        if key in series:
+            errors.append(f"Línea {n}: serie duplicada")
+        series.add(key)
+    return errors
+
+
+if __name__ == "__main__":
+    # Test: renderizar, validar y comprobar la cache
+    from src.server.api import get_all_metrics
+    from src.crud.processes import ProcessManager
+
+    text = render_openmetrics(
+        get_all_metrics(),
+        ProcessManager().get_stats(),
+        [{"id": 1, "name": 'CPU "Alto"', "metric": "cpu_usage", "triggered_count": 3}]
+    )
+    print(text)
+    errors = validate_openmetrics(text)
+    assert not errors, errors
+    assert validate_openmetrics("omnimonitor_x 1\n"), "El validador debe rechazar texto inválido"
+
+    # Formato 0.0.4 (text/plain): sin info, UNIT ni EOF; TYPE con el nombre de las muestras
+    plain = render_openmetrics(
+        get_all_metrics(),
+        ProcessManager().get_stats(),
+        [{"id": 1, "name": "CPU", "metric": "cpu_usage", "triggered_count": 3}],
+        openmetrics=False
+    )
+    errors = validate_openmetrics(plain, openmetrics=False)
+    assert not errors, errors
+    assert "# TYPE omnimonitor_alert_triggers_total counter" in plain
+    assert "# TYPE omnimonitor_system_info gauge" in plain
+    assert validate_openmetrics(text, openmetrics=False), "OpenMetrics no es 0.0.4 válido"
+
+    renderer = CachedRenderer(lambda: text)
+    for _ in range(5):
+        renderer.get(1)
+    renderer.get(2)
+    assert renderer.renders == 2
+    print("Validación OK")
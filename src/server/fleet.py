@@ -0,0 +1,308 @@
+"""
+Modo flota para OmniMonitor
+Consulta concurrentemente N servidores API de OmniMonitor y combina sus
+snapshots en una vista de flota con agregados globales.
+
+Cada host se consulta en su propia tarea asyncio; un semáforo limita las
+conexiones simultáneas, cada petición tiene su timeout y los hosts caídos
+entran en backoff exponencial. Un host lento nunca bloquea a los demás ni
+al loop de refresco de la UI, que solo lee el último estado conocido.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.server.wire import MIME_TYPE, decode_snapshot
+
+DEFAULT_PORT = 8765
+MAX_BACKOFF_DOUBLINGS = 16  # 2**16 ya supera cualquier tope razonable; evita OverflowError
+
+
+@dataclass
+class HostState:
+    """Estado de un host de la flota"""
+    url: str
+    snapshot: Optional[Dict] = None
+    updated_at: float = 0.0
+    latency_ms: float = 0.0
+    failures: int = 0
+    error: Optional[str] = None
+    next_attempt: float = 0.0
+    polls: int = field(default=0, repr=False)
+
+    @property
+    def name(self) -> str:
+        info = ((self.snapshot or {}).get("system") or {}).get("info") or {}
+        return info.get("hostname") or urlsplit(self.url).netloc
+
+    def is_up(self, stale_after: float) -> bool:
+        return self.snapshot is not None and self.error is None and \
+            time.monotonic() - self.updated_at < stale_after
+
+
+def normalize_host(host: str) -> str:
+    """Aceptar 'host', 'host:puerto' o URL completa"""
+    host = host.strip()
+    if "://" not in host:
+        host = f"http://{host}"
+    parts = urlsplit(host)
+    port = parts.port or DEFAULT_PORT
+    return f"{parts.scheme}://{parts.hostname}:{port}"
+
+
+async def fetch_snapshot(url: str, timeout: float) -> Dict:
+    """GET /api/all en formato binario sobre una conexión asyncio"""
+    parts = urlsplit(url)
+
+    async def _request():
+        reader, writer = await asyncio.open_connection(parts.hostname, parts.port)
+        try:
+            writer.write(
+                f"GET /api/all HTTP/1.0\r\nHost: {parts.netloc}\r\n"
+                f"Accept: {MIME_TYPE}, application/json;q=0.5\r\n\r\n".encode()
+            )
+            await writer.drain()
+            raw = await reader.read()
+        finally:
+            writer.close()
+        head, _, body = raw.partition(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split()[1])
+        if status != 200:
+            raise ConnectionError(f"HTTP {status}")
+        headers = {k.strip().lower(): v.strip() for k, _, v in (l.partition(":") for l in lines[1:])}
+        if headers.get("content-type", "").startswith(MIME_TYPE):
+            return decode_snapshot(body)
+        return json.loads(body)
+
+    return await asyncio.wait_for(_request(), timeout)
+
+
+class FleetClient:
+    """Cliente asyncio que mantiene el último snapshot de cada host"""
+
+    def __init__(self, hosts: List[str], interval: float = 1.0, timeout: float = 2.0,
+                 max_connections: int = 16, max_backoff: float = 60.0):
+        self.interval = interval
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.hosts: Dict[str, HostState] = {}
+        for host in hosts:
+            url = normalize_host(host)
+            self.hosts[url] = HostState(url=url)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._max_connections = max_connections
+        self._tasks: List[asyncio.Task] = []
+
+    async def poll_host(self, state: HostState):
+        """Consultar un host una vez, respetando el límite de conexiones"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_connections)
+        async with self._semaphore:
+            start = time.monotonic()
+            try:
+                state.snapshot = await fetch_snapshot(state.url, self.timeout)
+                state.updated_at = time.monotonic()
+                state.latency_ms = (state.updated_at - start) * 1000
+                state.failures = 0
+                state.error = None
+                state.next_attempt = 0.0
+            except Exception as e:
+                state.failures += 1
+                state.error = str(e) or type(e).__name__
+                # Backoff exponencial con tope: 2, 4, 8... segundos
+                backoff = min(self.interval * (2 ** min(state.failures, MAX_BACKOFF_DOUBLINGS)),
+                              self.max_backoff)
+                state.next_attempt = time.monotonic() + backoff
+            state.polls += 1
+
+    async def poll_once(self):
+        """Consultar todos los hosts disponibles en paralelo (una ronda)"""
+        now = time.monotonic()
+        due = [s for s in self.hosts.values() if s.next_attempt <= now]
+        await asyncio.gather(*(self.poll_host(s) for s in due))
+
+    async def _host_loop(self, state: HostState):
+        while True:
+            delay = state.next_attempt - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                await self.poll_host(state)
+            except Exception as e:
+                # Un fallo inesperado de un host no debe detener su tarea
+                state.error = f"{type(e).__name__}: {e}"
+                state.next_attempt = time.monotonic() + self.max_backoff
+                continue
+            if state.error is None:
+                await asyncio.sleep(self.interval)
+
+    async def run(self):
+        """Consultar cada host en su propia tarea hasta que se cancele"""
+        self._tasks = [asyncio.ensure_future(self._host_loop(s)) for s in self.hosts.values()]
+        try:
+            # return_exceptions: si una tarea muere, las demás siguen consultando
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        finally:
+            for task in self._tasks:
+                task.cancel()
+
+    def fleet_view(self) -> Dict:
+        """Snapshots por host + agregados de flota"""
+        stale_after = max(self.interval * 3, self.timeout * 2)
+        hosts = []
+        up = []
+        for state in self.hosts.values():
+            alive = state.is_up(stale_after)
+            hosts.append({
+                "url": state.url,
+                "name": state.name,
+                "up": alive,
+                "latency_ms": round(state.latency_ms, 1),
+                "failures": state.failures,
+                "error": state.error,
+                "snapshot": state.snapshot,
+            })
+            if alive:
+                up.append(state)
+        return {"hosts": hosts, "aggregate": aggregate([s.snapshot for s in up], len(self.hosts))}
+
+
+def _host_of(snapshot: Dict) -> str:
+    return ((snapshot.get("system") or {}).get("info") or {}).get("hostname", "")
+
+
+def aggregate(snapshots: List[Dict], total_hosts: int = None) -> Dict:
+    """Agregados de flota: máximos de uso y sumas de tráfico"""
+    result = {
+        "hosts_up": len(snapshots),
+        "hosts_total": total_hosts if total_hosts is not None else len(snapshots),
+        "cpu_max": 0.0, "cpu_max_host": None, "cpu_avg": 0.0,
+        "ram_max": 0.0, "ram_max_host": None,
+        "disk_max": 0.0, "disk_max_host": None,
+        "net_upload": 0.0, "net_download": 0.0,
+        "disk_read_speed": 0.0, "disk_write_speed": 0.0,
+        "memory_used": 0, "memory_total": 0,
+    }
+    if not snapshots:
+        return result
+
+    cpu_total = 0.0
+    for snap in snapshots:
+        host = _host_of(snap)
+        cpu = (snap.get("cpu") or {}).get("usage") or 0
+        ram = (snap.get("memory") or {}).get("percent") or 0
+        disk = ((snap.get("disk") or {}).get("usage") or {}).get("percent") or 0
+        cpu_total += cpu
+        if cpu >= result["cpu_max"]:
+            result["cpu_max"], result["cpu_max_host"] = cpu, host
+        if ram >= result["ram_max"]:
+            result["ram_max"], result["ram_max_host"] = ram, host
+        if disk >= result["disk_max"]:
+            result["disk_max"], result["disk_max_host"] = disk, host
+        speed = (snap.get("network") or {}).get("speed") or {}
+        result["net_upload"] += speed.get("upload") or 0
+        result["net_download"] += speed.get("download") or 0
+        io = (snap.get("disk") or {}).get("io") or {}
+        result["disk_read_speed"] += io.get("read_speed") or 0
+        result["disk_write_speed"] += io.get("write_speed") or 0
+        mem = snap.get("memory") or {}
+        result["memory_used"] += mem.get("used") or 0
+        result["memory_total"] += mem.get("total") or 0
+    result["cpu_avg"] = cpu_total / len(snapshots)
+    return result
+
+
+def merged_snapshot(view: Dict) -> Dict:
+    """
+    Construir un snapshot con formato /api/all a partir de la vista de flota
+    para reutilizar las tarjetas de la UI (CPU/RAM/disco = peor host,
+    red e I/O = suma de la flota)
+    """
+    agg = view["aggregate"]
+    up = [h["snapshot"] for h in view["hosts"] if h["up"]]
+    if not up:
+        return {}
+    worst_cpu = max(up, key=lambda s: (s.get("cpu") or {}).get("usage") or 0)
+    worst_disk = max(up, key=lambda s: ((s.get("disk") or {}).get("usage") or {}).get("percent") or 0)
+    memory_total = agg["memory_total"] or 1
+    return {
+        "cpu": dict(worst_cpu.get("cpu") or {}),
+        "memory": {
+            "percent": round(agg["memory_used"] / memory_total * 100, 1),
+            "used": agg["memory_used"],
+            "total": agg["memory_total"],
+            "free": agg["memory_total"] - agg["memory_used"],
+        },
+        "swap": worst_cpu.get("swap"),
+        "disk": {
+            "usage": (worst_disk.get("disk") or {}).get("usage"),
+            "info": (worst_disk.get("disk") or {}).get("info") or [],
+            "io": {"read_speed": agg["disk_read_speed"], "write_speed": agg["disk_write_speed"]},
+        },
+        "network": {
+            "speed": {"upload": agg["net_upload"], "download": agg["net_download"]},
+            "info": {"interfaces": []},
+        },
+        "gpu": worst_cpu.get("gpu"),
+        "system": {
+            "info": {
+                "os": "Flota", "os_version": "", "architecture": "",
+                "processor": f"{agg['hosts_up']}/{agg['hosts_total']} hosts | peor: {agg['cpu_max_host']}",
+                "hostname": "fleet",
+            },
+            "uptime": "0:00:00",
+            "battery": None,
+        },
+    }
+
+
+if __name__ == "__main__":
+    # Test: varios servidores API locales en puertos distintos + un host caído
+    import tempfile
+    import threading
+    from src.server.api import create_server
+    from src.database.db import use_database
+
+    db_dir = tempfile.TemporaryDirectory()
+    use_database(os.path.join(db_dir.name, 'fleet.db'))  # No tocar la base del repositorio
+    ports = [8871, 8872, 8873]
+    for port in ports:
+        server = create_server(port)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    hosts = [f"localhost:{p}" for p in ports] + ["localhost:8879"]
+    client = FleetClient(hosts, interval=0.5, timeout=1.0, max_connections=2)
+
+    async def demo():
+        task = asyncio.ensure_future(client.run())
+        await asyncio.sleep(2.5)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(demo())
+    view = client.fleet_view()
+    for h in view["hosts"]:
+        print(f"  {h['url']:<26} up={h['up']} latencia={h['latency_ms']}ms fallos={h['failures']} {h['error'] or ''}")
+    print(f"Agregados: {view['aggregate']}")
+    assert view["aggregate"]["hosts_up"] == len(ports)
+    assert view["aggregate"]["hosts_total"] == len(hosts)
+    dead = client.hosts[normalize_host("localhost:8879")]
+    assert dead.failures >= 1 and dead.polls < client.hosts[normalize_host(hosts[0])].polls
+    assert merged_snapshot(view)["network"]["speed"]["download"] == view["aggregate"]["net_download"]
+
+    # Host caído durante días: el backoff se queda en el tope, sin OverflowError
+    dead.failures = 5000
+    asyncio.run(client.poll_host(dead))
+    assert dead.next_attempt - time.monotonic() <= client.max_backoff
+    db_dir.cleanup()
+    print("Flota OK")
@@ -0,0 +1,365 @@
+"""
+Snapshot compartido en memoria para consumidores locales
+Un proceso colector publica el último snapshot (mismo formato binario que
+`application/vnd.omnimonitor.snapshot`, ver wire.py) en una región mapeada
+en memoria protegida por un seqlock. La interfaz Flet, el servidor API y
+las herramientas de consola lo leen sin recolectar por su cuenta: N
+consumidores locales cuestan una sola recolección.
+
+Layout de la región (little-endian, tamaño fijo REGION_SIZE):
+    cabecera : magic 'OMSH', versión u8, relleno, secuencia u64,
+               longitud u32, pid u32, publicado_en f64
+    payload  : snapshot binario de wire.py (cabecera + núcleo + secciones)
+
+Seqlock: el escritor pone la secuencia en impar, copia el payload y el
+resto de la cabecera y, como última escritura, la vuelve a poner en par. El lector copia el payload entre dos lecturas de la
+secuencia y reintenta si cambió o era impar. Las lecturas son accesos a
+memoria (sin syscalls) y el snapshot decodificado se reutiliza mientras la
+secuencia no cambie.
+
+Uso:
+    python app.py --collector [--interval 1.0]    # proceso colector
+    python -m src.server.shm --read               # último snapshot en JSON
+"""
+import argparse
+import json
+import mmap
+import os
+import signal
+import struct
+import sys
+import tempfile
+import time
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo de colector único
+    fcntl = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.server.wire import encode_snapshot, decode_snapshot
+
+SHM_MAGIC = b"OMSH"
+SHM_VERSION = 1
+REGION_SIZE = 64 * 1024
+
+_HEADER = struct.Struct("<4sB3xQIId")
+_SEQ = struct.Struct("<Q")
+_SEQ_OFFSET = 8
+PAYLOAD_CAPACITY = REGION_SIZE - _HEADER.size
+
+# Un snapshot más viejo que esto se considera huérfano (colector detenido)
+DEFAULT_MAX_AGE = 5.0
+READ_RETRIES = 100
+
+
+def default_path() -> str:
+    """/dev/shm en Linux (memoria, sin disco); directorio temporal en el resto"""
+    path = os.environ.get("OMNIMONITOR_SHM")
+    if path:
+        return path
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, "omnimonitor-snapshot")
+
+
+class SharedSnapshotWriter:
+    """Extremo escritor (un solo colector por región)"""
+
+    def __init__(self, path: str = None):
+        self.path = path or default_path()
+        self._file = open(self.path, "a+b")
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self._file.close()
+                raise RuntimeError(f"Ya hay un colector publicando en {self.path}")
+        self._file.truncate(REGION_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), REGION_SIZE, access=mmap.ACCESS_WRITE)
+        existing = _HEADER.unpack_from(self._map, 0)
+        # Continuar la secuencia anterior (par) para no confundir a lectores abiertos
+        self.seq = existing[2] + (existing[2] & 1) if existing[0] == SHM_MAGIC else 0
+        self.published = 0
+
+    def publish(self, data: Dict, timestamp: float = None):
+        """Publicar un snapshot (formato de /api/all)"""
+        payload = encode_snapshot(data, timestamp)
+        if len(payload) > PAYLOAD_CAPACITY:
+            payload = encode_snapshot(data, timestamp, include_sections=False)
+        self.publish_raw(payload)
+
+    def publish_raw(self, payload: bytes):
+        """Publicar un payload ya codificado"""
+        if len(payload) > PAYLOAD_CAPACITY:
+            raise ValueError(f"Snapshot de {len(payload)} bytes (máximo {PAYLOAD_CAPACITY})")
+        self.seq += 1  # Impar: escritura en curso
+        _SEQ.pack_into(self._map, _SEQ_OFFSET, self.seq)
+        self._map[_HEADER.size:_HEADER.size + len(payload)] = payload
+        _HEADER.pack_into(self._map, 0, SHM_MAGIC, SHM_VERSION, self.seq, len(payload),
+                          os.getpid(), time.time())
+        self.seq += 1  # Par: consistente; siempre la última escritura
+        _SEQ.pack_into(self._map, _SEQ_OFFSET, self.seq)
+        self.published += 1
+
+    def close(self):
+        """Marcar la región sin colector (pid 0) y liberarla"""
+        if self._map is None:
+            return
+        self.seq += 1
+        _HEADER.pack_into(self._map, 0, SHM_MAGIC, SHM_VERSION, self.seq, 0, 0, 0.0)
+        self.seq += 1
+        _SEQ.pack_into(self._map, _SEQ_OFFSET, self.seq)
+        self._map.close()
+        self._map = None
+        self._file.close()
+
+
+class SharedSnapshotReader:
+    """Extremo lector; abre la región cuando aparece el colector"""
+
+    def __init__(self, path: str = None):
+        self.path = path or default_path()
+        self._map: Optional[mmap.mmap] = None
+        self._seq = -1
+        self._data: Optional[Dict] = None
+        self.retries = 0
+
+    def _open(self) -> bool:
+        if self._map is not None:
+            return True
+        try:
+            with open(self.path, "rb") as f:
+                if os.fstat(f.fileno()).st_size < REGION_SIZE:
+                    return False
+                self._map = mmap.mmap(f.fileno(), REGION_SIZE, access=mmap.ACCESS_READ)
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def read_raw(self, max_age: float = DEFAULT_MAX_AGE) -> Optional[tuple]:
+        """(secuencia, publicado_en, payload) consistentes, o None sin colector vivo"""
+        if not self._open():
+            return None
+        buf = self._map
+        for _ in range(READ_RETRIES):
+            magic, version, seq, length, pid, published_at = _HEADER.unpack_from(buf, 0)
+            if magic != SHM_MAGIC or version != SHM_VERSION or not pid:
+                return None
+            if seq & 1:
+                self.retries += 1
+                continue
+            payload = buf[_HEADER.size:_HEADER.size + length]
+            if _SEQ.unpack_from(buf, _SEQ_OFFSET)[0] != seq:
+                self.retries += 1  # El escritor publicó mientras copiábamos
+                continue
+            if max_age is not None and time.time() - published_at > max_age:
+                return None
+            return seq, published_at, payload
+        return None
+
+    def read(self, max_age: float = DEFAULT_MAX_AGE) -> Optional[Dict]:
+        """Último snapshot decodificado (el mismo objeto mientras no cambie)"""
+        raw = self.read_raw(max_age)
+        if raw is None:
+            return None
+        seq, _, payload = raw
+        if seq != self._seq:
+            self._data = decode_snapshot(payload)
+            self._seq = seq
+        return self._data
+
+    def available(self, max_age: float = DEFAULT_MAX_AGE) -> bool:
+        return self.read_raw(max_age) is not None
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+class SnapshotCollector:
+    """
+    Snapshot completo (formato de /api/all) con las cadencias del planificador:
+    las sondas caras (GPU, sensores, particiones) no se repiten en cada ronda
+    """
+
+    def __init__(self, monitor=None, interval: float = 1.0):
+        from src.core.monitor import SystemMonitor
+        from src.core.scheduler import MetricSource, SamplingScheduler
+        self.monitor = monitor or SystemMonitor()
+        m = self.monitor
+        self.scheduler = SamplingScheduler([
+            MetricSource("cpu", lambda: m.get_cpu_usage()),
+            MetricSource("per_core", lambda: m.get_cpu_per_core()),
+            MetricSource("memory", lambda: m.get_memory_usage()),
+            MetricSource("network", lambda: m.get_network_speed()),
+            MetricSource("disk_io", lambda: m.get_disk_io()),
+            MetricSource("disk_devices", lambda: m.get_disk_io_per_device()),
+            MetricSource("net_devices", lambda: m.get_network_speed_per_interface()),
+            MetricSource("cpu_freq", lambda: m.get_cpu_freq(), every=2),
+            MetricSource("cpu_temp", lambda: m.get_cpu_temp(), every=2, expensive=True),
+            MetricSource("gpu", lambda: m.get_gpu_info(), every=2, expensive=True),
+            MetricSource("swap", lambda: m.get_swap_memory(), every=5),
+            MetricSource("temperatures", lambda: m.get_all_temperatures(), every=5, expensive=True),
+            MetricSource("disk", lambda: m.get_disk_usage(), every=5),
+            MetricSource("uptime", lambda: str(m.get_uptime()), every=5),
+            MetricSource("disk_info", lambda: m.get_disk_info(), every=10, expensive=True),
+            MetricSource("network_info", lambda: m.get_network_info(), every=10, expensive=True),
+            MetricSource("battery", lambda: m.get_battery_info(), every=10),
+            MetricSource("count", lambda: m.get_cpu_count(), every=60),
+            MetricSource("system_info", lambda: m.get_system_info(), every=60),
+        ], interval=interval, load_source="cpu")
+
+    def collect(self) -> Dict:
+        self.scheduler.collect()
+        v = self.scheduler.values
+        return {
+            "cpu": {
+                "usage": v.get("cpu"),
+                "per_core": v.get("per_core"),
+                "count": v.get("count"),
+                "freq": v.get("cpu_freq"),
+                "temp": v.get("cpu_temp"),
+            },
+            "memory": v.get("memory"),
+            "swap": v.get("swap"),
+            "temperatures": v.get("temperatures"),
+            "disk": {"usage": v.get("disk"), "info": v.get("disk_info"), "io": v.get("disk_io"),
+                     "devices": v.get("disk_devices")},
+            "network": {"speed": v.get("network"), "info": v.get("network_info"),
+                        "devices": v.get("net_devices")},
+            "gpu": v.get("gpu"),
+            "system": {"info": v.get("system_info"), "uptime": v.get("uptime"), "battery": v.get("battery")},
+        }
+
+    def next_delay(self) -> float:
+        return self.scheduler.next_delay()
+
+
+_reader: Optional[SharedSnapshotReader] = None
+
+
+def get_shared_reader() -> SharedSnapshotReader:
+    """Lector de la región por defecto (singleton)"""
+    global _reader
+    if _reader is None:
+        _reader = SharedSnapshotReader()
+    return _reader
+
+
+def read_shared_snapshot(max_age: float = DEFAULT_MAX_AGE) -> Optional[Dict]:
+    """Snapshot del colector local, o None si no hay uno publicando"""
+    return get_shared_reader().read(max_age)
+
+
+def run_collector(interval: float = 1.0, path: str = None):
+    """Bucle del proceso colector (Ctrl+C para detener)"""
+    writer = SharedSnapshotWriter(path)
+    collector = SnapshotCollector(interval=interval)
+    print(f"Publicando snapshots en {writer.path} cada {interval:g} s (Ctrl+C para detener)")
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # Marcar la región como libre también al terminar
+    try:
+        while True:
+            writer.publish(collector.collect())
+            time.sleep(collector.next_delay())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Colector de snapshots compartidos de OmniMonitor")
+    parser.add_argument("--interval", type=float, default=1.0, help="Segundos entre snapshots")
+    parser.add_argument("--path", default=None, help=f"Región compartida (por defecto {default_path()})")
+    parser.add_argument("--read", action="store_true", help="Imprimir el último snapshot en JSON y salir")
+    args = parser.parse_args(argv)
+    if args.read:
+        data = SharedSnapshotReader(args.path).read()
+        if data is None:
+            print("No hay un colector publicando", file=sys.stderr)
+            return 1
+        print(json.dumps(data, indent=2))
+        return 0
+    try:
+        run_collector(args.interval, args.path)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main())
+    # Test: escritor y lector en procesos distintos, sin lecturas rotas
+    import multiprocessing
+
+    path = os.path.join(tempfile.mkdtemp(), "snapshot")
+    collector = SnapshotCollector()
+    snapshot = collector.collect()
+
+    def marked_payload(i):
+        # Longitud variable y autoverificable: 'T' + longitud u32 + relleno
+        length = 5 + (i * 7919) % 8000
+        return b"T" + struct.pack("<I", length) + bytes([i % 251]) * (length - 5)
+
+    def hammer(path, rounds):
+        writer = SharedSnapshotWriter(path)
+        for i in range(rounds):
+            if i % 2:
+                writer.publish_raw(marked_payload(i))
+                continue
+            snapshot["cpu"]["usage"] = float(i % 100)
+            writer.publish(snapshot)
+        time.sleep(0.5)
+        writer.close()
+
+    process = multiprocessing.Process(target=hammer, args=(path, 20000))
+    process.start()
+    reader = SharedSnapshotReader(path)
+    reads = torn = 0
+    deadline = time.time() + 30
+    while process.is_alive() and time.time() < deadline:
+        raw = reader.read_raw()
+        if raw is None:
+            continue
+        reads += 1
+        payload = raw[2]
+        if payload[:1] == b"T":
+            # Cabecera y payload deben ser de la misma publicación
+            if struct.unpack_from("<I", payload, 1)[0] != len(payload) or \
+                    payload[5:].strip(payload[5:6]) != b"":
+                torn += 1
+            continue
+        try:
+            decode_snapshot(payload)
+        except Exception:
+            torn += 1
+    process.join()
+    print(f"{reads} lecturas concurrentes, {reader.retries} reintentos, {torn} rotas")
+    assert reads and not torn
+    assert reader.read() is None  # Colector cerrado
+
+    writer = SharedSnapshotWriter(path)
+    writer.publish(snapshot)
+    try:
+        SharedSnapshotWriter(path)
+        assert fcntl is None, "se permitieron dos colectores"
+    except RuntimeError:
+        pass
+    n = 100_000
+    start = time.perf_counter()
+    for _ in range(n):
+        reader.read()
+    cached_us = (time.perf_counter() - start) / n * 1e6
+    start = time.perf_counter()
+    for _ in range(n // 10):
+        writer.publish_raw(encode_snapshot(snapshot))
+        reader.read()
+    fresh_us = (time.perf_counter() - start) / (n // 10) * 1e6
+    assert reader.read()["memory"]["total"] == snapshot["memory"]["total"]
+    writer.close()
+    print(f"Lectura sin cambios: {cached_us:.2f} µs | publicar + leer nuevo: {fresh_us:.1f} µs")
+    print("Snapshot compartido OK")
@@ -0,0 +1,408 @@
+"""
+Formato binario compacto para snapshots de OmniMonitor
+Codifica el mismo documento que /api/all en un struct de layout fijo
+(núcleo numérico) más secciones variables opcionales (núcleos, particiones,
+interfaces, swap, sensores de temperatura, tasas por disco y por interfaz y
+textos descriptivos).
+
+Layout (little-endian):
+    cabecera   : magic 'OMNI', versión u8, nº de secciones u8, timestamp f64
+    núcleo     : CORE_STRUCT (siempre presente)
+    secciones  : [id u8][longitud u32][payload] repetido
+
+El uso por núcleo viaja en décimas de porcentaje (u16).
+
+Los valores ausentes (None) se codifican como NaN en los campos float.
+"""
+import math
+import struct
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+MIME_TYPE = "application/vnd.omnimonitor.snapshot"
+MAGIC = b"OMNI"
+VERSION = 1
+
+HEADER_STRUCT = struct.Struct("<4sBBd")
+
+# cpu: usage, freq, temp, físicos, lógicos
+# memoria: percent, used, total, free
+# disco: percent, used, total, free, read_speed, write_speed
+# red: upload, download
+# gpu: presente, usage, temp
+# sistema: uptime (s), batería presente, percent, plugged, time_left
+CORE_STRUCT = struct.Struct(
+    "<fffHH"
+    "fQQQ"
+    "fQQQdd"
+    "dd"
+    "Bff"
+    "dBfBd"
+)
+
+SECTION_HEADER = struct.Struct("<BI")
+SECTION_PER_CORE = 1
+SECTION_PARTITIONS = 2
+SECTION_INTERFACES = 3
+SECTION_STRINGS = 4
+SECTION_SWAP = 5
+SECTION_TEMPERATURES = 6
+SECTION_DISK_DEVICES = 7
+SECTION_NIC_DEVICES = 8
+
+_NAN = float("nan")
+_PARTITION_STRUCT = struct.Struct("<fQQQ")
+_SWAP_STRUCT = struct.Struct("<fQQQ")
+_TEMPERATURE_STRUCT = struct.Struct("<f")
+_DISK_DEVICE_KEYS = ("read_speed", "write_speed", "read_iops", "write_iops", "await_ms",
+                     "read_await_ms", "write_await_ms", "queue_depth", "util", "in_flight")
+_DISK_DEVICE_STRUCT = struct.Struct(f"<{len(_DISK_DEVICE_KEYS)}f")
+_NIC_DEVICE_KEYS = ("upload", "download", "packets_sent", "packets_recv", "errors", "drops")
+_NIC_DEVICE_STRUCT = struct.Struct(f"<{len(_NIC_DEVICE_KEYS)}f")
+_SYSTEM_KEYS = ("os", "os_version", "architecture", "processor", "hostname")
+
+
+def _f(value) -> float:
+    """Convertir None a NaN"""
+    return _NAN if value is None else float(value)
+
+
+def _opt(value: float) -> Optional[float]:
+    """Convertir NaN a None"""
+    return None if math.isnan(value) else value
+
+
+def _pack_str(value: Optional[str]) -> bytes:
+    data = (value or "").encode("utf-8")[:255]
+    return bytes((len(data),)) + data
+
+
+def _unpack_str(buf: memoryview, offset: int):
+    length = buf[offset]
+    start = offset + 1
+    return bytes(buf[start:start + length]).decode("utf-8", "replace"), start + length
+
+
+def parse_uptime(uptime) -> float:
+    """Convertir str(timedelta) o segundos a segundos"""
+    if isinstance(uptime, (int, float)):
+        return float(uptime)
+    if isinstance(uptime, timedelta):
+        return uptime.total_seconds()
+    try:
+        days = 0
+        text = str(uptime)
+        if "day" in text:
+            day_part, text = text.split(",", 1)
+            days = int(day_part.split()[0])
+        hours, minutes, seconds = text.strip().split(":")
+        return days * 86400 + int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    except (ValueError, AttributeError):
+        return 0.0
+
+
+def _section(section_id: int, payload: bytes) -> bytes:
+    return SECTION_HEADER.pack(section_id, len(payload)) + payload
+
+
+def encode_snapshot(data: Dict, timestamp: float = None,
+                    include_sections: bool = True) -> bytes:
+    """
+    Codificar un snapshot (formato de /api/all) a binario
+
+    Args:
+        data: Diccionario devuelto por get_all_metrics()
+        timestamp: Marca de tiempo del snapshot (por defecto, ahora)
+        include_sections: Si incluir las secciones variables
+    """
+    cpu = data.get("cpu") or {}
+    mem = data.get("memory") or {}
+    disk = data.get("disk") or {}
+    disk_usage = disk.get("usage") or {}
+    disk_io = disk.get("io") or {}
+    net_speed = (data.get("network") or {}).get("speed") or {}
+    gpu = data.get("gpu")
+    system = data.get("system") or {}
+    battery = system.get("battery")
+    count = cpu.get("count") or (1, 1)
+
+    core = CORE_STRUCT.pack(
+        _f(cpu.get("usage")), _f(cpu.get("freq")), _f(cpu.get("temp")),
+        int(count[0] or 1), int(count[1] or 1),
+        _f(mem.get("percent")), int(mem.get("used") or 0),
+        int(mem.get("total") or 0), int(mem.get("free") or 0),
+        _f(disk_usage.get("percent")), int(disk_usage.get("used") or 0),
+        int(disk_usage.get("total") or 0), int(disk_usage.get("free") or 0),
+        _f(disk_io.get("read_speed")), _f(disk_io.get("write_speed")),
+        _f(net_speed.get("upload")), _f(net_speed.get("download")),
+        1 if gpu else 0,
+        _f(gpu.get("usage")) if gpu else _NAN,
+        _f(gpu.get("temp")) if gpu else _NAN,
+        parse_uptime(system.get("uptime", 0)),
+        1 if battery else 0,
+        _f(battery.get("percent")) if battery else _NAN,
+        1 if battery and battery.get("plugged") else 0,
+        _f(battery.get("time_left")) if battery else _NAN,
+    )
+
+    sections = []
+    if include_sections:
+        per_core = cpu.get("per_core") or []
+        sections.append(_section(
+            SECTION_PER_CORE,
+            # Décimas de porcentaje en u16: exacto a 0.1 y la mitad que un f32
+            struct.pack(f"<H{len(per_core)}H", len(per_core),
+                        *(int(round((v or 0) * 10)) for v in per_core))
+        ))
+
+        partitions = disk.get("info") or []
+        if isinstance(partitions, list):
+            payload = [struct.pack("<H", len(partitions))]
+            for p in partitions:
+                usage = p.get("usage") or {}
+                payload.append(
+                    _pack_str(p.get("device")) + _pack_str(p.get("mountpoint")) +
+                    _pack_str(p.get("fstype")) + _pack_str(p.get("type")) +
+                    _PARTITION_STRUCT.pack(
+                        _f(usage.get("percent")), int(usage.get("used") or 0),
+                        int(usage.get("total") or 0), int(usage.get("free") or 0)
+                    )
+                )
+            sections.append(_section(SECTION_PARTITIONS, b"".join(payload)))
+
+        interfaces = ((data.get("network") or {}).get("info") or {}).get("interfaces") or []
+        payload = [struct.pack("<H", len(interfaces))]
+        for iface in interfaces:
+            payload.append(
+                _pack_str(iface.get("name")) + _pack_str(iface.get("ip")) +
+                struct.pack("<I", int(iface.get("speed") or 0))
+            )
+        sections.append(_section(SECTION_INTERFACES, b"".join(payload)))
+
+        info = system.get("info") or {}
+        strings = [info.get(k) for k in _SYSTEM_KEYS] + [gpu.get("name") if gpu else None]
+        sections.append(_section(SECTION_STRINGS, b"".join(_pack_str(s) for s in strings)))
+
+        swap = data.get("swap")
+        if swap:
+            sections.append(_section(SECTION_SWAP, _SWAP_STRUCT.pack(
+                _f(swap.get("percent")), int(swap.get("used") or 0),
+                int(swap.get("total") or 0), int(swap.get("free") or 0)
+            )))
+
+        temperatures = data.get("temperatures") or []
+        if temperatures:
+            payload = [struct.pack("<H", len(temperatures))]
+            for reading in temperatures:
+                payload.append(
+                    _pack_str(reading.get("sensor")) + _pack_str(reading.get("label")) +
+                    _TEMPERATURE_STRUCT.pack(_f(reading.get("current")))
+                )
+            sections.append(_section(SECTION_TEMPERATURES, b"".join(payload)))
+
+        for section_id, devices, keys, layout in (
+                (SECTION_DISK_DEVICES, disk.get("devices"), _DISK_DEVICE_KEYS, _DISK_DEVICE_STRUCT),
+                (SECTION_NIC_DEVICES, (data.get("network") or {}).get("devices"),
+                 _NIC_DEVICE_KEYS, _NIC_DEVICE_STRUCT)):
+            if devices:
+                payload = [struct.pack("<H", len(devices))]
+                for name, rates in devices.items():
+                    payload.append(_pack_str(name) + layout.pack(*(_f(rates.get(k)) for k in keys)))
+                sections.append(_section(section_id, b"".join(payload)))
+
+    header = HEADER_STRUCT.pack(MAGIC, VERSION, len(sections),
+                                time.time() if timestamp is None else timestamp)
+    return header + core + b"".join(sections)
+
+
+def decode_snapshot(payload: bytes) -> Dict:
+    """
+    Decodificar un snapshot binario al mismo formato que /api/all
+    Las secciones desconocidas se ignoran (compatibilidad hacia adelante).
+    """
+    buf = memoryview(payload)
+    magic, version, n_sections, timestamp = HEADER_STRUCT.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError("Payload no es un snapshot de OmniMonitor")
+    if version > VERSION:
+        raise ValueError(f"Versión de snapshot no soportada: {version}")
+
+    (cpu_usage, cpu_freq, cpu_temp, physical, logical,
+     mem_percent, mem_used, mem_total, mem_free,
+     disk_percent, disk_used, disk_total, disk_free, read_speed, write_speed,
+     upload, download,
+     has_gpu, gpu_usage, gpu_temp,
+     uptime, has_battery, bat_percent, bat_plugged, bat_left) = CORE_STRUCT.unpack_from(
+        buf, HEADER_STRUCT.size)
+
+    per_core: List[float] = []
+    partitions: List[Dict] = []
+    interfaces: List[Dict] = []
+    strings = [None] * (len(_SYSTEM_KEYS) + 1)
+    swap = None
+    temperatures: List[Dict] = []
+    devices: Dict[int, Dict[str, Dict]] = {SECTION_DISK_DEVICES: {}, SECTION_NIC_DEVICES: {}}
+
+    offset = HEADER_STRUCT.size + CORE_STRUCT.size
+    for _ in range(n_sections):
+        section_id, length = SECTION_HEADER.unpack_from(buf, offset)
+        start = offset + SECTION_HEADER.size
+        offset = start + length
+        if section_id == SECTION_PER_CORE:
+            (n,) = struct.unpack_from("<H", buf, start)
+            per_core = [v / 10 for v in struct.unpack_from(f"<{n}H", buf, start + 2)]
+        elif section_id == SECTION_PARTITIONS:
+            (n,) = struct.unpack_from("<H", buf, start)
+            pos = start + 2
+            for _ in range(n):
+                device, pos = _unpack_str(buf, pos)
+                mountpoint, pos = _unpack_str(buf, pos)
+                fstype, pos = _unpack_str(buf, pos)
+                disk_type, pos = _unpack_str(buf, pos)
+                percent, used, total, free = _PARTITION_STRUCT.unpack_from(buf, pos)
+                pos += _PARTITION_STRUCT.size
+                partitions.append({
+                    "device": device,
+                    "mountpoint": mountpoint,
+                    "fstype": fstype,
+                    "type": disk_type,
+                    "usage": {"percent": round(percent, 1), "used": used, "total": total, "free": free}
+                })
+        elif section_id == SECTION_INTERFACES:
+            (n,) = struct.unpack_from("<H", buf, start)
+            pos = start + 2
+            for _ in range(n):
+                name, pos = _unpack_str(buf, pos)
+                ip, pos = _unpack_str(buf, pos)
+                (speed,) = struct.unpack_from("<I", buf, pos)
+                pos += 4
+                interfaces.append({"name": name, "ip": ip, "speed": speed})
+        elif section_id == SECTION_SWAP:
+            percent, used, total, free = _SWAP_STRUCT.unpack_from(buf, start)
+            swap = {"total": total, "used": used, "free": free, "percent": round(percent, 1)}
+        elif section_id == SECTION_TEMPERATURES:
+            (n,) = struct.unpack_from("<H", buf, start)
+            pos = start + 2
+            for _ in range(n):
+                sensor, pos = _unpack_str(buf, pos)
+                label, pos = _unpack_str(buf, pos)
+                (current,) = _TEMPERATURE_STRUCT.unpack_from(buf, pos)
+                pos += _TEMPERATURE_STRUCT.size
+                temperatures.append({"sensor": sensor, "label": label,
+                                     "current": round(current, 1) if not math.isnan(current) else None})
+        elif section_id in devices:
+            keys, layout = ((_DISK_DEVICE_KEYS, _DISK_DEVICE_STRUCT) if section_id == SECTION_DISK_DEVICES
+                            else (_NIC_DEVICE_KEYS, _NIC_DEVICE_STRUCT))
+            (n,) = struct.unpack_from("<H", buf, start)
+            pos = start + 2
+            for _ in range(n):
+                name, pos = _unpack_str(buf, pos)
+                devices[section_id][name] = dict(zip(keys, map(_opt, layout.unpack_from(buf, pos))))
+                pos += layout.size
+        elif section_id == SECTION_STRINGS:
+            pos = start
+            for i in range(len(strings)):
+                strings[i], pos = _unpack_str(buf, pos)
+
+    cpu_freq = _opt(cpu_freq)
+    cpu_temp = _opt(cpu_temp)
+    return {
+        "timestamp": timestamp,
+        "cpu": {
+            "usage": round(cpu_usage, 1),
+            "per_core": per_core,
+            "count": [physical, logical],
+            "freq": round(cpu_freq, 3) if cpu_freq is not None else None,
+            "temp": round(cpu_temp, 1) if cpu_temp is not None else None,
+        },
+        "memory": {"percent": round(mem_percent, 1), "used": mem_used, "total": mem_total, "free": mem_free},
+        "swap": swap,
+        "temperatures": temperatures,
+        "disk": {
+            "usage": {"percent": round(disk_percent, 1), "used": disk_used, "total": disk_total, "free": disk_free},
+            "info": partitions,
+            "io": {"read_speed": read_speed, "write_speed": write_speed}
+                  if not math.isnan(read_speed) else None,
+            "devices": devices[SECTION_DISK_DEVICES],
+        },
+        "network": {
+            "speed": {"upload": upload, "download": download},
+            "info": {"interfaces": interfaces},
+            "devices": devices[SECTION_NIC_DEVICES],
+        },
+        "gpu": {
+            "name": strings[-1] or "GPU",
+            "usage": round(gpu_usage, 1),
+            "temp": round(gpu_temp, 1) if not math.isnan(gpu_temp) else None,
+        } if has_gpu else None,
+        "system": {
+            "info": dict(zip(_SYSTEM_KEYS, (s or "" for s in strings))),
+            "uptime": str(timedelta(seconds=uptime)),
+            "battery": {
+                "percent": round(bat_percent, 1),
+                "plugged": bool(bat_plugged),
+                "time_left": _opt(bat_left),
+            } if has_battery else None,
+        },
+    }
+
+
+def accepts_binary(accept_header: Optional[str]) -> bool:
+    """Verificar si el cliente pidió el formato binario en la cabecera Accept"""
+    return bool(accept_header) and MIME_TYPE in accept_header
+
+
+if __name__ == "__main__":
+    # Test: round-trip y comparación de tamaño/CPU contra JSON
+    import json
+    import os
+    import sys
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from src.server.api import get_all_metrics
+
+    snapshot = get_all_metrics()
+    encoded = encode_snapshot(snapshot)
+    decoded = decode_snapshot(encoded)
+
+    assert decoded["cpu"]["count"] == list(snapshot["cpu"]["count"])
+    assert len(decoded["cpu"]["per_core"]) == len(snapshot["cpu"]["per_core"])
+    assert decoded["memory"]["total"] == snapshot["memory"]["total"]
+    assert decoded["disk"]["usage"]["used"] == snapshot["disk"]["usage"]["used"]
+    assert len(decoded["disk"]["info"]) == len(snapshot["disk"]["info"])
+    assert [i["name"] for i in decoded["network"]["info"]["interfaces"]] == \
+        [i["name"] for i in snapshot["network"]["info"]["interfaces"]]
+    assert decoded["system"]["info"]["hostname"] == snapshot["system"]["info"]["hostname"]
+    assert (decoded["gpu"] is None) == (snapshot["gpu"] is None)
+    no_temp = decode_snapshot(encode_snapshot(dict(snapshot, gpu={"name": "GPU", "usage": 5.0, "temp": None})))
+    assert no_temp["gpu"]["temp"] is None  # Igual que JSON: sin lectura no es 0 °C
+    assert set(decoded["disk"]["devices"]) == set(snapshot["disk"]["devices"])
+    assert set(decoded["network"]["devices"]) == set(snapshot["network"]["devices"])
+    print("Round-trip OK")
+
+    json_bytes = json.dumps(snapshot).encode()
+    core_only = encode_snapshot(snapshot, include_sections=False)
+    print(f"Tamaño JSON:            {len(json_bytes)} bytes")
+    print(f"Tamaño binario:         {len(encoded)} bytes")
+    print(f"Tamaño binario (núcleo): {len(core_only)} bytes")
+
+    rounds = 20000
+    start = time.perf_counter()
+    for _ in range(rounds):
+        json.loads(json_bytes)
+    json_decode = (time.perf_counter() - start) / rounds * 1e6
+    start = time.perf_counter()
+    for _ in range(rounds):
+        decode_snapshot(encoded)
+    bin_decode = (time.perf_counter() - start) / rounds * 1e6
+    start = time.perf_counter()
+    for _ in range(rounds):
+        json.dumps(snapshot).encode()
+    json_encode = (time.perf_counter() - start) / rounds * 1e6
+    start = time.perf_counter()
+    for _ in range(rounds):
+        encode_snapshot(snapshot)
+    bin_encode = (time.perf_counter() - start) / rounds * 1e6
+    print(f"Codificar: JSON {json_encode:.1f} µs | binario {bin_encode:.1f} µs")
+    print(f"Decodificar: JSON {json_decode:.1f} µs | binario {bin_decode:.1f} µs "
+          f"({bin_decode / json_decode:.1f}x JSON)")
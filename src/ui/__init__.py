@@ -28,29 +28,48 @@ from .tokens import (
     FONT_SIZE_XS, FONT_SIZE_SM, FONT_SIZE_MD, FONT_SIZE_LG, FONT_SIZE_XL, FONT_SIZE_XXL,
 )
 
-# ============ ATOMIC DESIGN LAYERS ============
-from . import atoms
-from . import molecules
-from . import organisms
+# ============ CARGA PEREZOSA ============
+# Las capas de Atomic Design, los componentes legacy y ChartManager se
+# importan en el primer acceso (PEP 562): `from src.ui.toast_manager import ...`
+# no arrastra los paquetes completos al arrancar la aplicación.
+import importlib
 
-# ============ BACKWARD COMPATIBILITY ============
-# Legacy exports from components.py (for existing code)
-from .components import (
-    create_circular_progress,
-    create_sidebar as legacy_create_sidebar,
-    create_header as legacy_create_header,
-    create_detail_button as legacy_create_detail_button,
-    create_cpu_card as legacy_create_cpu_card,
-    create_ram_card as legacy_create_ram_card,
-    create_gpu_card as legacy_create_gpu_card,
-    create_disk_card as legacy_create_disk_card,
-    create_network_chart_card as legacy_create_network_chart_card,
-    create_info_row as legacy_create_info_row,
-    create_stat_box as legacy_create_stat_box,
-)
+_LAZY_MODULES = {'atoms', 'molecules', 'organisms'}
+
+# nombre exportado -> (módulo, atributo)
+_LAZY_ATTRS = {
+    # Legacy exports from components.py (for existing code)
+    'create_circular_progress': ('components', 'create_circular_progress'),
+    'legacy_create_sidebar': ('components', 'create_sidebar'),
+    'legacy_create_header': ('components', 'create_header'),
+    'legacy_create_detail_button': ('components', 'create_detail_button'),
+    'legacy_create_cpu_card': ('components', 'create_cpu_card'),
+    'legacy_create_ram_card': ('components', 'create_ram_card'),
+    'legacy_create_gpu_card': ('components', 'create_gpu_card'),
+    'legacy_create_disk_card': ('components', 'create_disk_card'),
+    'legacy_create_network_chart_card': ('components', 'create_network_chart_card'),
+    'legacy_create_info_row': ('components', 'create_info_row'),
+    'legacy_create_stat_box': ('components', 'create_stat_box'),
+    # Chart Manager
+    'ChartManager': ('chart_manager', 'ChartManager'),
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_MODULES:
+        value = importlib.import_module(f'.{name}', __name__)
+    elif name in _LAZY_ATTRS:
+        module_name, attr = _LAZY_ATTRS[name]
+        value = getattr(importlib.import_module(f'.{module_name}', __name__), attr)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value  # Los accesos siguientes no pasan por aquí
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | _LAZY_MODULES | set(_LAZY_ATTRS))
 
-# ============ CHART MANAGER ============
-from .chart_manager import ChartManager
 
 __all__ = [
     # Design Tokens
@@ -11,22 +11,34 @@ class ChartManager:
         self.mem_history = deque([0] * max_points, maxlen=max_points)
         self.net_up_history = deque([0] * max_points, maxlen=max_points)
         self.net_down_history = deque([0] * max_points, maxlen=max_points)
+        # Marcas de anomalía alineadas con cada historial (AnomalyDetector)
+        self.mem_anomalies = deque([False] * max_points, maxlen=max_points)
+        self.net_anomalies = deque([False] * max_points, maxlen=max_points)
     
-    def create_mini_line_chart(self, data: list, color: str, height: int = 50) -> ft.Container:
-        """Crea un mini gráfico de barras estilizado como línea para las tarjetas"""
+    ANOMALY_COLOR = "#FF5252"
+    
+    def create_mini_line_chart(self, data: list, color: str, height: int = 50,
+                               anomalies: list = None) -> ft.Container:
+        """
+        Crea un mini gráfico de barras estilizado como línea para las tarjetas
+        `anomalies`: marcas alineadas con `data`; esas barras se resaltan en rojo
+        """
         if not data or len(data) < 2:
             data = [0] * 10
+            anomalies = None
         
         max_val = max(data) if max(data) > 0 else 100
+        flags = list(anomalies or [])[-30:]
+        flags = [False] * (min(len(data), 30) - len(flags)) + flags
         
         bars = []
-        for value in data[-30:]:  # Últimos 30 puntos
+        for value, anomalous in zip(data[-30:], flags):  # Últimos 30 puntos
             bar_height = max((value / max_val) * height, 2) if max_val > 0 else 2
             bars.append(
                 ft.Container(
                     width=4,
                     height=bar_height,
-                    bgcolor=color,
+                    bgcolor=self.ANOMALY_COLOR if anomalous else color,
                     border_radius=2,
                 )
             )
@@ -46,8 +58,12 @@ class ChartManager:
         )
 
     def create_network_area_chart(self, download_data: list, upload_data: list, 
-                                   time_labels: list, height: int = 180) -> ft.Container:
-        """Crea el gráfico grande de red con barras para download/upload"""
+                                   time_labels: list, height: int = 180,
+                                   anomalies: list = None) -> ft.Container:
+        """
+        Crea el gráfico grande de red con barras para download/upload
+        Las barras de bajada marcadas en `anomalies` se resaltan en rojo
+        """
         
         # Asegurar datos mínimos
         if not download_data:
@@ -63,6 +79,8 @@ class ChartManager:
         if len(download_data) < 2:
             download_data = [0, 0]
             upload_data = [0, 0]
+        flags = list(anomalies or [])[-len(download_data):]
+        flags = [False] * (len(download_data) - len(flags)) + flags
         
         # Calcular escala
         all_data = download_data + upload_data
@@ -70,7 +88,7 @@ class ChartManager:
         
         # Crear barras combinadas
         bars = []
-        for i, (down, up) in enumerate(zip(download_data, upload_data)):
+        for i, (down, up, anomalous) in enumerate(zip(download_data, upload_data, flags)):
             down_height = max((down / max_val) * (height - 40), 2) if max_val > 0 else 2
             up_height = max((up / max_val) * (height - 40), 2) if max_val > 0 else 2
             
@@ -80,7 +98,7 @@ class ChartManager:
                         ft.Container(
                             width=6,
                             height=down_height,
-                            bgcolor="#4FC3F7",
+                            bgcolor=self.ANOMALY_COLOR if anomalous else "#4FC3F7",
                             border_radius=ft.border_radius.only(top_left=3, top_right=3),
                         ),
                         ft.Container(
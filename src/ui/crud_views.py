@@ -1,8 +1,9 @@
 """
 Vistas CRUD para OmniMonitor
-Interfaz gráfica para Alertas, Procesos, Historial y Configuración
+Interfaz gráfica para Alertas, Procesos, Contenedores, Historial y Configuración
 """
 import flet as ft
+import json
 from typing import Callable, Optional
 from datetime import datetime
 
@@ -11,14 +12,19 @@ try:
     from .theme_manager import ThemeManager
     from .toast_manager import ToastManager
     from .sound_manager import SoundManager
+    from .view_cache import BackgroundLoader, skeleton_rows
 except ImportError:
     from src.ui.theme_manager import ThemeManager
     from src.ui.toast_manager import ToastManager
+    from src.ui.view_cache import BackgroundLoader, skeleton_rows
     try:
         from src.ui.sound_manager import SoundManager
     except ImportError:
         SoundManager = None
 
+from src.core.instrumentation import get_instrumentation
+from src.core.burst import BurstCapture, BURST_RATES
+
 # Colores por defecto (fallback)
 DARK_BG = "#1A1B26"
 CARD_BG = "#24283B"
@@ -92,12 +98,80 @@ def create_crud_header(title: str, subtitle: str = "", icon: str = None,
 
 # ==================== VISTA DE ALERTAS ====================
 
+def build_condition_type_dropdown(colors: dict, width: int) -> ft.Dropdown:
+    """Selector del tipo de condición de una alerta"""
+    return ft.Dropdown(
+        label="Tipo",
+        options=[
+            ft.dropdown.Option("threshold", "Umbral (valor actual)"),
+            ft.dropdown.Option("rate", "Tasa de cambio (Δ en ventana)"),
+            ft.dropdown.Option("percentile", "Percentil (umbral = p, ej. 95)"),
+            ft.dropdown.Option("anomaly", "Anomalía (umbral = σ, ej. 4)"),
+        ],
+        value="threshold",
+        width=width,
+        bgcolor=colors["card"],
+        border_color=colors["border"],
+        color=colors["text"],
+    )
+
+
+def build_number_field(label: str, hint: str, colors: dict, width: int) -> ft.TextField:
+    """Campo numérico opcional del formulario de alertas"""
+    return ft.TextField(
+        label=label,
+        hint_text=hint,
+        bgcolor=colors["card"],
+        border_color=colors["border"],
+        color=colors["text"],
+        width=width,
+        keyboard_type=ft.KeyboardType.NUMBER,
+    )
+
+
+def build_label_filter_field(colors: dict, width: int) -> ft.TextField:
+    """Filtro de etiqueta opcional: convierte la métrica en un selector por serie"""
+    return ft.TextField(
+        label="Filtro (núcleo, partición, interfaz, proceso)",
+        hint_text="Ej: core=* · mountpoint=/var* · interface=eth0 · name=postgres",
+        bgcolor=colors["card"],
+        border_color=colors["border"],
+        color=colors["text"],
+        width=width,
+    )
+
+
+def parse_condition_fields(type_dropdown, duration_field, window_field, clear_field) -> dict:
+    """Leer los campos de condición con estado (vacío = valor por defecto)"""
+    def number(field, name):
+        if not field.value:
+            return None
+        try:
+            value = float(field.value)
+        except ValueError:
+            raise ValueError(f"{name} debe ser un número válido")
+        return value
+    
+    duration = number(duration_field, "La duración")
+    window = number(window_field, "La ventana")
+    if (duration or 0) < 0 or (window or 0) < 0:
+        raise ValueError("La duración y la ventana no pueden ser negativas")
+    return {
+        "condition_type": type_dropdown.value or "threshold",
+        "duration_s": duration or 0,
+        "window_s": window or 0,
+        "clear_threshold": number(clear_field, "El umbral de salida"),
+    }
+
+
 def build_alerts_view(alert_manager, page: ft.Page, on_refresh: Callable = None,
-                      on_theme_light=None, on_theme_dark=None, on_notifications=None) -> ft.Container:
+                      on_theme_light=None, on_theme_dark=None, on_notifications=None,
+                      alert_log=None) -> ft.Container:
     """Construir vista de gestión de alertas"""
     colors = get_crud_theme()
     
     alerts_list = ft.Column(spacing=10, scroll=ft.ScrollMode.AUTO)
+    events_list = ft.Column(spacing=6)
     
     # Campos del formulario
     name_field = ft.TextField(
@@ -120,6 +194,8 @@ def build_alerts_view(alert_manager, page: ft.Page, on_refresh: Callable = None,
             ft.dropdown.Option("gpu_temp", "Temperatura GPU (°C)"),
             ft.dropdown.Option("net_download", "Descarga Red (MB/s)"),
             ft.dropdown.Option("net_upload", "Subida Red (MB/s)"),
+            ft.dropdown.Option("process_cpu", "CPU de proceso (%)"),
+            ft.dropdown.Option("process_rss_gb", "Memoria de proceso (GB)"),
         ],
         width=250,
         bgcolor=colors["card"],
@@ -152,6 +228,13 @@ def build_alerts_view(alert_manager, page: ft.Page, on_refresh: Callable = None,
         keyboard_type=ft.KeyboardType.NUMBER,
     )
     
+    # Condiciones con estado: tipo, duración, ventana e histéresis
+    condition_type_dropdown = build_condition_type_dropdown(colors, 200)
+    duration_field = build_number_field("Durante (s)", "Ej: 60", colors, 120)
+    window_field = build_number_field("Ventana (s)", "Ej: 10", colors, 120)
+    clear_field = build_number_field("Sale en", "Ej: 80", colors, 100)
+    label_filter_field = build_label_filter_field(colors, 300)
+    
     status_text = ft.Text("", color=colors["green"], size=12)
     
     # Variable para almacenar el ID de la alerta que se está editando
@@ -177,6 +260,8 @@ def build_alerts_view(alert_manager, page: ft.Page, on_refresh: Callable = None,
             ft.dropdown.Option("gpu_temp", "Temperatura GPU (°C)"),
             ft.dropdown.Option("net_download", "Descarga Red (MB/s)"),
             ft.dropdown.Option("net_upload", "Subida Red (MB/s)"),
+            ft.dropdown.Option("process_cpu", "CPU de proceso (%)"),
+            ft.dropdown.Option("process_rss_gb", "Memoria de proceso (GB)"),
         ],
         width=280,
         bgcolor=colors["card"],
@@ -207,6 +292,12 @@ def build_alerts_view(alert_manager, page: ft.Page, on_refresh: Callable = None,
         keyboard_type=ft.KeyboardType.NUMBER,
     )
     
+    edit_condition_type_dropdown = build_condition_type_dropdown(colors, 280)
+    edit_duration_field = build_number_field("Durante (s)", "0 = inmediata", colors, 135)
+    edit_window_field = build_number_field("Ventana (s)", "Tasa / percentil / anomalía", colors, 135)
+    edit_clear_field = build_number_field("Sale en (histéresis)", "Vacío = umbral", colors, 280)
+    edit_label_filter_field = build_label_filter_field(colors, 280)
+    
     edit_sound_switch = ft.Switch(
         label="Sonido de alerta",
         active_color=colors["green"],
@@ -231,7 +322,12 @@ def build_alerts_view(alert_manager, page: ft.Page, on_refresh: Callable = None,
             updates["name"] = edit_name_field.value
         
         if edit_metric_dropdown.value:
-            updates["metric"] = edit_metric_dropdown.value
+            try:
+                updates["metric"] = alert_manager.make_metric(edit_metric_dropdown.value,
+                                                              edit_label_filter_field.value)
+            except ValueError as ex:
+                ToastManager.show_error(str(ex))
+                return
         
         if edit_operator_dropdown.value:
             updates["operator"] = edit_operator_dropdown.value
@@ -243,6 +339,14 @@ def build_alerts_view(alert_manager, page: ft.Page, on_refresh: Callable = None,
                 ToastManager.show_error("El umbral debe ser un número válido")
                 return
         
+        try:
+            updates.update(parse_condition_fields(
+                edit_condition_type_dropdown, edit_duration_field, edit_window_field, edit_clear_field
+            ))
+        except ValueError as ex:
+            ToastManager.show_error(str(ex))
+            return
+        
         updates["notify_sound"] = edit_sound_switch.value
         
         # Aplicar actualizaciones
@@ -266,14 +370,22 @@ def build_alerts_view(alert_manager, page: ft.Page, on_refresh: Callable = None,
                 ft.Container(height=10),
                 edit_metric_dropdown,
                 ft.Container(height=10),
+                edit_label_filter_field,
+                ft.Container(height=10),
                 edit_operator_dropdown,
                 ft.Container(height=10),
                 edit_threshold_field,
                 ft.Container(height=10),
+                edit_condition_type_dropdown,
+                ft.Container(height=10),
+                ft.Row([edit_duration_field, edit_window_field], spacing=10),
+                ft.Container(height=10),
+                edit_clear_field,
+                ft.Container(height=10),
                 edit_sound_switch,
-            ], tight=True),
+            ], tight=True, scroll=ft.ScrollMode.AUTO),
             width=300,
-            height=350,
+            height=580,
         ),
         actions=[
             ft.TextButton("Cancelar", on_click=close_edit_dialog),
@@ -297,9 +409,13 @@ def build_alerts_view(alert_manager, page: ft.Page, on_refresh: Callable = None,
         
         # Rellenar campos con valores actuales
         edit_name_field.value = alert.name
-        edit_metric_dropdown.value = alert.metric
+        edit_metric_dropdown.value, edit_label_filter_field.value = alert_manager.split_metric(alert.metric)
         edit_operator_dropdown.value = alert.operator
         edit_threshold_field.value = str(alert.threshold)
+        edit_condition_type_dropdown.value = alert.condition_type
+        edit_duration_field.value = f"{alert.duration_s:g}" if alert.duration_s else ""
+        edit_window_field.value = f"{alert.window_s:g}" if alert.window_s else ""
+        edit_clear_field.value = f"{alert.clear_threshold:g}" if alert.clear_threshold is not None else ""
         edit_sound_switch.value = alert.notify_sound
         
         # Mostrar diálogo
@@ -307,11 +423,52 @@ def build_alerts_view(alert_manager, page: ft.Page, on_refresh: Callable = None,
         edit_dialog.open = True
         page.update()
     
-    def refresh_alerts_list():
-        """Actualizar lista de alertas"""
+    def format_duration(seconds) -> str:
+        if seconds is None:
+            return "-"
+        if seconds < 60:
+            return f"{seconds:.0f}s"
+        if seconds < 3600:
+            return f"{seconds / 60:.1f} min"
+        return f"{seconds / 3600:.1f} h"
+    
+    def refresh_events_list(closed_events):
+        """Historial de disparos: eventos en curso + últimos eventos cerrados"""
+        c = get_crud_theme()
+        events_list.controls.clear()
+        open_events = alert_log.open_events() if alert_log else []
+        events = open_events + closed_events
+        if not events:
+            events_list.controls.append(
+                ft.Text("Sin disparos registrados", color=c["text_secondary"], size=12)
+            )
+        for event in events:
+            active = event["ended_at"] is None and event in open_events
+            peak = event["peak_value"]
+            events_list.controls.append(
+                ft.Row([
+                    ft.Icon(ft.Icons.WARNING_AMBER if active else ft.Icons.CHECK_CIRCLE_OUTLINE,
+                            color=c["red"] if active else c["text_secondary"], size=16),
+                    ft.Text(event["alert_name"], size=12, color=c["text"], expand=True),
+                    ft.Text(f"{event['started_at']} UTC", size=11, color=c["text_secondary"]),
+                    ft.Text(("En curso " if active else "") + format_duration(event["duration_s"]),
+                            size=11, color=c["red"] if active else c["text_secondary"], width=90),
+                    ft.Text(f"pico {peak:.1f}" if peak is not None else "", size=11,
+                            color=c["text_secondary"], width=80),
+                ], spacing=10)
+            )
+    
+    def load_alerts():
+        """Consultas de la vista (en segundo plano)"""
+        return alert_manager.get_all(), alert_manager.get_event_stats(hours=24), alert_manager.get_events(limit=20)
+    
+    def apply_alerts(data):
+        """Actualizar lista de alertas con los datos cargados"""
         c = get_crud_theme()
+        alerts, stats, closed_events = data
         alerts_list.controls.clear()
-        alerts = alert_manager.get_all()
+        # Los eventos en curso viven en memoria del motor: se leen aquí, en el hilo de la UI
+        refresh_events_list(closed_events)
         
         if not alerts:
             alerts_list.controls.append(
@@ -326,8 +483,6 @@ def build_alerts_view(alert_manager, page: ft.Page, on_refresh: Callable = None,
             )
         else:
             for alert in alerts:
-                metric_label = alert_manager.METRICS_LABELS.get(alert.metric, alert.metric)
-                
                 alert_card = ft.Container(
                     content=ft.Row([
                         ft.Container(
@@ -341,11 +496,14 @@ def build_alerts_view(alert_manager, page: ft.Page, on_refresh: Callable = None,
                         ft.Column([
                             ft.Text(alert.name, size=15, weight=ft.FontWeight.W_500, color=c["text"]),
                             ft.Text(
-                                f"{metric_label} {alert.operator} {alert.threshold}",
+                                alert_manager.describe(alert),
                                 size=12, color=c["text_secondary"]
                             ),
                             ft.Text(
-                                f"Disparada {alert.triggered_count} veces",
+                                f"Disparada {alert.triggered_count} veces"
+                                + (f" · {stats[alert.id]['events']} eventos en 24 h"
+                                   f" · MTTR {format_duration(stats[alert.id]['mttr_s'])}"
+                                   if alert.id in stats else ""),
                                 size=11, color=c["yellow"] if alert.triggered_count > 0 else c["text_secondary"]
                             ),
                         ], spacing=2, expand=True),
@@ -372,8 +530,12 @@ def build_alerts_view(alert_manager, page: ft.Page, on_refresh: Callable = None,
                     padding=15,
                 )
                 alerts_list.controls.append(alert_card)
-        
-        page.update()
+    
+    loader = BackgroundLoader(page, load_alerts, apply_alerts)
+    
+    def refresh_alerts_list():
+        """Recargar alertas y eventos sin bloquear la UI"""
+        loader.request()
     
     def create_alert(e):
         """Crear nueva alerta"""
@@ -385,18 +547,26 @@ def build_alerts_view(alert_manager, page: ft.Page, on_refresh: Callable = None,
             return
         
         try:
-            threshold = float(threshold_field.value)
+            try:
+                threshold = float(threshold_field.value)
+            except ValueError:
+                raise ValueError("El umbral debe ser un número válido")
+            condition = parse_condition_fields(condition_type_dropdown, duration_field, window_field, clear_field)
             alert_manager.create(
                 name=name_field.value,
-                metric=metric_dropdown.value,
+                metric=alert_manager.make_metric(metric_dropdown.value, label_filter_field.value),
                 operator=operator_dropdown.value,
-                threshold=threshold
+                threshold=threshold,
+                **condition
             )
             
             # Limpiar campos
             name_field.value = ""
             metric_dropdown.value = None
             threshold_field.value = ""
+            condition_type_dropdown.value = "threshold"
+            for field in (duration_field, window_field, clear_field, label_filter_field):
+                field.value = ""
             
             status_text.value = "✅ Alerta creada exitosamente"
             status_text.color = c["green"]
@@ -405,12 +575,12 @@ def build_alerts_view(alert_manager, page: ft.Page, on_refresh: Callable = None,
             ToastManager.show_success(f"Alerta creada correctamente")
             
             refresh_alerts_list()
-        except ValueError:
-            status_text.value = "❌ Umbral debe ser un número"
+        except ValueError as ex:
+            status_text.value = f"❌ {ex}"
             status_text.color = c["red"]
             
             # Notificación Toast
-            ToastManager.show_error("El umbral debe ser un número válido")
+            ToastManager.show_error(str(ex))
             
             page.update()
     
@@ -445,9 +615,11 @@ def build_alerts_view(alert_manager, page: ft.Page, on_refresh: Callable = None,
                 ft.Text("Nueva Alerta", size=16, weight=ft.FontWeight.W_500, color=colors["text"]),
             ]),
             ft.Container(height=10),
-            ft.Row([name_field, metric_dropdown], spacing=15, wrap=True),
+            ft.Row([name_field, metric_dropdown, label_filter_field], spacing=15, wrap=True),
             ft.Container(height=10),
             ft.Row([operator_dropdown, threshold_field], spacing=15),
+            ft.Container(height=10),
+            ft.Row([condition_type_dropdown, duration_field, window_field, clear_field], spacing=15, wrap=True),
             ft.Container(height=15),
             ft.Row([
                 ft.ElevatedButton(
@@ -465,10 +637,12 @@ def build_alerts_view(alert_manager, page: ft.Page, on_refresh: Callable = None,
         padding=20,
     )
     
-    # Inicializar lista
+    # Esqueleto hasta la primera carga
+    alerts_list.controls = skeleton_rows(3, colors["text_secondary"], height=40)
+    events_list.controls = skeleton_rows(3, colors["text_secondary"])
     refresh_alerts_list()
     
-    return ft.Container(
+    view = ft.Container(
         content=ft.Column([
             create_crud_header("Alertas", "Configura notificaciones automáticas", ft.Icons.NOTIFICATIONS,
                                on_theme_light, on_theme_dark, on_notifications),
@@ -488,11 +662,25 @@ def build_alerts_view(alert_manager, page: ft.Page, on_refresh: Callable = None,
                 padding=15,
                 expand=True,
             ),
+            ft.Container(height=20),
+            ft.Row([
+                ft.Icon(ft.Icons.HISTORY, color=colors["blue"], size=20),
+                ft.Text("Historial de Disparos", size=16, weight=ft.FontWeight.W_500, color=colors["text"]),
+            ]),
+            ft.Container(height=10),
+            ft.Container(
+                content=events_list,
+                bgcolor=colors["card"],
+                border_radius=15,
+                padding=15,
+            ),
         ], scroll=ft.ScrollMode.AUTO),
         padding=25,
         expand=True,
         bgcolor=colors["bg"],
     )
+    view.data = {"refresh": refresh_alerts_list}
+    return view
 
 
 # ==================== VISTA DE PROCESOS ====================
@@ -520,19 +708,15 @@ def build_processes_view(process_manager, page: ft.Page,
         column_spacing=20,
     )
     
-    # Loader para mostrar mientras carga
-    loading_indicator = ft.Container(
-        content=ft.Column([
-            ft.ProgressRing(width=40, height=40, stroke_width=3, color=colors["blue"]),
-            ft.Text("Cargando procesos...", size=14, color=colors["text_secondary"]),
-        ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, 
-           alignment=ft.MainAxisAlignment.CENTER, spacing=15),
-        height=200,
-    )
+    # Esqueleto mientras carga (la lista de procesos se lee en segundo plano)
+    def loading_skeleton():
+        return ft.Column(skeleton_rows(8, get_crud_theme()["text_secondary"]), spacing=14)
     
-    # Contenedor que alterna entre loader y tabla
+    table_column = ft.Column([processes_table], scroll=ft.ScrollMode.AUTO)
+    
+    # Contenedor que alterna entre esqueleto y tabla
     table_container = ft.Container(
-        content=loading_indicator,  # Inicia con loader
+        content=loading_skeleton(),  # Inicia con esqueleto
         bgcolor=colors["card"],
         border_radius=15,
         padding=15,
@@ -566,7 +750,6 @@ def build_processes_view(process_manager, page: ft.Page,
     
     stats_text = ft.Text("Cargando estadísticas...", size=12, color=colors["text_secondary"])
     status_text = ft.Text("", size=12, color=colors["green"])
-    is_loading = [False]  # Usar lista para poder modificar en closure
 
     def load_processes_data():
         """Carga los procesos (operación pesada - una sola iteración)"""
@@ -579,8 +762,9 @@ def build_processes_view(process_manager, page: ft.Page,
         
         return processes, stats, c
     
-    def update_table_with_data(processes, stats, c):
+    def update_table_with_data(data):
         """Actualiza la UI con los datos cargados"""
+        processes, stats, c = data
         stats_text.value = f"Total: {stats['total']} | Running: {stats['running']} | Threads: {stats['threads']}"
         
         processes_table.rows.clear()
@@ -616,42 +800,25 @@ def build_processes_view(process_manager, page: ft.Page,
             )
             processes_table.rows.append(row)
         
-        # Cambiar de loader a tabla
-        table_container.content = ft.Column([processes_table], scroll=ft.ScrollMode.AUTO)
-        is_loading[0] = False
-        page.update()
-
-    def refresh_processes(show_loader=True):
-        """Actualizar lista de procesos con loader"""
-        if is_loading[0]:
-            return  # Evitar múltiples cargas simultáneas
-        
-        is_loading[0] = True
+        # Cambiar de esqueleto a tabla
+        table_container.content = table_column
+    
+    def show_load_error(e):
         c = get_crud_theme()
-        
-        if show_loader:
-            # Mostrar loader
-            table_container.content = ft.Container(
-                content=ft.Column([
-                    ft.ProgressRing(width=40, height=40, stroke_width=3, color=c["blue"]),
-                    ft.Text("Cargando procesos...", size=14, color=c["text_secondary"]),
-                ], horizontal_alignment=ft.CrossAxisAlignment.CENTER, 
-                   alignment=ft.MainAxisAlignment.CENTER, spacing=15),
-                height=200,
-            )
+        status_text.value = f"❌ Error: {str(e)}"
+        status_text.color = c["red"]
+        table_container.content = ft.Text(f"Error al cargar procesos: {e}", color=c["red"])
+    
+    # El recorrido de procesos corre fuera del hilo de la UI (puede tardar cientos de ms)
+    loader = BackgroundLoader(page, load_processes_data, update_table_with_data, show_load_error)
+    
+    def refresh_processes(show_loader=True):
+        """Actualizar lista de procesos (en segundo plano, con esqueleto opcional)"""
+        if show_loader and not loader.busy:
+            table_container.content = loading_skeleton()
             stats_text.value = "Cargando..."
             page.update()
-        
-        # Cargar datos y actualizar tabla
-        try:
-            processes, stats, c = load_processes_data()
-            update_table_with_data(processes, stats, c)
-        except Exception as e:
-            status_text.value = f"❌ Error: {str(e)}"
-            status_text.color = c["red"]
-            table_container.content = ft.Text(f"Error al cargar procesos: {e}", color=c["red"])
-            is_loading[0] = False
-            page.update()
+        loader.request()
     
     def kill_process(pid: int, name: str):
         """Terminar proceso"""
@@ -785,24 +952,386 @@ def build_processes_view(process_manager, page: ft.Page,
         bgcolor=colors["bg"],
     )
     
-    # Iniciar carga de procesos después de que la UI se haya renderizado
-    def on_view_mounted(e=None):
-        refresh_processes()
+    # La vista se devuelve con el esqueleto; los procesos llegan en segundo plano.
+    # Al volver a la pestaña (caché de vistas) solo se recarga la tabla.
+    view.data = {"refresh": lambda: refresh_processes(show_loader=False)}
+    loader.request()
     
-    # Usar page.run_task para cargar en background si está disponible
-    try:
-        page.run_task(lambda: on_view_mounted())
-    except:
-        # Fallback: cargar síncronamente
-        on_view_mounted()
+    return view
+
+
+# ==================== VISTA DE CONTENEDORES ====================
+
+def format_bytes_rate(value: Optional[float]) -> str:
+    """Bytes/s -> texto corto (KB/s, MB/s)"""
+    if value is None:
+        return "—"
+    if value >= 1024 * 1024:
+        return f"{value / (1024 * 1024):.1f} MB/s"
+    return f"{value / 1024:.0f} KB/s"
+
+
+def build_containers_view(load_containers: Callable[[], list], page: ft.Page,
+                          on_theme_light=None, on_theme_dark=None, on_notifications=None) -> ft.Container:
+    """
+    Construir vista de uso por cgroup v2 (contenedores, servicios, slices)
+    `load_containers` devuelve las filas de CgroupCollector.sample() (local o vía API)
+    """
+    from src.core.cgroups import sort_cgroups
+    colors = get_crud_theme()
+    
+    containers_table = ft.DataTable(
+        columns=[
+            ft.DataColumn(ft.Text("Cgroup", color=colors["text"], size=12)),
+            ft.DataColumn(ft.Text("CPU %", color=colors["text"], size=12)),
+            ft.DataColumn(ft.Text("Memoria (MB)", color=colors["text"], size=12)),
+            ft.DataColumn(ft.Text("E/S lectura", color=colors["text"], size=12)),
+            ft.DataColumn(ft.Text("E/S escritura", color=colors["text"], size=12)),
+            ft.DataColumn(ft.Text("Presión CPU/mem/IO", color=colors["text"], size=12)),
+            ft.DataColumn(ft.Text("Throttling", color=colors["text"], size=12)),
+        ],
+        rows=[],
+        border=ft.border.all(1, colors["border"]),
+        border_radius=10,
+        heading_row_color=colors["card"],
+        data_row_color={"": colors["card"], "hovered": colors["border"]},
+        column_spacing=20,
+    )
+    
+    def loading_skeleton():
+        return ft.Column(skeleton_rows(8, get_crud_theme()["text_secondary"]), spacing=14)
+    
+    table_column = ft.Column([containers_table], scroll=ft.ScrollMode.AUTO)
+    table_container = ft.Container(
+        content=loading_skeleton(),
+        bgcolor=colors["card"],
+        border_radius=15,
+        padding=15,
+        expand=True,
+    )
+    
+    search_field = ft.TextField(
+        hint_text="🔍 Filtrar cgroup...",
+        bgcolor=colors["card"],
+        border_color=colors["border"],
+        color=colors["text"],
+        width=300,
+        height=40,
+        content_padding=ft.Padding(10, 0, 10, 0),
+    )
+    
+    sort_dropdown = ft.Dropdown(
+        value="cpu",
+        options=[
+            ft.dropdown.Option("cpu", "Mayor CPU"),
+            ft.dropdown.Option("memory", "Mayor memoria"),
+            ft.dropdown.Option("io", "Mayor E/S"),
+            ft.dropdown.Option("pressure", "Mayor presión"),
+        ],
+        width=180,
+        bgcolor=colors["card"],
+        border_color=colors["border"],
+        color=colors["text"],
+        height=40,
+    )
+    
+    stats_text = ft.Text("Cargando cgroups...", size=12, color=colors["text_secondary"])
+    
+    def load_data():
+        rows = load_containers()
+        text = (search_field.value or "").lower()
+        if text:
+            rows = [r for r in rows if text in r["path"].lower() or text in r["name"].lower()]
+        return len(rows), sort_cgroups(rows, sort_dropdown.value, 50), get_crud_theme()
+    
+    def update_table(data):
+        total, rows, c = data
+        cpu_total = sum(r["cpu_percent"] or 0.0 for r in rows)
+        stats_text.value = (f"{total} cgroups | CPU mostrada: {cpu_total:.1f}% (100% = 1 núcleo)"
+                            if total else "Sin cgroups v2 visibles en este sistema")
+        containers_table.rows.clear()
+        for r in rows:
+            cpu = r["cpu_percent"]
+            current, limit = r["memory_current"], r["memory_max"]
+            memory = "—" if current is None else f"{current / (1024 * 1024):.0f}"
+            if current is not None and limit:
+                memory += f" / {limit / (1024 * 1024):.0f}"
+            memory_color = c["red"] if (r["memory_percent"] or 0) > 90 else c["text"]
+            pressure = r["pressure"]
+            pressure_text = " / ".join(
+                f"{pressure[key]:.0f}" if key in pressure else "—"
+                for key in ("cpu_some", "memory_some", "io_some"))
+            throttled = r["throttled_ms"]
+            containers_table.rows.append(ft.DataRow(cells=[
+                ft.DataCell(ft.Text(("  " * max(r["depth"] - 1, 0)) + r["name"][-48:],
+                                    color=c["text"], size=11, tooltip=r["path"])),
+                ft.DataCell(ft.Text("—" if cpu is None else f"{cpu:.1f}",
+                                    color=c["red"] if (cpu or 0) > 80 else c["text"], size=11)),
+                ft.DataCell(ft.Text(memory, color=memory_color, size=11)),
+                ft.DataCell(ft.Text(format_bytes_rate(r["io_read"]), color=c["text_secondary"], size=11)),
+                ft.DataCell(ft.Text(format_bytes_rate(r["io_write"]), color=c["text_secondary"], size=11)),
+                ft.DataCell(ft.Text(pressure_text, size=11,
+                                    color=c["yellow"] if max(pressure.values(), default=0) > 10 else c["text_secondary"])),
+                ft.DataCell(ft.Text("—" if throttled is None else f"{throttled:.0f} ms/s",
+                                    color=c["orange"] if (throttled or 0) > 0 else c["text_secondary"], size=11)),
+            ]))
+        table_container.content = table_column
+    
+    def show_load_error(e):
+        c = get_crud_theme()
+        table_container.content = ft.Text(f"Error al leer cgroups: {e}", color=c["red"])
+    
+    loader = BackgroundLoader(page, load_data, update_table, show_load_error)
+    
+    search_field.on_change = lambda e: loader.request()
+    sort_dropdown.on_change = lambda e: loader.request()
+    
+    view = ft.Container(
+        content=ft.Column([
+            create_crud_header("Contenedores", "Uso por cgroup v2: contenedores, servicios y slices",
+                               ft.Icons.VIEW_IN_AR, on_theme_light, on_theme_dark, on_notifications),
+            ft.Container(
+                content=ft.Row([
+                    search_field,
+                    sort_dropdown,
+                    ft.Container(expand=True),
+                    ft.IconButton(
+                        ft.Icons.REFRESH,
+                        icon_color=colors["blue"],
+                        tooltip="Actualizar",
+                        on_click=lambda e: loader.request(),
+                    ),
+                ], spacing=15),
+                padding=ft.Padding(0, 0, 0, 10),
+            ),
+            stats_text,
+            ft.Container(height=10),
+            table_container,
+        ]),
+        padding=25,
+        expand=True,
+        bgcolor=colors["bg"],
+    )
+    
+    # Las tasas necesitan dos lecturas: al volver a la pestaña se recalculan
+    view.data = {"refresh": loader.request}
+    loader.request()
     
     return view
 
 
 # ==================== VISTA DE HISTORIAL ====================
 
+def format_us(us: float) -> str:
+    """Duración en µs -> texto corto (µs/ms/s)"""
+    if us >= 1_000_000:
+        return f"{us / 1_000_000:.2f} s"
+    if us >= 1000:
+        return f"{us / 1000:.1f} ms"
+    return f"{us:.0f} µs"
+
+
+BURST_CHANNEL_LABELS = {
+    "disk_read": "Disco lectura (MB/s)",
+    "disk_write": "Disco escritura (MB/s)",
+    "net_down": "Red bajada (MB/s)",
+    "net_up": "Red subida (MB/s)",
+}
+
+
+def build_burst_viewer(capture: BurstCapture, colors: dict, buckets: int = 120) -> ft.Column:
+    """
+    Visor de una captura de ráfaga con zoom y desplazamiento
+    Cada barra es el máximo de su tramo (los picos cortos no desaparecen al alejar).
+    """
+    channels = [c for c in capture.columns if c != "t"]
+    state = {"channel": channels[0], "start": 0.0, "end": capture.duration}
+    chart = ft.Container(height=160)
+    range_text = ft.Text("", size=11, color=colors["text_secondary"])
+    
+    def render():
+        points = capture.downsample(state["channel"], state["start"], state["end"], buckets)
+        peak = max((hi for _, _, hi in points), default=0.0)
+        scale = 100.0 if state["channel"].startswith("cpu.") else max(peak, 0.001)
+        chart.content = ft.Row([
+            ft.Container(width=3, height=max(hi / scale * 150, 1), bgcolor=colors["blue"],
+                         tooltip=f"{t:.2f} s: {lo:.1f}-{hi:.1f}")
+            for t, lo, hi in points
+        ], spacing=1, vertical_alignment=ft.CrossAxisAlignment.END)
+        range_text.value = (f"{state['start']:.2f}-{state['end']:.2f} s · pico {peak:.1f}"
+                            f"{'%' if state['channel'].startswith('cpu.') else ' MB/s'}")
+    
+    def on_channel_change(e):
+        state["channel"] = e.control.value
+        render()
+        e.page.update()
+    
+    def zoom(factor):
+        def handler(e):
+            center = (state["start"] + state["end"]) / 2
+            half = max((state["end"] - state["start"]) * factor / 2, 2.0 / capture.rate_hz)
+            half = min(half, capture.duration / 2)
+            center = min(max(center, half), capture.duration - half)
+            state["start"], state["end"] = center - half, center + half
+            render()
+            e.page.update()
+        return handler
+    
+    def pan(direction):
+        def handler(e):
+            width = state["end"] - state["start"]
+            start = min(max(state["start"] + direction * width / 2, 0.0), capture.duration - width)
+            state["start"], state["end"] = start, start + width
+            render()
+            e.page.update()
+        return handler
+    
+    channel_dropdown = ft.Dropdown(
+        value=state["channel"],
+        options=[ft.dropdown.Option(c, BURST_CHANNEL_LABELS.get(c, f"CPU {c[4:]} (%)")) for c in channels],
+        width=220,
+    )
+    channel_dropdown.on_change = on_channel_change
+    
+    render()
+    stats = capture.stats
+    return ft.Column([
+        ft.Row([
+            channel_dropdown,
+            ft.IconButton(ft.Icons.ZOOM_IN, tooltip="Acercar", on_click=zoom(0.5)),
+            ft.IconButton(ft.Icons.ZOOM_OUT, tooltip="Alejar", on_click=zoom(2.0)),
+            ft.IconButton(ft.Icons.CHEVRON_LEFT, tooltip="Anterior", on_click=pan(-1)),
+            ft.IconButton(ft.Icons.CHEVRON_RIGHT, tooltip="Siguiente", on_click=pan(1)),
+        ], spacing=5),
+        range_text,
+        chart,
+        ft.Text(f"{capture.samples} muestras a {stats.get('effective_hz', capture.rate_hz)} Hz · "
+                f"desfase p99 {format_us(stats.get('jitter_p99_us', 0))} · "
+                f"coste {format_us(stats.get('sample_cost_mean_us', 0))}/muestra · "
+                f"CPU del muestreo {stats.get('cpu_overhead_percent', 0)}%",
+                size=11, color=colors["text_secondary"]),
+    ], spacing=8, width=560)
+
+
+def build_burst_section(db, page: ft.Page, burst_controller, colors: dict):
+    """
+    Capturas de ráfaga en la vista de historial: disparo manual, lista y visor
+    Devuelve (contenedor, refresh).
+    """
+    rate_dropdown = ft.Dropdown(
+        value="50",
+        options=[ft.dropdown.Option(str(rate), f"{rate} Hz") for rate in BURST_RATES],
+        label="Frecuencia",
+        width=120,
+        bgcolor=colors["card"],
+        border_color=colors["border"],
+        color=colors["text"],
+    )
+    duration_dropdown = ft.Dropdown(
+        value="10",
+        options=[ft.dropdown.Option(str(d), f"{d} s") for d in (5, 10, 30, 60)],
+        label="Duración",
+        width=110,
+        bgcolor=colors["card"],
+        border_color=colors["border"],
+        color=colors["text"],
+    )
+    capture_status = ft.Text("", size=12, color=colors["text_secondary"])
+    capture_progress = ft.ProgressBar(value=None, width=160, color=colors["orange"], visible=False)
+    captures_column = ft.Column(spacing=6)
+    
+    def apply_captures(captures):
+        c = get_crud_theme()
+        active = burst_controller.active if burst_controller else None
+        capture_progress.visible = active is not None
+        capture_status.value = (f"Capturando ({active.reason}, {active.rate_hz:.0f} Hz)…" if active
+                                else f"{len(captures)} capturas guardadas")
+        rows = []
+        for item in captures:
+            stats = json.loads(item.get("stats") or "{}")
+            rows.append(ft.Row([
+                ft.Text(item["started_at"][:19], size=11, color=c["text_secondary"], width=140),
+                ft.Text(item.get("reason") or "", size=11, color=c["text"], width=160, no_wrap=True),
+                ft.Text(f"{item['rate_hz']:.0f} Hz · {item['duration_s']:.1f} s", size=11, color=c["text"], width=110),
+                ft.Text(f"p99 {format_us(stats.get('jitter_p99_us', 0))}", size=11,
+                        color=c["text_secondary"], width=90),
+                ft.Text(f"{item['size_bytes'] / 1024:.0f} KB", size=11, color=c["text_secondary"], width=60),
+                ft.IconButton(ft.Icons.SHOW_CHART, icon_color=c["blue"], tooltip="Ver",
+                              on_click=lambda e, cid=item["id"]: open_capture(cid)),
+                ft.IconButton(ft.Icons.DELETE_OUTLINE, icon_color=c["red"], tooltip="Eliminar",
+                              on_click=lambda e, cid=item["id"]: delete_capture(cid)),
+            ], spacing=8))
+        captures_column.controls = rows or [
+            ft.Text("Sin capturas todavía", size=12, color=c["text_secondary"])]
+    
+    loader = BackgroundLoader(page, lambda: db.get_burst_captures(limit=20), apply_captures)
+    
+    def open_capture(capture_id: int):
+        c = get_crud_theme()
+        row = db.get_burst_capture(capture_id)
+        if not row:
+            return
+        capture = BurstCapture.from_row(row)
+        
+        def close(e):
+            dialog.open = False
+            page.update()
+        
+        dialog = ft.AlertDialog(
+            title=ft.Text(f"Ráfaga {capture.started_at[:19]} · {capture.reason}", color=c["text"], size=16),
+            content=build_burst_viewer(capture, c),
+            actions=[ft.TextButton("Cerrar", on_click=close)],
+            bgcolor=c["card"],
+        )
+        page.overlay.append(dialog)
+        dialog.open = True
+        page.update()
+    
+    def delete_capture(capture_id: int):
+        db.delete_burst_capture(capture_id)
+        loader.request()
+    
+    def start_capture(e):
+        if burst_controller is None:
+            return
+        if not burst_controller.trigger(int(rate_dropdown.value), float(duration_dropdown.value)):
+            ToastManager.show_warning("Ya hay una ráfaga en curso")
+            return
+        ToastManager.show_info(f"Ráfaga de {duration_dropdown.value} s a {rate_dropdown.value} Hz iniciada")
+        loader.request()
+    
+    if burst_controller is not None:
+        # Al terminar (hilo de la ráfaga) se recarga la lista
+        burst_controller.listeners.append(lambda capture_id, capture: loader.request())
+    
+    section = ft.Container(
+        content=ft.Column([
+            ft.Row([
+                ft.Icon(ft.Icons.BOLT, color=colors["orange"], size=20),
+                ft.Text("Capturas de ráfaga", size=16, weight=ft.FontWeight.W_500, color=colors["text"]),
+                ft.Container(expand=True),
+                capture_progress,
+                capture_status,
+            ]),
+            ft.Row([
+                rate_dropdown,
+                duration_dropdown,
+                ft.ElevatedButton("Capturar", icon=ft.Icons.FIBER_MANUAL_RECORD, bgcolor=colors["orange"],
+                                  color=colors["bg"], on_click=start_capture,
+                                  disabled=burst_controller is None),
+            ], spacing=15),
+            captures_column,
+        ], spacing=10),
+        bgcolor=colors["card"],
+        border_radius=15,
+        padding=15,
+    )
+    return section, loader.request
+
+
 def build_history_view(history_manager, page: ft.Page,
-                       on_theme_light=None, on_theme_dark=None, on_notifications=None) -> ft.Container:
+                       on_theme_light=None, on_theme_dark=None, on_notifications=None,
+                       burst_controller=None) -> ft.Container:
     """Construir vista de historial de métricas"""
     colors = get_crud_theme()
     
@@ -856,13 +1385,17 @@ def build_history_view(history_manager, page: ft.Page,
             width=140,
         )
     
-    def refresh_history():
-        """Actualizar historial"""
-        c = get_crud_theme()
+    def load_history():
+        """Consultas del historial (en segundo plano)"""
         hours = int(hours_dropdown.value)
-        history = history_manager.get_history(hours=hours, limit=100)
-        summary = history_manager.get_summary(hours=hours)
-        count = history_manager.get_count()
+        return (history_manager.get_history(hours=hours, limit=100),
+                history_manager.get_summary(hours=hours),
+                history_manager.get_count())
+    
+    def apply_history(data):
+        """Volcar los datos cargados en los controles existentes"""
+        c = get_crud_theme()
+        history, summary, count = data
         
         count_text.value = f"Total registros: {count}"
         
@@ -902,8 +1435,13 @@ def build_history_view(history_manager, page: ft.Page,
                 ft.DataCell(ft.Text(f"{record.disk_usage or 0:.1f}", color=c["text"], size=11)),
             ])
             history_table.rows.append(row)
-        
-        page.update()
+        table_container.content = table_column
+    
+    loader = BackgroundLoader(page, load_history, apply_history)
+    
+    def refresh_history():
+        """Actualizar historial sin bloquear la UI"""
+        loader.request()
     
     def cleanup_history(e):
         """Limpiar historial antiguo"""
@@ -918,10 +1456,25 @@ def build_history_view(history_manager, page: ft.Page,
     
     hours_dropdown.on_change = on_hours_change
     
-    # Inicializar
+    # Esqueleto hasta que llegue la primera carga
+    summary_cards.controls = [
+        ft.Container(content=ft.Column(skeleton_rows(2, colors["text_secondary"]), spacing=10),
+                     bgcolor=colors["card"], border_radius=10, padding=15, width=140, height=86)
+        for _ in range(4)
+    ]
+    table_column = ft.Column([history_table], scroll=ft.ScrollMode.AUTO)
+    table_container = ft.Container(
+        content=ft.Column(skeleton_rows(8, colors["text_secondary"]), spacing=14),
+        bgcolor=colors["card"],
+        border_radius=15,
+        padding=15,
+        expand=True,
+    )
+    burst_section, refresh_bursts = build_burst_section(history_manager.db, page, burst_controller, colors)
     refresh_history()
+    refresh_bursts()
     
-    return ft.Container(
+    view = ft.Container(
         content=ft.Column([
             create_crud_header("Historial", "Registros históricos de métricas del sistema", ft.Icons.HISTORY,
                                on_theme_light, on_theme_dark, on_notifications),
@@ -936,22 +1489,102 @@ def build_history_view(history_manager, page: ft.Page,
             ], spacing=15),
             status_text,
             ft.Container(height=10),
-            ft.Container(
-                content=ft.Column([history_table], scroll=ft.ScrollMode.AUTO),
-                bgcolor=colors["card"],
-                border_radius=15,
-                padding=15,
-                expand=True,
-            ),
+            burst_section,
+            ft.Container(height=10),
+            table_container,
         ], scroll=ft.ScrollMode.AUTO),
         padding=25,
         expand=True,
         bgcolor=colors["bg"],
     )
+    view.data = {"refresh": lambda: (refresh_history(), refresh_bursts())}
+    return view
 
 
 # ==================== VISTA DE CONFIGURACIÓN ====================
 
+def build_diagnostics_panel(instrumentation, colors: dict):
+    """
+    Panel de autodiagnóstico: consumo del proceso, desfase de ticks y
+    latencia por etapa. Devuelve (contenedor, interruptor, refresh).
+    """
+    summary_text = ft.Text("", size=13, color=colors["text_secondary"])
+    stages_column = ft.Column(spacing=4)
+    
+    def stage_row(cells, weight=None, color=None):
+        widths = (220, 70, 80, 80, 80)
+        return ft.Row([
+            ft.Text(str(cell), width=width, size=12, weight=weight, color=color or colors["text"],
+                    no_wrap=True)
+            for cell, width in zip(cells, widths)
+        ], spacing=10)
+    
+    def refresh():
+        data = instrumentation.snapshot()
+        process = data["process"]
+        ticks = data["ticks"]
+        if not data["enabled"]:
+            summary_text.value = "Desactivado: actívalo para medir el coste de cada etapa."
+        else:
+            summary_text.value = (
+                f"CPU propia {process.get('cpu_percent', 0):.1f}% · RSS {process.get('rss_mb', 0):.0f} MB · "
+                f"{process.get('threads', 0)} hilos · {ticks['count']} ticks "
+                f"({ticks['late']} tarde) · desfase p95 {format_us(ticks['jitter']['p95_us'])}"
+            )
+        rows = [stage_row(("Etapa", "Llamadas", "p50", "p95", "Máx"),
+                          weight=ft.FontWeight.BOLD, color=colors["text_secondary"])]
+        for name, stats in data["stages"].items():
+            if stats["count"]:
+                rows.append(stage_row((name, stats["count"], format_us(stats["p50_us"]),
+                                       format_us(stats["p95_us"]), format_us(stats["max_us"]))))
+        stages_column.controls = rows
+    
+    def on_switch_change(e):
+        instrumentation.set_enabled(enabled_switch.value)
+        refresh()
+        e.page.update()
+    
+    def on_refresh_click(e):
+        refresh()
+        e.page.update()
+    
+    def on_reset_click(e):
+        instrumentation.reset()
+        refresh()
+        e.page.update()
+    
+    enabled_switch = ft.Switch(
+        value=instrumentation.enabled,
+        label="Medir etapas",
+        active_color=colors["green"],
+        on_change=on_switch_change,
+    )
+    refresh()
+    
+    panel = ft.Container(
+        content=ft.Column([
+            ft.Row([
+                ft.Icon(ft.Icons.MONITOR_HEART, color=colors["red"], size=20),
+                ft.Text("Diagnóstico", size=16, weight=ft.FontWeight.W_500, color=colors["text"]),
+                ft.Container(expand=True),
+                ft.IconButton(ft.Icons.REFRESH, icon_color=colors["blue"], tooltip="Actualizar",
+                              on_click=on_refresh_click),
+                ft.IconButton(ft.Icons.RESTART_ALT, icon_color=colors["yellow"], tooltip="Reiniciar contadores",
+                              on_click=on_reset_click),
+            ]),
+            ft.Container(height=10),
+            enabled_switch,
+            summary_text,
+            ft.Container(height=5),
+            stages_column,
+        ]),
+        bgcolor=colors["card"],
+        border_radius=15,
+        padding=20,
+    )
+    return panel, enabled_switch, refresh
+
+
 def build_config_view(db, page: ft.Page,
                       on_theme_light=None, on_theme_dark=None, on_notifications=None) -> ft.Container:
     """Construir vista de configuración"""
@@ -1008,6 +1641,19 @@ def build_config_view(db, page: ft.Page,
         color=colors["text"],
     )
     
+    backend_dropdown = ft.Dropdown(
+        value=config.get('history_backend', 'sqlite'),
+        options=[
+            ft.dropdown.Option("sqlite", "SQLite"),
+            ft.dropdown.Option("tsdb", "Comprimido (TSDB)"),
+        ],
+        label="Motor de historial (al reiniciar)",
+        width=240,
+        bgcolor=colors["card"],
+        border_color=colors["border"],
+        color=colors["text"],
+    )
+    
     notifications_switch = ft.Switch(
         value=config.get('enable_notifications', 'true') == 'true',
         label="Notificaciones",
@@ -1032,14 +1678,26 @@ def build_config_view(db, page: ft.Page,
     
     sounds_switch.on_change = on_sounds_switch_change
     
+    burst_switch = ft.Switch(
+        value=config.get('burst_on_alert', 'false') == 'true',
+        label="Ráfaga al disparar alerta",
+        active_color=colors["green"],
+    )
+    
+    instrumentation = get_instrumentation()
+    diagnostics_panel, diagnostics_switch, refresh_diagnostics = build_diagnostics_panel(instrumentation, colors)
+    
     def save_config(e):
         """Guardar configuración"""
         c = get_crud_theme()
         db.set_config('theme', theme_dropdown.value)
         db.set_config('update_interval', interval_dropdown.value)
         db.set_config('history_retention_days', retention_dropdown.value)
+        db.set_config('history_backend', backend_dropdown.value)
         db.set_config('enable_notifications', 'true' if notifications_switch.value else 'false')
         db.set_config('enable_sounds', 'true' if sounds_switch.value else 'false')
+        db.set_config('enable_diagnostics', 'true' if diagnostics_switch.value else 'false')
+        db.set_config('burst_on_alert', 'true' if burst_switch.value else 'false')
         
         # Actualizar SoundManager
         if SoundManager:
@@ -1068,8 +1726,13 @@ def build_config_view(db, page: ft.Page,
         theme_dropdown.value = config.get('theme', 'dark')
         interval_dropdown.value = config.get('update_interval', '1000')
         retention_dropdown.value = config.get('history_retention_days', '7')
+        backend_dropdown.value = config.get('history_backend', 'sqlite')
         notifications_switch.value = config.get('enable_notifications', 'true') == 'true'
         sounds_switch.value = config.get('enable_sounds', 'true') == 'true'
+        diagnostics_switch.value = config.get('enable_diagnostics', 'false') == 'true'
+        burst_switch.value = config.get('burst_on_alert', 'false') == 'true'
+        instrumentation.set_enabled(diagnostics_switch.value)
+        refresh_diagnostics()
         
         # Restaurar SoundManager a estado por defecto (habilitado)
         if SoundManager:
@@ -1087,7 +1750,7 @@ def build_config_view(db, page: ft.Page,
         
         page.update()
     
-    return ft.Container(
+    view = ft.Container(
         content=ft.Column([
             create_crud_header("Configuración", "Personaliza tu experiencia", ft.Icons.SETTINGS,
                                on_theme_light, on_theme_dark, on_notifications),
@@ -1117,7 +1780,7 @@ def build_config_view(db, page: ft.Page,
                         ft.Text("Rendimiento", size=16, weight=ft.FontWeight.W_500, color=colors["text"]),
                     ]),
                     ft.Container(height=15),
-                    ft.Row([interval_dropdown, retention_dropdown], spacing=20, wrap=True),
+                    ft.Row([interval_dropdown, retention_dropdown, backend_dropdown], spacing=20, wrap=True),
                 ]),
                 bgcolor=colors["card"],
                 border_radius=15,
@@ -1134,13 +1797,18 @@ def build_config_view(db, page: ft.Page,
                         ft.Text("Notificaciones", size=16, weight=ft.FontWeight.W_500, color=colors["text"]),
                     ]),
                     ft.Container(height=15),
-                    ft.Row([notifications_switch, sounds_switch], spacing=30),
+                    ft.Row([notifications_switch, sounds_switch, burst_switch], spacing=30, wrap=True),
                 ]),
                 bgcolor=colors["card"],
                 border_radius=15,
                 padding=20,
             ),
             
+            ft.Container(height=15),
+            
+            # Sección Diagnóstico (coste del propio monitor)
+            diagnostics_panel,
+            
             ft.Container(height=25),
             
             # Botones
@@ -1165,3 +1833,5 @@ def build_config_view(db, page: ft.Page,
         expand=True,
         bgcolor=colors["bg"],
     )
+    view.data = {"refresh": refresh_diagnostics}  # Datos frescos al volver a Ajustes
+    return view
@@ -1,45 +1,267 @@
 """
 Sistema de Sonidos para OmniMonitor
 Reproduce sonidos de notificación para alertas
+Un único hilo de audio persistente consume una cola acotada; los sonidos
+que llegan demasiado seguidos o con la cola llena se descartan.
+
+Los sonidos se resuelven y decodifican a PCM una sola vez al inicializar
+(WAV con el módulo `wave`; si no hay archivo se sintetiza un tono) y se
+escriben en un proceso `aplay`/`paplay` persistente que lee PCM crudo por
+stdin: ni búsqueda en disco, ni fork, ni decodificación por alerta.
 """
+import array
+import math
 import os
+import queue
+import subprocess
 import sys
 import threading
-from typing import Optional
+import time
+import wave
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+SOUND_TYPES = ("alert", "success", "error", "warning", "info")
+
+# Tonos sintetizados cuando no hay archivo: lista de (frecuencia Hz, duración s)
+DEFAULT_TONES = {
+    "alert": [(880, 0.12), (0, 0.05), (880, 0.12)],
+    "success": [(660, 0.08), (880, 0.12)],
+    "error": [(330, 0.25)],
+    "warning": [(740, 0.18)],
+    "info": [(600, 0.08)],
+}
+
+# Sonidos del sistema (solo para los backends que reproducen archivos)
+SYSTEM_SOUNDS = [
+    "/usr/share/sounds/freedesktop/stereo/message.oga",
+    "/usr/share/sounds/freedesktop/stereo/complete.oga",
+    "/usr/share/sounds/freedesktop/stereo/bell.oga",
+    "/usr/share/sounds/gnome/default/alerts/drip.ogg",
+    "/usr/share/sounds/ubuntu/notifications/Mallet.ogg",
+]
+
+
+@dataclass
+class PCMSound:
+    """Sonido decodificado en memoria"""
+    data: bytes
+    channels: int = 1
+    sample_width: int = 2  # bytes por muestra
+    rate: int = 22050
+    
+    @property
+    def format_key(self) -> Tuple[int, int, int]:
+        return self.channels, self.sample_width, self.rate
+    
+    @property
+    def duration(self) -> float:
+        return len(self.data) / (self.channels * self.sample_width * self.rate)
+    
+    @classmethod
+    def from_wav(cls, path: str) -> 'PCMSound':
+        with wave.open(path, 'rb') as wav:
+            return cls(wav.readframes(wav.getnframes()), wav.getnchannels(),
+                       wav.getsampwidth(), wav.getframerate())
+    
+    @classmethod
+    def tone(cls, notes: List[Tuple[float, float]], rate: int = 22050, volume: float = 0.5) -> 'PCMSound':
+        """Sintetizar una secuencia de tonos (frecuencia 0 = silencio)"""
+        samples = array.array('h')
+        amplitude = int(32767 * volume)
+        fade = int(rate * 0.005)  # Rampa de 5 ms para evitar clics
+        for freq, seconds in notes:
+            n = int(rate * seconds)
+            step = 2 * math.pi * freq / rate
+            for i in range(n):
+                envelope = min(1.0, i / fade, (n - i) / fade) if fade else 1.0
+                samples.append(int(amplitude * envelope * math.sin(step * i)) if freq else 0)
+        if sys.byteorder != 'little':
+            samples.byteswap()
+        return cls(samples.tobytes(), 1, 2, rate)
+
+
+class NullSink:
+    """Sumidero de audio que descarta el PCM (tests y equipos sin audio)"""
+    
+    def __init__(self):
+        self.played: List[PCMSound] = []
+    
+    def write(self, sound: PCMSound):
+        self.played.append(sound)
+    
+    def close(self):
+        pass
+
+
+class PipeSink:
+    """
+    Reproductor persistente que recibe PCM crudo por stdin
+    Mantiene un proceso vivo por formato de audio (normalmente uno) y lo
+    relanza solo si termina.
+    """
+    
+    SAMPLE_FORMATS = {1: ('U8', 'u8'), 2: ('S16_LE', 's16le'), 4: ('S32_LE', 's32le')}
+    
+    def __init__(self, player: str = "aplay", command: List[str] = None):
+        self.player = player
+        self.command = command  # Comando fijo (tests); None = según formato
+        self.spawned = 0
+        self._processes: Dict[Tuple[int, int, int], subprocess.Popen] = {}
+    
+    def _build_command(self, channels: int, width: int, rate: int) -> List[str]:
+        if self.command:
+            return list(self.command)
+        alsa_format, pulse_format = self.SAMPLE_FORMATS[width]
+        if self.player == "paplay":
+            # Volumen 65536 = 100%, usar 80000 para más fuerte
+            return ['paplay', '--raw', f'--format={pulse_format}', f'--rate={rate}',
+                    f'--channels={channels}', '--volume=80000']
+        return ['aplay', '-q', '-t', 'raw', '-f', alsa_format, '-r', str(rate), '-c', str(channels)]
+    
+    def _process(self, key: Tuple[int, int, int]) -> subprocess.Popen:
+        process = self._processes.get(key)
+        if process is None or process.poll() is not None:
+            process = subprocess.Popen(self._build_command(*key), stdin=subprocess.PIPE,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            self._processes[key] = process
+            self.spawned += 1
+        return process
+    
+    def write(self, sound: PCMSound):
+        process = self._process(sound.format_key)
+        try:
+            process.stdin.write(sound.data)
+            process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            # El reproductor murió: se relanza en el siguiente sonido
+            self._processes.pop(sound.format_key, None)
+    
+    def close(self):
+        for process in self._processes.values():
+            try:
+                process.stdin.close()
+                process.wait(timeout=2)
+            except Exception:
+                process.kill()
+        self._processes.clear()
 
 
 class SoundManager:
     """
     Gestor de sonidos para notificaciones
-    Soporta múltiples backends: playsound, pygame, system beep
+    Soporta múltiples backends: aplay/paplay por tubería (PCM precargado),
+    pygame, playsound, system beep
     """
     
     _enabled: bool = True
     _backend: Optional[str] = None
     _initialized: bool = False
     
+    # Sonidos resueltos una vez: PCM en memoria y/o ruta del archivo
+    _pcm: Dict[str, PCMSound] = {}
+    _files: Dict[str, Optional[str]] = {}
+    _sink = None  # NullSink / PipeSink; None = backend por archivo
+    
+    # Hilo de audio único y su cola
+    _queue: Optional[queue.Queue] = None
+    _worker: Optional[threading.Thread] = None
+    _last_enqueued: float = float('-inf')
+    _lock = threading.Lock()
+    _init_lock = threading.Lock()  # Serializa la detección (hilo de arranque / hilo de audio)
+    _init_thread: Optional[threading.Thread] = None
+    dropped: int = 0
+    
+    MAX_QUEUE = 4         # Sonidos pendientes como máximo
+    MIN_INTERVAL = 0.5    # Segundos mínimos entre dos sonidos
+    
     # Rutas de sonidos (relativos al directorio del proyecto)
     SOUNDS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'sounds')
     
     @classmethod
-    def initialize(cls):
-        """Inicializar el sistema de sonidos y detectar backend disponible"""
-        if cls._initialized:
-            return
+    def initialize(cls, sink=None):
+        """
+        Inicializar el sistema de sonidos y detectar backend disponible
         
-        # Crear directorio de sonidos si no existe
-        if not os.path.exists(cls.SOUNDS_DIR):
-            os.makedirs(cls.SOUNDS_DIR)
+        Args:
+            sink: Sumidero de audio explícito (p. ej. NullSink en tests);
+                  reemplaza al detectado aunque ya estuviera inicializado
+        """
+        if cls._initialized and sink is None:
+            return
         
-        # Detectar backend disponible
-        cls._backend = cls._detect_backend()
-        cls._initialized = True
+        with cls._init_lock:
+            if cls._initialized and sink is None:
+                return  # Otro hilo terminó la detección mientras esperábamos
+            
+            # Crear directorio de sonidos si no existe
+            if not os.path.exists(cls.SOUNDS_DIR):
+                os.makedirs(cls.SOUNDS_DIR)
+            
+            # Detectar backend disponible
+            if sink is not None:
+                cls.shutdown()
+                cls._backend, cls._sink = type(sink).__name__, sink
+            else:
+                cls._backend = cls._detect_backend()
+                if cls._backend in ("aplay", "paplay"):
+                    cls._sink = PipeSink(cls._backend)
+            cls._preload()
+            cls._initialized = True
         print(f"SoundManager inicializado con backend: {cls._backend}")
     
+    @classmethod
+    def initialize_async(cls):
+        """
+        Detectar backend y precargar sonidos en segundo plano
+        La detección prueba binarios y bibliotecas (pygame, playsound); hacerla
+        fuera del hilo de la UI evita retrasar el primer frame.
+        """
+        if cls._initialized or (cls._init_thread is not None and cls._init_thread.is_alive()):
+            return
+        cls._init_thread = threading.Thread(target=cls.initialize, daemon=True,
+                                            name='omnimonitor-audio-init')
+        cls._init_thread.start()
+    
+    @classmethod
+    def _preload(cls):
+        """Resolver cada tipo de sonido y decodificarlo a PCM una sola vez"""
+        system_sound = next((p for p in SYSTEM_SOUNDS if os.path.exists(p)), None)
+        for sound_type in SOUND_TYPES:
+            path = None
+            for ext in ("wav", "ogg", "mp3"):
+                candidate = os.path.join(cls.SOUNDS_DIR, f"{sound_type}.{ext}")
+                if os.path.exists(candidate):
+                    path = candidate
+                    break
+            cls._files[sound_type] = path or system_sound
+            
+            pcm = None
+            if path and path.endswith(".wav"):
+                try:
+                    pcm = PCMSound.from_wav(path)
+                except (wave.Error, EOFError, OSError) as e:
+                    print(f"No se pudo decodificar {path}: {e}")
+            if pcm is None and cls._sink is not None:
+                # Sin WAV propio: los sumideros PCM no leen .ogg/.mp3, usar un tono
+                pcm = PCMSound.tone(DEFAULT_TONES[sound_type])
+            if pcm is not None:
+                cls._pcm[sound_type] = pcm
+    
     @classmethod
     def _detect_backend(cls) -> Optional[str]:
         """Detectar qué biblioteca de sonido está disponible"""
         
+        # En Linux, preferir un reproductor por tubería (un proceso para todos los sonidos)
+        if sys.platform.startswith('linux'):
+            for player in ('aplay', 'paplay'):
+                try:
+                    result = subprocess.run(['which', player], capture_output=True)
+                    if result.returncode == 0:
+                        return player
+                except:
+                    pass
+        
         # Intentar con pygame (más confiable)
         try:
             import pygame
@@ -55,25 +277,6 @@ class SoundManager:
         except:
             pass
         
-        # En Linux, verificar si hay paplay (PulseAudio)
-        if sys.platform.startswith('linux'):
-            try:
-                import subprocess
-                result = subprocess.run(['which', 'paplay'], capture_output=True)
-                if result.returncode == 0:
-                    return "paplay"
-            except:
-                pass
-            
-            # Verificar aplay (ALSA)
-            try:
-                import subprocess
-                result = subprocess.run(['which', 'aplay'], capture_output=True)
-                if result.returncode == 0:
-                    return "aplay"
-            except:
-                pass
-        
         # Fallback: beep del sistema
         return "beep"
     
@@ -109,63 +312,28 @@ class SoundManager:
         except Exception as e:
             print(f"Error reproduciendo sonido con playsound: {e}")
     
-    @classmethod
-    def _play_with_paplay(cls, sound_file: str):
-        """Reproducir sonido con paplay (PulseAudio) a volumen alto"""
-        try:
-            import subprocess
-            # Volumen 65536 = 100%, usar 80000 para más fuerte
-            subprocess.Popen(['paplay', '--volume=80000', sound_file], 
-                           stdout=subprocess.DEVNULL, 
-                           stderr=subprocess.DEVNULL)
-        except Exception as e:
-            print(f"Error reproduciendo sonido con paplay: {e}")
-    
-    @classmethod
-    def _play_with_aplay(cls, sound_file: str):
-        """Reproducir sonido con aplay (ALSA)"""
-        try:
-            import subprocess
-            subprocess.Popen(['aplay', '-q', sound_file], 
-                           stdout=subprocess.DEVNULL, 
-                           stderr=subprocess.DEVNULL)
-        except Exception as e:
-            print(f"Error reproduciendo sonido con aplay: {e}")
-    
     @classmethod
     def _play_system_beep(cls):
         """Reproducir beep del sistema como fallback"""
         try:
-            if sys.platform.startswith('linux'):
-                import subprocess
-                # Intentar con speaker-test para un beep corto
-                subprocess.Popen(['paplay', '/usr/share/sounds/freedesktop/stereo/message.oga'],
-                               stdout=subprocess.DEVNULL,
-                               stderr=subprocess.DEVNULL)
-            elif sys.platform == 'darwin':  # macOS
+            if sys.platform == 'darwin':  # macOS
                 os.system('afplay /System/Library/Sounds/Ping.aiff &')
-            else:  # Windows
+            elif sys.platform == 'win32':
                 import winsound
                 winsound.MessageBeep()
+            else:
+                print('\a', end='', flush=True)
         except Exception as e:
             # Último recurso: print bell character
             print('\a', end='', flush=True)
     
     @classmethod
     def _play_sound_file(cls, sound_file: str):
-        """Reproducir archivo de sonido usando el backend disponible"""
-        if not os.path.exists(sound_file):
-            cls._play_system_beep()
-            return
-        
+        """Reproducir archivo de sonido con un backend que lee archivos"""
         if cls._backend == "pygame":
             cls._play_with_pygame(sound_file)
         elif cls._backend == "playsound":
             cls._play_with_playsound(sound_file)
-        elif cls._backend == "paplay":
-            cls._play_with_paplay(sound_file)
-        elif cls._backend == "aplay":
-            cls._play_with_aplay(sound_file)
         else:
             cls._play_system_beep()
     
@@ -180,56 +348,62 @@ class SoundManager:
         if not cls._enabled:
             return
         
-        if not cls._initialized:
-            cls.initialize()
-        
-        # Ejecutar en thread separado para no bloquear UI
-        def play_async():
+        # Rate limiting: las ráfagas de alertas suenan una sola vez
+        with cls._lock:
+            now = time.monotonic()
+            if now - cls._last_enqueued < cls.MIN_INTERVAL:
+                cls.dropped += 1
+                return
+            cls._last_enqueued = now
+            if cls._worker is None or not cls._worker.is_alive():
+                cls._queue = queue.Queue(maxsize=cls.MAX_QUEUE)
+                cls._worker = threading.Thread(target=cls._audio_worker, daemon=True,
+                                               name='omnimonitor-audio')
+                cls._worker.start()
+        try:
+            cls._queue.put_nowait(sound_type)
+        except queue.Full:
+            cls.dropped += 1
+    
+    @classmethod
+    def _audio_worker(cls):
+        """Hilo persistente que reproduce los sonidos encolados de uno en uno"""
+        while True:
+            sound_type = cls._queue.get()
             try:
-                # Buscar archivo de sonido
-                sound_files = {
-                    "alert": ["alert.wav", "alert.ogg", "alert.mp3"],
-                    "success": ["success.wav", "success.ogg", "success.mp3"],
-                    "error": ["error.wav", "error.ogg", "error.mp3"],
-                    "warning": ["warning.wav", "warning.ogg", "warning.mp3"],
-                    "info": ["info.wav", "info.ogg", "info.mp3"],
-                }
-                
-                # Buscar archivo existente
-                files_to_try = sound_files.get(sound_type, sound_files["alert"])
-                sound_file = None
-                
-                for filename in files_to_try:
-                    filepath = os.path.join(cls.SOUNDS_DIR, filename)
-                    if os.path.exists(filepath):
-                        sound_file = filepath
-                        break
-                
-                # Si no hay archivo personalizado, intentar sonidos del sistema
-                if not sound_file:
-                    system_sounds = [
-                        "/usr/share/sounds/freedesktop/stereo/message.oga",
-                        "/usr/share/sounds/freedesktop/stereo/complete.oga",
-                        "/usr/share/sounds/freedesktop/stereo/bell.oga",
-                        "/usr/share/sounds/gnome/default/alerts/drip.ogg",
-                        "/usr/share/sounds/ubuntu/notifications/Mallet.ogg",
-                    ]
-                    
-                    for sys_sound in system_sounds:
-                        if os.path.exists(sys_sound):
-                            sound_file = sys_sound
-                            break
-                
-                if sound_file:
-                    cls._play_sound_file(sound_file)
-                else:
-                    cls._play_system_beep()
-                    
+                cls.initialize()  # Sin coste si ya se inicializó (o espera a la detección en curso)
             except Exception as e:
-                print(f"Error en play_notification: {e}")
-        
-        thread = threading.Thread(target=play_async, daemon=True)
-        thread.start()
+                print(f"Error inicializando sonidos: {e}")
+            cls._play_now(sound_type)
+            cls._queue.task_done()
+    
+    @classmethod
+    def _play_now(cls, sound_type: str):
+        """Reproducir un sonido precargado (en el hilo de audio)"""
+        if sound_type not in SOUND_TYPES:
+            sound_type = "alert"
+        try:
+            pcm = cls._pcm.get(sound_type)
+            if cls._sink is not None and pcm is not None:
+                cls._sink.write(pcm)
+            elif cls._files.get(sound_type):
+                cls._play_sound_file(cls._files[sound_type])
+            else:
+                cls._play_system_beep()
+        except Exception as e:
+            print(f"Error en play_notification: {e}")
+    
+    @classmethod
+    def wait_idle(cls):
+        """Esperar a que el hilo de audio vacíe su cola (tests)"""
+        if cls._queue is not None:
+            cls._queue.join()
+    
+    @classmethod
+    def shutdown(cls):
+        """Cerrar el reproductor persistente"""
+        if cls._sink is not None:
+            cls._sink.close()
     
     @classmethod
     def play_alert(cls):
@@ -257,5 +431,31 @@ class SoundManager:
         cls.play_notification("info")
 
 
-# Inicializar al importar
-SoundManager.initialize()
+
+if __name__ == "__main__":
+    # Test con sumidero nulo: PCM precargado, cola acotada y rate limit
+    sink = NullSink()
+    SoundManager.initialize(sink=sink)
+    assert set(SoundManager._pcm) == set(SOUND_TYPES)
+    print(f"Alerta precargada: {SoundManager._pcm['alert'].duration:.2f}s de PCM")
+    
+    for _ in range(50):
+        SoundManager.play_alert()
+    SoundManager.wait_idle()
+    assert len(sink.played) == 1 and SoundManager.dropped == 49
+    
+    time.sleep(SoundManager.MIN_INTERVAL)
+    SoundManager.play_error()
+    SoundManager.wait_idle()
+    assert sink.played[-1] is SoundManager._pcm["error"]
+    
+    # Tubería persistente: un solo proceso para todos los sonidos
+    pipe = PipeSink(command=['cat'])
+    start = time.perf_counter()
+    for sound_type in SOUND_TYPES * 20:
+        pipe.write(SoundManager._pcm[sound_type])
+    elapsed = (time.perf_counter() - start) / 100 * 1e6
+    pipe.close()
+    print(f"Tubería: {pipe.spawned} proceso(s) para 100 sonidos, {elapsed:.0f} µs/sonido")
+    assert pipe.spawned == 1
+    print("Sonidos OK")
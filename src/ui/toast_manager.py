@@ -2,8 +2,15 @@
 Sistema de Notificaciones Toast para OmniMonitor
 Notificaciones flotantes en la esquina inferior derecha
 Con rate limiting y detección de cruce de umbrales
+
+Las notificaciones no tocan la página al pedirse: se encolan en una cola
+acotada y un único despachador (tarea del loop de Flet) las aplica por
+ticks, agrupando duplicados y retiradas en un solo page.update().
 """
+import asyncio
+import time
 import flet as ft
+from collections import deque
 from datetime import datetime, timedelta
 from typing import Dict, Optional, Callable
 from dataclasses import dataclass, field
@@ -37,6 +44,14 @@ class Toast:
     icon: str
     created_at: datetime = field(default_factory=datetime.now)
     duration_ms: int = 5000  # Duración por defecto: 5 segundos
+    key: str = ""            # Toasts con la misma clave se agrupan en uno con contador
+    count: int = 1
+    expires_at: float = 0.0  # time.monotonic() en que se retira
+    text_control: Optional[ft.Text] = field(default=None, repr=False)
+    
+    @property
+    def display_message(self) -> str:
+        return self.message if self.count == 1 else f"{self.message} (×{self.count})"
 
 
 class ToastManager:
@@ -45,12 +60,15 @@ class ToastManager:
     - Muestra notificaciones en esquina inferior derecha
     - Rate limiting: máximo 1 notificación del mismo tipo por minuto
     - Detección de cruce de umbrales (no notifica mientras se mantiene)
+    - Cola acotada + despachador único: agrupa duplicados y retiradas
+      en una sola actualización de la página por tick
     """
     
     # Rate limiting: última notificación por tipo
     _last_notifications: Dict[str, datetime] = {}
     
-    # Estado anterior de métricas (para detectar cruce de umbral)
+    # Claves de alerta actualmente en estado de alerta (para detectar cruce de umbral)
+    # Solo se guardan las que están en alerta, así el tamaño queda acotado
     _previous_states: Dict[str, bool] = {}
     
     # Instancia singleton
@@ -60,9 +78,19 @@ class ToastManager:
     _toasts_column: Optional[ft.Column] = None
     _theme_getter: Optional[Callable] = None
     
+    # Cola de notificaciones pendientes y toasts visibles (clave -> toast)
+    _pending: "deque[Toast]" = deque()
+    _visible: Dict[str, Toast] = {}
+    _to_remove: set = set()
+    _dispatcher_page: Optional[ft.Page] = None
+    dropped: int = 0  # Notificaciones descartadas por cola llena
+    
     # Configuración
     RATE_LIMIT_SECONDS = 30  # 30 segundos entre notificaciones del mismo tipo (más frecuente)
     MAX_VISIBLE_TOASTS = 5
+    MAX_TRACKED_KEYS = 256  # Límite de claves de rate limiting en memoria
+    MAX_PENDING = 32  # Tamaño de la cola de notificaciones
+    DISPATCH_INTERVAL = 0.25  # Segundos entre ticks del despachador
     
     # Flag para primera ejecución
     _first_run: bool = True
@@ -94,6 +122,14 @@ class ToastManager:
         # Agregar a la página como overlay
         if cls._container not in page.overlay:
             page.overlay.append(cls._container)
+        
+        cls._pending = deque(maxlen=cls.MAX_PENDING)
+        cls._visible = {}
+        cls._to_remove = set()
+        # Un solo despachador por página
+        if cls._dispatcher_page is not page:
+            cls._dispatcher_page = page
+            page.run_task(cls._dispatch_loop)
     
     @classmethod
     def _get_colors(cls) -> dict:
@@ -118,6 +154,13 @@ class ToastManager:
         """Verificar si se puede mostrar una notificación (rate limiting)"""
         now = datetime.now()
         
+        # Purgar claves cuyo rate limit ya expiró para acotar la memoria
+        if len(cls._last_notifications) >= cls.MAX_TRACKED_KEYS:
+            cls._last_notifications = {
+                k: t for k, t in cls._last_notifications.items()
+                if (now - t).total_seconds() < cls.RATE_LIMIT_SECONDS
+            }
+        
         if notification_key in cls._last_notifications:
             last_time = cls._last_notifications[notification_key]
             if (now - last_time).total_seconds() < cls.RATE_LIMIT_SECONDS:
@@ -127,7 +170,8 @@ class ToastManager:
         return True
     
     @classmethod
-    def _check_threshold_crossed(cls, metric_key: str, current_value: float, threshold: float, condition: str) -> bool:
+    def _check_threshold_crossed(cls, metric_key: str, current_value: float, threshold: float, condition: str,
+                                 is_alert: Optional[bool] = None) -> bool:
         """
         Verificar si se cruzó el umbral o si es la primera vez que se evalúa
         Retorna True cuando:
@@ -136,9 +180,14 @@ class ToastManager:
         
         Además, limpia el rate limit cuando SALE del estado de alerta
         para permitir que vuelva a sonar cuando regrese al estado de alerta.
+        
+        `is_alert` permite que el motor de alertas indique el estado directamente
+        (condiciones con duración, histéresis, tasa de cambio o percentil).
         """
         # Determinar si actualmente está en alerta según la condición
-        if condition == "greater":
+        if is_alert is not None:
+            pass
+        elif condition == "greater":
             is_alert = current_value > threshold
         elif condition == "greater_equal":
             is_alert = current_value >= threshold
@@ -149,23 +198,18 @@ class ToastManager:
         else:  # equal
             is_alert = current_value == threshold
         
-        # Si es la primera vez que evaluamos esta métrica
-        if metric_key not in cls._previous_states:
-            cls._previous_states[metric_key] = is_alert
-            # Disparar si ya está en estado de alerta al inicio
-            return is_alert
-        
-        # Obtener estado anterior
-        was_alert = cls._previous_states[metric_key]
+        # Sin estado previo equivale a "normal": en la primera evaluación
+        # se dispara si ya está en estado de alerta
+        was_alert = cls._previous_states.get(metric_key, False)
         
-        # Guardar nuevo estado
-        cls._previous_states[metric_key] = is_alert
-        
-        # Si SALIÓ del estado de alerta (estaba en alerta y ya no)
-        # Limpiar el rate limit para que pueda volver a sonar cuando regrese
-        if was_alert and not is_alert:
-            if metric_key in cls._last_notifications:
-                del cls._last_notifications[metric_key]
+        if is_alert:
+            cls._previous_states[metric_key] = True
+        else:
+            cls._previous_states.pop(metric_key, None)
+            # Si SALIÓ del estado de alerta (estaba en alerta y ya no)
+            # Limpiar el rate limit para que pueda volver a sonar cuando regrese
+            if was_alert:
+                cls._last_notifications.pop(metric_key, None)
         
         # Retornar True si CAMBIÓ de normal a alerta
         return is_alert and not was_alert
@@ -187,7 +231,15 @@ class ToastManager:
         accent_color = type_colors.get(toast.toast_type, colors["blue"])
         
         def close_toast(e):
-            cls._remove_toast(toast.id)
+            cls._remove_toast(toast.key)
+        
+        toast.text_control = ft.Text(
+            toast.display_message,
+            size=13,
+            color=colors["text"],
+            max_lines=2,
+            overflow=ft.TextOverflow.ELLIPSIS,
+        )
         
         toast_container = ft.Container(
             content=ft.Row([
@@ -201,13 +253,7 @@ class ToastManager:
                 ft.Icon(toast.icon, color=accent_color, size=24),
                 ft.Container(width=10),
                 ft.Column([
-                    ft.Text(
-                        toast.message,
-                        size=13,
-                        color=colors["text"],
-                        max_lines=2,
-                        overflow=ft.TextOverflow.ELLIPSIS,
-                    ),
+                    toast.text_control,
                     ft.Text(
                         toast.created_at.strftime("%H:%M:%S"),
                         size=10,
@@ -230,37 +276,90 @@ class ToastManager:
                 color=ft.Colors.with_opacity(0.3, ft.Colors.BLACK),
             ),
             animate=ft.Animation(300, ft.AnimationCurve.EASE_OUT),
-            data=toast.id,  # Guardar ID para referencia
+            data=toast.key,  # Guardar clave para referencia
         )
         
         return toast_container
     
     @classmethod
-    def _remove_toast(cls, toast_id: str):
-        """Remover un toast específico"""
-        if cls._toasts_column:
-            for control in cls._toasts_column.controls[:]:
-                if hasattr(control, 'data') and control.data == toast_id:
-                    cls._toasts_column.controls.remove(control)
-                    break
-            if cls._page:
-                cls._page.update()
+    def _remove_toast(cls, key: str):
+        """Marcar un toast para retirarlo en el próximo tick del despachador"""
+        cls._to_remove.add(key)
     
     @classmethod
-    def _auto_remove_toast(cls, toast_id: str, delay_ms: int):
-        """Programar remoción automática del toast"""
-        import asyncio
-        
-        async def remove_after_delay():
-            await asyncio.sleep(delay_ms / 1000)
-            cls._remove_toast(toast_id)
-        
-        if cls._page:
-            cls._page.run_task(remove_after_delay)
+    def _enqueue(cls, toast: Toast):
+        """Encolar sin bloquear; con la cola llena se descarta la más antigua"""
+        if len(cls._pending) == cls._pending.maxlen:
+            cls.dropped += 1
+        cls._pending.append(toast)
+    
+    @classmethod
+    def _flush(cls, now: float = None) -> bool:
+        """
+        Aplicar la cola y las retiradas pendientes a la columna de toasts
+        Devuelve True si cambió algo (y se actualizó la página una vez).
+        """
+        if not cls._toasts_column:
+            return False
+        now = time.monotonic() if now is None else now
+        controls = cls._toasts_column.controls
+        changed = False
+        
+        while cls._pending:
+            toast = cls._pending.popleft()
+            current = cls._visible.get(toast.key)
+            if current is not None and current.key not in cls._to_remove:
+                # Duplicado visible: solo sube el contador y se prolonga
+                current.count += toast.count
+                current.message = toast.message
+                current.expires_at = max(current.expires_at, now + toast.duration_ms / 1000)
+                current.text_control.value = current.display_message
+                changed = True
+                continue
+            if current is not None:
+                cls._drop_control(current)
+                cls._to_remove.discard(toast.key)
+            # Limitar cantidad visible
+            while len(controls) >= cls.MAX_VISIBLE_TOASTS:
+                cls._visible.pop(controls.pop(0).data, None)
+            toast.expires_at = now + toast.duration_ms / 1000
+            controls.append(cls._create_toast_control(toast))
+            cls._visible[toast.key] = toast
+            changed = True
+        
+        # Retiradas (cierre manual o expiradas) agrupadas en el mismo update
+        for key, toast in list(cls._visible.items()):
+            if key in cls._to_remove or toast.expires_at <= now:
+                cls._drop_control(toast)
+                changed = True
+        cls._to_remove.clear()
+        
+        if changed and cls._page:
+            cls._page.update()
+        return changed
+    
+    @classmethod
+    def _drop_control(cls, toast: Toast):
+        cls._visible.pop(toast.key, None)
+        for control in cls._toasts_column.controls:
+            if control.data == toast.key:
+                cls._toasts_column.controls.remove(control)
+                break
+    
+    @classmethod
+    async def _dispatch_loop(cls):
+        """Despachador único de notificaciones (tarea del loop de Flet)"""
+        while True:
+            try:
+                cls._flush()
+            except Exception as e:
+                print(f"Error despachando notificaciones: {e}")
+            await asyncio.sleep(cls.DISPATCH_INTERVAL)
     
     @classmethod
     def show(cls, message: str, toast_type: ToastType = ToastType.INFO, 
-             icon: str = None, duration_ms: int = 5000, notification_key: str = None):
+             icon: str = None, duration_ms: int = 5000, notification_key: str = None,
+             group_key: str = None):
         """
         Mostrar una notificación toast
         
@@ -270,6 +369,8 @@ class ToastManager:
             icon: Icono personalizado (opcional)
             duration_ms: Duración en milisegundos
             notification_key: Clave para rate limiting (opcional)
+            group_key: Clave para agrupar duplicados en un toast con contador
+                       (por defecto, la clave de rate limiting o el mensaje)
         """
         if not cls._page or not cls._toasts_column:
             return
@@ -294,19 +395,11 @@ class ToastManager:
             toast_type=toast_type,
             icon=icon or default_icons.get(toast_type, ft.Icons.INFO_OUTLINE),
             duration_ms=duration_ms,
+            key=group_key or key,
         )
         
-        # Limitar cantidad visible
-        while len(cls._toasts_column.controls) >= cls.MAX_VISIBLE_TOASTS:
-            cls._toasts_column.controls.pop(0)
-        
-        # Agregar toast
-        toast_control = cls._create_toast_control(toast)
-        cls._toasts_column.controls.append(toast_control)
-        cls._page.update()
-        
-        # Auto-remover después de duration
-        cls._auto_remove_toast(toast.id, duration_ms)
+        # El despachador lo mostrará (o agrupará) en su próximo tick
+        cls._enqueue(toast)
     
     @classmethod
     def show_info(cls, message: str, play_sound: bool = False, **kwargs):
@@ -339,7 +432,8 @@ class ToastManager:
     @classmethod
     def show_alert(cls, alert_name: str, metric: str, value: float, threshold: float, 
                    condition: str = "greater", play_sound: bool = True, 
-                   on_triggered: callable = None, alert_id: int = None):
+                   on_triggered: callable = None, alert_id: int = None,
+                   firing: Optional[bool] = None):
         """
         Mostrar notificación de alerta del sistema
         Solo se muestra si cruza el umbral (no si se mantiene)
@@ -354,22 +448,26 @@ class ToastManager:
             play_sound: Si reproducir sonido de alerta
             on_triggered: Callback cuando se dispara la alerta (para guardar en BD)
             alert_id: ID de la alerta para el callback
+            firing: Estado ya evaluado por el motor de alertas (None = comparar value/threshold)
         """
         metric_key = f"alert:{alert_name}:{metric}"  # Clave única por alerta+métrica
         
         # Verificar si cruzó el umbral (de normal a alerta)
-        if not cls._check_threshold_crossed(metric_key, value, threshold, condition):
+        if not cls._check_threshold_crossed(metric_key, value, threshold, condition, firing):
             return False  # Retornar False para indicar que no se disparó
         
         # Rate limiting (30 segundos entre alertas del mismo tipo)
         if not cls._can_show_notification(metric_key):
             return False
         
-        # Determinar unidad según la métrica
-        if 'temp' in metric:
+        # Determinar unidad según la métrica (sin las etiquetas de la serie)
+        base_metric = metric.partition('{')[0]
+        if 'temp' in base_metric:
             unit = "°C"
-        elif 'net_' in metric:
+        elif 'net_' in base_metric:
             unit = " MB/s"
+        elif base_metric.endswith('_gb'):
+            unit = " GB"
         else:
             unit = "%"
         
@@ -392,9 +490,11 @@ class ToastManager:
             "gpu_usage": "GPU",
             "gpu_temp": "Temp. GPU",
             "net_download": "Descarga",
-            "net_upload": "Subida"
+            "net_upload": "Subida",
+            "process_cpu": "CPU de proceso",
+            "process_rss_gb": "Memoria de proceso"
         }
-        metric_display = metric_names.get(metric, metric.upper())
+        metric_display = metric_names.get(base_metric, base_metric.upper())
         
         message = f"⚠️ {alert_name}: {metric_display} {condition_text} {threshold}{unit} (actual: {value:.2f}{unit})"
         
@@ -403,6 +503,8 @@ class ToastManager:
             toast_type=ToastType.ALERT,
             icon=ft.Icons.NOTIFICATIONS_ACTIVE,
             duration_ms=8000,  # Alertas duran más
+            # Una ráfaga de la misma regla (p. ej. varios núcleos) se agrupa en un toast
+            group_key=f"alert:{alert_id if alert_id is not None else alert_name}",
         )
         
         # Reproducir sonido de alerta
@@ -421,7 +523,46 @@ class ToastManager:
     @classmethod
     def clear_all(cls):
         """Limpiar todas las notificaciones"""
-        if cls._toasts_column:
-            cls._toasts_column.controls.clear()
-            if cls._page:
-                cls._page.update()
+        cls._pending.clear()
+        cls._to_remove.update(cls._visible)
+
+
+if __name__ == "__main__":
+    # Test: ráfaga de alertas -> un toast agrupado y un page.update() por tick
+    class FakePage:
+        def __init__(self):
+            self.overlay = []
+            self.updates = 0
+        
+        def run_task(self, handler):
+            pass  # Sin loop de Flet: el test llama a _flush() a mano
+        
+        def update(self):
+            self.updates += 1
+    
+    page = FakePage()
+    ToastManager.initialize(page)
+    for core in range(16):
+        ToastManager.show_alert(f"Núcleo saturado [{core}]", f"cpu_usage{{core={core}}}", 100, 100,
+                                condition="greater_equal", play_sound=False, alert_id=7, firing=True)
+    ToastManager.show_info("Alerta creada correctamente")
+    assert len(ToastManager._pending) == 17 and page.updates == 0  # Nada toca la página al encolar
+    
+    assert ToastManager._flush(now=0)
+    assert page.updates == 1 and len(ToastManager._toasts_column.controls) == 2
+    grouped = ToastManager._visible["alert:7"]
+    print(f"Agrupado: {grouped.display_message}")
+    assert grouped.count == 16
+    
+    assert not ToastManager._flush(now=1)  # Sin cambios: sin update
+    ToastManager._remove_toast("alert:7")
+    assert ToastManager._flush(now=2) and len(ToastManager._toasts_column.controls) == 1
+    assert ToastManager._flush(now=10) and not ToastManager._toasts_column.controls  # Expirado
+    assert page.updates == 3
+    
+    for i in range(100):
+        ToastManager.show_info(f"Mensaje {i}")
+    assert len(ToastManager._pending) == ToastManager.MAX_PENDING and ToastManager.dropped == 100 - ToastManager.MAX_PENDING
+    ToastManager._flush(now=20)
+    assert len(ToastManager._toasts_column.controls) == ToastManager.MAX_VISIBLE_TOASTS
+    print(f"Notificaciones OK ({page.updates} updates, {ToastManager.dropped} descartadas)")
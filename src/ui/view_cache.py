@@ -0,0 +1,176 @@
+"""
+Caché de vistas para OmniMonitor
+Cada vista de la navegación se construye una sola vez y se conserva; al
+volver a ella solo se refrescan sus datos. Las vistas que consultan la base
+de datos o recorren la lista de procesos cargan en segundo plano y muestran
+un esqueleto mientras tanto, así cambiar de pestaña es inmediato.
+
+Protocolo: una vista puede exponer `view.data = {"refresh": fn}`; la caché
+llama a `fn()` cada vez que la vista vuelve a mostrarse.
+"""
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import flet as ft
+
+
+def refresh_view(view: ft.Control):
+    """Refrescar los datos de una vista ya construida (si expone `refresh`)"""
+    data = getattr(view, "data", None)
+    if isinstance(data, dict) and callable(data.get("refresh")):
+        data["refresh"]()
+
+
+class ViewCache:
+    """Vistas construidas bajo demanda y reutilizadas entre navegaciones"""
+
+    def __init__(self, builders: Dict[str, Callable[[], ft.Control]]):
+        self.builders = builders
+        self._views: Dict[str, ft.Control] = {}
+        self.builds = 0  # Vistas construidas (las visitas repetidas no cuentan)
+
+    def get(self, name: str) -> ft.Control:
+        """Vista `name`: la construye la primera vez, luego solo refresca sus datos"""
+        view = self._views.get(name)
+        if view is None:
+            view = self._views[name] = self.builders[name]()
+            self.builds += 1
+        else:
+            refresh_view(view)
+        return view
+
+    def invalidate(self, name: str = None):
+        """Descartar una vista (o todas, p. ej. al cambiar de tema)"""
+        if name is None:
+            self._views.clear()
+        else:
+            self._views.pop(name, None)
+
+
+class BackgroundLoader:
+    """
+    Carga de datos fuera del hilo de la UI, una a la vez por vista
+    `load()` corre en un hilo del executor de la página; `apply(result)`
+    actualiza los controles y después se hace un único page.update().
+    Las peticiones que llegan con una carga en curso se agrupan en una sola
+    recarga al terminar (p. ej. escribir en el buscador de procesos).
+    """
+
+    def __init__(self, page: ft.Page, load: Callable[[], Any], apply: Callable[[Any], None],
+                 on_error: Callable[[Exception], None] = None):
+        self.page = page
+        self.load = load
+        self.apply = apply
+        self.on_error = on_error
+        self._lock = threading.Lock()
+        self._running = False
+        self._pending = False
+        self.loads = 0
+
+    def request(self):
+        """Pedir una recarga (no bloquea)"""
+        with self._lock:
+            if self._running:
+                self._pending = True
+                return
+            self._running = True
+        run_thread = getattr(self.page, "run_thread", None)
+        if run_thread is not None:
+            run_thread(self._run)
+        else:
+            threading.Thread(target=self._run, daemon=True, name="omnimonitor-view-load").start()
+
+    @property
+    def busy(self) -> bool:
+        return self._running
+
+    def _run(self):
+        while True:
+            try:
+                result, error = self.load(), None
+            except Exception as e:
+                result, error = None, e
+            self.loads += 1
+            try:
+                if error is None:
+                    self.apply(result)
+                elif self.on_error is not None:
+                    self.on_error(error)
+                else:
+                    print(f"Error cargando vista: {error}")
+                self.page.update()
+            except Exception as e:
+                print(f"Error actualizando vista: {e}")
+            with self._lock:
+                if not self._pending:
+                    self._running = False
+                    return
+                self._pending = False
+
+
+def skeleton_block(width: Optional[float], height: float, color: str) -> ft.Container:
+    """Bloque gris que ocupa el lugar de un dato mientras carga"""
+    return ft.Container(
+        width=width,
+        height=height,
+        bgcolor=ft.Colors.with_opacity(0.12, color),
+        border_radius=6,
+    )
+
+
+def skeleton_rows(count: int, color: str, height: float = 18) -> List[ft.Control]:
+    """Filas de esqueleto con anchos alternos (tablas y listas)"""
+    widths = (None, 0.75, 0.9, 0.6)
+    rows = []
+    for i in range(count):
+        fraction = widths[i % len(widths)]
+        rows.append(ft.Row([
+            skeleton_block(60, height, color),
+            ft.Container(content=skeleton_block(None, height, color), expand=True)
+            if fraction is None else skeleton_block(400 * fraction, height, color),
+        ], spacing=15))
+    return rows
+
+
+if __name__ == "__main__":
+    # Test: caché de vistas y cargas agrupadas con una página simulada
+    import time
+
+    class FakePage:
+        def __init__(self):
+            self.updates = 0
+
+        def update(self):
+            self.updates += 1
+
+    refreshed = []
+
+    def build_slow():
+        view = ft.Container(content=ft.Column(skeleton_rows(3, "#888888")))
+        view.data = {"refresh": lambda: refreshed.append(time.monotonic())}
+        return view
+
+    cache = ViewCache({"procesos": build_slow, "ajustes": lambda: ft.Container()})
+    first = cache.get("procesos")
+    assert cache.get("ajustes") is not None and cache.get("procesos") is first
+    assert cache.builds == 2 and len(refreshed) == 1
+    cache.invalidate()
+    assert cache.get("procesos") is not first and cache.builds == 3
+
+    page = FakePage()
+    applied = []
+
+    def slow_load():
+        time.sleep(0.05)  # Simula recorrer cientos de procesos
+        return len(applied)
+
+    loader = BackgroundLoader(page, slow_load, applied.append)
+    start = time.perf_counter()
+    for _ in range(20):
+        loader.request()
+    elapsed = (time.perf_counter() - start) * 1000
+    while loader.busy:
+        time.sleep(0.01)
+    print(f"20 peticiones: {elapsed:.2f} ms en el hilo de la UI, {loader.loads} cargas")
+    assert loader.loads == 2 and page.updates == 2 and elapsed < 20
+    print("Caché de vistas OK")